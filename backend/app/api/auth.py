@@ -1,7 +1,12 @@
+import asyncio
+import math
 import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import jwt
 from fastapi import Depends, HTTPException, status
@@ -9,9 +14,48 @@ from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from pydantic import BaseModel
 
+from app.database import get_client
+
 # Password Hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is CPU-bound (tens of ms per call): in request handlers it runs in a bounded
+# thread pool (the bcrypt C extension releases the GIL) instead of on the event loop.
+_bcrypt_rounds: Optional[int] = None  # None: passlib's default cost
+_crypto_workers = 4
+_crypto_executor: Optional[ThreadPoolExecutor] = None
+
+
+def set_password_settings(bcrypt_rounds: Optional[int] = None, crypto_workers: Optional[int] = None):
+    """
+    Configures the bcrypt cost and the size of the hashing pool.
+    Hashes made with another cost are upgraded at the next successful login.
+    """
+    global _bcrypt_rounds, _crypto_workers
+    if bcrypt_rounds is not None:
+        pwd_context.update(bcrypt__rounds=bcrypt_rounds)
+        _bcrypt_rounds = bcrypt_rounds
+    if crypto_workers is not None:
+        _crypto_workers = crypto_workers
+
+
+def get_bcrypt_rounds() -> Optional[int]:
+    return _bcrypt_rounds
+
+
+def _get_crypto_executor() -> ThreadPoolExecutor:
+    global _crypto_executor
+    if _crypto_executor is None:
+        _crypto_executor = ThreadPoolExecutor(max_workers=_crypto_workers, thread_name_prefix="auth-crypto")
+    return _crypto_executor
+
+
+def shutdown_crypto_executor():
+    global _crypto_executor
+    if _crypto_executor is not None:
+        _crypto_executor.shutdown(wait=False, cancel_futures=True)
+        _crypto_executor = None
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -21,6 +65,24 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+async def hash_password(password: str) -> str:
+    """Hashes a password in the auth crypto pool (for use in request handlers)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_crypto_executor(), pwd_context.hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password in the auth crypto pool.
+    Returns (valid, new_hash): new_hash is set when the stored hash uses outdated
+    parameters (e.g. a lower bcrypt cost) and should replace it.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_crypto_executor(), pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
 # Configuration for JWT
 _SECRET_KEY: Optional[str] = None
 ALGORITHM = "HS256"
@@ -35,13 +97,21 @@ def get_secret_key() -> str:
         raise ValueError("JWT SECRET_KEY not configured. Call set_jwt_settings first.")
     return _SECRET_KEY
 
+def issued_at() -> float:
+    """Current time in epoch seconds, truncated to the millisecond."""
+    return math.floor(time.time() * 1000) / 1000
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # "iat" lets revoke_user reject the tokens issued before a password change. It is kept
+    # to the millisecond (like "tokensValidAfter"), so that a token issued within the same
+    # second as a revocation is still told apart.
+    to_encode.update({"exp": expire, "iat": issued_at()})
     encoded_jwt = jwt.encode(to_encode, get_secret_key(), algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -67,6 +137,140 @@ class CurrentUser(BaseModel):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")  # Updated tokenUrl
 
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of verified tokens -> CurrentUser, so that an authenticated
+    request does not decode and validate its JWT again.
+    - An entry is only served until the token's "exp".
+    - revoke_user() drops the user's entries and rejects the tokens issued before
+      (their "iat"), e.g. after a password change or a deletion. The list of revoked
+      users only needs to outlive the tokens, so entries older than
+      ACCESS_TOKEN_EXPIRE_MINUTES are purged.
+    The cutoff is also stored on the user ("tokensValidAfter"), which verify_token
+    checks before caching a token: revocations survive restarts and reach workers that
+    missed them.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.rejected_revoked = 0
+        self._entries: "OrderedDict[str, Tuple[CurrentUser, float]]" = OrderedDict()
+        self._revoked_before: Dict[str, float] = {}
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return user
+
+    def put(self, token: str, user: CurrentUser, expires_at: float) -> None:
+        self._entries[token] = (user, expires_at)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def is_revoked(self, user_id: str, issued_at: Optional[float]) -> bool:
+        revoked_before = self._revoked_before.get(user_id)
+        if revoked_before is None:
+            return False
+        # Tokens without "iat" were issued before revocation support: treat them as old
+        return issued_at is None or issued_at < revoked_before
+
+    def revoke_user(self, user_id: str, at: Optional[float] = None) -> None:
+        now = time.time()
+        self._revoked_before[user_id] = at if at is not None else now
+        for token in [t for t, (user, _) in self._entries.items() if user.id == user_id]:
+            del self._entries[token]
+        horizon = now - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        for revoked_user_id in [u for u, t in self._revoked_before.items() if t < horizon]:
+            del self._revoked_before[revoked_user_id]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._revoked_before.clear()
+        self.hits = self.misses = self.rejected_revoked = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxSize": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else None,
+            "revokedUsers": len(self._revoked_before),
+            "rejectedRevoked": self.rejected_revoked,
+        }
+
+
+token_cache = VerifiedTokenCache()
+
+
+_TOKENS_VALID_AFTER_SQL = """
+SELECT EXTRACT(EPOCH FROM "tokensValidAfter")::float8 AS "validAfter" FROM "User" WHERE "id" = $1
+"""
+
+
+async def _revoked_in_database(user_id: str, issued_at: Optional[float]) -> bool:
+    rows = await get_client().query_raw(_TOKENS_VALID_AFTER_SQL, user_id)
+    if not rows:
+        return True  # deleted user
+    valid_after = rows[0]["validAfter"]
+    return valid_after is not None and (issued_at is None or issued_at < valid_after)
+
+
+async def verify_token(token: str) -> CurrentUser:
+    """
+    Returns the user of a valid token, from the cache when possible (otherwise the
+    user's revocation cutoff is read from the database before caching it).
+    Raises jwt.ExpiredSignatureError or jwt.InvalidTokenError otherwise.
+    """
+    user = token_cache.get(token)
+    if user is not None:
+        return user
+
+    payload = jwt.decode(token, get_secret_key(), algorithms=[ALGORITHM])
+    user_id: str = payload.get("id")
+    user_username: str = payload.get("username")
+    user_email: Optional[str] = payload.get("email")
+    user_name: str = payload.get("name")
+    user_role: str = payload.get("role")
+    user_department: Optional[str] = payload.get("department")
+
+    if (
+        user_id is None
+        or user_username is None
+        or user_name is None
+        or user_role is None
+    ):
+        raise jwt.InvalidTokenError("Missing claims")
+    issued = payload.get("iat")
+    if token_cache.is_revoked(user_id, issued) or await _revoked_in_database(user_id, issued):
+        token_cache.rejected_revoked += 1
+        raise jwt.InvalidTokenError("Token revoked")
+
+    user = CurrentUser(
+        id=user_id,
+        username=user_username,
+        email=user_email,
+        name=user_name,
+        role=UserRole(user_role),
+        department=user_department,
+    )
+    token_cache.put(token, user, float(payload["exp"]))
+    return user
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,37 +278,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, get_secret_key(), algorithms=[ALGORITHM])
-        user_id: str = payload.get("id")
-        user_username: str = payload.get("username")
-        user_email: Optional[str] = payload.get("email")
-        user_name: str = payload.get("name")
-        user_role: str = payload.get("role")
-        user_department: Optional[str] = payload.get("department")
-
-        if (
-            user_id is None
-            or user_username is None
-            or user_name is None
-            or user_role is None
-        ):
-            raise credentials_exception
-
-        return CurrentUser(
-            id=user_id,
-            username=user_username,
-            email=user_email,
-            name=user_name,
-            role=UserRole(user_role),
-            department=user_department,
-        )
+        return await verify_token(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    except jwt.PyJWTError:
+    except (jwt.PyJWTError, ValueError):
         raise credentials_exception
 
 
@@ -138,11 +319,9 @@ def super_observateur_access(current_user: CurrentUser = Depends(get_current_use
 
 
 # --- WebSocket Authentication ---
-def get_user_id_from_token(token: str) -> Optional[str]:
-    """Decodes the JWT token and returns the user ID."""
+async def get_user_id_from_token(token: str) -> Optional[str]:
+    """Verifies the JWT token (through the token cache) and returns the user ID."""
     try:
-        payload = jwt.decode(token, get_secret_key(), algorithms=[ALGORITHM])
-        user_id: Optional[str] = payload.get("id")
-        return user_id
-    except jwt.PyJWTError:
-        return None
\ No newline at end of file
+        return (await verify_token(token)).id
+    except (jwt.PyJWTError, ValueError):
+        return None
@@ -0,0 +1,110 @@
+import hashlib
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Sequence
+
+from fastapi import Request, Response, status
+
+from app.table_versions import table_versions
+
+# Authenticated content: caches of the browser only, revalidated before every reuse.
+CACHE_CONTROL = "private, no-cache"
+
+_enabled = True
+
+
+def set_http_cache_enabled(enabled: bool) -> None:
+    """Turns the validators of the catalog reads on or off (HTTP_CACHE_ENABLED)."""
+    global _enabled
+    _enabled = enabled
+
+
+def _utc(value: datetime) -> datetime:
+    # Prisma and asyncpg return UTC datetimes, naive for TIMESTAMP columns
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _stable(last_modified: Optional[datetime]) -> Optional[datetime]:
+    """
+    Last-Modified has a one-second resolution: a date is only used once its second is
+    over, otherwise a second write within the same second would keep the same date.
+    """
+    if last_modified is None:
+        return None
+    last_modified = _utc(last_modified)
+    if datetime.now(timezone.utc) - last_modified < timedelta(seconds=1):
+        return None
+    return last_modified.replace(microsecond=0)
+
+
+def _etag_values(header: str) -> Sequence[str]:
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    return [value.strip().removeprefix("W/") for value in header.split(",")]
+
+
+@dataclass(frozen=True)
+class Validators:
+    """Strong ETag and optional Last-Modified of a representation."""
+
+    etag: str
+    last_modified: Optional[datetime] = None
+
+    def with_last_modified(self, *dates: Optional[datetime]) -> "Validators":
+        known = [_utc(date) for date in dates if date is not None]
+        return replace(self, last_modified=max(known) if known else None)
+
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        last_modified = _stable(self.last_modified)
+        if last_modified is not None:
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """
+        True when the client copy is current (RFC 9110 section 13.1): If-None-Match
+        when present, otherwise If-Modified-Since.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            values = _etag_values(if_none_match)
+            return "*" in values or self.etag in values
+        if_modified_since = request.headers.get("if-modified-since")
+        last_modified = _stable(self.last_modified)
+        if if_modified_since is None or last_modified is None:
+            return False
+        try:
+            since = _utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return last_modified <= since
+
+    def not_modified(self) -> Response:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self.headers())
+
+    def apply(self, response: Response) -> None:
+        response.headers.update(self.headers())
+
+
+def catalog_validators(resource: str, tables: Sequence[str], *parts: str) -> Optional[Validators]:
+    """
+    Validators of a representation built from `tables`, from their change counters
+    (no query). The ETag changes with any committed write on one of the tables; `parts`
+    (query parameters, id) distinguish the representations of a resource.
+    Returns None when a counter is unknown (listener down or disabled): the request is
+    then answered normally, without validators.
+    """
+    if not _enabled:
+        return None
+    versions = [table_versions.get(table) for table in tables]
+    if any(version is None for version in versions):
+        return None
+    tag = "-".join([resource, *(f"{table.lower()}{version}" for table, version in zip(tables, versions))])
+    if parts:
+        tag += "-" + hashlib.sha1("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+    return Validators(etag=f'"{tag}"').with_last_modified(
+        *(table_versions.changed_at(table) for table in tables)
+    )
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from app.api.auth import create_access_token, verify_password
+from app.api.auth import check_password, create_access_token
 
 # Import schemas and auth utility functions
 from app.api.schemas import LoginRequest, TokenResponse
@@ -37,11 +37,13 @@ async def login(body: LoginRequest, db: Prisma = Depends(get_db)):
 
 
 
-    # Check if user exists and if the password is correct
+    # Check if user exists and if the password is correct (bcrypt runs off the event loop)
 
-    if not user or not verify_password(body.password, user.password):
+    password_valid, new_hash = await check_password(body.password, user.password) if user else (False, None)
 
-        logger.warning(f"Login failed for username: {body.username}. User found: {user is not None}, Password correct: {verify_password(body.password, user.password) if user else False}")
+    if not password_valid:
+
+        logger.warning(f"Login failed for username: {body.username}. User found: {user is not None}")
 
         raise HTTPException(
 
@@ -55,6 +57,10 @@ async def login(body: LoginRequest, db: Prisma = Depends(get_db)):
 
     logger.info(f"Login successful for user: {user.username}")
 
+    # The stored hash uses outdated parameters (e.g. a lower bcrypt cost): upgrade it
+    if new_hash:
+        await db.user.update(where={"id": user.id}, data={"password": new_hash})
+
     # Data to be encoded in the JWT
     token_data = {
         "id": user.id,
@@ -1,8 +1,9 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
 from app.api.auth import CurrentUser, UserRole, get_current_user, role_required
+from app.api.conditional import catalog_validators
 from app.api.schemas import CategoryCreate, CategoryResponse, CategoryUpdate
 from app.database import get_db
 from database.generated.prisma import Prisma  # Corrected import path
@@ -31,12 +32,22 @@ async def create_category(
 
 @router.get("/", response_model=List[CategoryResponse])
 async def get_all_categories(
+    request: Request,
+    response: Response,
     db: Prisma = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),  # Any authenticated user
 ):
     """
     Retrieves a list of all categories (accessible by any authenticated user).
+    Answers 304 Not Modified, without querying the database, when the client's ETag is
+    still current.
     """
+    validators = catalog_validators("categories", ("Category",))
+    if validators is not None:
+        if validators.matches(request):
+            return validators.not_modified()
+        validators.apply(response)
+
     categories = await db.category.find_many(order={"name": "asc"})
     return [CategoryResponse.model_validate(cat) for cat in categories]
 
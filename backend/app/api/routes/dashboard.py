@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.api.auth import CurrentUser, get_current_user
 from app.api.schemas import DashboardStats
+from app.crud import stock_status as crud_stock_status
 from app.database import get_db
 from database.generated.prisma import Prisma  # Corrected import path
 
@@ -22,12 +23,8 @@ async def get_dashboard_stats(
     - totalItems: Total quantity of all items in stock.
     """
     try:
-        # Fetch products to determine minStock dynamically
-        products = await db.product.find_many(
-            select={"quantity": True, "minStock": True}
-        )
-
-        low_stock_count = sum(1 for p in products if p.quantity < p.minStock)
+        # Counted by the database, without loading the products
+        low_stock_count = await crud_stock_status.count_below_min_stock(db)
 
         pending_approvals_count = await db.request.count(
             where={"status": "TRANSMISE"}
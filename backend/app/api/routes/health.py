@@ -0,0 +1,92 @@
+import logging
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.api.auth import UserRole, role_required, token_cache
+from app.catalog_cache import catalog_cache
+from app.database import get_client, get_pool_status
+from app.metrics import metrics
+from app.services.notification_outbox import outbox
+from app.table_versions import table_versions
+from app.websockets import manager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Health"])
+
+# Only the probes are public; the metrics describe the internals of the worker.
+admin_only = [Depends(role_required(UserRole.ADMIN))]
+
+
+@router.get("/health")
+async def liveness():
+    """
+    Liveness probe: the worker process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: the shared database client is connected and answers a trivial query.
+    Returns 503 with the pool state when the database is not reachable (the error itself
+    is only logged).
+    """
+    pool = get_pool_status()
+    try:
+        await get_client().query_raw("SELECT 1")
+    except Exception:
+        logger.exception("Readiness check failed")
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "database": pool, "detail": "Database unreachable"},
+        )
+    return {"status": "ready", "database": pool}
+
+
+@router.get("/health/websockets", dependencies=admin_only)
+async def websocket_metrics():
+    """
+    WebSocket fan-out metrics of this worker: connections, send queue depth,
+    send latency, slow consumers dropped and notification outbox counters.
+    """
+    return {**manager.get_metrics(), "outbox": outbox.get_metrics()}
+
+
+@router.get("/health/auth", dependencies=admin_only)
+async def auth_metrics():
+    """
+    Verified-token cache of this worker: size, hit rate and revocations.
+    """
+    return token_cache.stats()
+
+
+@router.get("/health/table-versions", dependencies=admin_only)
+async def table_version_metrics():
+    """
+    Catalog change counters known to this worker (ETag of the catalog reads): listener
+    state, versions, notifications received and reloads.
+    """
+    return table_versions.stats()
+
+
+@router.get("/health/catalog", dependencies=admin_only)
+async def catalog_cache_metrics():
+    """
+    Catalog cache of this worker: size, memory, versions behind the database, age of the
+    last refresh, reloads and hit rate.
+    """
+    return catalog_cache.stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=admin_only)
+async def prometheus_metrics():
+    """
+    Request metrics of this worker in the Prometheus text format: latency and database
+    time histograms and query counts per route template and status class.
+    """
+    return PlainTextResponse(
+        metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,8 +1,12 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
 from app.api.auth import get_user_id_from_token, get_current_user, CurrentUser
 from app.websockets import manager
 from app.services.notification_service import NotificationService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
 
@@ -21,7 +25,7 @@ async def get_counts(
 
 @router.websocket("/ws/{token}")
 async def websocket_endpoint(websocket: WebSocket, token: str):
-    user_id = get_user_id_from_token(token)
+    user_id = await get_user_id_from_token(token)
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token"
@@ -34,11 +38,11 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
             # For now, we just expect the client to send a ping or nothing
             # If the client sends a message, we can process it here
             message = await websocket.receive_text()
-            print(f"Received message from {user_id}: {message}")
+            logger.debug("Received WebSocket message from %s (%d bytes)", user_id, len(message))
             # Optionally, send a response back
             # await manager.send_personal_message(f"Echo: {message}", user_id)
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
     except Exception as e:
-        print(f"WebSocket error for user {user_id}: {e}")
-        manager.disconnect(user_id)
+        logger.warning("WebSocket error for user %s: %s", user_id, e)
+        manager.disconnect(user_id, websocket)
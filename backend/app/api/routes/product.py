@@ -1,14 +1,20 @@
 from datetime import datetime  # Import datetime
-from typing import List, Optional, Union
+from typing import AsyncIterator, List, Literal, Optional, Union
 from io import StringIO
 import csv
+import zlib
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Response
+from fastapi.responses import StreamingResponse
 
 from app.api.auth import CurrentUser, UserRole, get_current_user, role_required
+from app.api.conditional import catalog_validators
+from app.catalog_cache import catalog_cache
 from app.api.schemas import (
     BatchStockReceiptCreate,
     PaginatedProductStockStatusResponse,
+    PaginatedStockAdjustmentSummaryResponse,
+    PaginatedStockReceiptSummaryResponse,
     PaginatedTransactionHistoryResponse,
     ProductCreate,
     ProductFullResponse,
@@ -17,18 +23,26 @@ from app.api.schemas import (
     StockAdjustmentCreate,
     StockAdjustmentDecision,
     StockAdjustmentResponse,
-    StockAdjustmentType,
     StockReceiptCreate,
     StockReceiptDecision,
     StockReceiptResponse,
-    StockReportItem,
-    StockReportProduct,
     StockReportResponse,
     StockStatusEnum,
     TransactionHistoryResponse,
 )
+from app.crud import reports as crud_reports
+from app.crud import search as crud_search
+from app.crud import stock_status as crud_stock_status
+from app.crud import summaries as crud_summaries
+from app.crud import transaction as crud_transaction
 from app.crud.inventory_audit import check_and_close_audit
+from app.services.notification_dispatcher import dispatcher
+from app.services.notification_outbox import outbox
 from app.database import get_db
+from app.services.pdf_service import PDFService
+from app.services.stock_ledger import StockLedger, StockMovement
+from app.table_versions import table_versions
+from app.utils.loader import ModelLoader
 from app.websockets import manager  # Import the WebSocket manager
 from database.generated.prisma import Prisma  # Corrected import path
 from database.generated.prisma.enums import (
@@ -39,26 +53,6 @@ from database.generated.prisma.enums import (
 )  # Corrected import path for StockAdjustmentStatus, TransactionSource, StockReceiptStatus, and TransactionType
 
 
-# Helper function to check for low stock and send notifications
-async def _check_and_notify_low_stock(product_id: str, db: Prisma):
-    product = await db.product.find_unique(where={"id": product_id})
-    if product and product.quantity <= product.minStock:
-        message = f"Alerte stock faible: Le produit '{product.name}' (Référence: {product.reference}) a atteint ou dépassé son seuil de stock minimum ({product.quantity}/{product.minStock})."
-
-        # Get users with roles ADMIN, MAGASINIER, CHEF_SERVICE
-        relevant_users = await db.user.find_many(
-            where={
-                "role": {
-                    "in": [UserRole.ADMIN, UserRole.MAGASINIER, UserRole.CHEF_SERVICE]
-                }
-            }
-        )
-        relevant_user_ids = [u.id for u in relevant_users]
-
-        await manager.send_to_users(
-            {"type": "low_stock_alert", "message": message}, relevant_user_ids
-        )
-
 # Helper function to calculate stock status
 def _calculate_product_stock_status(product: dict) -> StockStatusEnum:
     if product.quantity <= 0:
@@ -94,9 +88,7 @@ async def create_product(
         product = await db.product.create(
             data=product_data.model_dump(), include={"category": True}
         )
-        await _check_and_notify_low_stock(
-            product.id, db
-        )  # Check after product creation
+        dispatcher.notify_low_stock(product)  # Check after product creation
         return ProductFullResponse.model_validate(product)
     except Exception as e:
         raise HTTPException(
@@ -121,97 +113,51 @@ async def get_stock_report(
     """
     Generates a comprehensive stock report with filtering, sorting, and pagination capabilities (accessible by ADMIN).
     Includes current stock levels, product details, and last movement dates.
+    Filtering, sorting (including by last movement dates) and pagination run in a single SQL query.
     """
-    where_clause = {}
-    if product_name:
-        where_clause["name"] = {"contains": product_name, "mode": "insensitive"}
-    if reference:
-        where_clause["reference"] = {"contains": reference, "mode": "insensitive"}
-    if category_name:
-        where_clause["category"] = {
-            "name": {"contains": category_name, "mode": "insensitive"}
-        }
-
-    # Fetch all products that match the initial filters to get total count
-    all_products = await db.product.find_many(
-        where=where_clause,
-        include={"category": True},
-    )
-
-    # Apply low stock filter after fetching, as it depends on currentQuantity and minStock
-    if low_stock:
-        all_products = [p for p in all_products if p.quantity <= p.minStock]
-
-    total_items = len(all_products)
-
-    # Apply sorting
-    if sort_by:
-        reverse = sort_order.lower() == "desc"
-        if sort_by == "name":
-            all_products.sort(key=lambda x: x.name.lower(), reverse=reverse)
-        elif sort_by == "quantity":
-            all_products.sort(key=lambda x: x.quantity, reverse=reverse)
-        # For last_adjustment and last_receipt, sorting will be applied after enriching with transaction dates
-
-    # Apply pagination
-    paginated_products = all_products[skip : skip + limit]
-
-    report_items: List[StockReportItem] = []
-    for product in paginated_products:
-        last_adjustment = await db.transaction.find_first(
-            where={"productId": product.id, "source": TransactionSource.ADJUSTMENT},
-            order={"createdAt": "desc"},
-        )
-        last_receipt = await db.transaction.find_first(
-            where={"productId": product.id, "source": TransactionSource.RECEIPT},
-            order={"createdAt": "desc"},
-        )
-
-        report_items.append(
-            StockReportItem(
-                product=StockReportProduct(
-                    id=product.id,
-                    name=product.name,
-                    reference=product.reference,
-                    unit=product.unit,
-                    category=product.category,
-                ),
-                currentQuantity=product.quantity,
-                minStock=product.minStock,
-                location=product.location,
-                lastAdjustmentDate=(
-                    last_adjustment.createdAt if last_adjustment else None
-                ),
-                lastReceiptDate=last_receipt.createdAt if last_receipt else None,
-            )
-        )
-
-    # Re-apply sorting if it depends on last_adjustmentDate or last_receiptDate
-    if sort_by:
-        reverse = sort_order.lower() == "desc"
-        if sort_by == "last_adjustment":
-            report_items.sort(
-                key=lambda x: x.lastAdjustmentDate or datetime.min, reverse=reverse
-            )
-        elif sort_by == "last_receipt":
-            report_items.sort(
-                key=lambda x: x.lastReceiptDate or datetime.min, reverse=reverse
-            )
-
-    return StockReportResponse(
-        reportDate=datetime.now(), items=report_items, totalItems=total_items
+    report = await crud_reports.get_stock_report(
+        db,
+        product_name=product_name,
+        reference=reference,
+        category_name=category_name,
+        low_stock=bool(low_stock),
+        sort_by=sort_by,
+        sort_order=sort_order or "asc",
+        skip=max(skip or 0, 0),
+        limit=limit if limit and limit > 0 else 10,
     )
+    return StockReportResponse.model_validate(report)
 
 
 @router.get("/", response_model=List[ProductFullResponse])
 async def get_all_products(
+    request: Request,
+    response: Response,
     db: Prisma = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),  # Any authenticated user
     search: Optional[str] = None,  # New search parameter
 ):
     """
     Retrieves a list of all products, with optional search functionality (accessible by any authenticated user).
+    Answers 304 Not Modified, without querying the database, when the client's ETag is
+    still current (no product or category written since); otherwise the list comes from
+    the worker's catalog cache when it is up to date.
     """
+    # Validators are taken before reading: a write committed in between changes the
+    # next ETag, so the client never keeps stale data under a current tag.
+    validators = catalog_validators("products", ("Product", "Category"), search or "")
+    if validators is not None:
+        if validators.matches(request):
+            return validators.not_modified()
+        validators.apply(response)
+
+    # Served by this worker's catalog copy when it is up to date (body serialized once)
+    if catalog_cache.fresh():
+        cached = Response(content=catalog_cache.products_json(search), media_type="application/json")
+        if validators is not None:
+            validators.apply(cached)
+        return cached
+
     where_clause = {}
     if search:
         where_clause = {
@@ -221,12 +167,28 @@ async def get_all_products(
             ]
         }
 
+    # Same order as the catalog copy: name, then id for equal names
     products = await db.product.find_many(
-        where=where_clause, include={"category": True}, order={"name": "asc"}
+        where=where_clause, include={"category": True}, order=[{"name": "asc"}, {"id": "asc"}]
     )
     return [ProductFullResponse.model_validate(p) for p in products]
 
 
+@router.get("/search", response_model=List[ProductFullResponse])
+async def search_products(
+    q: str = Query(..., min_length=crud_search.MIN_SEARCH_LENGTH),
+    limit: int = Query(crud_search.SEARCH_LIMIT, ge=1, le=crud_search.MAX_SEARCH_LIMIT),
+    categoryId: Optional[str] = None,
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),  # Any authenticated user
+):
+    """
+    Ranked product search on name and reference (typos tolerated), at most `limit` results:
+    exact reference first, then prefix matches, then the closest names.
+    """
+    return await crud_search.search_products(db, q, limit, category_id=categoryId)
+
+
 @router.put("/{product_id}", response_model=ProductFullResponse)
 async def update_product(
     product_id: str,
@@ -236,6 +198,7 @@ async def update_product(
 ):
     """
     Updates a product's details (only accessible by ADMIN).
+    A new quantity is applied as an ADJUSTMENT movement, so it appears in the stock history.
     """
     update_fields = product_data.model_dump(exclude_unset=True)
 
@@ -255,48 +218,62 @@ async def update_product(
                 status_code=status.HTTP_404_NOT_FOUND, detail="New category not found"
             )
 
-    # Fetch current product to check against new quantity/minStock
-    current_product = await db.product.find_unique(where={"id": product_id})
-    if not current_product:
+    # A quantity change is a stock movement, recorded in the ledger like an adjustment
+    new_quantity = update_fields.pop("quantity", None)
+    if new_quantity is not None and new_quantity < 0:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Product quantity cannot be set to a negative value.",
         )
 
-    # Add check for negative quantity if it's being updated
-    if "quantity" in update_fields:
-        new_quantity = update_fields["quantity"]
-        if new_quantity < 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Product quantity cannot be set to a negative value.",
-            )
-        # If quantity is updated, then current_product.quantity is already old,
-        # so check against new_quantity for minStock
-        updated_quantity_for_check = new_quantity
-    else:
-        updated_quantity_for_check = current_product.quantity # Use current quantity for check if not being updated
-
-    updated_min_stock = update_fields.get("minStock", current_product.minStock)
-
-    # Optional: You could add a check here if updated_quantity_for_check < updated_min_stock
-    # but _check_and_notify_low_stock will handle notifications, not prevents update.
-
     try:
-        product = await db.product.update(
-            where={"id": product_id}, data=update_fields, include={"category": True}
-        )
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
-            )
-        await _check_and_notify_low_stock(product.id, db)  # Check after product update
-        return ProductFullResponse.model_validate(product)
+        async with db.tx() as transaction:
+            if new_quantity is not None:
+                # The delta is computed on the locked row: no concurrent movement is lost
+                rows = await transaction.query_raw(
+                    'SELECT "quantity" FROM "Product" WHERE "id" = $1 FOR UPDATE', product_id
+                )
+                if not rows:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
+                    )
+                delta = new_quantity - rows[0]["quantity"]
+                if delta:
+                    await StockLedger(transaction).apply(
+                        [
+                            StockMovement(
+                                product_id=product_id,
+                                quantity=abs(delta),
+                                type=TransactionType.ENTREE if delta > 0 else TransactionType.SORTIE,
+                                source=TransactionSource.ADJUSTMENT,
+                                user_id=current_user.id,
+                            )
+                        ]
+                    )
+
+            if update_fields:
+                product = await transaction.product.update(
+                    where={"id": product_id}, data=update_fields, include={"category": True}
+                )
+            else:
+                product = await transaction.product.find_unique(
+                    where={"id": product_id}, include={"category": True}
+                )
+            if not product:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
+                )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Product with this reference may already exist or other update error: {e}",
         )
 
+    dispatcher.notify_low_stock(product)  # Check after product update
+    return ProductFullResponse.model_validate(product)
+
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
@@ -341,6 +318,7 @@ async def receive_stock(
             detail="Received quantity must be positive.",
         )
 
+    levels = {}
     async with db.tx() as transaction:
         product = await transaction.product.find_unique(
             where={"id": receipt_data.productId}
@@ -352,19 +330,16 @@ async def receive_stock(
 
         if current_user.role == UserRole.ADMIN:
             # ADMINs can receive stock directly
-            await transaction.product.update(
-                where={"id": product.id},
-                data={"quantity": product.quantity + receipt_data.quantity},
-            )
-
-            await transaction.transaction.create(
-                data={
-                    "productId": product.id,
-                    "userId": current_user.id,
-                    "type": StockAdjustmentType.ENTREE,  # Use ENTREE for receipts
-                    "source": TransactionSource.RECEIPT,  # Mark as RECEIPT
-                    "quantity": receipt_data.quantity,
-                }
+            levels = await StockLedger(transaction).apply(
+                [
+                    StockMovement(
+                        product_id=product.id,
+                        quantity=receipt_data.quantity,
+                        type=TransactionType.ENTREE,  # Use ENTREE for receipts
+                        source=TransactionSource.RECEIPT,  # Mark as RECEIPT
+                        user_id=current_user.id,
+                    )
+                ]
             )
 
             # Create an APPROVED StockReceipt record for ADMIN's direct action
@@ -381,8 +356,6 @@ async def receive_stock(
                 },
                 include={"product": True, "requestedBy": True, "approvedBy": True},
             )
-            await _check_and_notify_low_stock(product.id, db)  # Call helper function
-            return StockReceiptResponse.model_validate(stock_receipt)
 
         elif current_user.role == UserRole.MAGASINIER:
             # MAGASINIERs create a pending receipt for DAF approval
@@ -398,26 +371,28 @@ async def receive_stock(
                 include={"product": True, "requestedBy": True},
             )
 
-            # --- NOTIFICATION: Notify DAFs ---
-            daf_users = await db.user.find_many(where={"role": UserRole.DAF})
-            daf_ids = [u.id for u in daf_users]
-            await manager.send_to_users(
+            # --- NOTIFICATION: Notify DAFs (sent once the transaction is committed) ---
+            await outbox.enqueue(
+                transaction,
                 {
                     "type": "daf_approval_request",
                     "message": f"Nouvelle demande de réception de stock (Produit: {product.name}) en attente d'approbation.",
                 },
-                daf_ids,
+                roles=[UserRole.DAF],
             )
             # --- END NOTIFICATION ---
 
-            return StockReceiptResponse.model_validate(stock_receipt)
-
         else:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Unauthorized role for stock receipt.",
             )
 
+    outbox.wake()
+    for level in levels.values():
+        dispatcher.notify_low_stock(level)
+    return StockReceiptResponse.model_validate(stock_receipt)
+
 
 @router.post(
     "/receive-batch",
@@ -436,7 +411,11 @@ async def receive_stock_batch(
     If ADMIN, applies directly. If MAGASINIER, creates pending receipts for DAF approval.
     """
     created_receipts = []
+    movements: List[StockMovement] = []
     async with db.tx() as transaction:
+        products = await ModelLoader(transaction.product).load_many(
+            item.productId for item in batch_data.items
+        )
         for item_data in batch_data.items:
             if item_data.quantity <= 0:
                 raise HTTPException(
@@ -444,9 +423,7 @@ async def receive_stock_batch(
                     detail=f"Received quantity for product {item_data.productId} must be positive.",
                 )
 
-            product = await transaction.product.find_unique(
-                where={"id": item_data.productId}
-            )
+            product = products[item_data.productId]
             if not product:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -454,20 +431,15 @@ async def receive_stock_batch(
                 )
 
             if current_user.role == UserRole.ADMIN:
-                # ADMINs can receive stock directly
-                await transaction.product.update(
-                    where={"id": product.id},
-                    data={"quantity": product.quantity + item_data.quantity},
-                )
-
-                await transaction.transaction.create(
-                    data={
-                        "productId": product.id,
-                        "userId": current_user.id,
-                        "type": StockAdjustmentType.ENTREE,
-                        "source": TransactionSource.RECEIPT,
-                        "quantity": item_data.quantity,
-                    }
+                # ADMINs can receive stock directly; the whole batch is applied below
+                movements.append(
+                    StockMovement(
+                        product_id=product.id,
+                        quantity=item_data.quantity,
+                        type=TransactionType.ENTREE,
+                        source=TransactionSource.RECEIPT,
+                        user_id=current_user.id,
+                    )
                 )
 
                 stock_receipt = await transaction.stockreceipt.create(
@@ -483,9 +455,6 @@ async def receive_stock_batch(
                     },
                     include={"product": True, "requestedBy": True, "approvedBy": True},
                 )
-                await _check_and_notify_low_stock(
-                    product.id, db
-                )  # Call helper function
                 created_receipts.append(
                     StockReceiptResponse.model_validate(stock_receipt)
                 )
@@ -506,15 +475,14 @@ async def receive_stock_batch(
                     StockReceiptResponse.model_validate(stock_receipt)
                 )
 
-                # --- NOTIFICATION: Notify DAFs ---
-                daf_users = await db.user.find_many(where={"role": UserRole.DAF})
-                daf_ids = [u.id for u in daf_users]
-                await manager.send_to_users(
+                # --- NOTIFICATION: Notify DAFs (sent once the transaction is committed) ---
+                await outbox.enqueue(
+                    transaction,
                     {
                         "type": "daf_approval_request",
                         "message": f"Nouvelle demande de réception de stock par lot (Produit: {product.name}) en attente d'approbation.",
                     },
-                    daf_ids,
+                    roles=[UserRole.DAF],
                 )
                 # --- END NOTIFICATION ---
 
@@ -524,6 +492,11 @@ async def receive_stock_batch(
                     detail="Unauthorized role for batch stock receipt.",
                 )
 
+        levels = await StockLedger(transaction).apply(movements)
+
+    outbox.wake()
+    for level in levels.values():
+        dispatcher.notify_low_stock(level)
     return created_receipts
 
 
@@ -554,27 +527,25 @@ async def decide_stock_receipt(
 
         updated_receipt_status: StockReceiptStatus
         notification_message: str
+        updated_product = None
 
         if decision_data.decision.upper() == "APPROVE":
             # Apply the stock change
             product = stock_receipt.product
-            await transaction.product.update(
-                where={"id": product.id},
-                data={"quantity": product.quantity + stock_receipt.quantity},
-            )
-
-            await transaction.transaction.create(
-                data={
-                    "productId": product.id,
-                    "userId": stock_receipt.requestedById,  # User who requested the receipt
-                    "type": StockAdjustmentType.ENTREE,  # Always ENTREE for receipts
-                    "source": TransactionSource.RECEIPT,  # Mark as RECEIPT
-                    "quantity": stock_receipt.quantity,
-                }
+            levels = await StockLedger(transaction).apply(
+                [
+                    StockMovement(
+                        product_id=product.id,
+                        quantity=stock_receipt.quantity,
+                        type=TransactionType.ENTREE,  # Always ENTREE for receipts
+                        source=TransactionSource.RECEIPT,  # Mark as RECEIPT
+                        user_id=stock_receipt.requestedById,  # User who requested the receipt
+                    )
+                ]
             )
+            updated_product = levels[product.id]
             updated_receipt_status = StockReceiptStatus.APPROVED
             notification_message = f"Votre demande de réception de stock (Produit: {product.name}) a été approuvée."
-            await _check_and_notify_low_stock(product.id, db)  # Call helper function
 
         elif decision_data.decision.upper() == "REJECT":
             updated_receipt_status = StockReceiptStatus.REJECTED
@@ -596,14 +567,18 @@ async def decide_stock_receipt(
             include={"product": True, "requestedBy": True, "approvedBy": True},
         )
 
-        # --- NOTIFICATION: Notify Requester (MAGASINIER) ---
-        await manager.send_personal_message(
+        # --- NOTIFICATION: Notify Requester (MAGASINIER), sent once the transaction is committed ---
+        await outbox.enqueue(
+            transaction,
             {"type": "daf_receipt_decision", "message": notification_message},
-            stock_receipt.requestedById,
+            user_ids=[stock_receipt.requestedById],
         )
         # --- END NOTIFICATION ---
 
-        return StockReceiptResponse.model_validate(updated_stock_receipt)
+    outbox.wake()
+    if updated_product is not None:
+        dispatcher.notify_low_stock(updated_product)
+    return StockReceiptResponse.model_validate(updated_stock_receipt)
 
 
 @router.get("/stock-receipts/my-receipts", response_model=List[StockReceiptResponse])
@@ -656,6 +631,23 @@ async def get_pending_stock_receipts(
     return [StockReceiptResponse.model_validate(sr) for sr in stock_receipts]
 
 
+@router.get("/stock-receipts/pending/summary", response_model=PaginatedStockReceiptSummaryResponse)
+async def get_pending_stock_receipts_summary(
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required(UserRole.DAF)),
+    search: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    count: Literal["exact", "none"] = "exact",
+):
+    """
+    Paginated summary of the pending stock receipts, most recent first.
+    """
+    return await crud_summaries.get_pending_stock_receipt_page(
+        db, page, page_size, search=search, count_mode=count
+    )
+
+
 @router.post("/{product_id}/adjust-stock", response_model=StockAdjustmentResponse)
 async def adjust_stock(
     product_id: str,
@@ -675,6 +667,7 @@ async def adjust_stock(
             detail="Adjustment quantity must be positive.",
         )
 
+    levels = {}
     async with db.tx() as transaction:
         product = await transaction.product.find_unique(where={"id": product_id})
         if not product:
@@ -683,31 +676,17 @@ async def adjust_stock(
             )
 
         if current_user.role == UserRole.ADMIN:
-            # ADMINs can adjust stock directly
-            new_quantity = product.quantity
-            if adjustment_data.type == StockAdjustmentType.ENTREE:
-                new_quantity += adjustment_data.quantity
-            elif adjustment_data.type == StockAdjustmentType.SORTIE:
-                new_quantity -= adjustment_data.quantity
-
-            if new_quantity < 0:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Stock quantity cannot be negative.",
-                )
-
-            await transaction.product.update(
-                where={"id": product_id}, data={"quantity": new_quantity}
-            )
-
-            await transaction.transaction.create(
-                data={
-                    "productId": product_id,
-                    "userId": current_user.id,
-                    "type": adjustment_data.type.value,
-                    "quantity": adjustment_data.quantity,
-                    "source": TransactionSource.ADJUSTMENT,
-                }
+            # ADMINs can adjust stock directly (a SORTIE that would make stock negative is rejected)
+            levels = await StockLedger(transaction).apply(
+                [
+                    StockMovement(
+                        product_id=product_id,
+                        quantity=adjustment_data.quantity,
+                        type=adjustment_data.type.value,
+                        source=TransactionSource.ADJUSTMENT,
+                        user_id=current_user.id,
+                    )
+                ]
             )
 
             # Create an APPROVED StockAdjustment record for ADMIN's direct action
@@ -724,8 +703,6 @@ async def adjust_stock(
                 },
                 include={"product": True, "requestedBy": True, "approvedBy": True},
             )
-            await _check_and_notify_low_stock(product_id, db)  # Call helper function
-            return StockAdjustmentResponse.model_validate(stock_adjustment)
 
         elif current_user.role == UserRole.MAGASINIER:
             # MAGASINIERs create a pending adjustment for DAF approval
@@ -741,26 +718,28 @@ async def adjust_stock(
                 include={"product": True, "requestedBy": True},
             )
 
-            # --- NOTIFICATION: Notify DAFs ---
-            daf_users = await db.user.find_many(where={"role": UserRole.DAF})
-            daf_ids = [u.id for u in daf_users]
-            await manager.send_to_users(
+            # --- NOTIFICATION: Notify DAFs (sent once the transaction is committed) ---
+            await outbox.enqueue(
+                transaction,
                 {
                     "type": "daf_approval_request",
                     "message": f"Nouvelle demande d'ajustement de stock (Produit: {product.name}) en attente d'approbation.",
                 },
-                daf_ids,
+                roles=[UserRole.DAF],
             )
             # --- END NOTIFICATION ---
 
-            return StockAdjustmentResponse.model_validate(stock_adjustment)
-
         else:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Unauthorized role for stock adjustment.",
             )
 
+    outbox.wake()
+    for level in levels.values():
+        dispatcher.notify_low_stock(level)
+    return StockAdjustmentResponse.model_validate(stock_adjustment)
+
 
 @router.put(
     "/stock-adjustments/{adjustment_id}/decide", response_model=StockAdjustmentResponse
@@ -777,6 +756,7 @@ async def decide_stock_adjustment(
     """
     updated_stock_adjustment = None
     original_requester_id = None
+    levels = {}
     
     async with db.tx() as transaction:
         stock_adjustment = await transaction.stockadjustment.find_unique(
@@ -799,34 +779,19 @@ async def decide_stock_adjustment(
 
         if decision_data.decision.upper() == "APPROVE":
             product = stock_adjustment.product
-            new_quantity = product.quantity
-            if stock_adjustment.type == StockAdjustmentType.ENTREE:
-                new_quantity += stock_adjustment.quantity
-            elif stock_adjustment.type == StockAdjustmentType.SORTIE:
-                new_quantity -= stock_adjustment.quantity
-
-            if new_quantity < 0:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Stock quantity cannot be negative.",
-                )
-
-            await transaction.product.update(
-                where={"id": product.id}, data={"quantity": new_quantity}
-            )
-
-            await transaction.transaction.create(
-                data={
-                    "productId": product.id,
-                    "userId": stock_adjustment.requestedById,
-                    "type": stock_adjustment.type,
-                    "quantity": stock_adjustment.quantity,
-                    "source": TransactionSource.ADJUSTMENT,
-                }
+            levels = await StockLedger(transaction).apply(
+                [
+                    StockMovement(
+                        product_id=product.id,
+                        quantity=stock_adjustment.quantity,
+                        type=stock_adjustment.type,
+                        source=TransactionSource.ADJUSTMENT,
+                        user_id=stock_adjustment.requestedById,
+                    )
+                ]
             )
             updated_adjustment_status = StockAdjustmentStatus.APPROVED
             notification_message = f"Votre demande d'ajustement (Produit: {product.name}) a été approuvée."
-            await _check_and_notify_low_stock(product.id, transaction)
 
         elif decision_data.decision.upper() == "REJECT":
             updated_adjustment_status = StockAdjustmentStatus.REJECTED
@@ -859,6 +824,8 @@ async def decide_stock_adjustment(
             {"type": "daf_adjustment_decision", "message": notification_message},
             original_requester_id,
         )
+    for level in levels.values():
+        dispatcher.notify_low_stock(level)
 
     # --- NEW: Check if this adjustment closes an audit ---
     if updated_stock_adjustment.inventoryAuditId:
@@ -917,6 +884,23 @@ async def get_pending_stock_adjustments(
     return [StockAdjustmentResponse.model_validate(sa) for sa in stock_adjustments]
 
 
+@router.get("/stock-adjustments/pending/summary", response_model=PaginatedStockAdjustmentSummaryResponse)
+async def get_pending_stock_adjustments_summary(
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required(UserRole.DAF)),
+    search: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    count: Literal["exact", "none"] = "exact",
+):
+    """
+    Paginated summary of the pending stock adjustments, most recent first.
+    """
+    return await crud_summaries.get_pending_stock_adjustment_page(
+        db, page, page_size, search=search, count_mode=count
+    )
+
+
 @router.get("/transactions/history", response_model=PaginatedTransactionHistoryResponse)
 async def get_transaction_history(
     db: Prisma = Depends(get_db),
@@ -929,49 +913,32 @@ async def get_transaction_history(
     end_date: Optional[datetime] = None,
     page: int = 1,
     page_size: int = 10,
+    after: Optional[str] = None,
+    count: Literal["exact", "approximate", "none"] = "exact",
 ):
     """
     Retrieves a paginated history of stock transactions with filtering capabilities.
+    - after: opaque cursor (`nextCursor` of the previous page); when given, `page` is ignored
+      and the page is read with keyset pagination on (createdAt, id).
+    - count: "exact" total, "approximate" (estimated or cached) total, or "none".
     Accessible by ADMIN, MAGASINIER, CHEF_SERVICE.
     """
-    where_clause = {}
-    if product_id:
-        where_clause["productId"] = product_id
-    if user_id:
-        where_clause["userId"] = user_id
-    if transaction_type:
-        where_clause["type"] = transaction_type
-    if transaction_source:
-        where_clause["source"] = transaction_source
-
-    if start_date or end_date:
-        where_clause["createdAt"] = {}
-        if start_date:
-            where_clause["createdAt"]["gte"] = start_date
-        if end_date:
-            where_clause["createdAt"]["lte"] = end_date
-
-    total_items = await db.transaction.count(where=where_clause)
-
-    transactions = await db.transaction.find_many(
-        where=where_clause,
-        include={
-            "product": {
-                "select": {"id": True, "name": True, "reference": True, "unit": True}
-            },
-            "user": {"select": {"id": True, "name": True, "email": True, "role": True}},
-        },
-        order={"createdAt": "desc"},
-        skip=(page - 1) * page_size,
-        take=page_size,
+    where_clause = crud_transaction.build_history_where(
+        product_id=product_id,
+        user_id=user_id,
+        transaction_type=transaction_type,
+        transaction_source=transaction_source,
+        start_date=start_date,
+        end_date=end_date,
     )
+    try:
+        history = await crud_transaction.get_transaction_page(
+            db, where_clause, page=page, page_size=page_size, after=after, count_mode=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    return PaginatedTransactionHistoryResponse(
-        items=[TransactionHistoryResponse.model_validate(t) for t in transactions],
-        totalItems=total_items,
-        page=page,
-        pageSize=page_size,
-    )
+    return PaginatedTransactionHistoryResponse.model_validate(history)
 
 
 @router.get(
@@ -990,46 +957,10 @@ async def get_product_stock_status(
     Retrieves a paginated list of product stock statuses with optional search and category filtering.
     - Accessible by ADMIN and MAGASINIER.
     """
-    where_clause = {} # NEW: Initialize where_clause
-    if search: # NEW: Add search filter
-        where_clause["OR"] = [
-            {"name": {"contains": search, "mode": "insensitive"}},
-            {"reference": {"contains": search, "mode": "insensitive"}},
-        ]
-    if categoryId: # NEW: Add category filter
-        where_clause["categoryId"] = categoryId
-
-    products = await db.product.find_many(
-        where=where_clause, # NEW: Pass where_clause
-        include={"category": True},
-        skip=(page - 1) * page_size,
-        take=page_size,
-        order={"name": "asc"}
-    )
-    total_products = await db.product.count(where=where_clause) # NEW: Apply where_clause to count
-
-    status_report: List[ProductStockStatus] = []
-    for product in products:
-        status = _calculate_product_stock_status(product)
-        status_report.append(
-            ProductStockStatus(
-                id=product.id,
-                name=product.name,
-                reference=product.reference,
-                category=product.category,
-                quantity=product.quantity,
-                minStock=product.minStock,
-                unit=product.unit,
-                location=product.location,
-                status=status,
-            )
-        )
-    return PaginatedProductStockStatusResponse(
-        items=status_report,
-        totalItems=total_products,
-        page=page,
-        pageSize=page_size,
+    report = await crud_stock_status.get_stock_status_page(
+        db, page=page, page_size=page_size, search=search, category_id=categoryId
     )
+    return PaginatedProductStockStatusResponse.model_validate(report)
 
 
 @router.get(
@@ -1046,54 +977,86 @@ async def get_low_stock_alerts(
 ):
     """
     Retrieves a paginated list of products with low stock (quantity <= minStock).
+    Filtering, counting and pagination are done by the database.
     - Accessible by ADMIN, MAGASINIER, CHEF_SERVICE.
     """
-    base_where_clause = {}
-    if search:
-        base_where_clause["OR"] = [
-            {"name": {"contains": search, "mode": "insensitive"}},
-            {"reference": {"contains": search, "mode": "insensitive"}},
-        ]
-    if categoryId:
-        base_where_clause["categoryId"] = categoryId
-
-    # Fetch all products matching initial filters
-    all_products = await db.product.find_many(
-        where=base_where_clause,
-        include={"category": True},
-        order={"name": "asc"}
+    report = await crud_stock_status.get_stock_status_page(
+        db,
+        page=page,
+        page_size=page_size,
+        search=search,
+        category_id=categoryId,
+        low_stock_only=True,
     )
+    return PaginatedProductStockStatusResponse.model_validate(report)
+
+
+# Translation map for StockStatusEnum to French
+STOCK_STATUS_TRANSLATIONS = {
+    StockStatusEnum.OUT_OF_STOCK.value: "Rupture",
+    StockStatusEnum.CRITICAL.value: "Critique",
+    StockStatusEnum.AVAILABLE.value: "Disponible",
+}
+
+# Products fetched per query while streaming an export.
+EXPORT_BATCH_SIZE = 1000
+
+STOCK_STATUS_CSV_HEADER = [
+    "ID",
+    "Nom",
+    "Référence",
+    "Catégorie",
+    "Quantité",
+    "Stock Min",
+    "Unité",
+    "Emplacement",
+    "Statut",
+]
+
+
+async def _stock_status_csv_chunks(
+    db: Prisma, search: Optional[str], category_id: Optional[str]
+) -> AsyncIterator[bytes]:
+    """
+    Yields the stock status CSV as UTF-8 chunks, one chunk per batch of products.
+    """
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(STOCK_STATUS_CSV_HEADER)
+    yield output.getvalue().encode("utf-8")
+
+    async for rows in crud_stock_status.iter_stock_status(
+        db, search=search, category_id=category_id, batch_size=EXPORT_BATCH_SIZE
+    ):
+        output.seek(0)
+        output.truncate()
+        writer.writerows(
+            [
+                row["id"],
+                row["name"],
+                row["reference"],
+                row["categoryName"],
+                row["quantity"],
+                row["minStock"],
+                row["unit"],
+                row["location"],
+                STOCK_STATUS_TRANSLATIONS.get(row["status"], row["status"]),
+            ]
+            for row in rows
+        )
+        yield output.getvalue().encode("utf-8")
 
-    # Filter products in Python for low stock condition
-    low_stock_products = [p for p in all_products if p.quantity <= p.minStock]
-
-    total_products = len(low_stock_products)
-
-    # Apply pagination to the filtered list
-    paginated_low_stock_products = low_stock_products[(page - 1) * page_size : page * page_size]
 
-    status_report: List[ProductStockStatus] = []
-    for product in paginated_low_stock_products:
-        status = _calculate_product_stock_status(product)
-        status_report.append(
-            ProductStockStatus(
-                id=product.id,
-                name=product.name,
-                reference=product.reference,
-                category=product.category,
-                quantity=product.quantity,
-                minStock=product.minStock,
-                unit=product.unit,
-                location=product.location,
-                status=status,
-            )
-        )
-    return PaginatedProductStockStatusResponse(
-        items=status_report,
-        totalItems=total_products,
-        page=page,
-        pageSize=page_size,
-    )
+async def _gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Gzip-compresses a stream of chunks incrementally.
+    """
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
 
 
 @router.get(
@@ -1103,115 +1066,65 @@ async def export_product_stock_status(
     db: Prisma = Depends(get_db),
     search: Optional[str] = None, # New search parameter
     categoryId: Optional[str] = None, # New categoryId parameter
+    compress: bool = False,
 ):
     """
     Exports a CSV report of product stock statuses.
+    The CSV is streamed batch by batch (keyset pagination), so memory use and
+    time to first byte do not depend on the size of the catalog.
+    - compress=true sends the same CSV gzip-encoded (Content-Encoding: gzip).
     - Accessible by ADMIN and MAGASINIER.
     """
-    where_clause = {}
-    if search:
-        where_clause["OR"] = [
-            {"name": {"contains": search, "mode": "insensitive"}},
-            {"reference": {"contains": search, "mode": "insensitive"}},
-        ]
-    if categoryId:
-        where_clause["categoryId"] = categoryId
-
-    products = await db.product.find_many(where=where_clause, include={"category": True})
-
-    status_report: List[ProductStockStatus] = []
-    for product in products:
-        status = _calculate_product_stock_status(product)
-        status_report.append(
-            ProductStockStatus(
-                id=product.id,
-                name=product.name,
-                reference=product.reference,
-                category=product.category,
-                quantity=product.quantity,
-                minStock=product.minStock,
-                unit=product.unit,
-                location=product.location,
-                status=status,
-            )
-        )
-
-    # Translation map for StockStatusEnum to French
-    status_translations = {
-        StockStatusEnum.OUT_OF_STOCK: "Rupture",
-        StockStatusEnum.CRITICAL: "Critique",
-        StockStatusEnum.AVAILABLE: "Disponible",
+    headers = {
+        "Content-Disposition": f"attachment; filename=rapport_etat_stock_{datetime.now().strftime('%Y%m%d')}.csv"
     }
+    chunks = _stock_status_csv_chunks(db, search, categoryId)
+    if compress:
+        chunks = _gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type="text/csv", headers=headers)
 
-    output = StringIO()
-    writer = csv.writer(output)
-    # Write header
-    writer.writerow(
-        [
-            "ID",
-            "Nom",
-            "Référence",
-            "Catégorie",
-            "Quantité",
-            "Stock Min",
-            "Unité",
-            "Emplacement",
-            "Statut",
-        ]
-    )
-    # Write data
-    for item in status_report:
-        translated_status = status_translations.get(item.status, item.status.value)
-        writer.writerow(
-            [
-                item.id,
-                item.name,
-                item.reference,
-                item.category.name,
-                item.quantity,
-                item.minStock,
-                item.unit,
-                item.location,
-                translated_status,
-            ]
-        )
-    output.seek(0)
-    return Response(
-        content=output.read(),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=rapport_etat_stock_{datetime.now().strftime('%Y%m%d')}.csv"
-        },
-    )
 
 @router.get("/{product_id}", response_model=ProductFullResponse)
 async def get_product_by_id(
     product_id: str,
+    request: Request,
+    response: Response,
     db: Prisma = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),  # Any authenticated user
 ):
     """
     Retrieves a single product by its ID (accessible by any authenticated user).
+    Answers 304 Not Modified when the client's ETag is still current. The product is
+    resolved first (404 for an unknown id, even with If-None-Match: *), from the catalog
+    cache when it is up to date, so that a 304 then costs no query.
     """
-    product = await db.product.find_unique(
-        where={"id": product_id}, include={"category": True}
-    )
+    validators = catalog_validators("product", ("Product", "Category"), product_id)
+    if catalog_cache.fresh():
+        product = catalog_cache.get(product_id)
+    else:
+        product = await db.product.find_unique(
+            where={"id": product_id}, include={"category": True}
+        )
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Product not found"
         )
+    if validators is not None:
+        # Last-Modified of this product (its category may have been renamed since)
+        validators = validators.with_last_modified(product.updatedAt, table_versions.changed_at("Category"))
+        if validators.matches(request):
+            return validators.not_modified()
+        validators.apply(response)
     return ProductFullResponse.model_validate(product)
 
-from weasyprint import HTML
-import base64
-from pathlib import Path
-
 @router.get(
     "/stock-status-report-v2/export/pdf",
     dependencies=[Depends(role_required([UserRole.ADMIN, UserRole.MAGASINIER, UserRole.SUPER_OBSERVATEUR]))],
 )
 async def export_product_stock_status_pdf(
     db: Prisma = Depends(get_db),
+    pdf_service: PDFService = Depends(),
     search: Optional[str] = None, # New search parameter
     categoryId: Optional[str] = None, # New categoryId parameter
 ):
@@ -1246,81 +1159,15 @@ async def export_product_stock_status_pdf(
             )
         )
 
-    # --- Prepare Logo ---
-    logo_path = Path(__file__).parent.parent.parent.parent / 'frontend' / 'public' / 'Logo_PF.jpeg'
-    logo_base64 = ''
-    try:
-        with open(logo_path, 'rb') as f:
-            logo_base64 = base64.b64encode(f.read()).decode('utf-8')
-    except FileNotFoundError:
-        # Handle case where logo is not found, maybe log a warning
-        pass
-    
-    logo_img_tag = f'<img src="data:image/jpeg;base64,{logo_base64}" alt="Logo Postefinances" style="width: 150px; height: auto;">' if logo_base64 else ''
-
-
-    # --- Build HTML ---
-    html_string = f"""
-    <html>
-        <head>
-            <style>
-                body {{ font-family: sans-serif; }}
-                h1 {{ color: #004494; }}
-                table {{ width: 100%; border-collapse: collapse; }}
-                th, td {{ border: 1px solid #dddddd; text-align: left; padding: 8px; }}
-                thead {{ background-color: #f2f2f2; }}
-            </style>
-        </head>
-        <body>
-            {logo_img_tag}
-            <h1>Rapport d'État des Stocks</h1>
-            <p>Date du rapport: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</p>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Nom</th>
-                        <th>Référence</th>
-                        <th>Catégorie</th>
-                        <th>Quantité</th>
-                        <th>Stock Min</th>
-                        <th>Statut</th>
-                    </tr>
-                </thead>
-                <tbody>
-    """
-    status_translations = {
-        StockStatusEnum.OUT_OF_STOCK: "Rupture",
-        StockStatusEnum.CRITICAL: "Critique",
-        StockStatusEnum.AVAILABLE: "Disponible",
-    }
-    for item in status_report:
-        translated_status = status_translations.get(item.status, item.status.value)
-        html_string += f"""
-        <tr>
-            <td>{item.name}</td>
-            <td>{item.reference}</td>
-            <td>{item.category.name}</td>
-            <td>{item.quantity}</td>
-            <td>{item.minStock}</td>
-            <td>{translated_status}</td>
-        </tr>
-        """
-
-    html_string += """
-                </tbody>
-            </table>
-        </body>
-    </html>
-    """
-
-    # --- Generate PDF ---
-    pdf_bytes = HTML(string=html_string).write_pdf()
+    # --- Generate PDF (process pool, outside the event loop) ---
+    report_date = datetime.now()
+    pdf_bytes = await pdf_service.generate_stock_status_pdf(status_report, report_date)
 
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
         headers={
-            "Content-Disposition": f"attachment; filename=rapport_etat_stock_{datetime.now().strftime('%Y%m%d')}.pdf"
+            "Content-Disposition": f"attachment; filename=rapport_etat_stock_{report_date.strftime('%Y%m%d')}.pdf"
         },
     )
 
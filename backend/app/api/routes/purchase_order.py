@@ -30,6 +30,21 @@ from app.crud.purchase_order import (
 
 router = APIRouter()
 
+# Products below their minimum stock that no draft or pending purchase order covers yet,
+# in one query instead of one purchase order lookup per product.
+_REORDER_CANDIDATES_SQL = """
+SELECT p."id", p."name", p."quantity", p."minStock"
+FROM "Product" p
+WHERE p."quantity" < p."minStock"
+  AND NOT EXISTS (
+      SELECT 1
+      FROM "PurchaseOrderItem" i
+      JOIN "PurchaseOrder" po ON po."id" = i."purchaseOrderId"
+      WHERE i."productId" = p."id" AND po."status" IN ('DRAFT', 'PENDING_APPROVAL')
+  )
+ORDER BY p."name", p."id"
+"""
+
 @router.post(
     "/purchase-orders",
     response_model=PurchaseOrderResponse,
@@ -187,7 +202,7 @@ async def download_purchase_order_pdf(
     # Convert to dict for the service
     order_data = purchase_order.model_dump()
     
-    pdf_bytes = pdf_service.generate_purchase_order_pdf(order_data)
+    pdf_bytes = await pdf_service.generate_purchase_order_pdf(order_data)
     
     filename = f"Bon_Commande_{purchase_order.orderNumber}.pdf"
     
@@ -273,24 +288,13 @@ async def auto_generate_purchase_orders(
     """
     # Removed manual connect
     # Removed try block
-    products_below_min_stock = await db.product.find_many(
-        where={"quantity": {"lt": {"minStock": True}}}
-    )
+    # Products that already have a pending PO are skipped by the query
+    products_below_min_stock = await db.query_raw(_REORDER_CANDIDATES_SQL)
 
     generated_pos = []
     for product in products_below_min_stock:
-        # Check if there's already a pending PO for this product
-        existing_pending_po = await db.purchaseorder.find_first(
-            where={
-                "items": {"some": {"productId": product.id}},
-                "status": {"in": [PurchaseOrderStatus.DRAFT, PurchaseOrderStatus.PENDING_APPROVAL]},
-            }
-        )
-        if existing_pending_po:
-            continue # Skip if a pending PO already exists for this product
-
         # Calculate quantity to order (e.g., bring stock up to minStock + a buffer)
-        quantity_to_order = product.minStock * 2 - product.quantity # Example: order to bring stock to 2x minStock
+        quantity_to_order = product["minStock"] * 2 - product["quantity"] # Example: order to bring stock to 2x minStock
 
         if quantity_to_order <= 0:
             continue
@@ -300,7 +304,7 @@ async def auto_generate_purchase_orders(
         unit_price = 10.0 # Placeholder
 
         po_item_data = {
-            "productId": product.id,
+            "productId": product["id"],
             "quantity": quantity_to_order,
             "unitPrice": unit_price,
             "totalPrice": quantity_to_order * unit_price,
@@ -308,8 +312,8 @@ async def auto_generate_purchase_orders(
 
         purchase_order = await db.purchaseorder.create(
             data={
-                "requestedById": current_user.userId,
-                "supplierName": f"Auto-generated for {product.name}",
+                "requestedById": current_user.id,
+                "supplierName": f"Auto-generated for {product['name']}",
                 "totalAmount": quantity_to_order * unit_price,
                 "status": PurchaseOrderStatus.DRAFT,
                 "items": {"create": [po_item_data]},
@@ -320,7 +324,7 @@ async def auto_generate_purchase_orders(
         
         # Notify DAF about new auto-generated PO
         await manager.send_personal_message(
-            f"Un nouveau bon de commande brouillon (N° {purchase_order.orderNumber}) a été auto-généré pour le produit '{product.name}'.",
+            f"Un nouveau bon de commande brouillon (N° {purchase_order.orderNumber}) a été auto-généré pour le produit '{product['name']}'.",
             UserRole.DAF.value # Send to all DAF users
         )
 
@@ -1,7 +1,7 @@
 # app/api/routes/reports.py
 from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, Depends, Query
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.api import schemas
 from app.api.auth import UserRole, role_required
@@ -36,14 +36,20 @@ async def get_stock_valuation_by_category_report(
 async def get_stock_turnover_report(
     start_date: datetime = Query(..., description="Start date for the report"),
     end_date: datetime = Query(..., description="End date for the report"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: Optional[int] = Query(None, ge=1, le=1000, description="Number of items per page (all products if omitted)"),
+    sort_by: Optional[str] = Query(None, description="Sort column (turnover_rate, quantity_out, current_stock, average_stock, name, reference)"),
+    sort_order: str = Query("desc", description="Sort order (asc or desc)"),
     service: ReportService = Depends(),
 ):
     """
     Retrieves a report of stock turnover for each product within a specified date range.
+    The turnover rate is the quantity issued over the period divided by the average of the
+    opening and closing stock, computed in a single aggregated query.
     
     - **DAF, ADMIN, MAGASINIER, SUPER_OBSERVATEUR only**
     """
-    return await service.get_stock_turnover(start_date, end_date)
+    return await service.get_stock_turnover(start_date, end_date, page, page_size, sort_by, sort_order)
 
 @router.get(
     "/stock-requests",
@@ -80,14 +86,22 @@ async def get_stock_history_report_endpoint(
     end_date: Optional[datetime] = Query(None, description="End date for the report"),
     product_id: Optional[str] = Query(None, description="ID of the product"),
     user_id: Optional[str] = Query(None, description="ID of the user who initiated the transaction"),
+    after: Optional[str] = Query(None, description="Cursor of the next page (nextCursor of the previous page); page is then ignored"),
+    count: Literal["exact", "approximate", "none"] = Query("exact", description="How totalItems is computed"),
     service: ReportService = Depends(),
 ):
     """
     Retrieves a paginated report of stock transaction history with optional filters.
+    Deep pages should be read with the `after` cursor rather than `page`.
     
     - **ADMIN & SUPER_OBSERVATEUR only**
     """
-    return await service.get_stock_history_report(page, page_size, start_date, end_date, product_id, user_id)
+    try:
+        return await service.get_stock_history_report(
+            page, page_size, start_date, end_date, product_id, user_id, after, count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.get(
     "/stock-status",
@@ -1,25 +1,30 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
 
 from app.api.auth import CurrentUser, UserRole, role_required
 from app.api.schemas import (
     RequestApprove,
     RequestCreate,
     RequestResponse,
+    PaginatedRequestSummaryResponse,
+    RequestSummaryResponse,
     RequestBulkItemIssuesData, # Changed to bulk
     DisputeResolutionData,
     DeliveryNoteResponse, # New import
     DeliveryNoteItem,     # New import
 )
 from app.database import get_db
-from app.websockets import manager  # Import the WebSocket manager
 from app.services.pdf_service import PDFService # NEW
 from database.generated.prisma import Prisma  # Corrected import path
 from database.generated.prisma.enums import ApprovalDecision, DisputeReason, RequestItemDisputeStatus, TransactionSource # New import for item-level dispute
 from app.utils.number_generator import generate_next_number # New import
+from app.utils.loader import ModelLoader
 from app.services import request_service # NEW: Import the service layer
+from app.crud import search as crud_search
+from app.crud import summaries as crud_summaries
+from app.services.notification_outbox import outbox
 
 router = APIRouter(prefix="/requests", tags=["Requests"])
 
@@ -34,6 +39,10 @@ FULL_REQUEST_INCLUDE = {
     "approvals": {"include": {"user": True}},
 }
 
+# Statuts listés pour le magasinier et le DAF (listes complètes et résumés paginés)
+MAGASINIER_STATUSES = ["APPROUVEE", "LITIGE_RECEPTION", "LIVREE_PAR_MAGASINIER", "RECEPTION_CONFIRMEE"]
+DAF_STATUSES = ["TRANSMISE", "LITIGE_RECEPTION"]
+
 
 # 1. CHEF_SERVICE - Créer une demande
 @router.post("/", response_model=RequestResponse, status_code=status.HTTP_201_CREATED)
@@ -44,11 +53,12 @@ async def create_request(
 ):
     async with db.tx() as transaction:
         try:
-            # 1. Check for stock availability for all items
+            # 1. Check for stock availability for all items (products loaded in one query)
+            products = await ModelLoader(transaction.product).load_many(
+                item.productId for item in request_data.items
+            )
             for item_data in request_data.items:
-                product = await transaction.product.find_unique(
-                    where={"id": item_data.productId}
-                )
+                product = products[item_data.productId]
                 if not product:
                     raise HTTPException(
                         status_code=status.HTTP_404_NOT_FOUND,
@@ -83,19 +93,16 @@ async def create_request(
                 include=FULL_REQUEST_INCLUDE,
             )
 
-            # 4. --- NOTIFICATION: Notify DAFs ---
-            daf_users = await transaction.user.find_many(where={"role": UserRole.DAF})
-            daf_ids = [u.id for u in daf_users]
-            await manager.send_to_users(
+            # 4. --- NOTIFICATION: Notify DAFs (sent once the transaction is committed) ---
+            await outbox.enqueue(
+                transaction,
                 {
                     "type": "daf_approval_request",
                     "message": f"Nouvelle demande de stock (N°{request.requestNumber}) en attente de votre approbation.",
                 },
-                daf_ids,
+                roles=[UserRole.DAF],
             )
             # --- END NOTIFICATION ---
-
-            return RequestResponse.model_validate(request)
         except HTTPException as http_exc:
             # Re-raise HTTPException to be handled by FastAPI
             raise http_exc
@@ -106,6 +113,9 @@ async def create_request(
                 detail=f"Une erreur interne est survenue: {e}",
             )
 
+    outbox.wake()
+    return RequestResponse.model_validate(request)
+
 
 
 
@@ -137,17 +147,8 @@ async def get_magasinier_requests(
                 ]
             },
             {
-                "OR": [
-                    {"requestNumber": {"contains": search, "mode": "insensitive"}},
-                    {"requester": {"name": {"contains": search, "mode": "insensitive"}}},
-                    {
-                        "items": {
-                            "some": {
-                                "product": {"name": {"contains": search, "mode": "insensitive"}}
-                            }
-                        }
-                    },
-                ]
+                # Document de recherche indexé par trigrammes (numéro, demandeur, produits)
+                "searchText": {"contains": search, "mode": "insensitive"}
             },
         ]
 
@@ -158,6 +159,25 @@ async def get_magasinier_requests(
     return [RequestResponse.model_validate(req) for req in requests]
 
 
+@router.get("/magasinier/requests/summary", response_model=PaginatedRequestSummaryResponse)
+async def get_magasinier_requests_summary(
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required(UserRole.MAGASINIER)),
+    search: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    count: Literal["exact", "none"] = "exact",
+):
+    """
+    Paginated summary of /magasinier/requests, most recently approved first.
+    Items and approvals are not included: fetch them with GET /requests/{request_id}.
+    """
+    return await crud_summaries.get_request_summary_page(
+        db, page, page_size, statuses=MAGASINIER_STATUSES, search=search,
+        order_by="approvedAt", count_mode=count,
+    )
+
+
 # NEW ENDPOINT: ADMIN / SUPER_OBSERVATEUR - Voir toutes les demandes
 @router.get("/all", response_model=List[RequestResponse])
 async def get_all_requests(
@@ -167,17 +187,8 @@ async def get_all_requests(
 ):
     where_clause = {}
     if search:
-        where_clause["OR"] = [
-            {"requestNumber": {"contains": search, "mode": "insensitive"}},
-            {"requester": {"name": {"contains": search, "mode": "insensitive"}}},
-            {
-                "items": {
-                    "some": {
-                        "product": {"name": {"contains": search, "mode": "insensitive"}}
-                    }
-                }
-            },
-        ]
+        # Document de recherche indexé par trigrammes (numéro, demandeur, produits)
+        where_clause["searchText"] = {"contains": search, "mode": "insensitive"}
 
     requests = await db.request.find_many(
         where=where_clause, include=FULL_REQUEST_INCLUDE, order={"createdAt": "desc"}
@@ -186,6 +197,24 @@ async def get_all_requests(
     return [RequestResponse.model_validate(req) for req in requests]
 
 
+@router.get("/all/summary", response_model=PaginatedRequestSummaryResponse)
+async def get_all_requests_summary(
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required([UserRole.ADMIN, UserRole.SUPER_OBSERVATEUR])),
+    search: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    count: Literal["exact", "none"] = "exact",
+):
+    """
+    Paginated summary of /all, most recent first.
+    Items and approvals are not included: fetch them with GET /requests/{request_id}.
+    """
+    return await crud_summaries.get_request_summary_page(
+        db, page, page_size, search=search, count_mode=count
+    )
+
+
 # 4. DAF - Voir demandes en approbation et en litige
 @router.get("/daf", response_model=List[RequestResponse])
 async def get_requests_for_daf(
@@ -209,17 +238,8 @@ async def get_requests_for_daf(
                 ]
             },
             {
-                "OR": [
-                    {"requestNumber": {"contains": search, "mode": "insensitive"}},
-                    {"requester": {"name": {"contains": search, "mode": "insensitive"}}},
-                    {
-                        "items": {
-                            "some": {
-                                "product": {"name": {"contains": search, "mode": "insensitive"}}
-                            }
-                        }
-                    },
-                ]
+                # Document de recherche indexé par trigrammes (numéro, demandeur, produits)
+                "searchText": {"contains": search, "mode": "insensitive"}
             },
         ]
 
@@ -229,6 +249,24 @@ async def get_requests_for_daf(
     return [RequestResponse.model_validate(req) for req in requests]
 
 
+@router.get("/daf/summary", response_model=PaginatedRequestSummaryResponse)
+async def get_requests_for_daf_summary(
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required(UserRole.DAF)),
+    search: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    count: Literal["exact", "none"] = "exact",
+):
+    """
+    Paginated summary of /daf, most recent first.
+    Items and approvals are not included: fetch them with GET /requests/{request_id}.
+    """
+    return await crud_summaries.get_request_summary_page(
+        db, page, page_size, statuses=DAF_STATUSES, search=search, count_mode=count
+    )
+
+
 # 5. DAF - Approuver/Rejeter
 @router.put("/{request_id}/approve", response_model=RequestResponse)
 async def approve_request(
@@ -262,17 +300,23 @@ async def approve_request(
                 detail="Items must be provided for approval",
             )
         
+        # Request items and their products are loaded in one query per model
+        request_items = await ModelLoader(transaction.requestitem).load_many(
+            item.requestItemId for item in approval_data.items
+        )
+        products = await ModelLoader(transaction.product).load_many(
+            item.productId for item in request_items.values() if item is not None
+        )
+
         for item_data_from_approval in approval_data.items:
-            request_item = await transaction.requestitem.find_unique(
-                where={"id": item_data_from_approval.requestItemId}
-            )
+            request_item = request_items[item_data_from_approval.requestItemId]
             if not request_item:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"RequestItem with ID {item_data_from_approval.requestItemId} not found.",
                 )
             
-            product = await transaction.product.find_unique(where={"id": request_item.productId})
+            product = products[request_item.productId]
             if not product:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -313,28 +357,26 @@ async def approve_request(
             where={"id": request_id}, include=FULL_REQUEST_INCLUDE
         )
 
-        if existing_request.requesterId:
-            await manager.send_personal_message(
-                {
-                    "type": "request_decision",
-                    "message": f"Votre demande (N°{final_request.requestNumber}) a été approuvée",
-                },
-                existing_request.requesterId,
-            )
-        
-        magasinier_users = await db.user.find_many(
-            where={"role": UserRole.MAGASINIER}
+        # Notifications are written in the transaction and sent once it is committed.
+        await outbox.enqueue(
+            transaction,
+            {
+                "type": "request_decision",
+                "message": f"Votre demande (N°{final_request.requestNumber}) a été approuvée",
+            },
+            user_ids=[existing_request.requesterId],
         )
-        magasinier_ids = [u.id for u in magasinier_users]
-        await manager.send_to_users(
+        await outbox.enqueue(
+            transaction,
             {
                 "type": "delivery_ready",
                 "message": f"La demande (N°{final_request.requestNumber}) a été approuvée et est prête à être livrée.",
             },
-            magasinier_ids,
+            roles=[UserRole.MAGASINIER],
         )
 
-        return RequestResponse.model_validate(final_request)
+    outbox.wake()
+    return RequestResponse.model_validate(final_request)
 
 
 # NEW ENDPOINT: DAF - Rejeter une demande
@@ -381,17 +423,18 @@ async def reject_request(
         )
 
         # --- NOTIFICATION: Notify Requester (CHEF_SERVICE) ---
-        if existing_request.requesterId:
-            await manager.send_personal_message(
-                {
-                    "type": "request_decision",
-                    "message": f"Votre demande (N°{final_request.requestNumber}) a été rejetée.",
-                },
-                existing_request.requesterId,
-            )
+        await outbox.enqueue(
+            transaction,
+            {
+                "type": "request_decision",
+                "message": f"Votre demande (N°{final_request.requestNumber}) a été rejetée.",
+            },
+            user_ids=[existing_request.requesterId],
+        )
         # --- END NOTIFICATION ---
 
-        return RequestResponse.model_validate(final_request)
+    outbox.wake()
+    return RequestResponse.model_validate(final_request)
 
 
 # NEW ENDPOINT: CHEF_SERVICE - Annuler une demande
@@ -509,24 +552,21 @@ async def report_issue_request(
         )
         
         # --- NOTIFICATION: Notify Magasinier and DAF ---
-        magasinier_users = await db.user.find_many(where={"role": UserRole.MAGASINIER})
-        magasinier_ids = [u.id for u in magasinier_users]
-        daf_users = await db.user.find_many(where={"role": UserRole.DAF})
-        daf_ids = [u.id for u in daf_users]
-
         notification_message = (
             f"Un ou plusieurs litiges ont été signalés pour la demande N°{final_request.requestNumber} "
             f"par {current_user.name}.\n"
             f"Détails des litiges:\n" + "\n".join(updated_item_details_messages)
         )
 
-        await manager.send_to_users(
+        await outbox.enqueue(
+            transaction,
             {"type": "reception_issue", "message": notification_message},
-            magasinier_ids + daf_ids,
+            roles=[UserRole.MAGASINIER, UserRole.DAF],
         )
         # --- END NOTIFICATION ---
 
-        return RequestResponse.model_validate(final_request)
+    outbox.wake()
+    return RequestResponse.model_validate(final_request)
 
 
 # NEW ENDPOINT: DAF - Résoudre un litige de réception
@@ -635,28 +675,20 @@ async def resolve_dispute_request(
             where={"id": request_id}, include=FULL_REQUEST_INCLUDE
         )
 
-        # --- NOTIFICATION: Notify Requester (CHEF_SERVICE) and MAGASINIERs ---
-        if existing_request.requesterId:
-            await manager.send_personal_message(
-                {
-                    "type": "dispute_resolved",
-                    "message": notification_message + "\nDétails des résolutions:\n" + "\n".join(resolved_item_summaries),
-                },
-                existing_request.requesterId,
-            )
-        
-        magasinier_users = await db.user.find_many(where={"role": UserRole.MAGASINIER})
-        magasinier_ids = [u.id for u in magasinier_users]
-        await manager.send_to_users(
+        # --- NOTIFICATION: Notify Requester (CHEF_SERVICE) and MAGASINIERs, after commit ---
+        await outbox.enqueue(
+            transaction,
             {
                 "type": "dispute_resolved",
                 "message": notification_message + "\nDétails des résolutions:\n" + "\n".join(resolved_item_summaries),
             },
-            magasinier_ids,
+            user_ids=[existing_request.requesterId],
+            roles=[UserRole.MAGASINIER],
         )
         # --- END NOTIFICATION ---
 
-        return RequestResponse.model_validate(final_request)
+    outbox.wake()
+    return RequestResponse.model_validate(final_request)
 
 
 # 6. CHEF_SERVICE - Voir ses demandes
@@ -668,16 +700,8 @@ async def get_my_requests(
 ):
     where_clause = {"requesterId": current_user.id}
     if search:
-        where_clause["OR"] = [
-            {"requestNumber": {"contains": search, "mode": "insensitive"}},
-            {
-                "items": {
-                    "some": {
-                        "product": {"name": {"contains": search, "mode": "insensitive"}}
-                    }
-                }
-            },
-        ]
+        # Document de recherche indexé par trigrammes (numéro, demandeur, produits)
+        where_clause["searchText"] = {"contains": search, "mode": "insensitive"}
 
     requests = await db.request.find_many(
         where=where_clause, include=FULL_REQUEST_INCLUDE, order={"createdAt": "desc"}
@@ -685,6 +709,24 @@ async def get_my_requests(
     return [RequestResponse.model_validate(req) for req in requests]
 
 
+@router.get("/my-requests/summary", response_model=PaginatedRequestSummaryResponse)
+async def get_my_requests_summary(
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required(UserRole.CHEF_SERVICE)),
+    search: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    count: Literal["exact", "none"] = "exact",
+):
+    """
+    Paginated summary of /my-requests, most recent first.
+    Items and approvals are not included: fetch them with GET /requests/{request_id}.
+    """
+    return await crud_summaries.get_request_summary_page(
+        db, page, page_size, requester_id=current_user.id, search=search, count_mode=count
+    )
+
+
 # --- NEW ENDPOINT: MAGASINIER - Confirmer la livraison ---
 @router.put("/{request_id}/deliver", response_model=RequestResponse)
 async def deliver_request(
@@ -824,7 +866,7 @@ async def download_delivery_note_pdf(
         )
 
     request_data = request.model_dump()
-    pdf_bytes = pdf_service.generate_delivery_note_pdf(request_data)
+    pdf_bytes = await pdf_service.generate_delivery_note_pdf(request_data)
     
     filename = f"Bon_Livraison_{request.requestNumber}.pdf"
     
@@ -835,3 +877,45 @@ async def download_delivery_note_pdf(
             "Content-Disposition": f"attachment; filename={filename}"
         }
     )
+
+
+@router.get("/search", response_model=List[RequestSummaryResponse])
+async def search_requests(
+    q: str = Query(..., min_length=crud_search.MIN_SEARCH_LENGTH),
+    limit: int = Query(crud_search.SEARCH_LIMIT, ge=1, le=crud_search.MAX_SEARCH_LIMIT),
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required([UserRole.CHEF_SERVICE, UserRole.DAF, UserRole.MAGASINIER, UserRole.ADMIN, UserRole.SUPER_OBSERVATEUR])),
+):
+    """
+    Ranked search over request numbers, requesters and requested products, at most `limit` results.
+    Each role searches the requests of its own list (a CHEF_SERVICE only their own requests).
+    """
+    scope = {
+        UserRole.CHEF_SERVICE: {"requester_id": current_user.id},
+        UserRole.DAF: {"statuses": DAF_STATUSES},
+        UserRole.MAGASINIER: {"statuses": MAGASINIER_STATUSES},
+    }.get(current_user.role, {})
+    return await crud_search.search_requests(db, q, limit, **scope)
+
+
+# Détail d'une demande (les listes résumées ne contiennent ni articles ni approbations).
+# Déclaré en dernier : /{request_id} ne doit pas masquer /all, /daf ou /my-requests.
+@router.get("/{request_id}", response_model=RequestResponse)
+async def get_request(
+    request_id: str,
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required([UserRole.CHEF_SERVICE, UserRole.DAF, UserRole.MAGASINIER, UserRole.ADMIN, UserRole.SUPER_OBSERVATEUR])),
+):
+    """
+    Retrieves one request with its items, requester and approvals.
+    A CHEF_SERVICE can only read their own requests.
+    """
+    request = await db.request.find_unique(where={"id": request_id}, include=FULL_REQUEST_INCLUDE)
+    if not request:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Request not found")
+    if current_user.role == UserRole.CHEF_SERVICE and request.requesterId != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not authorized to view this request.",
+        )
+    return RequestResponse.model_validate(request)
@@ -1,9 +1,12 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from app.api.auth import CurrentUser, UserRole, role_required
-from app.api.schemas import StockAdjustmentDirectCreate, StockAdjustmentResponse
+from app.api.schemas import StockAdjustmentDirectCreate, StockAdjustmentResponse, StockImportReport
 from app.crud import stock_adjustment as crud
 from app.database import get_db
+from app.services.stock_import import StockImportService
 from database.generated.prisma import Prisma
 from app.websockets import manager
 
@@ -64,3 +67,39 @@ async def create_direct_stock_adjustment(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post(
+    "/import",
+    response_model=StockImportReport,
+    summary="Import stock quantities from a file",
+    description="Allows an admin to set the stock of many products from an Excel workbook or a CSV file. Dry-run by default.",
+)
+async def import_stock_file(
+    file: UploadFile = File(...),
+    dry_run: bool = True,
+    zero_missing: bool = False,
+    reason: Optional[str] = None,
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required([UserRole.ADMIN])),
+):
+    """
+    Importe les quantités en stock depuis un fichier (.xlsx ou .csv) avec les colonnes
+    **Reference** et **Quantité** (nouvelle quantité totale).
+    - **dry_run**: si vrai (par défaut), retourne seulement la prévisualisation des écarts.
+    - **zero_missing**: met à zéro le stock des produits absents du fichier.
+    - **reason**: justification enregistrée sur les ajustements créés.
+
+    Retourne un rapport ligne par ligne (ajusté, inchangé, introuvable, invalide, en échec).
+    """
+    try:
+        return await StockImportService(db).import_file(
+            file.file,
+            file.filename or "",
+            current_user,
+            dry_run=dry_run,
+            zero_missing=zero_missing,
+            reason=reason,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
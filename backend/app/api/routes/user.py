@@ -1,21 +1,56 @@
-from typing import List, Optional
+import json
+from typing import Iterable, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 
 from app.api.auth import (
     CurrentUser,
     UserRole,
+    check_password,
     get_current_user,
-    get_password_hash,
+    hash_password,
+    issued_at,
     role_required,
 )
-from app.api.schemas import PasswordUpdate, UserCreate, UserFullResponse, UserUpdate
+from app.api.schemas import (
+    PaginatedUserResponse,
+    PasswordUpdate,
+    UserCreate,
+    UserFullResponse,
+    UserImportReport,
+    UserImportRowStatus,
+    UserUpdate,
+)
+from app.crud import summaries as crud_summaries
 from app.database import get_db
+from app.services.user_import import UserImportService
+from app.websockets import manager
 from database.generated.prisma import Prisma  # Corrected import path
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
+async def revoke_user_tokens(db: Prisma, user_ids: Iterable[str]):
+    """
+    Rejects the tokens issued to the users so far: the cutoff is stored on each user
+    (read by the workers that have not cached a token yet) and sent to every worker's
+    token cache.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    at = issued_at()
+    await db.execute_raw(
+        """
+        UPDATE "User" SET "tokensValidAfter" = to_timestamp($2) AT TIME ZONE 'UTC'
+        WHERE "id" IN (SELECT jsonb_array_elements_text($1::jsonb))
+        """,
+        json.dumps(user_ids),
+        at,
+    )
+    await manager.publish_control("revoke_tokens", {"userIds": user_ids, "at": at})
+
+
 @router.post("/", response_model=UserFullResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_data: UserCreate,
@@ -27,7 +62,7 @@ async def create_user(
     The password is automatically hashed before saving.
     """
     try:
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         user = await db.user.create(
             data={
                 "username": user_data.username,
@@ -38,6 +73,7 @@ async def create_user(
                 "department": user_data.department,
             }
         )
+        await manager.publish_control("invalidate_roles", {})
         return UserFullResponse.model_validate(user)
     except Exception: # Catch all exceptions
         # Log the actual exception for debugging (e.g., using a logger)
@@ -47,6 +83,30 @@ async def create_user(
         )
 
 
+@router.post("/import", response_model=UserImportReport)
+async def import_users(
+    file: UploadFile = File(...),
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required([UserRole.ADMIN, UserRole.USER_MANAGER])),
+):
+    """
+    Creates or updates users in bulk from an Excel workbook or a CSV file (accessible by ADMIN, USER_MANAGER).
+    Accepts the columns of users.xlsx (Nom, login, mot de passe, Role, Département) or their English names.
+    Existing users (same username) are updated, including their password, and their tokens are revoked.
+    Returns the created/updated/skipped counts and a per-row report.
+    """
+    try:
+        report = await UserImportService(db).import_file(file.file, file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await manager.publish_control("invalidate_roles", {})
+    # Password and role overwritten, as in update_user: a new login is required
+    await revoke_user_tokens(
+        db, [row.userId for row in report.rows if row.status == UserImportRowStatus.UPDATED]
+    )
+    return report
+
+
 @router.get("/", response_model=List[UserFullResponse])
 async def get_all_users(
     db: Prisma = Depends(get_db),
@@ -83,6 +143,25 @@ async def get_all_users(
     users = await db.user.find_many(where=where_clause, order={"createdAt": "desc"})
     return [UserFullResponse.model_validate(user) for user in users]
 
+
+@router.get("/summary", response_model=PaginatedUserResponse)
+async def get_users_page(
+    db: Prisma = Depends(get_db),
+    current_user: CurrentUser = Depends(role_required([UserRole.ADMIN, UserRole.SUPER_OBSERVATEUR, UserRole.MAGASINIER, UserRole.USER_MANAGER])),
+    search: Optional[str] = None,
+    roles: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    count: Literal["exact", "none"] = "exact",
+):
+    """
+    Paginated variant of GET /users/, with the same search and role filters.
+    """
+    valid_roles = [role for role in roles.upper().split(',') if role in UserRole.__members__] if roles else None
+    return await crud_summaries.get_user_summary_page(
+        db, page, page_size, search=search, roles=valid_roles, count_mode=count
+    )
+
 @router.get("/request-creators", response_model=List[UserFullResponse])
 async def get_request_creators(
     db: Prisma = Depends(get_db),
@@ -153,7 +232,7 @@ async def update_user(
 
     # If password is being updated, hash it
     if "password" in update_fields:
-        update_fields["password"] = get_password_hash(update_fields["password"])
+        update_fields["password"] = await hash_password(update_fields["password"])
 
     try:
         user = await db.user.update(where={"id": user_id}, data=update_fields)
@@ -161,6 +240,10 @@ async def update_user(
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
+        await manager.publish_control("invalidate_roles", {})
+        # The token carries the role: a new role or password requires a new login
+        if "password" in update_fields or "role" in update_fields:
+            await revoke_user_tokens(db, [user_id])
         return UserFullResponse.model_validate(user)
     except Exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Could not update user due to invalid data or other error.")
@@ -181,6 +264,9 @@ async def delete_user(
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
+        await manager.publish_control("invalidate_roles", {})
+        # The row is gone: the tokens are also rejected when a worker checks the database
+        await manager.publish_control("revoke_tokens", {"userIds": [user_id], "at": issued_at()})
         return
     except Exception:
         raise HTTPException(
@@ -195,7 +281,6 @@ async def test_authentication(current_user: CurrentUser = Depends(get_current_us
     A simple test endpoint to check if authentication is working.
     Returns the current_user object if authenticated.
     """
-    print(f"DEBUG: test_authentication received current_user: {current_user}")
     return current_user
 
 
@@ -256,19 +341,18 @@ async def change_current_user_password(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    # Verify current password (assuming verify_password function exists)
-    # For now, we'll skip actual password verification for simplicity,
-    # but in a real app, you'd verify the current_password against the hashed password in the DB.
-    from app.api.auth import verify_password
-    if not verify_password(password_data.current_password, user.password):
+    # Verify current password
+    password_valid, _ = await check_password(password_data.current_password, user.password)
+    if not password_valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect current password")
 
-    hashed_new_password = get_password_hash(password_data.new_password)
+    hashed_new_password = await hash_password(password_data.new_password)
 
     try:
         updated_user = await db.user.update(
             where={"id": current_user.id}, data={"password": hashed_new_password}
         )
+        await revoke_user_tokens(db, [current_user.id])
         return UserFullResponse.model_validate(updated_user)
     except Exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Could not change password due to invalid data or other error.")
@@ -12,7 +12,7 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
     The WebSocket endpoint for real-time notifications.
     It decodes the JWT token from the URL to identify the user.
     """
-    user_id = get_user_id_from_token(token)
+    user_id = await get_user_id_from_token(token)
     if user_id is None:
         await websocket.close(code=1008)
         return
@@ -23,4 +23,4 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
             # We can receive messages here if needed in the future
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
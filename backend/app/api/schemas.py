@@ -173,6 +173,28 @@ class PasswordUpdate(BaseModel):
     new_password: str
 
 
+# User Import Schemas
+class UserImportRowStatus(str, Enum):
+    CREATED = "CREATED"
+    UPDATED = "UPDATED"
+    SKIPPED = "SKIPPED"  # Missing data, invalid role, duplicated username or failed batch
+
+
+class UserImportRowResult(BaseModel):
+    row: int  # Line number in the file (header is line 1)
+    username: Optional[str] = None
+    userId: Optional[str] = None  # Set for created and updated users
+    status: UserImportRowStatus
+    message: Optional[str] = None
+
+
+class UserImportReport(BaseModel):
+    created: int
+    updated: int
+    skipped: int
+    rows: List[UserImportRowResult]
+
+
 class UserFullResponse(BaseModel):
     id: str
     username: str
@@ -336,6 +358,37 @@ class StockAdjustmentDirectCreate(BaseModel):
     reason: str
 
 
+# Stock Import Schemas
+class StockImportRowStatus(str, Enum):
+    ADJUSTED = "ADJUSTED"  # Adjustment applied (or to be applied, in dry-run)
+    UNCHANGED = "UNCHANGED"  # Quantity already correct
+    NOT_FOUND = "NOT_FOUND"  # Unknown reference
+    INVALID = "INVALID"  # Empty reference, invalid quantity or duplicated reference
+    FAILED = "FAILED"  # The chunk containing the row could not be applied
+
+
+class StockImportRowResult(BaseModel):
+    row: Optional[int] = None  # Line number in the file (None for products zeroed because absent from the file)
+    reference: Optional[str] = None
+    productId: Optional[str] = None
+    previousQuantity: Optional[int] = None
+    newQuantity: Optional[int] = None
+    difference: Optional[int] = None
+    status: StockImportRowStatus
+    message: Optional[str] = None
+
+
+class StockImportReport(BaseModel):
+    dryRun: bool
+    totalRows: int
+    adjusted: int
+    unchanged: int
+    notFound: int
+    invalid: int
+    failed: int
+    rows: List[StockImportRowResult]
+
+
 # Dashboard Schemas
 class DashboardStats(BaseModel):
     lowStock: int
@@ -425,9 +478,10 @@ class TransactionHistoryResponse(BaseModel):
 
 class PaginatedTransactionHistoryResponse(BaseModel):
     items: List[TransactionHistoryResponse]
-    totalItems: int
+    totalItems: Optional[int] = None  # None when count=none
     page: int
     pageSize: int
+    nextCursor: Optional[str] = None  # Pass as `after` to get the next page
 
     class Config:
         from_attributes = True
@@ -920,6 +974,12 @@ class StockTurnoverReportItem(BaseModel):
 
     turnoverRate: float
 
+    openingStock: Optional[int] = None  # Stock reconstitué au début de la période
+
+    closingStock: Optional[int] = None  # Stock reconstitué à la fin de la période
+
+    averageStock: Optional[float] = None  # (openingStock + closingStock) / 2
+
 
 
 
@@ -1046,6 +1106,12 @@ class StockTurnoverReportResponse(BaseModel):
 
     items: List[StockTurnoverReportItem]
 
+    totalItems: Optional[int] = None
+
+    page: Optional[int] = None
+
+    pageSize: Optional[int] = None
+
 
 
 
@@ -1130,3 +1196,71 @@ class StockTurnoverReportResponse(BaseModel):
 
 
 
+
+
+# Summary Schemas (paginated lists; details are fetched per item)
+class RequestSummaryResponse(BaseModel):
+    id: str
+    requestNumber: str
+    status: str
+    requesterId: str
+    requester: UserResponse
+    itemCount: int
+    totalRequestedQty: int
+    totalApprovedQty: Optional[int] = None
+    disputedItemCount: int = 0
+    approvedAt: Optional[datetime] = None
+    receivedAt: Optional[datetime] = None
+    createdAt: datetime
+    updatedAt: datetime
+
+
+class PaginatedRequestSummaryResponse(BaseModel):
+    items: List[RequestSummaryResponse]
+    totalItems: Optional[int] = None  # None when count=none
+    page: int
+    pageSize: int
+
+
+class StockReceiptSummaryResponse(BaseModel):
+    id: str
+    product: ProductBase
+    quantity: int
+    supplierName: Optional[str] = None
+    batchNumber: Optional[str] = None
+    requestedBy: UserResponse
+    status: StockReceiptStatus
+    createdAt: datetime
+
+
+class PaginatedStockReceiptSummaryResponse(BaseModel):
+    items: List[StockReceiptSummaryResponse]
+    totalItems: Optional[int] = None  # None when count=none
+    page: int
+    pageSize: int
+
+
+class StockAdjustmentSummaryResponse(BaseModel):
+    id: str
+    product: ProductBase
+    quantity: int
+    type: StockAdjustmentType
+    reason: str
+    inventoryAuditId: Optional[str] = None
+    requestedBy: UserResponse
+    status: StockAdjustmentStatus
+    createdAt: datetime
+
+
+class PaginatedStockAdjustmentSummaryResponse(BaseModel):
+    items: List[StockAdjustmentSummaryResponse]
+    totalItems: Optional[int] = None  # None when count=none
+    page: int
+    pageSize: int
+
+
+class PaginatedUserResponse(BaseModel):
+    items: List[UserFullResponse]
+    totalItems: Optional[int] = None  # None when count=none
+    page: int
+    pageSize: int
@@ -0,0 +1,374 @@
+import asyncio
+import json
+import logging
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from app.database import get_client
+from app.table_versions import TableVersions
+from database.generated.prisma import Prisma
+
+logger = logging.getLogger(__name__)
+
+# Beyond this many changed rows in one version, the whole catalog is reloaded instead.
+MAX_ROW_REFRESH = 500
+
+_PRODUCT_COLUMNS = """
+    "id", "reference", "name", "categoryId", "quantity", "minStock", "cost", "unit",
+    "location", EXTRACT(EPOCH FROM "updatedAt")::float8 AS "updatedAt"
+"""
+
+
+class CachedProduct:
+    """Read-only view of one cached product, with the attributes of a Prisma Product."""
+
+    __slots__ = (
+        "id", "reference", "name", "categoryId", "category", "quantity", "minStock",
+        "cost", "unit", "location", "updatedAt",
+    )
+
+    def __init__(self, cache: "CatalogCache", row: int):
+        self.id = cache.ids[row]
+        self.reference = cache.references[row]
+        self.name = cache.names[row]
+        self.categoryId = cache.category_ids[row]
+        self.category = {"id": self.categoryId, "name": cache.categories.get(self.categoryId, "")}
+        self.quantity = cache.quantities[row]
+        self.minStock = cache.min_stocks[row]
+        self.cost = cache.costs[row]
+        self.unit = cache.units[row]
+        self.location = cache.locations[row]
+        self.updatedAt = datetime.fromtimestamp(cache.updated_at[row], tz=timezone.utc)
+
+    def to_dict(self) -> dict:
+        """Same shape as ProductFullResponse."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "reference": self.reference,
+            "categoryId": self.categoryId,
+            "category": self.category,
+            "quantity": self.quantity,
+            "minStock": self.minStock,
+            "cost": self.cost,
+            "unit": self.unit,
+            "location": self.location,
+        }
+
+
+class CatalogCache:
+    """
+    Per-worker copy of the catalog (products and category names), stored by column:
+    numbers in typed arrays, strings in lists (category ids and units interned), with
+    id -> row and reference -> row maps. Lookups are dictionary accesses and a search is a scan of one list of
+    lower-cased keys, without a query or a pydantic object. Products are listed in the
+    order of the database (name, then id, under its collation), which sorts them at load
+    time and again when a product is added or renamed.
+
+    The copy follows the database through the TableVersions listener: written rows are
+    re-read when the version of their transaction arrives, and the whole catalog is
+    reloaded when a version was missed (reconnection) or too many rows changed. It is
+    only used while `fresh()`, i.e. when it reflects the versions known to this worker;
+    otherwise callers read the database as before.
+    """
+
+    __slots__ = (
+        "ids", "references", "names", "category_ids", "units", "locations",
+        "quantities", "min_stocks", "costs", "updated_at", "categories", "versions",
+        "_row_of", "_row_of_reference", "_search_keys", "_order_ids", "_order", "_list_body",
+        "_pending", "_lock", "_source", "full_reloads", "row_refreshes", "rows_refreshed",
+        "hits", "misses", "last_refresh", "last_refresh_seconds",
+    )
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.references: List[str] = []
+        self.names: List[str] = []
+        self.category_ids: List[str] = []
+        self.units: List[str] = []
+        self.locations: List[Optional[str]] = []
+        self.quantities = array("q")
+        self.min_stocks = array("q")
+        self.costs = array("d")
+        self.updated_at = array("d")  # epoch seconds (UTC)
+        self.categories: Dict[str, str] = {}
+        self.versions: Dict[str, int] = {}  # table versions this copy reflects
+        self._row_of: Dict[str, int] = {}
+        self._row_of_reference: Dict[str, int] = {}
+        self._search_keys: List[str] = []
+        self._order_ids: List[str] = []  # product ids in database order (name, id)
+        self._order: Optional[List[int]] = None  # rows in that order, rebuilt after changes
+        self._list_body: Optional[bytes] = None  # serialized full list, rebuilt after changes
+        self._pending: Set[str] = set()
+        self._lock = asyncio.Lock()
+        self._source: Optional[TableVersions] = None
+        self.full_reloads = 0
+        self.row_refreshes = 0
+        self.rows_refreshed = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_refresh: Optional[float] = None
+        self.last_refresh_seconds: Optional[float] = None
+
+    # --- Synchronization -------------------------------------------------------------
+
+    def attach(self, source: TableVersions) -> None:
+        """Follows the catalog changes received by `source` (before it is started)."""
+        self._source = source
+        source.on_row_change(self._on_row_change)
+        source.on_change(self._on_version_change)
+
+    def _on_row_change(self, table: str, row_id: str) -> None:
+        if table == "Product":
+            self._pending.add(row_id)
+
+    async def _on_version_change(self, table: str, version: int) -> None:
+        if table not in ("Product", "Category"):
+            return
+        async with self._lock:
+            current = self.versions.get(table)
+            if current is not None and current >= version:
+                return
+            started = time.perf_counter()
+            db = get_client()
+            if table == "Category":
+                await self._load_categories(db)
+            elif current == version - 1 and len(self._pending) <= MAX_ROW_REFRESH:
+                await self._refresh_products(db)
+            else:
+                # First load, missed version or large write: read everything again
+                await self._load_products(db)
+            self.versions[table] = version
+            self.last_refresh = time.time()
+            self.last_refresh_seconds = time.perf_counter() - started
+
+    async def _load_categories(self, db: Prisma) -> None:
+        rows = await db.query_raw('SELECT "id", "name" FROM "Category"')
+        self.categories = {sys.intern(row["id"]): row["name"] for row in rows}
+        self._list_body = None
+
+    async def _load_products(self, db: Prisma) -> None:
+        # Rows notified from now on are re-read at their version, even if this load sees them
+        self._pending.clear()
+        rows = await db.query_raw(f'SELECT {_PRODUCT_COLUMNS} FROM "Product" ORDER BY "name", "id"')
+        self._clear()
+        for row in rows:
+            self._put(row)
+        self._order_ids = [row["id"] for row in rows]
+        self.full_reloads += 1
+        logger.info("Catalog cache loaded: %d products", len(self.ids))
+
+    async def _refresh_products(self, db: Prisma) -> None:
+        ids, self._pending = self._pending, set()
+        if not ids:
+            return
+        rows = await db.query_raw(
+            f"""
+            SELECT {_PRODUCT_COLUMNS} FROM "Product"
+            WHERE "id" IN (SELECT jsonb_array_elements_text($1::jsonb))
+            """,
+            json.dumps(list(ids)),
+        )
+        # Quantity or price changes keep the order; added or renamed products are placed
+        # by the database, so that the order stays the one of its collation
+        reorder = False
+        for row in rows:
+            index = self._row_of.get(row["id"])
+            reorder = reorder or index is None or self.names[index] != row["name"]
+            self._put(row)
+        for deleted in ids - {row["id"] for row in rows}:
+            self._remove(deleted)
+        if reorder:
+            await self._sort_products(db)
+        self.row_refreshes += 1
+        self.rows_refreshed += len(ids)
+
+    async def _sort_products(self, db: Prisma) -> None:
+        """Orders the cached products as the database does (name, then id)."""
+        # Read from the "Product_name_id_idx" index: only the ids cross the wire
+        rows = await db.query_raw('SELECT "id" FROM "Product" ORDER BY "name", "id"')
+        # Rows added since the cached version are placed by their own refresh
+        order_ids = [row["id"] for row in rows if row["id"] in self._row_of]
+        if len(order_ids) < len(self._row_of):
+            # Rows deleted since then stay listed (last) until their refresh removes them
+            listed = set(order_ids)
+            order_ids += [product_id for product_id in self.ids if product_id not in listed]
+        self._order_ids = order_ids
+        self._order = None
+
+    def _clear(self) -> None:
+        for column in (self.ids, self.references, self.names, self.category_ids, self.units,
+                       self.locations, self._search_keys):
+            column.clear()
+        for numbers in (self.quantities, self.min_stocks, self.costs, self.updated_at):
+            del numbers[:]
+        self._row_of.clear()
+        self._row_of_reference.clear()
+        self._order_ids = []
+        self._order = None
+        self._list_body = None
+
+    def _put(self, row: dict) -> None:
+        """Inserts or replaces a product row."""
+        index = self._row_of.get(row["id"])
+        if index is None:
+            index = len(self.ids)
+            self._row_of[row["id"]] = index
+            self.ids.append(row["id"])
+            self.references.append("")
+            self.names.append("")
+            self.category_ids.append("")
+            self.units.append("")
+            self.locations.append(None)
+            self._search_keys.append("")
+            self.quantities.append(0)
+            self.min_stocks.append(0)
+            self.costs.append(0.0)
+            self.updated_at.append(0.0)
+        else:
+            self._row_of_reference.pop(self.references[index], None)
+        self.references[index] = row["reference"]
+        self.names[index] = row["name"]
+        self.category_ids[index] = sys.intern(row["categoryId"])
+        self.units[index] = sys.intern(row["unit"])
+        self.locations[index] = row["location"]
+        self._search_keys[index] = f"{row['name']}\x00{row['reference']}".lower()
+        self.quantities[index] = row["quantity"]
+        self.min_stocks[index] = row["minStock"]
+        self.costs[index] = row["cost"]
+        self.updated_at[index] = row["updatedAt"]
+        self._row_of_reference[row["reference"]] = index
+        self._order = None
+        self._list_body = None
+
+    def _remove(self, product_id: str) -> None:
+        """Removes a product row: the last row takes its place."""
+        index = self._row_of.pop(product_id, None)
+        if index is None:
+            return
+        self._row_of_reference.pop(self.references[index], None)
+        last = len(self.ids) - 1
+        columns = (self.ids, self.references, self.names, self.category_ids, self.units,
+                   self.locations, self._search_keys, self.quantities, self.min_stocks,
+                   self.costs, self.updated_at)
+        if index != last:
+            for column in columns:
+                column[index] = column[last]
+            self._row_of[self.ids[index]] = index
+            self._row_of_reference[self.references[index]] = index
+        for column in columns:
+            column.pop()
+        self._order_ids.remove(product_id)
+        self._order = None
+        self._list_body = None
+
+    # --- Reads -----------------------------------------------------------------------
+
+    def fresh(self) -> bool:
+        """
+        True when this copy reflects the catalog versions known to the worker; counted
+        as a hit (read served by the cache) or a miss (read sent to the database).
+        """
+        source = self._source
+        current = source is not None and all(
+            self.versions.get(table) is not None and source.get(table) == self.versions[table]
+            for table in ("Product", "Category")
+        )
+        if current:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return current
+
+    def get(self, product_id: str) -> Optional[CachedProduct]:
+        index = self._row_of.get(product_id)
+        return CachedProduct(self, index) if index is not None else None
+
+    def get_by_reference(self, reference: str) -> Optional[CachedProduct]:
+        index = self._row_of_reference.get(reference)
+        return CachedProduct(self, index) if index is not None else None
+
+    def _sorted_rows(self) -> List[int]:
+        if self._order is None:
+            self._order = [self._row_of[product_id] for product_id in self._order_ids]
+        return self._order
+
+    def search(self, term: Optional[str] = None, limit: Optional[int] = None) -> List[CachedProduct]:
+        """Products whose name or reference contains `term` (case-insensitive), by name."""
+        rows = self._sorted_rows()
+        if term:
+            needle = term.lower()
+            keys = self._search_keys
+            rows = [i for i in rows if needle in keys[i]]
+        if limit is not None:
+            rows = rows[:limit]
+        return [CachedProduct(self, i) for i in rows]
+
+    def products_json(self, term: Optional[str] = None) -> bytes:
+        """JSON body of GET /products; the unfiltered list is serialized once per version."""
+        if term:
+            return _dumps([product.to_dict() for product in self.search(term)])
+        if self._list_body is None:
+            self._list_body = _dumps([product.to_dict() for product in self.search()])
+        return self._list_body
+
+    # --- Metrics ---------------------------------------------------------------------
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the columns, maps and strings held (shared strings once)."""
+        size = sum(
+            sys.getsizeof(container)
+            for container in (
+                self.ids, self.references, self.names, self.category_ids, self.units,
+                self.locations, self._search_keys, self.quantities, self.min_stocks,
+                self.costs, self.updated_at, self._row_of, self._row_of_reference,
+                self._order_ids, self.categories,
+            )
+        )
+        strings = {}
+        for column in (self.ids, self.references, self.names, self.category_ids, self.units,
+                       self.locations, self._search_keys):
+            for value in column:
+                if value is not None:
+                    strings[id(value)] = value
+        size += sum(sys.getsizeof(value) for value in strings.values())
+        if self._list_body is not None:
+            size += sys.getsizeof(self._list_body)
+        return size
+
+    def stats(self) -> dict:
+        source_versions = {
+            table: self._source.get(table) if self._source is not None else None
+            for table in ("Product", "Category")
+        }
+        return {
+            "products": len(self.ids),
+            "categories": len(self.categories),
+            "memoryBytes": self.memory_bytes(),
+            "versions": dict(self.versions),
+            "sourceVersions": source_versions,
+            "versionLag": {
+                table: version - self.versions[table]
+                for table, version in source_versions.items()
+                if version is not None and table in self.versions
+            },
+            "pendingRows": len(self._pending),
+            "lastRefreshAgeSeconds": time.time() - self.last_refresh if self.last_refresh else None,
+            "lastRefreshSeconds": self.last_refresh_seconds,
+            "fullReloads": self.full_reloads,
+            "rowRefreshes": self.row_refreshes,
+            "rowsRefreshed": self.rows_refreshed,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _dumps(items: list) -> bytes:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+catalog_cache = CatalogCache()
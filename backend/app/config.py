@@ -6,10 +6,62 @@ class Settings(BaseSettings):
     # Core settings
     SECRET_KEY: str
     DATABASE_URL: str
-    
+
     # Sentry DSN for error tracking
     SENTRY_DSN: Optional[str] = None
 
+    # Database pool settings (one shared Prisma client per worker process)
+    # DB_CONNECTION_LIMIT: max connections opened by the query engine of a worker.
+    #   Keep (workers * limit) below PostgreSQL's max_connections.
+    # DB_POOL_TIMEOUT: seconds a query waits for a free connection before failing.
+    # DB_CONNECT_TIMEOUT: seconds allowed to start the engine and reach the database.
+    DB_CONNECTION_LIMIT: Optional[int] = 10
+    DB_POOL_TIMEOUT: int = 10
+    DB_CONNECT_TIMEOUT: int = 10
+
+    # PDF rendering (WeasyPrint runs in a process pool, outside the event loop)
+    # PDF_POOL_SIZE: rendering processes per worker.
+    # PDF_QUEUE_DEPTH: renders allowed to wait for a free process; beyond it the API answers 503.
+    # PDF_RENDER_TIMEOUT: seconds before a render is abandoned with a 504.
+    # PDF_CACHE_MAX_BYTES: size of the per-worker cache of generated PDFs.
+    PDF_POOL_SIZE: int = 2
+    PDF_QUEUE_DEPTH: int = 8
+    PDF_RENDER_TIMEOUT: int = 30
+    PDF_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Password hashing (bcrypt runs in a thread pool, outside the event loop)
+    # AUTH_BCRYPT_ROUNDS: bcrypt cost; existing hashes are upgraded at the next login.
+    # AUTH_CRYPTO_WORKERS: hashing threads per worker (bounds the CPU a login burst can use).
+    AUTH_BCRYPT_ROUNDS: int = 12
+    AUTH_CRYPTO_WORKERS: int = 4
+    # AUTH_TOKEN_CACHE_SIZE: verified tokens kept per worker (LRU), so requests skip JWT decoding.
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+
+    # WebSocket notifications between workers
+    # WS_PUBSUB_BACKEND: "postgres" (LISTEN/NOTIFY on DATABASE_URL, needed with several
+    #   gunicorn workers) or "memory" (single process, development and tests).
+    WS_PUBSUB_BACKEND: str = "postgres"
+
+    # Request instrumentation (latency per route at /api/metrics, Server-Timing header)
+    # REQUEST_LOG_SAMPLE_RATE: share of requests logged (0 to 1); slow and failed ones always are.
+    # SLOW_REQUEST_MS: duration above which a request is logged as a warning.
+    REQUEST_LOG_SAMPLE_RATE: float = 0.01
+    SLOW_REQUEST_MS: int = 1000
+    # Query budget of a request (0 disables a limit). Violations are logged, or raised
+    # with DB_QUERY_BUDGET_RAISE (development: makes N+1 queries fail loudly).
+    # DB_QUERY_BUDGET: queries per request.
+    # DB_QUERY_REPEAT_LIMIT: executions of the same query shape per request (N+1 detector).
+    DB_QUERY_BUDGET: int = 100
+    DB_QUERY_REPEAT_LIMIT: int = 20
+    DB_QUERY_BUDGET_RAISE: bool = False
+
+    # HTTP conditional requests on the catalog (GET /products, /products/{id}, /categories)
+    # HTTP_CACHE_ENABLED: ETag/Last-Modified from the change counters of "TableVersion"
+    #   (one LISTEN connection per worker); 304 answers skip the database.
+    HTTP_CACHE_ENABLED: bool = True
+    # CATALOG_CACHE_ENABLED: per-worker copy of the products and categories, refreshed from
+    #   the row change notifications of the same listener; serves the catalog reads.
+    CATALOG_CACHE_ENABLED: bool = True
 
     # CORS settings
     CORS_ORIGINS: List[str] = [
@@ -20,7 +72,7 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env.prod"
         env_file_encoding = 'utf-8'
-        extra = 'ignore' 
+        extra = 'ignore'
 
 # Create a single, reusable instance of the settings
 settings = Settings()
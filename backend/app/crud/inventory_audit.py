@@ -4,7 +4,8 @@ from typing import List, Optional
 from app.api.auth import CurrentUser
 from app.api.schemas import InventoryAuditBulkUpdate
 from app.utils.number_generator import generate_next_number
-from app.websockets import manager
+from app.services.notification_dispatcher import dispatcher
+from app.services.notification_outbox import outbox
 from database.generated.prisma import Prisma
 from database.generated.prisma.enums import (
     InventoryAuditStatus,
@@ -177,14 +178,12 @@ async def request_reconciliation(db: Prisma, audit_id: str, user: CurrentUser) -
         )
 
     # Notifier les DAFs
-    daf_users = await db.user.find_many(where={"role": UserRole.DAF})
-    daf_ids = [u.id for u in daf_users]
-    await manager.send_to_users(
+    dispatcher.notify_roles(
         {
             "type": "reconciliation_request",
             "message": f"De nouvelles demandes d'ajustement de stock suite à l'audit #{audit.auditNumber} sont en attente de votre approbation.",
         },
-        daf_ids,
+        [UserRole.DAF],
     )
 
     return updated_audit
@@ -218,14 +217,17 @@ async def check_and_close_audit(db: Prisma, audit_id: str) -> None:
     )
 
     if all_resolved:
-        await db.inventoryaudit.update(
-            where={"id": audit_id}, data={"status": InventoryAuditStatus.CLOSED}
-        )
-        # Notifier le créateur de l'audit
-        await manager.send_personal_message(
-            {
-                "type": "audit_closed",
-                "message": f"Le processus de réconciliation pour l'audit #{audit.auditNumber} est terminé et l'audit est maintenant clôturé.",
-            },
-            audit.createdById,
-        )
+        async with db.tx() as transaction:
+            await transaction.inventoryaudit.update(
+                where={"id": audit_id}, data={"status": InventoryAuditStatus.CLOSED}
+            )
+            # Notifier le créateur de l'audit (envoyée après la validation de la clôture)
+            await outbox.enqueue(
+                transaction,
+                {
+                    "type": "audit_closed",
+                    "message": f"Le processus de réconciliation pour l'audit #{audit.auditNumber} est terminé et l'audit est maintenant clôturé.",
+                },
+                user_ids=[audit.createdById],
+            )
+        outbox.wake()
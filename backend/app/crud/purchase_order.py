@@ -2,12 +2,9 @@ from typing import List, Optional
 
 from database.generated.prisma import Prisma
 from database.generated.prisma.models import PurchaseOrder, PurchaseOrderItem, User
-from database.generated.prisma.enums import (
-    PurchaseOrderStatus,
-    TransactionType,
-    TransactionSource,
-)
-from app.api.schemas import PurchaseOrderCreate, PurchaseOrderUpdate
+from database.generated.prisma.enums import PurchaseOrderStatus
+from app.api.schemas import PurchaseOrderCreate
+from app.utils.loader import ModelLoader
 from app.utils.number_generator import generate_next_number
 
 # --- READ Operations ---
@@ -74,10 +71,14 @@ async def create_purchase_order(
     """
     new_order_number = await generate_next_number(db, "BC")
 
+    products = await ModelLoader(db.product).load_many(
+        item.productId for item in purchase_order_data.items
+    )
+
     po_items_data = []
     total_amount = 0.0
     for item_data in purchase_order_data.items:
-        product = await db.product.find_unique(where={"id": item_data.productId})
+        product = products[item_data.productId]
         if not product:
             raise ValueError(f"Product with ID {item_data.productId} not found")
         item_total_price = item_data.quantity * item_data.unitPrice
@@ -104,22 +105,6 @@ async def create_purchase_order(
     )
     return purchase_order
 
-async def create_po_stock_transaction(
-    db: Prisma, product_id: str, user_id: str, quantity: int
-):
-    """
-    Crée une transaction d'entrée de stock pour la réception d'une commande.
-    """
-    await db.transaction.create(
-        data={
-            "productId": product_id,
-            "userId": user_id,
-            "type": TransactionType.ENTREE,
-            "source": TransactionSource.RECEIPT,
-            "quantity": quantity,
-        }
-    )
-
 # --- UPDATE Operations ---
 
 async def generic_update_purchase_order(
@@ -133,15 +118,6 @@ async def generic_update_purchase_order(
         data=data,
     )
 
-async def increment_product_stock(db: Prisma, product_id: str, quantity: int):
-    """
-    Incrémente le stock pour un produit donné.
-    """
-    await db.product.update(
-        where={"id": product_id},
-        data={"quantity": {"increment": quantity}},
-    )
-
 # --- DELETE Operations ---
 
 async def delete_purchase_order(db: Prisma, purchase_order_id: str) -> Optional[PurchaseOrder]:
@@ -156,4 +132,4 @@ async def delete_purchase_order(db: Prisma, purchase_order_id: str) -> Optional[
         deleted_order = await transaction.purchaseorder.delete(
             where={"id": purchase_order_id}
         )
-    return deleted_order
\ No newline at end of file
+    return deleted_order
@@ -4,6 +4,9 @@ from typing import List, Optional
 
 from database.generated.prisma import Prisma
 from app.api.schemas import StockAdjustmentType
+from app.crud.stock_status import LOW_STOCK_CONDITION, get_stock_status_page
+from app.crud.transaction import build_history_where, get_transaction_page
+from app.crud.utils import escape_like
 from database.generated.prisma.enums import RequestStatus, TransactionSource, TransactionType
 
 async def get_stock_valuation_by_category(db: Prisma):
@@ -37,59 +40,273 @@ async def get_stock_valuation_by_category(db: Prisma):
 
     return result
 
-async def get_stock_turnover(db: Prisma, start_date: datetime, end_date: datetime):
+# Colonnes de tri autorisées pour le rapport de stock (clé API -> expression SQL).
+# Les expressions portent sur les colonnes projetées par _STOCK_REPORT_SELECT.
+# Les dates de dernier mouvement sont triées sur tout le résultat, pas seulement sur la page.
+STOCK_REPORT_SORT_COLUMNS = {
+    "name": "lower(name)",
+    "reference": "reference",
+    "quantity": "quantity",
+    "min_stock": '"minStock"',
+    "category": 'lower("categoryName")',
+    "last_adjustment": '"lastAdjustmentDate"',
+    "last_receipt": '"lastReceiptDate"',
+}
+_MOVEMENT_SORT_KEYS = {"last_adjustment", "last_receipt"}
+
+_STOCK_REPORT_SELECT = f"""
+    SELECT
+        p.id, p.name, p.reference, p.unit, p.quantity, p."minStock", p.location,
+        c.id AS "categoryId", c.name AS "categoryName"
+    FROM "Product" p
+    JOIN "Category" c ON c.id = p."categoryId"
+    WHERE ($1::text IS NULL OR p.name ILIKE '%' || $1 || '%')
+      AND ($2::text IS NULL OR p.reference ILIKE '%' || $2 || '%')
+      AND ($3::text IS NULL OR c.name ILIKE '%' || $3 || '%')
+      AND (NOT $4::boolean OR {LOW_STOCK_CONDITION})
+"""
+
+# Dernier ajustement / dernière réception d'un produit ; chaque sous-requête est un
+# simple parcours descendant de l'index ("productId", source, "createdAt").
+_LAST_MOVEMENT_LATERAL = """
+    LEFT JOIN LATERAL (
+        SELECT
+            (SELECT t."createdAt" FROM "Transaction" t
+              WHERE t."productId" = f.id AND t.source = 'ADJUSTMENT'
+              ORDER BY t."createdAt" DESC LIMIT 1) AS "lastAdjustmentDate",
+            (SELECT t."createdAt" FROM "Transaction" t
+              WHERE t."productId" = f.id AND t.source = 'RECEIPT'
+              ORDER BY t."createdAt" DESC LIMIT 1) AS "lastReceiptDate"
+    ) lm ON TRUE
+"""
+
+
+def build_stock_report_query(sort_by: Optional[str], sort_order: str) -> str:
+    """
+    Construit la requête SQL du rapport de stock pour un tri donné.
+
+    - Tri sur une colonne produit : la pagination est faite d'abord, puis les dates de
+      dernier mouvement ne sont calculées que pour les lignes de la page.
+    - Tri sur une date de mouvement : les dates sont calculées pour tout le résultat filtré
+      afin que l'ordre soit global.
+    """
+    sort_key = sort_by if sort_by in STOCK_REPORT_SORT_COLUMNS else "name"
+    direction = "DESC" if (sort_order or "asc").lower() == "desc" else "ASC"
+    order_by = f"{STOCK_REPORT_SORT_COLUMNS[sort_key]} {direction} NULLS LAST, id"
+
+    if sort_key in _MOVEMENT_SORT_KEYS:
+        return f"""
+        SELECT * FROM (
+            SELECT f.*, lm."lastAdjustmentDate", lm."lastReceiptDate",
+                   COUNT(*) OVER () AS "totalItems"
+            FROM ({_STOCK_REPORT_SELECT}) f
+            {_LAST_MOVEMENT_LATERAL}
+        ) r
+        ORDER BY {order_by}
+        LIMIT $5 OFFSET $6
+        """
+
+    return f"""
+    SELECT f.*, lm."lastAdjustmentDate", lm."lastReceiptDate"
+    FROM (
+        SELECT s.*, COUNT(*) OVER () AS "totalItems"
+        FROM ({_STOCK_REPORT_SELECT}) s
+        ORDER BY {order_by}
+        LIMIT $5 OFFSET $6
+    ) f
+    {_LAST_MOVEMENT_LATERAL}
+    ORDER BY {order_by}
+    """
+
+
+async def get_stock_report(
+    db: Prisma,
+    product_name: Optional[str] = None,
+    reference: Optional[str] = None,
+    category_name: Optional[str] = None,
+    low_stock: bool = False,
+    sort_by: Optional[str] = None,
+    sort_order: str = "asc",
+    skip: int = 0,
+    limit: int = 10,
+) -> dict:
+    """
+    Rapport de stock complet en une seule requête SQL.
+
+    Le filtrage (nom, référence, catégorie, stock faible), le tri (y compris par date de
+    dernier ajustement / réception), la pagination et le comptage total sont faits par
+    PostgreSQL : le coût de l'appel dépend de la taille de la page, pas du catalogue.
+    """
+    query = build_stock_report_query(sort_by, sort_order)
+    rows = await db.query_raw(
+        query,
+        escape_like(product_name),
+        escape_like(reference),
+        escape_like(category_name),
+        bool(low_stock),
+        limit,
+        skip,
+    )
+
+    total_items = int(rows[0]["totalItems"]) if rows else 0
+    if not rows and skip > 0:
+        # Page au-delà de la fin : on recompte pour renvoyer un total exact.
+        count_rows = await db.query_raw(
+            f"SELECT COUNT(*) AS \"totalItems\" FROM ({_STOCK_REPORT_SELECT}) s",
+            escape_like(product_name),
+            escape_like(reference),
+            escape_like(category_name),
+            bool(low_stock),
+        )
+        total_items = int(count_rows[0]["totalItems"]) if count_rows else 0
+
+    items = [
+        {
+            "product": {
+                "id": row["id"],
+                "name": row["name"],
+                "reference": row["reference"],
+                "unit": row["unit"],
+                "category": {"id": row["categoryId"], "name": row["categoryName"]},
+            },
+            "currentQuantity": row["quantity"],
+            "minStock": row["minStock"],
+            "location": row["location"],
+            "lastAdjustmentDate": row["lastAdjustmentDate"],
+            "lastReceiptDate": row["lastReceiptDate"],
+        }
+        for row in rows
+    ]
+
+    return {
+        "reportDate": datetime.now(),
+        "items": items,
+        "totalItems": total_items,
+    }
+
+
+# Colonnes de tri autorisées pour le rapport de rotation (clé API -> colonne SQL).
+STOCK_TURNOVER_SORT_COLUMNS = {
+    "turnover_rate": '"turnoverRate"',
+    "quantity_out": '"totalQuantityOut"',
+    "current_stock": '"currentStock"',
+    "average_stock": '"averageStock"',
+    "name": 'lower("productName")',
+    "reference": '"productReference"',
+}
+
+# Un seul passage sur le registre des transactions, groupé par produit :
+# - sorties sur la période (SORTIE / REQUEST) ;
+# - mouvement net après la période et pendant la période, pour reconstituer le stock
+#   de fin (stock actuel - net après) et de début (stock de fin - net pendant).
+_STOCK_TURNOVER_QUERY = """
+    WITH movements AS (
+        SELECT
+            t."productId",
+            SUM(t.quantity) FILTER (
+                WHERE t."createdAt" <= $2::timestamp(3) AND t.type = 'SORTIE' AND t.source = 'REQUEST'
+            ) AS out_qty,
+            SUM(CASE WHEN t.type = 'ENTREE' THEN t.quantity ELSE -t.quantity END)
+                FILTER (WHERE t."createdAt" > $2::timestamp(3)) AS net_after,
+            SUM(CASE WHEN t.type = 'ENTREE' THEN t.quantity ELSE -t.quantity END)
+                FILTER (WHERE t."createdAt" <= $2::timestamp(3)) AS net_during
+        FROM "Transaction" t
+        WHERE t."createdAt" >= $1::timestamp(3)
+        GROUP BY t."productId"
+    ),
+    balances AS (
+        SELECT
+            p.id AS "productId",
+            p.name AS "productName",
+            p.reference AS "productReference",
+            p.quantity AS "currentStock",
+            COALESCE(m.out_qty, 0)::int AS "totalQuantityOut",
+            (p.quantity - COALESCE(m.net_after, 0))::int AS "closingStock",
+            (p.quantity - COALESCE(m.net_after, 0) - COALESCE(m.net_during, 0))::int AS "openingStock"
+        FROM "Product" p
+        LEFT JOIN movements m ON m."productId" = p.id
+    ),
+    rates AS (
+        SELECT
+            b.*,
+            ("openingStock" + "closingStock") / 2.0 AS "averageStock",
+            CASE
+                WHEN ("openingStock" + "closingStock") > 0
+                THEN "totalQuantityOut" / (("openingStock" + "closingStock") / 2.0)
+                ELSE 0
+            END AS "turnoverRate"
+        FROM balances b
+    )
+    SELECT
+        "productId", "productName", "productReference", "currentStock",
+        "totalQuantityOut", "openingStock", "closingStock",
+        ROUND("averageStock", 2) AS "averageStock",
+        ROUND("turnoverRate", 2) AS "turnoverRate",
+        COUNT(*) OVER () AS "totalItems"
+    FROM rates
+"""
+
+
+async def get_stock_turnover(
+    db: Prisma,
+    start_date: datetime,
+    end_date: datetime,
+    page: int = 1,
+    page_size: Optional[int] = None,
+    sort_by: Optional[str] = None,
+    sort_order: str = "desc",
+):
     """
     Calcule le taux de rotation des stocks pour chaque produit sur une période donnée.
 
+    Le calcul est fait en une seule requête agrégée, quel que soit le nombre de produits.
+    Le taux de rotation est : sorties de la période / stock moyen, où le stock moyen est
+    la moyenne des stocks de début et de fin de période, reconstitués à partir du
+    registre des transactions (les modifications directes de quantité hors registre
+    ne sont pas prises en compte).
+
     Args:
         db: L'instance du client Prisma.
         start_date: Date de début de la période d'analyse.
         end_date: Date de fin de la période d'analyse.
+        page: Numéro de page (à partir de 1).
+        page_size: Taille de page ; None renvoie tous les produits.
+        sort_by: Clé de STOCK_TURNOVER_SORT_COLUMNS (par défaut le taux de rotation).
+        sort_order: "asc" ou "desc".
 
     Returns:
-        Un dictionnaire contenant la date du rapport et une liste d'articles de rotation.
+        Un dictionnaire contenant la date du rapport, les articles de rotation et la pagination.
     """
-    products = await db.product.find_many()
+    sort_column = STOCK_TURNOVER_SORT_COLUMNS.get(sort_by or "turnover_rate", '"turnoverRate"')
+    direction = "ASC" if (sort_order or "desc").lower() == "asc" else "DESC"
+    query = f'{_STOCK_TURNOVER_QUERY} ORDER BY {sort_column} {direction}, "productId"'
+
+    if page_size:
+        query += " LIMIT $3 OFFSET $4"
+        rows = await db.query_raw(query, start_date, end_date, page_size, (page - 1) * page_size)
+    else:
+        rows = await db.query_raw(query, start_date, end_date)
 
     report_items = []
-    for product in products:
-        # Correctly query transactions for stock going out
-        transactions_out = await db.transaction.find_many(
-            where={
-                'productId': product.id,
-                'type': TransactionType.SORTIE,
-                'source': TransactionSource.REQUEST,
-                'createdAt': {
-                    'gte': start_date,
-                    'lte': end_date
-                }
-            }
-        )
-        total_quantity_out = sum([t.quantity for t in transactions_out])
-        
-        current_stock = product.quantity
-        
-        # Avoid division by zero if average stock is zero
-        # A more accurate average stock would be (stock_start + stock_end) / 2
-        # but for simplicity, we use current_stock.
-        turnover_rate = 0.0
-        if current_stock > 0:
-            # The classic formula is Cost of Goods Sold / Average Inventory.
-            # Here we simplify to Quantity Out / Current Stock for the period.
-            turnover_rate = float(total_quantity_out) / current_stock
-        
+    for row in rows:
         report_items.append({
-            "productId": product.id,
-            "productName": product.name,
-            "productReference": product.reference,
-            "currentStock": current_stock,
-            "totalQuantityOut": total_quantity_out,
-            "turnoverRate": round(turnover_rate, 2)
+            "productId": row["productId"],
+            "productName": row["productName"],
+            "productReference": row["productReference"],
+            "currentStock": row["currentStock"],
+            "totalQuantityOut": row["totalQuantityOut"],
+            "openingStock": row["openingStock"],
+            "closingStock": row["closingStock"],
+            "averageStock": float(row["averageStock"]),
+            "turnoverRate": float(row["turnoverRate"]),
         })
-    
+
     return {
         "reportDate": datetime.now(),
-        "items": report_items
+        "items": report_items,
+        "totalItems": int(rows[0]["totalItems"]) if rows else 0,
+        "page": page,
+        "pageSize": page_size,
     }
 
 
@@ -211,44 +428,24 @@ async def get_stock_history_report(
     end_date: Optional[datetime] = None,
     product_id: Optional[str] = None,
     user_id: Optional[str] = None,
+    after: Optional[str] = None,
+    count_mode: str = "exact",
 ) -> dict:
     """
     Récupère l'historique des transactions de stock avec pagination et filtrage.
+    Avec `after` (curseur `nextCursor` de la page précédente), la pagination se fait par clé.
     """
-    skip = (page - 1) * page_size
-    take = page_size
-
-    where_conditions = {}
-    if start_date:
-        where_conditions["createdAt"] = {"gte": start_date}
-    if end_date:
-        where_conditions.setdefault("createdAt", {})["lte"] = end_date
-    if product_id:
-        where_conditions["productId"] = product_id
-    if user_id:
-        where_conditions["userId"] = user_id
-
-    transactions = await db.transaction.find_many(
-        skip=skip,
-        take=take,
-        where=where_conditions,
-        include={
-            "product": True,
-            "user": True,
-        },
-        order={
-            "createdAt": "desc"
-        }
+    where_conditions = build_history_where(
+        product_id=product_id, user_id=user_id, start_date=start_date, end_date=end_date
+    )
+    return await get_transaction_page(
+        db,
+        where_conditions,
+        page=page,
+        page_size=page_size,
+        after=after,
+        count_mode=count_mode,
     )
-
-    total_items = await db.transaction.count(where=where_conditions)
-
-    return {
-        "items": transactions,
-        "totalItems": total_items,
-        "page": page,
-        "pageSize": page_size,
-    }
 
 
 async def get_stock_value_report(db: Prisma):
@@ -291,50 +488,13 @@ async def get_stock_status_report(
 ):
     """
     Récupère un rapport paginé sur l'état des stocks.
+    Le statut, le filtre, le total et la pagination sont calculés par PostgreSQL.
     """
-    skip = (page - 1) * page_size
-    
-    where_conditions = {}
-    if category_id:
-        where_conditions['categoryId'] = category_id
-
-    # Fetch all products matching the basic filters first
-    all_products = await db.product.find_many(
-        where=where_conditions,
-        include={'category': True}
+    return await get_stock_status_page(
+        db,
+        page=page,
+        page_size=page_size,
+        status_filter=status_filter,
+        category_id=category_id,
     )
 
-    # Manually calculate status and then filter
-    report_items = []
-    for p in all_products:
-        status = "AVAILABLE"
-        if p.quantity <= 0:
-            status = "OUT_OF_STOCK"
-        elif p.quantity <= p.minStock:
-            status = "CRITICAL"
-        
-        if status_filter and status != status_filter:
-            continue
-            
-        report_items.append({
-            "id": p.id,
-            "name": p.name,
-            "reference": p.reference,
-            "quantity": p.quantity,
-            "minStock": p.minStock,
-            "unit": p.unit,
-            "location": p.location,
-            "category": p.category,
-            "status": status,
-        })
-    
-    total_items = len(report_items)
-    paginated_items = report_items[skip : skip + page_size]
-
-    return {
-        "items": paginated_items,
-        "totalItems": total_items,
-        "page": page,
-        "pageSize": page_size,
-    }
-
@@ -1,7 +1,7 @@
-from typing import List, Optional
+from typing import Optional
 from database.generated.prisma import Prisma
-from database.generated.prisma.models import Request, RequestItem, Product, Transaction
-from database.generated.prisma.enums import RequestStatus, TransactionType, TransactionSource
+from database.generated.prisma.models import Request, Product
+from database.generated.prisma.enums import RequestStatus
 
 FULL_REQUEST_INCLUDE = {
     "items": {"include": {"product": True}},
@@ -27,31 +27,6 @@ async def get_product_by_id(db: Prisma, product_id: str) -> Optional[Product]:
     """
     return await db.product.find_unique(where={"id": product_id})
 
-async def decrement_product_stock(db: Prisma, product_id: str, quantity: int):
-    """
-    Decrements the stock quantity for a given product.
-    """
-    await db.product.update(
-        where={"id": product_id},
-        data={"quantity": {"decrement": quantity}},
-    )
-
-async def create_stock_transaction(
-    db: Prisma, product_id: str, user_id: str, quantity: int
-):
-    """
-    Creates a stock transaction record for a stock issue (SORTIE).
-    """
-    await db.transaction.create(
-        data={
-            "productId": product_id,
-            "userId": user_id,
-            "type": TransactionType.SORTIE,
-            "quantity": quantity,
-            "source": TransactionSource.REQUEST,
-        }
-    )
-
 async def update_request_status_to_delivered(
     db: Prisma, request_id: str, deliverer_id: str
 ) -> Request:
@@ -0,0 +1,123 @@
+# app/crud/search.py
+"""
+Recherche classée des produits et des demandes, servie par les index trigrammes (pg_trgm,
+migration 20261016130000_add_trigram_search).
+
+Un terme correspond s'il est contenu dans le texte (ILIKE '%terme%') ou s'il ressemble à
+un de ses mots (opérateur <% de pg_trgm, qui tolère les fautes de frappe) ; les deux
+conditions utilisent les index GIN. Les résultats sont classés par pertinence et bornés
+(SEARCH_LIMIT par défaut, MAX_SEARCH_LIMIT au plus) : une recherche ne parcourt jamais
+tout le catalogue ni tout l'historique des demandes.
+"""
+import json
+from typing import List, Optional, Sequence
+
+from app.crud.summaries import REQUEST_SUMMARY_COLUMNS, request_summaries
+from app.crud.utils import escape_like
+from database.generated.prisma import Prisma
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# En dessous d'un trigramme, l'index ne filtre rien : le terme doit avoir 3 caractères.
+MIN_SEARCH_LENGTH = 3
+
+
+def _bounded(limit: Optional[int]) -> int:
+    return min(max(limit or SEARCH_LIMIT, 1), MAX_SEARCH_LIMIT)
+
+
+async def search_products(
+    db: Prisma,
+    term: str,
+    limit: Optional[int] = None,
+    category_id: Optional[str] = None,
+) -> List[dict]:
+    """
+    Produits correspondant au terme, du plus au moins pertinent :
+    référence exacte, puis nom ou référence commençant par le terme, puis ressemblance
+    (word_similarity) avec le nom ou la référence, puis ordre alphabétique.
+    """
+    params: list = [term.strip(), escape_like(term.strip())]
+    conditions = [
+        "(p.name ILIKE '%' || $2 || '%' OR p.reference ILIKE '%' || $2 || '%' "
+        "OR $1 <% p.name OR $1 <% p.reference)"
+    ]
+    if category_id:
+        params.append(category_id)
+        conditions.append(f'p."categoryId" = ${len(params)}')
+    params.append(_bounded(limit))
+
+    rows = await db.query_raw(
+        f"""
+        SELECT
+            p.id, p.name, p.reference, p."categoryId", p.quantity, p."minStock", p.cost,
+            p.unit, p.location, c.name AS "categoryName"
+        FROM "Product" p
+        JOIN "Category" c ON c.id = p."categoryId"
+        WHERE {' AND '.join(conditions)}
+        ORDER BY
+            lower(p.reference) = lower($1) DESC,
+            (p.name ILIKE $2 || '%' OR p.reference ILIKE $2 || '%') DESC,
+            GREATEST(word_similarity($1, p.name), word_similarity($1, p.reference)) DESC,
+            p.name, p.id
+        LIMIT ${len(params)}
+        """,
+        *params,
+    )
+    return [
+        {
+            "id": row["id"],
+            "name": row["name"],
+            "reference": row["reference"],
+            "categoryId": row["categoryId"],
+            "category": {"id": row["categoryId"], "name": row["categoryName"]},
+            "quantity": row["quantity"],
+            "minStock": row["minStock"],
+            "cost": row["cost"],
+            "unit": row["unit"],
+            "location": row["location"],
+        }
+        for row in rows
+    ]
+
+
+async def search_requests(
+    db: Prisma,
+    term: str,
+    limit: Optional[int] = None,
+    statuses: Optional[Sequence[str]] = None,
+    requester_id: Optional[str] = None,
+) -> List[dict]:
+    """
+    Demandes dont le document de recherche (numéro, demandeur, produits) correspond au
+    terme, résumées comme les listes paginées. Classement : numéro commençant par le
+    terme, puis ressemblance avec le document, puis les plus récentes.
+    """
+    params: list = [term.strip(), escape_like(term.strip())]
+    conditions = ["""(r."searchText" ILIKE '%' || $2 || '%' OR $1 <% r."searchText")"""]
+    if statuses:
+        params.append(json.dumps(list(statuses)))
+        conditions.append(
+            f'r.status IN (SELECT jsonb_array_elements_text(${len(params)}::jsonb)::"RequestStatus")'
+        )
+    if requester_id:
+        params.append(requester_id)
+        conditions.append(f'r."requesterId" = ${len(params)}')
+    params.append(_bounded(limit))
+
+    rows = await db.query_raw(
+        f"""
+        SELECT {REQUEST_SUMMARY_COLUMNS}
+        FROM "Request" r
+        JOIN "User" u ON u.id = r."requesterId"
+        WHERE {' AND '.join(conditions)}
+        ORDER BY
+            r."requestNumber" ILIKE $2 || '%' DESC,
+            word_similarity($1, r."searchText") DESC,
+            r."createdAt" DESC, r.id DESC
+        LIMIT ${len(params)}
+        """,
+        *params,
+    )
+    return await request_summaries(db, rows)
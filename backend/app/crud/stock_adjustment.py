@@ -1,5 +1,6 @@
 
 from app.api.auth import CurrentUser
+from app.services.stock_ledger import StockLedger, StockMovement
 from database.generated.prisma import Prisma
 from database.generated.prisma.models import StockAdjustment
 from database.generated.prisma.enums import StockAdjustmentStatus, TransactionType, TransactionSource
@@ -25,13 +26,16 @@ async def create_stock_adjustment(
         raise ValueError("La nouvelle quantité ne peut pas être négative.")
 
     async with db.tx() as transaction:
-        # 1. Récupérer le produit et verrouiller la ligne pour la mise à jour
-        product = await transaction.product.find_unique(where={"id": product_id})
+        # 1. Récupérer le produit et verrouiller la ligne pour la mise à jour : l'écart
+        # est calculé sur une quantité qu'aucune autre transaction ne peut modifier
+        rows = await transaction.query_raw(
+            'SELECT "quantity" FROM "Product" WHERE "id" = $1 FOR UPDATE', product_id
+        )
 
-        if not product:
+        if not rows:
             raise ValueError("Produit non trouvé.")
 
-        current_quantity = product.quantity
+        current_quantity = rows[0]["quantity"]
         
         # Si la quantité est la même, ne rien faire
         if new_quantity == current_quantity:
@@ -45,10 +49,17 @@ async def create_stock_adjustment(
         adjustment_type = TransactionType.ENTREE if difference > 0 else TransactionType.SORTIE
         adjustment_quantity = abs(difference)
 
-        # 3. Mettre à jour la quantité du produit
-        await transaction.product.update(
-            where={"id": product_id},
-            data={"quantity": new_quantity},
+        # 3. Appliquer l'écart et créer la transaction d'historique en une instruction
+        await StockLedger(transaction).apply(
+            [
+                StockMovement(
+                    product_id=product_id,
+                    quantity=adjustment_quantity,
+                    type=adjustment_type,
+                    source=TransactionSource.ADJUSTMENT,
+                    user_id=user.id,
+                )
+            ]
         )
 
         # 4. Créer l'enregistrement de l'ajustement de stock
@@ -65,17 +76,6 @@ async def create_stock_adjustment(
             }
         )
 
-        # 5. Créer une transaction pour l'historique
-        await transaction.transaction.create(
-            data={
-                "productId": product_id,
-                "userId": user.id,
-                "type": adjustment_type,
-                "source": TransactionSource.ADJUSTMENT,
-                "quantity": adjustment_quantity,
-            }
-        )
-        
         logger.info(f"Ajustement de stock créé pour le produit {product_id}. Quantité changée de {current_quantity} à {new_quantity}.")
 
         return new_adjustment
@@ -0,0 +1,179 @@
+# app/crud/stock_status.py
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.crud.utils import escape_like
+from database.generated.prisma import Prisma
+
+# Prédicat "stock faible" partagé par les rapports, les alertes et le tableau de bord.
+# La comparaison colonne à colonne est évaluée par PostgreSQL ; l'index partiel
+# "Product_low_stock_idx" (quantity <= "minStock") couvre ce prédicat.
+LOW_STOCK_CONDITION = 'p.quantity <= p."minStock"'
+
+# Statut calculé d'un produit, identique à StockStatusEnum.
+STOCK_STATUS_SQL = """
+    CASE
+        WHEN p.quantity <= 0 THEN 'OUT_OF_STOCK'
+        WHEN p.quantity <= p."minStock" THEN 'CRITICAL'
+        ELSE 'AVAILABLE'
+    END
+"""
+
+# Filtre par statut exprimé directement sur les colonnes (utilisable par les index).
+_STATUS_CONDITIONS = {
+    "OUT_OF_STOCK": "p.quantity <= 0",
+    "CRITICAL": 'p.quantity > 0 AND p.quantity <= p."minStock"',
+    "AVAILABLE": 'p.quantity > 0 AND p.quantity > p."minStock"',
+}
+
+
+def build_stock_status_filters(
+    search: Optional[str] = None,
+    category_id: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    low_stock_only: bool = False,
+) -> Tuple[str, list]:
+    """
+    Construit la clause WHERE (et ses paramètres $n) commune aux requêtes de statut de stock.
+    Un statut inconnu ne renvoie aucun produit, comme l'ancien filtrage en Python.
+    """
+    conditions: List[str] = []
+    params: list = []
+
+    if search:
+        params.append(escape_like(search))
+        n = len(params)
+        conditions.append(f"(p.name ILIKE '%' || ${n} || '%' OR p.reference ILIKE '%' || ${n} || '%')")
+    if category_id:
+        params.append(category_id)
+        conditions.append(f'p."categoryId" = ${len(params)}')
+    if low_stock_only:
+        conditions.append(LOW_STOCK_CONDITION)
+    if status_filter:
+        conditions.append(_STATUS_CONDITIONS.get(status_filter, "FALSE"))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+
+async def get_stock_status_page(
+    db: Prisma,
+    page: int = 1,
+    page_size: int = 20,
+    search: Optional[str] = None,
+    category_id: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    low_stock_only: bool = False,
+) -> dict:
+    """
+    Récupère une page de produits avec leur statut de stock calculé par la base.
+
+    Le filtrage (y compris stock faible et statut), le tri par nom, la pagination
+    (LIMIT/OFFSET) et le total sont faits dans une seule requête.
+    """
+    where, params = build_stock_status_filters(search, category_id, status_filter, low_stock_only)
+    limit_index = len(params) + 1
+    query = f"""
+        SELECT
+            p.id, p.name, p.reference, p.quantity, p."minStock", p.unit, p.location,
+            c.id AS "categoryId", c.name AS "categoryName",
+            {STOCK_STATUS_SQL} AS status,
+            COUNT(*) OVER () AS "totalItems"
+        FROM "Product" p
+        JOIN "Category" c ON c.id = p."categoryId"
+        {where}
+        ORDER BY p.name ASC, p.id
+        LIMIT ${limit_index} OFFSET ${limit_index + 1}
+    """
+    rows = await db.query_raw(query, *params, page_size, (page - 1) * page_size)
+
+    if rows:
+        total_items = int(rows[0]["totalItems"])
+    elif page > 1:
+        total_items = await count_products(db, search, category_id, status_filter, low_stock_only)
+    else:
+        total_items = 0
+
+    return {
+        "items": [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "reference": row["reference"],
+                "quantity": row["quantity"],
+                "minStock": row["minStock"],
+                "unit": row["unit"],
+                "location": row["location"],
+                "category": {"id": row["categoryId"], "name": row["categoryName"]},
+                "status": row["status"],
+            }
+            for row in rows
+        ],
+        "totalItems": total_items,
+        "page": page,
+        "pageSize": page_size,
+    }
+
+
+async def iter_stock_status(
+    db: Prisma,
+    search: Optional[str] = None,
+    category_id: Optional[str] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[List[dict]]:
+    """
+    Parcourt tous les produits filtrés, par lots, dans l'ordre (nom, id).
+
+    Pagination par clé ((name, id) > dernier lot lu) : chaque lot est un parcours
+    d'index de coût constant, quelle que soit la taille du catalogue.
+    """
+    where, params = build_stock_status_filters(search, category_id)
+    after_index = len(params) + 1
+    keyset = f"(${after_index}::text IS NULL OR (p.name, p.id) > (${after_index}, ${after_index + 1}))"
+    where = f"{where} AND {keyset}" if where else f"WHERE {keyset}"
+    query = f"""
+        SELECT
+            p.id, p.name, p.reference, p.quantity, p."minStock", p.unit, p.location,
+            c.name AS "categoryName",
+            {STOCK_STATUS_SQL} AS status
+        FROM "Product" p
+        JOIN "Category" c ON c.id = p."categoryId"
+        {where}
+        ORDER BY p.name, p.id
+        LIMIT ${after_index + 2}
+    """
+    after_name, after_id = None, None
+    while True:
+        rows = await db.query_raw(query, *params, after_name, after_id, batch_size)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        after_name, after_id = rows[-1]["name"], rows[-1]["id"]
+
+
+async def count_products(
+    db: Prisma,
+    search: Optional[str] = None,
+    category_id: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    low_stock_only: bool = False,
+) -> int:
+    """
+    Compte les produits correspondant aux filtres de statut de stock, côté base.
+    """
+    where, params = build_stock_status_filters(search, category_id, status_filter, low_stock_only)
+    rows = await db.query_raw(
+        f'SELECT COUNT(*) AS "count" FROM "Product" p {where}', *params
+    )
+    return int(rows[0]["count"]) if rows else 0
+
+
+async def count_below_min_stock(db: Prisma) -> int:
+    """
+    Nombre de produits strictement sous leur stock minimum (indicateur du tableau de bord).
+    """
+    rows = await db.query_raw(
+        'SELECT COUNT(*) AS "count" FROM "Product" p WHERE p.quantity < p."minStock"'
+    )
+    return int(rows[0]["count"]) if rows else 0
@@ -0,0 +1,311 @@
+# app/crud/summaries.py
+"""
+Listes paginées « résumé » des demandes, réceptions et ajustements en attente, et des
+utilisateurs.
+
+Chaque page est une seule requête SQL : filtre, tri (avec l'id pour départager les
+égalités) et LIMIT/OFFSET sont faits par la base, et seules les colonnes affichées dans
+les listes sont lues. Le détail complet (articles, approbations) est demandé à part,
+pour une seule ligne. Le total est un COUNT(*) séparé, omis avec count="none".
+"""
+import json
+from typing import List, Optional, Sequence, Tuple
+
+from app.crud.utils import escape_like
+from database.generated.prisma import Prisma
+
+# Colonnes lues pour un résumé de demande (FROM "Request" r JOIN "User" u sur le demandeur)
+REQUEST_SUMMARY_COLUMNS = """
+    r.id, r."requestNumber", r.status, r."requesterId",
+    u.name AS "requesterName", u.department AS "requesterDepartment",
+    r."approvedAt", r."receivedAt", r."createdAt", r."updatedAt"
+"""
+
+# Tris autorisés pour les demandes (le magasinier les voit par date d'approbation).
+REQUEST_ORDERS = {
+    "createdAt": 'r."createdAt" DESC, r.id DESC',
+    "approvedAt": 'r."approvedAt" DESC, r.id DESC',
+}
+
+
+def _contains(params: list, value: str) -> str:
+    """Ajoute le motif de recherche aux paramètres et renvoie sa référence $n."""
+    params.append(escape_like(value))
+    return f"'%' || ${len(params)} || '%'"
+
+
+def _where(conditions: List[str]) -> str:
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+async def _fetch_page(
+    db: Prisma,
+    select: str,
+    from_where: str,
+    order: str,
+    params: list,
+    page: int,
+    page_size: int,
+    count_mode: str,
+) -> Tuple[List[dict], Optional[int]]:
+    """
+    Lit une page (LIMIT/OFFSET) et, sauf en mode "none", le total correspondant au filtre.
+    """
+    limit_index = len(params) + 1
+    rows = await db.query_raw(
+        f"{select} {from_where} ORDER BY {order} LIMIT ${limit_index} OFFSET ${limit_index + 1}",
+        *params,
+        page_size,
+        (page - 1) * page_size,
+    )
+    total_items = None
+    if count_mode != "none":
+        # Page incomplète en partant du début : le total est connu sans compter
+        if page == 1 and len(rows) < page_size:
+            total_items = len(rows)
+        else:
+            count_rows = await db.query_raw(f'SELECT COUNT(*) AS "count" {from_where}', *params)
+            total_items = int(count_rows[0]["count"]) if count_rows else 0
+    return rows, total_items
+
+
+def _paginated(items: list, total_items: Optional[int], page: int, page_size: int) -> dict:
+    return {"items": items, "totalItems": total_items, "page": page, "pageSize": page_size}
+
+
+async def request_summaries(db: Prisma, rows: List[dict]) -> List[dict]:
+    """
+    Résumés des demandes lues avec REQUEST_SUMMARY_COLUMNS, dans l'ordre des lignes.
+    Les totaux des articles sont agrégés en une requête, pour ces demandes seulement.
+    """
+    totals = {}
+    if rows:
+        total_rows = await db.query_raw(
+            """
+            SELECT ri."requestId",
+                   COUNT(*) AS "itemCount",
+                   SUM(ri."requestedQty") AS "totalRequestedQty",
+                   SUM(ri."approvedQty") AS "totalApprovedQty",
+                   COUNT(*) FILTER (WHERE ri."itemDisputeStatus" <> 'NO_DISPUTE') AS "disputedItemCount"
+            FROM "RequestItem" ri
+            WHERE ri."requestId" IN (SELECT jsonb_array_elements_text($1::jsonb))
+            GROUP BY ri."requestId"
+            """,
+            json.dumps([row["id"] for row in rows]),
+        )
+        totals = {row["requestId"]: row for row in total_rows}
+
+    items = []
+    for row in rows:
+        item_totals = totals.get(row["id"], {})
+        approved = item_totals.get("totalApprovedQty")
+        items.append(
+            {
+                "id": row["id"],
+                "requestNumber": row["requestNumber"],
+                "status": row["status"],
+                "requesterId": row["requesterId"],
+                "requester": {"name": row["requesterName"], "department": row["requesterDepartment"]},
+                "itemCount": int(item_totals.get("itemCount") or 0),
+                "totalRequestedQty": int(item_totals.get("totalRequestedQty") or 0),
+                "totalApprovedQty": int(approved) if approved is not None else None,
+                "disputedItemCount": int(item_totals.get("disputedItemCount") or 0),
+                "approvedAt": row["approvedAt"],
+                "receivedAt": row["receivedAt"],
+                "createdAt": row["createdAt"],
+                "updatedAt": row["updatedAt"],
+            }
+        )
+    return items
+
+
+async def get_request_summary_page(
+    db: Prisma,
+    page: int = 1,
+    page_size: int = 20,
+    statuses: Optional[Sequence[str]] = None,
+    requester_id: Optional[str] = None,
+    search: Optional[str] = None,
+    order_by: str = "createdAt",
+    count_mode: str = "exact",
+) -> dict:
+    """
+    Page de demandes résumées : numéro, statut, demandeur et totaux des articles.
+
+    La recherche porte, comme les listes complètes, sur le document de recherche de la
+    demande (numéro, nom du demandeur, nom et référence des produits demandés).
+    """
+    conditions: List[str] = []
+    params: list = []
+    if statuses:
+        params.append(json.dumps(list(statuses)))
+        conditions.append(
+            f'r.status IN (SELECT jsonb_array_elements_text(${len(params)}::jsonb)::"RequestStatus")'
+        )
+    if requester_id:
+        params.append(requester_id)
+        conditions.append(f'r."requesterId" = ${len(params)}')
+    if search:
+        # Document de recherche indexé par trigrammes (numéro, demandeur, produits)
+        conditions.append(f'r."searchText" ILIKE {_contains(params, search)}')
+
+    from_where = f"""
+        FROM "Request" r
+        JOIN "User" u ON u.id = r."requesterId"
+        {_where(conditions)}
+    """
+    page_rows, total_items = await _fetch_page(
+        db,
+        f"SELECT {REQUEST_SUMMARY_COLUMNS}",
+        from_where,
+        REQUEST_ORDERS[order_by],
+        params,
+        page,
+        page_size,
+        count_mode,
+    )
+
+    items = await request_summaries(db, page_rows)
+    return _paginated(items, total_items, page, page_size)
+
+
+def _pending_item(row: dict) -> dict:
+    return {
+        "id": row["id"],
+        "product": {
+            "id": row["productId"],
+            "name": row["productName"],
+            "reference": row["productReference"],
+            "unit": row["productUnit"],
+        },
+        "quantity": row["quantity"],
+        "requestedBy": {"name": row["requestedByName"], "department": row["requestedByDepartment"]},
+        "status": row["status"],
+        "createdAt": row["createdAt"],
+    }
+
+
+async def get_pending_stock_receipt_page(
+    db: Prisma,
+    page: int = 1,
+    page_size: int = 20,
+    search: Optional[str] = None,
+    count_mode: str = "exact",
+) -> dict:
+    """
+    Page des réceptions de stock en attente de décision du DAF, les plus récentes d'abord.
+    """
+    conditions = ["s.status = 'PENDING'"]
+    params: list = []
+    if search:
+        pattern = _contains(params, search)
+        conditions.append(
+            f'(p.name ILIKE {pattern} OR s."supplierName" ILIKE {pattern} '
+            f'OR s."batchNumber" ILIKE {pattern} OR u.name ILIKE {pattern})'
+        )
+    rows, total_items = await _fetch_page(
+        db,
+        """
+        SELECT s.id, s."productId", p.name AS "productName", p.reference AS "productReference",
+               p.unit AS "productUnit", s.quantity, s."supplierName", s."batchNumber",
+               u.name AS "requestedByName", u.department AS "requestedByDepartment",
+               s.status, s."createdAt"
+        """,
+        f"""
+        FROM "StockReceipt" s
+        JOIN "Product" p ON p.id = s."productId"
+        JOIN "User" u ON u.id = s."requestedById"
+        {_where(conditions)}
+        """,
+        's."createdAt" DESC, s.id DESC',
+        params,
+        page,
+        page_size,
+        count_mode,
+    )
+    items = [
+        {**_pending_item(row), "supplierName": row["supplierName"], "batchNumber": row["batchNumber"]}
+        for row in rows
+    ]
+    return _paginated(items, total_items, page, page_size)
+
+
+async def get_pending_stock_adjustment_page(
+    db: Prisma,
+    page: int = 1,
+    page_size: int = 20,
+    search: Optional[str] = None,
+    count_mode: str = "exact",
+) -> dict:
+    """
+    Page des ajustements de stock en attente de décision du DAF, les plus récents d'abord.
+    """
+    conditions = ["a.status = 'PENDING'"]
+    params: list = []
+    if search:
+        pattern = _contains(params, search)
+        conditions.append(f"(p.name ILIKE {pattern} OR a.reason ILIKE {pattern} OR u.name ILIKE {pattern})")
+    rows, total_items = await _fetch_page(
+        db,
+        """
+        SELECT a.id, a."productId", p.name AS "productName", p.reference AS "productReference",
+               p.unit AS "productUnit", a.quantity, a.type, a.reason, a."inventoryAuditId",
+               u.name AS "requestedByName", u.department AS "requestedByDepartment",
+               a.status, a."createdAt"
+        """,
+        f"""
+        FROM "StockAdjustment" a
+        JOIN "Product" p ON p.id = a."productId"
+        JOIN "User" u ON u.id = a."requestedById"
+        {_where(conditions)}
+        """,
+        'a."createdAt" DESC, a.id DESC',
+        params,
+        page,
+        page_size,
+        count_mode,
+    )
+    items = [
+        {
+            **_pending_item(row),
+            "type": row["type"],
+            "reason": row["reason"],
+            "inventoryAuditId": row["inventoryAuditId"],
+        }
+        for row in rows
+    ]
+    return _paginated(items, total_items, page, page_size)
+
+
+async def get_user_summary_page(
+    db: Prisma,
+    page: int = 1,
+    page_size: int = 20,
+    search: Optional[str] = None,
+    roles: Optional[Sequence[str]] = None,
+    count_mode: str = "exact",
+) -> dict:
+    """
+    Page d'utilisateurs (sans mot de passe ni jeton), les plus récents d'abord.
+    """
+    conditions: List[str] = []
+    params: list = []
+    if search:
+        pattern = _contains(params, search)
+        conditions.append(f"(u.name ILIKE {pattern} OR u.username ILIKE {pattern} OR u.email ILIKE {pattern})")
+    if roles:
+        params.append(json.dumps(list(roles)))
+        conditions.append(
+            f'u.role IN (SELECT jsonb_array_elements_text(${len(params)}::jsonb)::"UserRole")'
+        )
+    rows, total_items = await _fetch_page(
+        db,
+        'SELECT u.id, u.username, u.email, u.name, u.role, u.department, u."createdAt"',
+        f'FROM "User" u {_where(conditions)}',
+        'u."createdAt" DESC, u.id DESC',
+        params,
+        page,
+        page_size,
+        count_mode,
+    )
+    return _paginated(rows, total_items, page, page_size)
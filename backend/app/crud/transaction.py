@@ -0,0 +1,151 @@
+# app/crud/transaction.py
+import base64
+import json
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+from database.generated.prisma import Prisma
+
+# Modes de calcul du total renvoyé avec une page d'historique :
+# - "exact" : COUNT(*) à chaque page (comportement historique) ;
+# - "approximate" : estimation du planificateur si aucun filtre, sinon COUNT(*) mis en cache ;
+# - "none" : pas de total (totalItems = null), le plus rapide pour le défilement.
+COUNT_MODES = ("exact", "approximate", "none")
+
+# Durée de vie (secondes) des totaux mis en cache en mode "approximate".
+COUNT_CACHE_TTL = 30
+_count_cache: dict = {}
+
+TRANSACTION_HISTORY_INCLUDE = {
+    "product": {
+        "select": {"id": True, "name": True, "reference": True, "unit": True}
+    },
+    "user": {"select": {"id": True, "name": True, "email": True, "role": True}},
+}
+
+
+def encode_cursor(created_at: datetime, transaction_id: str) -> str:
+    """
+    Encode la position (createdAt, id) d'une transaction en curseur opaque.
+    """
+    raw = json.dumps([created_at.isoformat(), transaction_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Décode un curseur produit par encode_cursor. Lève ValueError si le curseur est invalide.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, transaction_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(transaction_id)
+    except Exception as e:
+        raise ValueError("Curseur de pagination invalide.") from e
+
+
+def build_history_where(
+    product_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    transaction_source: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> dict:
+    where_clause = {}
+    if product_id:
+        where_clause["productId"] = product_id
+    if user_id:
+        where_clause["userId"] = user_id
+    if transaction_type:
+        where_clause["type"] = transaction_type
+    if transaction_source:
+        where_clause["source"] = transaction_source
+    if start_date or end_date:
+        where_clause["createdAt"] = {}
+        if start_date:
+            where_clause["createdAt"]["gte"] = start_date
+        if end_date:
+            where_clause["createdAt"]["lte"] = end_date
+    return where_clause
+
+
+async def count_transactions(db: Prisma, where: dict, count_mode: str = "exact") -> Optional[int]:
+    """
+    Total des transactions correspondant au filtre, selon le mode demandé (voir COUNT_MODES).
+    """
+    if count_mode == "none":
+        return None
+    if count_mode == "exact":
+        return await db.transaction.count(where=where)
+
+    if not where:
+        rows = await db.query_raw(
+            "SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = '\"Transaction\"'::regclass"
+        )
+        if rows and int(rows[0]["estimate"]) >= 0:
+            return int(rows[0]["estimate"])
+
+    key = json.dumps(where, sort_keys=True, default=str)
+    cached = _count_cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+    total = await db.transaction.count(where=where)
+    if len(_count_cache) > 1000:
+        _count_cache.clear()
+    _count_cache[key] = (now + COUNT_CACHE_TTL, total)
+    return total
+
+
+async def get_transaction_page(
+    db: Prisma,
+    where: dict,
+    page: int = 1,
+    page_size: int = 10,
+    after: Optional[str] = None,
+    count_mode: str = "exact",
+    include: Optional[dict] = None,
+) -> dict:
+    """
+    Récupère une page de l'historique des transactions, de la plus récente à la plus ancienne.
+
+    Avec `after` (curseur opaque renvoyé dans `nextCursor`), la page commence juste après
+    la transaction (createdAt, id) du curseur : la requête suit l'index sur createdAt
+    (ou ("productId", "createdAt") pour l'historique d'un produit) sans OFFSET, et son coût
+    ne dépend pas de la profondeur. Sans curseur, `page` est utilisée (skip/take).
+    """
+    query_where = where
+    skip = (page - 1) * page_size
+    if after:
+        created_at, transaction_id = decode_cursor(after)
+        keyset = {
+            "OR": [
+                {"createdAt": {"lt": created_at}},
+                {"createdAt": created_at, "id": {"lt": transaction_id}},
+            ]
+        }
+        query_where = {"AND": [where, keyset]} if where else keyset
+        skip = 0
+
+    transactions = await db.transaction.find_many(
+        where=query_where,
+        include=include if include is not None else TRANSACTION_HISTORY_INCLUDE,
+        order=[{"createdAt": "desc"}, {"id": "desc"}],
+        skip=skip,
+        take=page_size + 1,
+    )
+    has_more = len(transactions) > page_size
+    transactions = transactions[:page_size]
+    next_cursor = (
+        encode_cursor(transactions[-1].createdAt, transactions[-1].id) if has_more else None
+    )
+
+    return {
+        "items": transactions,
+        "totalItems": await count_transactions(db, where, count_mode),
+        "page": page,
+        "pageSize": page_size,
+        "nextCursor": next_cursor,
+    }
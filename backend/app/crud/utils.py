@@ -0,0 +1,12 @@
+# app/crud/utils.py
+from typing import Optional
+
+
+def escape_like(value: Optional[str]) -> Optional[str]:
+    """
+    Neutralise les jokers LIKE (%, _ et \\) d'un terme de recherche saisi par l'utilisateur.
+    Un terme vide donne None (filtre absent).
+    """
+    if not value:
+        return None
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
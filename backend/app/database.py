@@ -1,16 +1,107 @@
+import logging
+from datetime import timedelta
+from typing import AsyncGenerator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.metrics import instrument_client
 from database.generated.prisma import Prisma
-from typing import AsyncGenerator
+
+logger = logging.getLogger(__name__)
+
+# The single Prisma client of this worker process.
+# It is created by `connect_db()` in the application lifespan and shared by every request.
+_client: Optional[Prisma] = None
+_pool_settings: dict = {}
+
+
+def build_datasource_url(
+    url: str,
+    connection_limit: Optional[int] = None,
+    pool_timeout: Optional[int] = None,
+) -> str:
+    """
+    Adds the Prisma pool parameters (`connection_limit`, `pool_timeout`) to a database URL.
+    Parameters already present in the URL take precedence over the settings.
+    """
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    if connection_limit is not None:
+        query.setdefault("connection_limit", str(connection_limit))
+    if pool_timeout is not None:
+        query.setdefault("pool_timeout", str(pool_timeout))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+async def connect_db(
+    database_url: str,
+    connection_limit: Optional[int] = None,
+    pool_timeout: Optional[int] = None,
+    connect_timeout: int = 10,
+) -> Prisma:
+    """
+    Creates and connects the shared Prisma client for this worker.
+    Called once at application startup.
+    """
+    global _client, _pool_settings
+    # Queries counted and timed per request (Server-Timing, /api/metrics, query budgets)
+    instrument_client(Prisma)
+    if _client is not None and _client.is_connected():
+        return _client
+
+    _pool_settings = {
+        "connection_limit": connection_limit,
+        "pool_timeout": pool_timeout,
+        "connect_timeout": connect_timeout,
+    }
+    _client = Prisma(
+        datasource={
+            "url": build_datasource_url(database_url, connection_limit, pool_timeout)
+        },
+        connect_timeout=timedelta(seconds=connect_timeout),
+    )
+    await _client.connect()
+    logger.info(
+        "Prisma client connected (connection_limit=%s, pool_timeout=%s)",
+        connection_limit,
+        pool_timeout,
+    )
+    return _client
+
+
+async def disconnect_db() -> None:
+    """
+    Disconnects the shared Prisma client. Called once at application shutdown.
+    """
+    global _client
+    if _client is not None and _client.is_connected():
+        await _client.disconnect()
+        logger.info("Prisma client disconnected")
+    _client = None
+
+
+def get_client() -> Prisma:
+    """
+    Returns the shared Prisma client, for code running outside of a request
+    (background tasks, services started by the lifespan).
+    """
+    if _client is None or not _client.is_connected():
+        raise RuntimeError("Database client is not connected. Call connect_db first.")
+    return _client
+
+
+def get_pool_status() -> dict:
+    """
+    Describes the state of the shared client, used by the health/readiness endpoint.
+    """
+    return {
+        "connected": _client is not None and _client.is_connected(),
+        **_pool_settings,
+    }
 
 
 async def get_db() -> AsyncGenerator[Prisma, None]:
     """
-    FastAPI dependency that provides a database session for a single request.
-    Ensures the connection is closed after the request is finished.
+    FastAPI dependency that provides the worker's shared database client.
+    The connection pool is owned by the application lifespan, not by the request.
     """
-    db = Prisma()
-    try:
-        await db.connect()
-        yield db
-    finally:
-        if db.is_connected():
-            await db.disconnect()
+    yield get_client()
@@ -0,0 +1,365 @@
+import contextvars
+import logging
+import random
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("app.requests")
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Requests that did not match a route share one label, so that scanners probing
+# random URLs cannot create an unbounded number of series.
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised when a request exceeds its query budget and the budget is set to raise."""
+
+
+class QueryBudget:
+    """
+    Limits checked on the queries of a request:
+    - max_queries: total number of queries;
+    - max_repeats: number of times the same query shape may run, the signature of
+      an N+1 (one query per row of a previous result).
+    A violation is logged at the end of the request, or raised immediately with
+    raise_on_violation (development and tests).
+    """
+
+    __slots__ = ("max_queries", "max_repeats", "raise_on_violation")
+
+    def __init__(
+        self,
+        max_queries: Optional[int] = None,
+        max_repeats: Optional[int] = None,
+        raise_on_violation: bool = False,
+    ):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.raise_on_violation = raise_on_violation
+
+
+class RequestStats:
+    """Database activity of the request being served (one instance per request)."""
+
+    __slots__ = ("db_queries", "db_time", "shapes", "budget", "violations")
+
+    def __init__(self, budget: Optional[QueryBudget] = None):
+        self.db_queries = 0
+        self.db_time = 0.0
+        # query shape -> number of executions
+        self.shapes: Dict[str, int] = {}
+        self.budget = budget
+        self.violations: List[str] = []
+
+    def top_shapes(self, limit: int = 5) -> List[Tuple[str, int]]:
+        return sorted(self.shapes.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+_current_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "request_stats", default=None
+)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being served, or None outside of an HTTP request."""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries(budget: Optional[QueryBudget] = None) -> Iterator[RequestStats]:
+    """Counts the queries run in the block (outside of the HTTP middleware: tests, scripts)."""
+    stats = RequestStats(budget)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def record_db_query(shape: str, duration: float, check_budget: bool = True) -> None:
+    """
+    Adds one query to the current request (no-op outside of a request) and checks
+    the request's budget. Raises QueryBudgetExceeded when the budget says so.
+    """
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    stats.db_queries += 1
+    stats.db_time += duration
+    repeats = stats.shapes[shape] = stats.shapes.get(shape, 0) + 1
+
+    budget = stats.budget
+    if budget is None or not check_budget:
+        return
+    # Each limit is reported once per request, when it is first crossed
+    violation = None
+    if budget.max_queries is not None and stats.db_queries == budget.max_queries + 1:
+        violation = f"more than {budget.max_queries} queries"
+    elif budget.max_repeats is not None and repeats == budget.max_repeats + 1:
+        violation = f"query repeated more than {budget.max_repeats} times (N+1?): {shape}"
+    if violation is None:
+        return
+    stats.violations.append(violation)
+    if budget.raise_on_violation:
+        raise QueryBudgetExceeded(violation)
+
+
+def query_shape(method: str, model, arguments: dict) -> str:
+    """
+    Identifies a query without its values: `Product.find_unique(where{id})`, or the SQL
+    text (whitespace collapsed) of a raw query, whose parameters are passed separately.
+    """
+    if model is None or method in ("query_raw", "query_first", "execute_raw"):
+        sql = " ".join(str(arguments.get("query", "")).split())
+        return f"{method}: {sql[:160]}"
+    return f"{model.__name__}.{method}({_argument_shape(arguments)})"
+
+
+def _argument_shape(value) -> str:
+    if isinstance(value, dict):
+        parts = []
+        for key in sorted(value):
+            inner = _argument_shape(value[key])
+            parts.append(f"{key}{{{inner}}}" if inner else key)
+        return ",".join(parts)
+    if isinstance(value, list) and value:
+        return _argument_shape(value[0])
+    return ""
+
+
+def instrument_client(client_class) -> None:
+    """
+    Counts and times every action of the Prisma client (find_*, create, update,
+    query_raw...) through its `_execute` method. The class is patched, so that the
+    clients created by `db.tx()` (copies of the shared client) are counted too.
+    """
+    if getattr(client_class, "_instrumented", False):
+        return
+    execute = client_class._execute
+
+    async def timed_execute(self, *, method, arguments, model=None, root_selection=None):
+        shape = query_shape(method, model, arguments)
+        started = time.perf_counter()
+        try:
+            result = await execute(
+                self, method=method, arguments=arguments, model=model, root_selection=root_selection
+            )
+        except Exception:
+            record_db_query(shape, time.perf_counter() - started, check_budget=False)
+            raise
+        record_db_query(shape, time.perf_counter() - started)
+        return result
+
+    client_class._execute = timed_execute
+    client_class._instrumented = True
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets (count and sum included)."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+class RouteMetrics:
+    """Per-route request metrics of this worker process."""
+
+    def __init__(self):
+        # (method, route template, status class) -> histograms / counters
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.db_time: Dict[Tuple[str, str, str], Histogram] = {}
+        self.db_queries: Dict[Tuple[str, str, str], int] = {}
+        self.budget_violations: Dict[Tuple[str, str, str], int] = {}
+        self.in_flight = 0
+
+    def record(self, method: str, route: str, status: int, duration: float, stats: RequestStats) -> None:
+        key = (method, route, f"{status // 100}xx")
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+            self.db_time[key] = Histogram()
+            self.db_queries[key] = 0
+            self.budget_violations[key] = 0
+        histogram.observe(duration)
+        self.db_time[key].observe(stats.db_time)
+        self.db_queries[key] += stats.db_queries
+        if stats.violations:
+            self.budget_violations[key] += 1
+
+    def reset(self) -> None:
+        self.latency.clear()
+        self.db_time.clear()
+        self.db_queries.clear()
+        self.budget_violations.clear()
+
+    def render_prometheus(self) -> str:
+        """Text exposition format (version 0.0.4) of the metrics of this worker."""
+        lines = [
+            "# HELP http_requests_in_flight Requests being served by this worker.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        for name, help_text, histograms in (
+            ("http_request_duration_seconds", "Request latency by route.", self.latency),
+            ("http_request_db_seconds", "Database time spent per request, by route.", self.db_time),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(histograms.items()):
+                labels = _labels(key)
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+        lines.append("# HELP http_request_db_queries_total Database queries issued, by route.")
+        lines.append("# TYPE http_request_db_queries_total counter")
+        for key, count in sorted(self.db_queries.items()):
+            lines.append(f"http_request_db_queries_total{{{_labels(key)}}} {count}")
+        lines.append(
+            "# HELP http_request_db_budget_violations_total Requests over their query budget, by route."
+        )
+        lines.append("# TYPE http_request_db_budget_violations_total counter")
+        for key, count in sorted(self.budget_violations.items()):
+            lines.append(f"http_request_db_budget_violations_total{{{_labels(key)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: Tuple[str, str, str]) -> str:
+    method, route, status = key
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}",status="{status}"'
+
+
+metrics = RouteMetrics()
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware: the response is not re-wrapped in a
+    task and a stream per request). For each HTTP request it:
+    - measures the latency and the database queries/time, recorded per route template
+      (`/api/products/{product_id}`, not the concrete URL) in `metrics`;
+    - adds a `Server-Timing` header (app and db durations, db query count);
+    - logs one structured line for a sample of the requests, and for every slow or
+      failed one;
+    - checks the request's queries against `query_budget` and logs the violations
+      (too many queries, same query repeated: N+1) with the most frequent shapes.
+    """
+
+    def __init__(
+        self,
+        app,
+        log_sample_rate: float = 0.01,
+        slow_request_seconds: float = 1.0,
+        query_budget: Optional[QueryBudget] = None,
+    ):
+        self.app = app
+        self.log_sample_rate = log_sample_rate
+        self.slow_request_seconds = slow_request_seconds
+        self.query_budget = query_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(self.query_budget)
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+        metrics.in_flight += 1
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = time.perf_counter() - started
+                server_timing = (
+                    f"app;dur={elapsed * 1000:.1f}, "
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_queries} queries"'
+                )
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", []))
+                    + [(b"server-timing", server_timing.encode("latin-1"))],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            duration = time.perf_counter() - started
+            metrics.in_flight -= 1
+            _current_stats.reset(token)
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            route_path = getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+            metrics.record(scope["method"], route_path, status_code, duration, stats)
+            self._log(scope, route_path, status_code, duration, stats)
+            if stats.violations:
+                self._log_violations(scope, route_path, stats)
+
+    def _log(self, scope, route: str, status_code: int, duration: float, stats: RequestStats) -> None:
+        slow = duration >= self.slow_request_seconds
+        if not (slow or status_code >= 500 or random.random() < self.log_sample_rate):
+            return
+        level = logging.WARNING if slow or status_code >= 500 else logging.INFO
+        logger.log(
+            level,
+            "request method=%s route=%s path=%s status=%s duration_ms=%.1f db_queries=%s db_ms=%.1f",
+            scope["method"],
+            route,
+            scope["path"],
+            status_code,
+            duration * 1000,
+            stats.db_queries,
+            stats.db_time * 1000,
+            extra={
+                "http_method": scope["method"],
+                "http_route": route,
+                "http_status": status_code,
+                "duration_ms": round(duration * 1000, 1),
+                "db_queries": stats.db_queries,
+                "db_ms": round(stats.db_time * 1000, 1),
+            },
+        )
+
+    def _log_violations(self, scope, route: str, stats: RequestStats) -> None:
+        logger.warning(
+            "query budget exceeded method=%s route=%s db_queries=%s violations=%s top_queries=%s",
+            scope["method"],
+            route,
+            stats.db_queries,
+            "; ".join(stats.violations),
+            " | ".join(f"{count}x {shape}" for shape, count in stats.top_shapes()),
+            extra={
+                "http_method": scope["method"],
+                "http_route": route,
+                "db_queries": stats.db_queries,
+                "db_query_shapes": dict(stats.top_shapes()),
+            },
+        )
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Callback receiving each envelope published by any worker.
+Handler = Callable[[dict], Awaitable[None]]
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more.
+MAX_NOTIFY_PAYLOAD = 7900
+
+# Envelopes too large for NOTIFY are stored in "PubSubPayload" and kept this long, for the
+# workers to read them.
+STORED_PAYLOAD_RETENTION = 300  # seconds
+
+
+class PubSubBackend(ABC):
+    """
+    Transport of WebSocket envelopes between the workers of the application.
+    Every worker receives every envelope (its own included) and delivers it to the
+    sockets it holds, so a message reaches each socket exactly once.
+    """
+
+    @abstractmethod
+    async def start(self, handler: Handler) -> None:
+        ...
+
+    @abstractmethod
+    async def publish(self, envelope: dict) -> None:
+        ...
+
+    async def stop(self) -> None:
+        pass
+
+
+class InMemoryHub:
+    """Process-local bus shared by InMemoryPubSub instances (one instance = one simulated worker)."""
+
+    def __init__(self):
+        self.handlers: List[Handler] = []
+
+    async def publish(self, envelope: dict) -> None:
+        for handler in list(self.handlers):
+            try:
+                await handler(envelope)
+            except Exception:
+                logger.exception("In-memory pub/sub handler failed")
+
+
+_default_hub = InMemoryHub()
+
+
+class InMemoryPubSub(PubSubBackend):
+    """Single-process backend, used by default for development and by the tests."""
+
+    def __init__(self, hub: Optional[InMemoryHub] = None):
+        self.hub = hub or _default_hub
+        self._handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+        self.hub.handlers.append(handler)
+
+    async def publish(self, envelope: dict) -> None:
+        await self.hub.publish(envelope)
+
+    async def stop(self) -> None:
+        if self._handler in self.hub.handlers:
+            self.hub.handlers.remove(self._handler)
+        self._handler = None
+
+
+def to_asyncpg_dsn(database_url: str) -> str:
+    """
+    Removes the Prisma-specific query parameters (schema, connection_limit, ...)
+    that asyncpg does not understand.
+    """
+    parts = urlsplit(database_url)
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query)
+        if key not in {"schema", "connection_limit", "pool_timeout", "connect_timeout", "pgbouncer", "socket_timeout", "statement_cache_size"}
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class PostgresPubSub(PubSubBackend):
+    """
+    LISTEN/NOTIFY on the application database, through one dedicated asyncpg
+    connection per worker.
+
+    Publishes are batched: envelopes queued within `batch_interval` seconds are sent
+    as one JSON array per NOTIFY (split to respect the payload limit), in a single
+    round trip. An envelope too large for NOTIFY on its own is stored in the
+    "PubSubPayload" table and published by reference ({"p": id}); each worker reads it
+    back before delivering it.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        channel: str = "ws_notifications",
+        batch_interval: float = 0.01,
+        reconnect_delay: float = 2.0,
+    ):
+        self.dsn = to_asyncpg_dsn(database_url)
+        self.channel = channel
+        self.batch_interval = batch_interval
+        self.reconnect_delay = reconnect_delay
+        self._handler: Optional[Handler] = None
+        self._connection = None
+        # Serializes the statements of the connection (flushes, stored payload reads)
+        self._lock = asyncio.Lock()
+        self._pending: List[str] = []
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        # Running deliveries (referenced until done, so they are not collected).
+        self._deliveries: Set[asyncio.Task] = set()
+        self._stopping = False
+        self.notifies_sent = 0
+        self.envelopes_published = 0
+        self.envelopes_by_reference = 0
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+        self._stopping = False
+        await self._connect()
+        self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self.dsn)
+        self._connection.add_termination_listener(self._on_connection_lost)
+        await self._connection.add_listener(self.channel, self._on_notify)
+        logger.info("Listening for WebSocket notifications on channel %s", self.channel)
+
+    def _on_connection_lost(self, connection) -> None:
+        if not self._stopping:
+            logger.warning("Pub/sub connection lost, reconnecting")
+            self._connection = None
+            self._wakeup.set()
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            envelopes = json.loads(payload)
+        except ValueError:
+            logger.error("Invalid pub/sub payload on %s", channel)
+            return
+        for envelope in envelopes:
+            if "p" in envelope:
+                delivery = self._deliver_stored(envelope["p"])
+            else:
+                delivery = self._handler(envelope)
+            task = asyncio.get_running_loop().create_task(delivery)
+            self._deliveries.add(task)
+            task.add_done_callback(self._on_delivery_done)
+
+    def _on_delivery_done(self, task: asyncio.Task) -> None:
+        self._deliveries.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Pub/sub delivery failed", exc_info=task.exception())
+
+    async def _deliver_stored(self, payload_id: int) -> None:
+        try:
+            async with self._lock:
+                encoded = await self._connection.fetchval(
+                    'SELECT "payload" FROM "PubSubPayload" WHERE "id" = $1', payload_id
+                )
+        except Exception:
+            logger.exception("Reading stored pub/sub payload %s failed", payload_id)
+            return
+        if encoded is None:
+            logger.error("Stored pub/sub payload %s not found (expired?)", payload_id)
+            return
+        await self._handler(json.loads(encoded))
+
+    async def publish(self, envelope: dict) -> None:
+        self._pending.append(json.dumps(envelope))
+        self.envelopes_published += 1
+        self._wakeup.set()
+
+    @staticmethod
+    def build_payloads(encoded_envelopes: List[str]) -> List[str]:
+        """Groups encoded envelopes into JSON arrays that each fit in one NOTIFY."""
+        payloads: List[str] = []
+        batch: List[str] = []
+        size = 2
+        for encoded in encoded_envelopes:
+            length = len(encoded.encode("utf-8")) + 1
+            if batch and size + length > MAX_NOTIFY_PAYLOAD:
+                payloads.append("[" + ",".join(batch) + "]")
+                batch, size = [], 2
+            batch.append(encoded)
+            size += length
+        if batch:
+            payloads.append("[" + ",".join(batch) + "]")
+        return payloads
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._connection is None or self._connection.is_closed():
+                try:
+                    await self._connect()
+                except Exception:
+                    logger.exception("Pub/sub reconnection failed")
+                    await asyncio.sleep(self.reconnect_delay)
+                    self._wakeup.set()
+                    continue
+            # Let concurrent publishes join this batch.
+            await asyncio.sleep(self.batch_interval)
+            try:
+                await self._send_pending()
+            except Exception:
+                logger.exception("Pub/sub publish failed, retrying")
+                await asyncio.sleep(self.reconnect_delay)
+                self._wakeup.set()
+
+    async def _store(self, encoded: str) -> str:
+        """Stores an envelope too large for NOTIFY; returns the reference to publish instead."""
+        logger.warning(
+            "Pub/sub envelope too large for NOTIFY (%d bytes), published by reference",
+            len(encoded.encode("utf-8")),
+        )
+        payload_id = await self._connection.fetchval(
+            """
+            WITH expired AS (
+                DELETE FROM "PubSubPayload" WHERE "createdAt" < now() - make_interval(secs => $2)
+            )
+            INSERT INTO "PubSubPayload" ("payload") VALUES ($1) RETURNING "id"
+            """,
+            encoded,
+            STORED_PAYLOAD_RETENTION,
+        )
+        self.envelopes_by_reference += 1
+        return json.dumps({"p": payload_id})
+
+    async def _send_pending(self) -> None:
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            async with self._lock:
+                encoded = [
+                    await self._store(e) if len(e.encode("utf-8")) > MAX_NOTIFY_PAYLOAD - 2 else e
+                    for e in pending
+                ]
+                payloads = self.build_payloads(encoded)
+                await self._connection.executemany(
+                    "SELECT pg_notify($1, $2)", [(self.channel, p) for p in payloads]
+                )
+        except Exception:
+            self._pending = pending + self._pending
+            raise
+        self.notifies_sent += len(payloads)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._connection is not None and not self._connection.is_closed():
+            try:
+                await self._send_pending()
+            except Exception:
+                logger.exception("Pub/sub flush at shutdown failed")
+            await self._connection.close()
+        self._connection = None
+
+
+def create_pubsub_backend(kind: str, database_url: str) -> PubSubBackend:
+    if kind == "postgres":
+        return PostgresPubSub(database_url)
+    if kind == "memory":
+        return InMemoryPubSub()
+    raise ValueError(f"Unknown WebSocket pub/sub backend: {kind}")
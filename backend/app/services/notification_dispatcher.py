@@ -0,0 +1,130 @@
+# backend/app/services/notification_dispatcher.py
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.database import get_client
+from app.websockets import manager
+from database.generated.prisma.enums import UserRole
+
+logger = logging.getLogger(__name__)
+
+# Rôles prévenus lorsqu'un produit atteint son seuil de stock minimum.
+LOW_STOCK_ALERT_ROLES = [UserRole.ADMIN, UserRole.MAGASINIER, UserRole.CHEF_SERVICE]
+
+# Une alerte de stock faible par produit au plus toutes les LOW_STOCK_ALERT_WINDOW secondes.
+LOW_STOCK_ALERT_WINDOW = 300
+
+# Durée de vie de l'index rôle -> utilisateurs. Il est invalidé sur tous les workers
+# à chaque création, modification ou suppression d'utilisateur (enveloppe de contrôle
+# "invalidate_roles") ; le TTL couvre les changements faits par les scripts.
+ROLE_INDEX_TTL = 300
+
+# Seules les deux colonnes utiles à l'index sont lues (pas les mots de passe ni les profils).
+_ROLE_INDEX_SQL = 'SELECT "id", "role"::text AS "role" FROM "User"'
+
+
+def _role_key(role) -> str:
+    # app.api.auth.UserRole (str, Enum) et l'enum Prisma (StrEnum) n'ont pas le même str().
+    return getattr(role, "value", role)
+
+
+class NotificationDispatcher:
+    """
+    Envoie les notifications WebSocket en arrière-plan, hors du chemin de la requête.
+    - Garde en mémoire l'index rôle -> identifiants d'utilisateurs.
+    - Déduplique les alertes de stock faible par produit dans une fenêtre de temps.
+    """
+
+    def __init__(
+        self,
+        low_stock_window: float = LOW_STOCK_ALERT_WINDOW,
+        role_index_ttl: float = ROLE_INDEX_TTL,
+    ):
+        self.low_stock_window = low_stock_window
+        self.role_index_ttl = role_index_ttl
+        self._role_index: Optional[Dict[str, Set[str]]] = None
+        self._role_index_expires_at = 0.0
+        self._low_stock_alerted_at: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    # --- Index rôle -> utilisateurs ---
+
+    def invalidate_roles(self) -> None:
+        """
+        Vide l'index de ce worker. Appelé par le gestionnaire de l'enveloppe de contrôle
+        "invalidate_roles", publiée après la création, la modification ou la suppression
+        d'un utilisateur.
+        """
+        self._role_index = None
+
+    async def _load_role_index(self) -> Dict[str, Set[str]]:
+        rows = await get_client().query_raw(_ROLE_INDEX_SQL)
+        index: Dict[str, Set[str]] = {}
+        for row in rows:
+            index.setdefault(row["role"], set()).add(row["id"])
+        self._role_index = index
+        self._role_index_expires_at = time.monotonic() + self.role_index_ttl
+        return index
+
+    async def user_ids_for_roles(self, roles: Iterable[UserRole]) -> List[str]:
+        index = self._role_index
+        if index is None or time.monotonic() >= self._role_index_expires_at:
+            index = await self._load_role_index()
+        user_ids: Set[str] = set()
+        for role in roles:
+            user_ids |= index.get(_role_key(role), set())
+        return list(user_ids)
+
+    # --- Envoi en arrière-plan ---
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Notification fan-out failed", exc_info=task.exception())
+
+    async def _send_to_roles(self, message: dict, roles: List[UserRole]) -> None:
+        await manager.send_to_users(message, await self.user_ids_for_roles(roles))
+
+    def notify_user(self, message: dict, user_id: str) -> None:
+        self._spawn(manager.send_personal_message(message, user_id))
+
+    def notify_users(self, message: dict, user_ids: List[str]) -> None:
+        self._spawn(manager.send_to_users(message, list(user_ids)))
+
+    def notify_roles(self, message: dict, roles: List[UserRole]) -> None:
+        self._spawn(self._send_to_roles(message, list(roles)))
+
+    def notify_low_stock(self, product) -> None:
+        """
+        Alerte les rôles concernés si le produit (dans son état après mise à jour) est
+        sous son seuil. Une seule alerte par produit dans la fenêtre de déduplication ;
+        la fenêtre est réinitialisée dès que le stock repasse au-dessus du seuil.
+        """
+        if product.quantity > product.minStock:
+            self._low_stock_alerted_at.pop(product.id, None)
+            return
+
+        now = time.monotonic()
+        last_alert = self._low_stock_alerted_at.get(product.id)
+        if last_alert is not None and now - last_alert < self.low_stock_window:
+            return
+        self._low_stock_alerted_at[product.id] = now
+
+        message = f"Alerte stock faible: Le produit '{product.name}' (Référence: {product.reference}) a atteint ou dépassé son seuil de stock minimum ({product.quantity}/{product.minStock})."
+        self.notify_roles({"type": "low_stock_alert", "message": message}, LOW_STOCK_ALERT_ROLES)
+
+    async def drain(self) -> None:
+        """Attend la fin des envois en cours (arrêt de l'application, tests)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+# Create a single instance of the dispatcher to be used across the application
+dispatcher = NotificationDispatcher()
@@ -0,0 +1,218 @@
+# backend/app/services/notification_outbox.py
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Iterable, List, Optional
+
+from app.database import get_client
+from app.services.notification_dispatcher import _role_key, dispatcher
+from app.websockets import manager
+from database.generated.prisma import Prisma
+
+logger = logging.getLogger(__name__)
+
+# Nombre de notifications réservées par aller-retour à la base.
+OUTBOX_BATCH_SIZE = 100
+# Intervalle (secondes) entre deux passages sans réveil explicite : rattrape les lignes
+# validées par les autres workers ou laissées en attente par un arrêt.
+OUTBOX_POLL_INTERVAL = 1.0
+# Durée (secondes) de la réservation d'une ligne ; passé ce délai, une ligne réservée
+# par un worker arrêté redevient disponible.
+OUTBOX_CLAIM_TIMEOUT = 30
+# Au-delà, la notification est abandonnée (elle reste en base avec lastError).
+OUTBOX_MAX_ATTEMPTS = 5
+# Délai maximal (secondes) entre deux tentatives.
+OUTBOX_MAX_BACKOFF = 300
+# Les notifications envoyées sont purgées après ce nombre de jours.
+OUTBOX_RETENTION_DAYS = 7
+
+# Les lignes sont écrites et lues en SQL brut sur le client de la transaction : le
+# client Prisma généré n'a pas à connaître le modèle pour que l'écriture fasse partie
+# de la transaction.
+_INSERT_SQL = """
+INSERT INTO "NotificationOutbox" ("id", "message", "userIds", "roles")
+VALUES ($1, $2::jsonb, $3::jsonb, $4::jsonb)
+"""
+
+# Réserve un lot de notifications dues. SKIP LOCKED : les workers se partagent les
+# lignes sans s'attendre ; la réservation repousse availableAt, donc une ligne n'est
+# reprise que si son envoi n'a pas été confirmé avant OUTBOX_CLAIM_TIMEOUT.
+_CLAIM_SQL = """
+WITH claimed AS (
+    UPDATE "NotificationOutbox" o
+    SET "attempts" = o."attempts" + 1,
+        "availableAt" = CURRENT_TIMESTAMP + $2::int * interval '1 second'
+    WHERE o."id" IN (
+        SELECT "id" FROM "NotificationOutbox"
+        WHERE "sentAt" IS NULL
+          AND "availableAt" <= CURRENT_TIMESTAMP
+          AND "attempts" < $3::int
+        ORDER BY "availableAt"
+        LIMIT $1::int
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING o."id", o."message", o."userIds", o."roles", o."attempts", o."createdAt"
+)
+SELECT "id", "message"::text AS "message", "userIds"::text AS "userIds",
+       "roles"::text AS "roles", "attempts"
+FROM claimed
+ORDER BY "createdAt", "id"
+"""
+
+_MARK_SENT_SQL = """
+UPDATE "NotificationOutbox"
+SET "sentAt" = CURRENT_TIMESTAMP, "lastError" = NULL
+WHERE "id" IN (SELECT jsonb_array_elements_text($1::jsonb))
+"""
+
+_MARK_FAILED_SQL = """
+UPDATE "NotificationOutbox"
+SET "lastError" = $2, "availableAt" = CURRENT_TIMESTAMP + $3::int * interval '1 second'
+WHERE "id" = $1
+"""
+
+_PURGE_SQL = """
+DELETE FROM "NotificationOutbox"
+WHERE "sentAt" < CURRENT_TIMESTAMP - $1::int * interval '1 day'
+"""
+
+
+class NotificationOutbox:
+    """
+    Outbox transactionnelle des notifications WebSocket.
+    - `enqueue` écrit la notification dans la transaction du changement métier : elle
+      n'existe que si la transaction est validée, et n'est jamais perdue si elle l'est.
+    - Une tâche de fond (une par worker) envoie les lignes validées par lots, avec
+      nouvelles tentatives espacées en cas d'échec.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        claim_timeout: int = OUTBOX_CLAIM_TIMEOUT,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        retention_days: int = OUTBOX_RETENTION_DAYS,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.retention_days = retention_days
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._next_purge_at = 0.0
+        # Métriques
+        self.notifications_sent = 0
+        self.notifications_failed = 0
+
+    # --- Écriture (dans la transaction) ---
+
+    async def enqueue(
+        self,
+        tx: Prisma,
+        message: dict,
+        user_ids: Optional[Iterable[str]] = None,
+        roles: Optional[Iterable] = None,
+    ) -> None:
+        """
+        Enregistre une notification destinée à des utilisateurs et/ou à des rôles.
+        `tx` est le client de la transaction en cours ; appeler `wake()` après le commit.
+        """
+        user_ids = [user_id for user_id in dict.fromkeys(user_ids or []) if user_id]
+        roles = [_role_key(role) for role in roles or []]
+        if not user_ids and not roles:
+            return
+        await tx.execute_raw(
+            _INSERT_SQL,
+            uuid.uuid4().hex,
+            json.dumps(message),
+            json.dumps(user_ids),
+            json.dumps(roles),
+        )
+
+    def wake(self) -> None:
+        """Déclenche l'envoi sans attendre le prochain passage (à appeler après le commit)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # --- Envoi ---
+
+    async def dispatch_pending(self, db: Optional[Prisma] = None) -> int:
+        """Envoie un lot de notifications dues. Retourne le nombre de lignes réservées."""
+        db = db or get_client()
+        rows = await db.query_raw(
+            _CLAIM_SQL, self.batch_size, self.claim_timeout, self.max_attempts
+        )
+        sent_ids: List[str] = []
+        for row in rows:
+            try:
+                user_ids = json.loads(row["userIds"])
+                roles = json.loads(row["roles"])
+                if roles:
+                    user_ids = user_ids + await dispatcher.user_ids_for_roles(roles)
+                await manager.send_to_users(json.loads(row["message"]), user_ids)
+                sent_ids.append(row["id"])
+            except Exception as e:
+                self.notifications_failed += 1
+                logger.warning("Outbox notification %s failed (attempt %s): %s", row["id"], row["attempts"], e)
+                await db.execute_raw(
+                    _MARK_FAILED_SQL,
+                    row["id"],
+                    str(e)[:1000],
+                    min(2 ** int(row["attempts"]), OUTBOX_MAX_BACKOFF),
+                )
+        if sent_ids:
+            await db.execute_raw(_MARK_SENT_SQL, json.dumps(sent_ids))
+            self.notifications_sent += len(sent_ids)
+        return len(rows)
+
+    async def _purge_sent(self, db: Prisma) -> None:
+        now = time.monotonic()
+        if now < self._next_purge_at:
+            return
+        self._next_purge_at = now + 3600
+        await db.execute_raw(_PURGE_SQL, self.retention_days)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                db = get_client()
+                while await self.dispatch_pending(db) >= self.batch_size:
+                    pass
+                await self._purge_sent(db)
+            except Exception:
+                logger.exception("Notification outbox dispatch failed")
+
+    def start(self) -> None:
+        """Démarre la tâche d'envoi de ce worker (lifespan de l'application)."""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._wakeup = None
+
+    def get_metrics(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "notificationsSent": self.notifications_sent,
+            "notificationsFailed": self.notifications_failed,
+        }
+
+
+# Create a single instance of the outbox to be used across the application
+outbox = NotificationOutbox()
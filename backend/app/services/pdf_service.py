@@ -1,20 +1,226 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import multiprocessing
 import os
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, status
+from jinja2 import Environment, FileSystemLoader
+
+
+logger = logging.getLogger(__name__)
+
+LOGO_PATH = Path(__file__).parent.parent.parent.parent / 'frontend' / 'public' / 'Logo_PF.jpeg'
+
+
+def render_html_to_pdf(html_content: str) -> bytes:
+    """
+    Convertit du HTML en PDF avec WeasyPrint.
+    Exécutée dans un processus du pool : WeasyPrint n'est importé que par les processus de rendu.
+    """
+    from weasyprint import HTML
+
+    return HTML(string=html_content).write_pdf()
+
+
+def _warm_up_worker():
+    # Importer WeasyPrint (et ses bibliothèques natives) une seule fois par processus.
+    import weasyprint  # noqa: F401
+
+
+class PDFCache:
+    """
+    Cache LRU de PDF adressé par contenu, borné en octets.
+    La clé est l'empreinte du HTML rendu : tant que les données du document ne changent pas,
+    le HTML (et donc la clé) est identique et le PDF est servi depuis le cache.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    @staticmethod
+    def key_for(kind: str, html_content: str) -> str:
+        return f"{kind}:{hashlib.sha256(html_content.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        pdf_bytes = self._entries.get(key)
+        if pdf_bytes is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return pdf_bytes
+
+    def put(self, key: str, pdf_bytes: bytes) -> None:
+        if len(pdf_bytes) > self.max_bytes:
+            return
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key))
+        self._entries[key] = pdf_bytes
+        self.size += len(pdf_bytes)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class PDFRenderPool:
+    """
+    Pool de processus borné pour le rendu WeasyPrint, afin de ne pas bloquer la boucle
+    d'événements du worker.
+    - pool_size : nombre de processus de rendu.
+    - queue_depth : nombre de rendus pouvant attendre un processus libre ; au-delà, 503.
+    - timeout : durée maximale d'attente d'un rendu (secondes) ; au-delà, 504.
+    """
+
+    def __init__(self, pool_size: int, queue_depth: int, timeout: float, cache_max_bytes: int):
+        self.pool_size = pool_size
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.cache = PDFCache(cache_max_bytes)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(pool_size + queue_depth)
+        self._in_flight: dict = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" : ne pas dupliquer l'état du worker (boucle d'événements, moteur Prisma).
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up_worker,
+            )
+        return self._executor
+
+    async def render(self, kind: str, html_content: str, cache: bool = True) -> bytes:
+        """
+        Retourne le PDF du HTML donné, depuis le cache si possible.
+        Les demandes simultanées du même document partagent un seul rendu.
+        cache=False pour les documents qui ne se répètent pas (ils évinceraient les autres).
+        """
+        key = self.cache.key_for(kind, html_content)
+        if cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        pending = self._in_flight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render_uncached(key, html_content, cache))
+            self._in_flight[key] = pending
+            pending.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _render_uncached(self, key: str, html_content: str, cache: bool) -> bytes:
+        if self._slots.locked():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Trop de documents PDF en cours de génération. Veuillez réessayer.",
+            )
+        await self._slots.acquire()
+        try:
+            future = self._get_executor().submit(render_html_to_pdf, html_content)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Le créneau est rendu quand le processus a fini, pas quand la requête abandonne :
+        # un rendu déjà démarré ne peut pas être interrompu et occupe son processus
+        # jusqu'au bout. Le rappel s'exécute dans un thread du pool.
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._slots.release))
+        try:
+            pdf_bytes = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            logger.warning("PDF rendering timed out after %ss (%s)", self.timeout, key)
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="La génération du PDF a pris trop de temps.",
+            )
+        if cache:
+            self.cache.put(key, pdf_bytes)
+        return pdf_bytes
+
+    def stats(self) -> dict:
+        return {
+            "poolSize": self.pool_size,
+            "queueDepth": self.queue_depth,
+            "inFlight": len(self._in_flight),
+            "cache": self.cache.stats(),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Le pool de rendu de ce worker, créé au premier rendu et arrêté par le lifespan.
+_render_pool: Optional[PDFRenderPool] = None
+
+
+def get_render_pool() -> PDFRenderPool:
+    global _render_pool
+    if _render_pool is None:
+        from app.config import settings
+
+        _render_pool = PDFRenderPool(
+            pool_size=settings.PDF_POOL_SIZE,
+            queue_depth=settings.PDF_QUEUE_DEPTH,
+            timeout=settings.PDF_RENDER_TIMEOUT,
+            cache_max_bytes=settings.PDF_CACHE_MAX_BYTES,
+        )
+    return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown()
+        _render_pool = None
+
+
+def _load_logo_base64() -> str:
+    try:
+        with open(LOGO_PATH, 'rb') as f:
+            return base64.b64encode(f.read()).decode('utf-8')
+    except FileNotFoundError:
+        return ''
+
+
+_logo_base64: Optional[str] = None
+
 
 class PDFService:
     def __init__(self):
         # Initialiser l'environnement Jinja2
         template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'pdf')
         self.jinja_env = Environment(loader=FileSystemLoader(template_dir))
+        self.render_pool = get_render_pool()
 
-    def generate_purchase_order_pdf(self, order_data: dict) -> bytes:
+    async def generate_purchase_order_pdf(self, order_data: dict) -> bytes:
         """
         Génère un PDF pour un bon de commande à partir d'un dictionnaire de données.
         """
         template = self.jinja_env.get_template('purchase_order.html')
-        
+
         # Préparer les données pour le template
         context = {
             'order_number': order_data['orderNumber'],
@@ -26,20 +232,18 @@ class PDFService:
             'requester_name': order_data['requestedBy']['name'],
             'approved_by_name': order_data.get('approvedBy', {}).get('name') if order_data.get('approvedBy') else None,
         }
-        
+
         html_content = template.render(context)
-        
-        # Générer le PDF avec WeasyPrint
-        pdf_bytes = HTML(string=html_content).write_pdf()
-        
-        return pdf_bytes
 
-    def generate_delivery_note_pdf(self, request_data: dict) -> bytes:
+        # Générer le PDF avec WeasyPrint (pool de processus + cache)
+        return await self.render_pool.render('purchase_order', html_content)
+
+    async def generate_delivery_note_pdf(self, request_data: dict) -> bytes:
         """
         Génère un PDF pour un bon de livraison à partir d'un dictionnaire de données de requête.
         """
         template = self.jinja_env.get_template('delivery_note.html')
-        
+
         # Préparer les données pour le template
         context = {
             'request_number': request_data['requestNumber'],
@@ -51,10 +255,74 @@ class PDFService:
             'observations': request_data.get('requesterObservations'),
             'items': request_data['items'],
         }
-        
+
         html_content = template.render(context)
-        
-        # Générer le PDF avec WeasyPrint
-        pdf_bytes = HTML(string=html_content).write_pdf()
-        
-        return pdf_bytes
+
+        # Générer le PDF avec WeasyPrint (pool de processus + cache)
+        return await self.render_pool.render('delivery_note', html_content)
+
+    async def generate_stock_status_pdf(self, items: list, report_date: datetime) -> bytes:
+        """
+        Génère le rapport PDF d'état des stocks à partir des lignes de ProductStockStatus.
+        """
+        global _logo_base64
+        if _logo_base64 is None:
+            _logo_base64 = _load_logo_base64()
+        logo_img_tag = f'<img src="data:image/jpeg;base64,{_logo_base64}" alt="Logo Postefinances" style="width: 150px; height: auto;">' if _logo_base64 else ''
+
+        html_string = f"""
+    <html>
+        <head>
+            <style>
+                body {{ font-family: sans-serif; }}
+                h1 {{ color: #004494; }}
+                table {{ width: 100%; border-collapse: collapse; }}
+                th, td {{ border: 1px solid #dddddd; text-align: left; padding: 8px; }}
+                thead {{ background-color: #f2f2f2; }}
+            </style>
+        </head>
+        <body>
+            {logo_img_tag}
+            <h1>Rapport d'État des Stocks</h1>
+            <p>Date du rapport: {report_date.strftime('%d/%m/%Y %H:%M:%S')}</p>
+            <table>
+                <thead>
+                    <tr>
+                        <th>Nom</th>
+                        <th>Référence</th>
+                        <th>Catégorie</th>
+                        <th>Quantité</th>
+                        <th>Stock Min</th>
+                        <th>Statut</th>
+                    </tr>
+                </thead>
+                <tbody>
+    """
+        status_translations = {
+            "OUT_OF_STOCK": "Rupture",
+            "CRITICAL": "Critique",
+            "AVAILABLE": "Disponible",
+        }
+        rows = []
+        for item in items:
+            item_status = getattr(item.status, "value", item.status)
+            rows.append(f"""
+        <tr>
+            <td>{item.name}</td>
+            <td>{item.reference}</td>
+            <td>{item.category.name}</td>
+            <td>{item.quantity}</td>
+            <td>{item.minStock}</td>
+            <td>{status_translations.get(item_status, item_status)}</td>
+        </tr>
+        """)
+        html_string += "".join(rows)
+        html_string += """
+                </tbody>
+            </table>
+        </body>
+    </html>
+    """
+
+        # La date du rapport (à la seconde) rend chaque document unique : pas de cache.
+        return await self.render_pool.render('stock_status', html_string, cache=False)
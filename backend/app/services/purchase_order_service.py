@@ -3,7 +3,8 @@ from database.generated.prisma import Prisma
 from app.api.auth import CurrentUser, UserRole
 from app.api.schemas import PurchaseOrderUpdate
 from app.crud import purchase_order as po_crud
-from app.websockets import manager
+from app.services.notification_outbox import outbox
+from app.services.stock_ledger import StockLedger, StockMovement
 from database.generated.prisma.enums import PurchaseOrderStatus, TransactionType, TransactionSource
 
 async def update_purchase_order_status_service(
@@ -42,9 +43,13 @@ async def update_purchase_order_status_service(
             await po_crud.generic_update_purchase_order(transaction, purchase_order_id, update_data)
             
             status_french = "approuvé" if new_status == PurchaseOrderStatus.APPROVED else "renvoyé pour révision"
-            await manager.send_personal_message(
-                f"Votre bon de commande (N° {existing_po.orderNumber}) a été {status_french} par {current_user.name}.",
-                existing_po.requestedById,
+            await outbox.enqueue(
+                transaction,
+                {
+                    "type": "purchase_order_update",
+                    "message": f"Votre bon de commande (N° {existing_po.orderNumber}) a été {status_french} par {current_user.name}.",
+                },
+                user_ids=[existing_po.requestedById],
             )
 
         # Magasinier can mark as ordered or closed
@@ -59,21 +64,27 @@ async def update_purchase_order_status_service(
 
             if new_status == PurchaseOrderStatus.CLOTUREE:
                 po_items = await po_crud.get_purchase_order_items(transaction, purchase_order_id)
-                for item in po_items:
-                    await po_crud.increment_product_stock(transaction, item.productId, item.quantity)
-                    await po_crud.create_po_stock_transaction(
-                        transaction,
+                await StockLedger(transaction).apply(
+                    StockMovement(
                         product_id=item.productId,
+                        quantity=item.quantity,
+                        type=TransactionType.ENTREE,
+                        source=TransactionSource.RECEIPT,
                         user_id=current_user.id,
-                        quantity=item.quantity
                     )
+                    for item in po_items
+                )
             
             await po_crud.generic_update_purchase_order(transaction, purchase_order_id, update_data)
 
             if new_status == PurchaseOrderStatus.CLOTUREE:
-                 await manager.send_personal_message(
-                    f"La commande N° {existing_po.orderNumber} a été marquée comme clôturée par le magasinier. Le stock a été mis à jour.",
-                    existing_po.requestedById,
+                await outbox.enqueue(
+                    transaction,
+                    {
+                        "type": "purchase_order_update",
+                        "message": f"La commande N° {existing_po.orderNumber} a été marquée comme clôturée par le magasinier. Le stock a été mis à jour.",
+                    },
+                    user_ids=[existing_po.requestedById],
                 )
 
         # Creator can resubmit an order that needs review
@@ -84,9 +95,13 @@ async def update_purchase_order_status_service(
                  raise PermissionError(f"Cannot submit for approval from status {existing_po.status}.")
             
             await po_crud.generic_update_purchase_order(transaction, purchase_order_id, update_data)
-            await manager.send_personal_message(
-                f"Le bon de commande N° {existing_po.orderNumber} a été soumis pour approbation par {current_user.name}.",
-                UserRole.DAF.value,
+            await outbox.enqueue(
+                transaction,
+                {
+                    "type": "purchase_order_update",
+                    "message": f"Le bon de commande N° {existing_po.orderNumber} a été soumis pour approbation par {current_user.name}.",
+                },
+                roles=[UserRole.DAF],
             )
 
         # DAF/Admin can cancel an order
@@ -97,12 +112,17 @@ async def update_purchase_order_status_service(
                 raise PermissionError("Cannot cancel a closed purchase order.")
 
             await po_crud.generic_update_purchase_order(transaction, purchase_order_id, update_data)
-            await manager.send_personal_message(
-                f"La commande N° {existing_po.orderNumber} a été annulée par {current_user.name}.",
-                existing_po.requestedById,
+            await outbox.enqueue(
+                transaction,
+                {
+                    "type": "purchase_order_update",
+                    "message": f"La commande N° {existing_po.orderNumber} a été annulée par {current_user.name}.",
+                },
+                user_ids=[existing_po.requestedById],
             )
 
         else:
             raise PermissionError(f"Transition from {existing_po.status} to {new_status} is not allowed.")
 
+    outbox.wake()
     return await po_crud.get_purchase_order(db, purchase_order_id)
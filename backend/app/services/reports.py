@@ -18,11 +18,21 @@ class ReportService:
         report_data = await crud_reports.get_stock_valuation_by_category(self.db)
         return report_data
 
-    async def get_stock_turnover(self, start_date: datetime, end_date: datetime):
+    async def get_stock_turnover(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        page: int = 1,
+        page_size: Optional[int] = None,
+        sort_by: Optional[str] = None,
+        sort_order: str = "desc",
+    ):
         """
         Orchestre la récupération du rapport de rotation des stocks.
         """
-        report_data = await crud_reports.get_stock_turnover(self.db, start_date, end_date)
+        report_data = await crud_reports.get_stock_turnover(
+            self.db, start_date, end_date, page, page_size, sort_by, sort_order
+        )
         return report_data
 
     async def get_stock_requests_report(
@@ -46,12 +56,14 @@ class ReportService:
         end_date: Optional[datetime] = None,
         product_id: Optional[str] = None,
         user_id: Optional[str] = None,
+        after: Optional[str] = None,
+        count_mode: str = "exact",
     ):
         """
         Orchestre la récupération du rapport d'historique des stocks.
         """
         report_data = await crud_reports.get_stock_history_report(
-            self.db, page, page_size, start_date, end_date, product_id, user_id
+            self.db, page, page_size, start_date, end_date, product_id, user_id, after, count_mode
         )
         return report_data
 
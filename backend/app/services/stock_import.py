@@ -0,0 +1,294 @@
+# backend/app/services/stock_import.py
+import asyncio
+import json
+import logging
+import unicodedata
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.api.auth import CurrentUser
+from app.api.schemas import (
+    StockImportReport,
+    StockImportRowResult,
+    StockImportRowStatus,
+)
+from app.services.stock_ledger import StockLedger, StockMovement
+from database.generated.prisma import Prisma
+from database.generated.prisma.enums import (
+    StockAdjustmentStatus,
+    TransactionSource,
+    TransactionType,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Noms de colonnes acceptés (comparés sans accents, espaces ni casse)
+REFERENCE_COLUMNS = {"reference", "ref"}
+QUANTITY_COLUMNS = {"quantite", "quantity", "qte", "stock"}
+
+# Les références sont comparées sans espaces, comme le faisaient les scripts d'import
+_NORMALIZED_REFERENCE = """replace("reference", ' ', '')"""
+
+_RESOLVE_SQL = f"""
+SELECT "id", "quantity", {_NORMALIZED_REFERENCE} AS "key"
+FROM "Product"
+WHERE {_NORMALIZED_REFERENCE} IN (SELECT jsonb_array_elements_text($1::jsonb))
+"""
+
+_ABSENT_SQL = f"""
+SELECT "id", "reference", "quantity"
+FROM "Product"
+WHERE "quantity" <> 0
+  AND {_NORMALIZED_REFERENCE} NOT IN (SELECT jsonb_array_elements_text($1::jsonb))
+ORDER BY "reference"
+"""
+
+_LOCK_SQL = """
+SELECT "id", "quantity"
+FROM "Product"
+WHERE "id" IN (SELECT jsonb_array_elements_text($1::jsonb))
+FOR UPDATE
+"""
+
+
+def normalize_column_name(name) -> str:
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    return text.strip().lower().replace(" ", "")
+
+
+def read_stock_file(file: BinaryIO, filename: str) -> pd.DataFrame:
+    """
+    Lit un classeur Excel ou un CSV et retourne un DataFrame (row, reference, quantity).
+    `row` est le numéro de ligne dans le fichier (l'en-tête est la ligne 1).
+    Fonction bloquante : à appeler via asyncio.to_thread.
+    """
+    if not filename.lower().endswith((".csv", ".xlsx", ".xlsm", ".xls")):
+        raise ValueError("Unsupported file type. Upload an Excel workbook (.xlsx) or a CSV file.")
+    try:
+        if filename.lower().endswith(".csv"):
+            df = pd.read_csv(file, dtype=str, sep=None, engine="python")
+        else:
+            df = pd.read_excel(file, sheet_name=0, dtype=str)
+    except Exception as exc:
+        raise ValueError(f"Could not read the file: {exc}") from exc
+
+    columns = {normalize_column_name(column): column for column in df.columns}
+    reference_column = next((columns[key] for key in REFERENCE_COLUMNS if key in columns), None)
+    quantity_column = next((columns[key] for key in QUANTITY_COLUMNS if key in columns), None)
+    if reference_column is None or quantity_column is None:
+        raise ValueError(
+            f"The file must contain 'Reference' and 'Quantité' columns. Found: {list(df.columns)}"
+        )
+
+    frame = pd.DataFrame(
+        {
+            "row": df.index + 2,
+            "reference": df[reference_column].str.strip().str.replace(" ", "", regex=False),
+            "quantity": pd.to_numeric(df[quantity_column].str.strip(), errors="coerce"),
+        }
+    )
+    return frame
+
+
+def plan_stock_import(frame: pd.DataFrame, products: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcule, pour toutes les lignes à la fois, le produit visé, l'écart avec le stock
+    actuel et le statut de la ligne. `products` contient les colonnes (key, id, quantity).
+    """
+    plan = frame.merge(
+        products.drop_duplicates("key").rename(
+            columns={"key": "reference", "id": "productId", "quantity": "previousQuantity"}
+        ),
+        on="reference",
+        how="left",
+    )
+    plan["newQuantity"] = plan["quantity"]
+    plan["difference"] = plan["newQuantity"] - plan["previousQuantity"]
+
+    missing_reference = plan["reference"].isna() | (plan["reference"] == "")
+    invalid_quantity = (
+        plan["quantity"].isna() | (plan["quantity"] < 0) | (plan["quantity"] % 1 != 0)
+    )
+    duplicated = plan.duplicated("reference", keep="last") & ~missing_reference
+    not_found = plan["productId"].isna()
+    unchanged = plan["difference"] == 0
+
+    conditions = [missing_reference, invalid_quantity, duplicated, not_found, unchanged]
+    plan["status"] = np.select(
+        conditions,
+        [
+            StockImportRowStatus.INVALID.value,
+            StockImportRowStatus.INVALID.value,
+            StockImportRowStatus.INVALID.value,
+            StockImportRowStatus.NOT_FOUND.value,
+            StockImportRowStatus.UNCHANGED.value,
+        ],
+        default=StockImportRowStatus.ADJUSTED.value,
+    )
+    plan["message"] = np.select(
+        conditions,
+        [
+            "Empty reference.",
+            "Quantity must be a non-negative integer.",
+            "Reference listed several times in the file; the last line is used.",
+            "Product not found.",
+            "",
+        ],
+        default="",
+    )
+    return plan.drop(columns=["quantity"])
+
+
+def _report_rows(plan: pd.DataFrame) -> List[StockImportRowResult]:
+    records = plan.astype(object).where(plan.notna(), None).to_dict("records")
+    rows = []
+    for record in records:
+        for field in ("row", "previousQuantity", "newQuantity", "difference"):
+            if record[field] is not None:
+                record[field] = int(record[field])
+        record["message"] = record["message"] or None
+        rows.append(StockImportRowResult(**record))
+    return rows
+
+
+class StockImportService:
+    """
+    Import en masse des quantités en stock depuis un fichier (remplace les scripts
+    qui faisaient un appel HTTP par ligne) : une requête pour résoudre toutes les
+    références, un calcul d'écart vectorisé, puis des transactions par lots.
+    """
+
+    def __init__(self, db: Prisma, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    async def import_file(
+        self,
+        file: BinaryIO,
+        filename: str,
+        user: CurrentUser,
+        dry_run: bool = True,
+        zero_missing: bool = False,
+        reason: Optional[str] = None,
+    ) -> StockImportReport:
+        frame = await asyncio.to_thread(read_stock_file, file, filename)
+        references = frame["reference"].dropna().unique().tolist()
+
+        resolved = await self.db.query_raw(_RESOLVE_SQL, json.dumps(references))
+        products = pd.DataFrame(resolved, columns=["key", "id", "quantity"])
+        plan = plan_stock_import(frame, products)
+
+        if zero_missing:
+            absent = await self.db.query_raw(_ABSENT_SQL, json.dumps(references))
+            if absent:
+                zeroed = pd.DataFrame(absent)
+                plan = pd.concat(
+                    [
+                        plan,
+                        pd.DataFrame(
+                            {
+                                "row": None,
+                                "reference": zeroed["reference"],
+                                "productId": zeroed["id"],
+                                "previousQuantity": zeroed["quantity"],
+                                "newQuantity": 0,
+                                "difference": -zeroed["quantity"],
+                                "status": StockImportRowStatus.ADJUSTED.value,
+                                "message": "Product absent from the file; stock set to 0.",
+                            }
+                        ),
+                    ],
+                    ignore_index=True,
+                )
+
+        if not dry_run:
+            reason = reason or f"Import de stock depuis '{filename}'"
+            await self._apply(plan, user, reason)
+
+        rows = _report_rows(plan)
+        counts = plan["status"].value_counts()
+        return StockImportReport(
+            dryRun=dry_run,
+            totalRows=len(frame),
+            adjusted=int(counts.get(StockImportRowStatus.ADJUSTED.value, 0)),
+            unchanged=int(counts.get(StockImportRowStatus.UNCHANGED.value, 0)),
+            notFound=int(counts.get(StockImportRowStatus.NOT_FOUND.value, 0)),
+            invalid=int(counts.get(StockImportRowStatus.INVALID.value, 0)),
+            failed=int(counts.get(StockImportRowStatus.FAILED.value, 0)),
+            rows=rows,
+        )
+
+    async def _apply(self, plan: pd.DataFrame, user: CurrentUser, reason: str) -> None:
+        """Applique les lignes ADJUSTED par lots ; un lot en échec n'empêche pas les suivants."""
+        to_apply = plan.index[plan["status"] == StockImportRowStatus.ADJUSTED.value]
+        for start in range(0, len(to_apply), self.chunk_size):
+            chunk = to_apply[start : start + self.chunk_size]
+            try:
+                previous = await self._apply_chunk(plan.loc[chunk], user, reason)
+            except Exception as exc:
+                logger.error("Stock import chunk failed: %s", exc)
+                plan.loc[chunk, "status"] = StockImportRowStatus.FAILED.value
+                plan.loc[chunk, "message"] = str(exc)
+                continue
+
+            # Le stock a pu bouger depuis la prévisualisation : l'écart réel est recalculé
+            plan.loc[chunk, "previousQuantity"] = plan.loc[chunk, "productId"].map(previous)
+            plan.loc[chunk, "difference"] = (
+                plan.loc[chunk, "newQuantity"] - plan.loc[chunk, "previousQuantity"]
+            )
+            unchanged = chunk[(plan.loc[chunk, "difference"] == 0).to_numpy()]
+            plan.loc[unchanged, "status"] = StockImportRowStatus.UNCHANGED.value
+            # Produits supprimés depuis la prévisualisation (absents du verrouillage)
+            deleted = chunk[plan.loc[chunk, "previousQuantity"].isna().to_numpy()]
+            plan.loc[deleted, "status"] = StockImportRowStatus.NOT_FOUND.value
+            plan.loc[deleted, "message"] = "Product not found."
+
+    async def _apply_chunk(self, chunk: pd.DataFrame, user: CurrentUser, reason: str) -> Dict[str, int]:
+        """Applique un lot dans une transaction et retourne les quantités d'avant import."""
+        targets = dict(zip(chunk["productId"], chunk["newQuantity"].astype(int)))
+        async with self.db.tx() as transaction:
+            # Verrouille les lignes : l'écart est calculé sur le stock réel, pas sur la prévisualisation
+            locked = await transaction.query_raw(_LOCK_SQL, json.dumps(list(targets)))
+            previous = {row["id"]: int(row["quantity"]) for row in locked}
+
+            movements: List[StockMovement] = []
+            adjustments: List[dict] = []
+            now = datetime.now()
+            for product_id, new_quantity in targets.items():
+                if product_id not in previous:
+                    continue  # supprimé avant le verrouillage : ligne NOT_FOUND
+                difference = new_quantity - previous[product_id]
+                if difference == 0:
+                    continue
+                adjustment_type = TransactionType.ENTREE if difference > 0 else TransactionType.SORTIE
+                movements.append(
+                    StockMovement(
+                        product_id=product_id,
+                        quantity=abs(difference),
+                        type=adjustment_type,
+                        source=TransactionSource.ADJUSTMENT,
+                        user_id=user.id,
+                    )
+                )
+                adjustments.append(
+                    {
+                        "productId": product_id,
+                        "quantity": abs(difference),
+                        "type": adjustment_type,
+                        "reason": reason,
+                        "requestedById": user.id,
+                        "status": StockAdjustmentStatus.APPROVED,
+                        "approvedById": user.id,
+                        "approvedAt": now,
+                    }
+                )
+
+            await StockLedger(transaction).apply(movements)
+            if adjustments:
+                await transaction.stockadjustment.create_many(data=adjustments)
+        return previous
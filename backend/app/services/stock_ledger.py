@@ -0,0 +1,170 @@
+# backend/app/services/stock_ledger.py
+import json
+import uuid
+from typing import Dict, Iterable, List
+
+from database.generated.prisma import Prisma
+from database.generated.prisma.enums import TransactionSource, TransactionType
+
+# Applique un lot de mouvements en une seule instruction :
+# 1. les mouvements d'un même produit sont additionnés ;
+# 2. chaque produit est mis à jour de façon atomique (quantity = quantity + delta), à
+#    condition que le stock ne devienne pas négatif : deux sorties concurrentes ne
+#    peuvent ni se perdre ni passer toutes les deux sur un stock insuffisant ;
+# 3. les lignes "Transaction" sont insérées en masse, seulement si tous les produits
+#    ont pu être mis à jour.
+# La requête finale lit l'état d'avant l'instruction ("Product" p) et celui d'après
+# ("updated" u), ce qui permet de signaler précisément les produits en défaut.
+_APPLY_SQL = """
+WITH movements AS (
+    SELECT *
+    FROM jsonb_to_recordset($1::jsonb) AS m(
+        "id" text, "productId" text, "userId" text, "type" text, "source" text,
+        "quantity" int, "delta" int
+    )
+),
+totals AS (
+    SELECT "productId", SUM("delta")::int AS "delta"
+    FROM movements
+    GROUP BY "productId"
+),
+updated AS (
+    UPDATE "Product" p
+    SET "quantity" = p."quantity" + t."delta"
+    FROM totals t
+    WHERE p."id" = t."productId" AND p."quantity" + t."delta" >= 0
+    RETURNING p."id", p."quantity"
+),
+inserted AS (
+    INSERT INTO "Transaction" ("id", "productId", "userId", "type", "source", "quantity", "createdAt")
+    SELECT m."id", m."productId", m."userId", m."type"::"TransactionType",
+           m."source"::"TransactionSource", m."quantity",
+           now() AT TIME ZONE 'UTC' -- même horloge (UTC) que les dates écrites par Prisma
+    FROM movements m
+    WHERE (SELECT COUNT(*) FROM updated) = (SELECT COUNT(*) FROM totals)
+    RETURNING 1
+)
+SELECT t."productId" AS "id", t."delta",
+       p."name", p."reference", p."minStock",
+       p."quantity" AS "previousQuantity",
+       u."quantity" AS "quantity",
+       (p."id" IS NOT NULL) AS "found",
+       (u."id" IS NOT NULL) AS "applied"
+FROM totals t
+LEFT JOIN "Product" p ON p."id" = t."productId"
+LEFT JOIN updated u ON u."id" = t."productId"
+"""
+
+
+class ProductNotFoundError(ValueError):
+    """Un mouvement vise un produit inexistant (réponse 404 via le gestionnaire global)."""
+
+    def __init__(self, product_id: str):
+        self.product_id = product_id
+        super().__init__(f"Product with ID {product_id} not found.")
+
+
+class InsufficientStockError(ValueError):
+    """Le lot rendrait le stock d'un produit négatif (réponse 400 via le gestionnaire global)."""
+
+    def __init__(self, product_id: str, name: str, available: int, requested: int):
+        self.product_id = product_id
+        self.name = name
+        self.available = available
+        self.requested = requested
+        super().__init__(
+            f"Not enough stock for product '{name}'. Available: {available}, Requested: {requested}."
+        )
+
+
+class StockMovement:
+    """Mouvement de stock : une entrée (ENTREE) ou une sortie (SORTIE) d'un produit."""
+
+    __slots__ = ("product_id", "quantity", "type", "source", "user_id")
+
+    def __init__(
+        self,
+        product_id: str,
+        quantity: int,
+        type: TransactionType,
+        source: TransactionSource,
+        user_id: str,
+    ):
+        if quantity <= 0:
+            raise ValueError("Movement quantity must be positive.")
+        self.product_id = product_id
+        self.quantity = quantity
+        self.type = type
+        self.source = source
+        self.user_id = user_id
+
+    @property
+    def delta(self) -> int:
+        return self.quantity if _enum_value(self.type) == TransactionType.ENTREE.value else -self.quantity
+
+
+class StockLevel:
+    """État d'un produit après l'application d'un lot (utilisable par notify_low_stock)."""
+
+    __slots__ = ("id", "name", "reference", "quantity", "minStock")
+
+    def __init__(self, id: str, name: str, reference: str, quantity: int, minStock: int):
+        self.id = id
+        self.name = name
+        self.reference = reference
+        self.quantity = quantity
+        self.minStock = minStock
+
+
+def _enum_value(value) -> str:
+    return getattr(value, "value", value)
+
+
+class StockLedger:
+    """
+    Point unique de modification des quantités en stock.
+
+    `apply` doit être appelé avec le client d'une transaction (`db.tx()`) : en cas
+    d'erreur, l'exception levée annule la transaction, donc aucune quantité ni ligne
+    d'historique partielle n'est conservée.
+    """
+
+    def __init__(self, db: Prisma):
+        self.db = db
+
+    async def apply(self, movements: Iterable[StockMovement]) -> Dict[str, StockLevel]:
+        """
+        Applique les mouvements en un aller-retour et retourne, par identifiant de
+        produit, la quantité après mouvement.
+        Lève ProductNotFoundError ou InsufficientStockError si le lot ne peut pas être appliqué.
+        """
+        movements: List[StockMovement] = list(movements)
+        if not movements:
+            return {}
+
+        payload = [
+            {
+                "id": uuid.uuid4().hex,
+                "productId": movement.product_id,
+                "userId": movement.user_id,
+                "type": _enum_value(movement.type),
+                "source": _enum_value(movement.source),
+                "quantity": movement.quantity,
+                "delta": movement.delta,
+            }
+            for movement in movements
+        ]
+        rows = await self.db.query_raw(_APPLY_SQL, json.dumps(payload))
+
+        levels: Dict[str, StockLevel] = {}
+        for row in rows:
+            if not row["found"]:
+                raise ProductNotFoundError(row["id"])
+            if not row["applied"]:
+                raise InsufficientStockError(
+                    row["id"], row["name"], int(row["previousQuantity"]), -int(row["delta"])
+                )
+            levels[row["id"]] = StockLevel(
+                row["id"], row["name"], row["reference"], int(row["quantity"]), int(row["minStock"])
+            )
+        return levels
@@ -0,0 +1,180 @@
+# backend/app/services/user_import.py
+import asyncio
+import json
+import uuid
+from typing import BinaryIO, Dict, List, Optional
+
+import pandas as pd
+
+from app.api.auth import UserRole, hash_password
+from app.api.schemas import UserImportReport, UserImportRowResult, UserImportRowStatus
+from app.services.stock_import import normalize_column_name
+from database.generated.prisma import Prisma
+
+DEFAULT_BATCH_SIZE = 500
+
+# Colonnes acceptées, comparées sans accents, espaces ni casse : les noms anglais du
+# script historique et les en-têtes français de users.xlsx (Nom, login, mot de passe...).
+USER_COLUMNS = {
+    "username": {"username", "login"},
+    "name": {"name", "nom"},
+    "password": {"password", "motdepasse"},
+    "role": {"role"},
+    "email": {"email", "mail"},
+    "department": {"department", "departement"},
+}
+REQUIRED_FIELDS = ("username", "name", "password", "role")
+
+# Libellés de rôle rencontrés dans les fichiers, en plus des noms de l'énumération
+ROLE_LABELS = {
+    "chefdeservice": UserRole.CHEF_SERVICE,
+    "administrateur": UserRole.ADMIN,
+    "gestionnairedesutilisateurs": UserRole.USER_MANAGER,
+}
+
+# Une instruction par lot ; (xmax = 0) distingue les lignes insérées des lignes mises à jour.
+_UPSERT_SQL = """
+INSERT INTO "User" ("id", "username", "email", "name", "password", "role", "department")
+SELECT u."id", u."username", u."email", u."name", u."password", u."role"::"UserRole", u."department"
+FROM jsonb_to_recordset($1::jsonb) AS u(
+    "id" text, "username" text, "email" text, "name" text, "password" text,
+    "role" text, "department" text
+)
+ON CONFLICT ("username") DO UPDATE SET
+    "email" = EXCLUDED."email",
+    "name" = EXCLUDED."name",
+    "password" = EXCLUDED."password",
+    "role" = EXCLUDED."role",
+    "department" = EXCLUDED."department"
+RETURNING "id", "username", (xmax = 0) AS "created"
+"""
+
+
+def parse_role(value: str) -> Optional[UserRole]:
+    key = normalize_column_name(value).replace("_", "").replace("-", "")
+    for role in UserRole:
+        if key == role.value.replace("_", "").lower():
+            return role
+    return ROLE_LABELS.get(key)
+
+
+def read_users_file(file: BinaryIO, filename: str) -> pd.DataFrame:
+    """
+    Lit le classeur (ou CSV) des utilisateurs et retourne un DataFrame avec les colonnes
+    row, username, name, password, role, email, department (chaînes nettoyées ou None).
+    Fonction bloquante : à appeler via asyncio.to_thread.
+    """
+    if not filename.lower().endswith((".csv", ".xlsx", ".xlsm", ".xls")):
+        raise ValueError("Unsupported file type. Upload an Excel workbook (.xlsx) or a CSV file.")
+    try:
+        if filename.lower().endswith(".csv"):
+            df = pd.read_csv(file, dtype=str, sep=None, engine="python")
+        else:
+            df = pd.read_excel(file, sheet_name=0, dtype=str)
+    except Exception as exc:
+        raise ValueError(f"Could not read the file: {exc}") from exc
+
+    columns = {normalize_column_name(column): column for column in df.columns}
+    frame = pd.DataFrame({"row": df.index + 2})
+    for field, aliases in USER_COLUMNS.items():
+        column = next((columns[alias] for alias in aliases if alias in columns), None)
+        if column is None:
+            if field in REQUIRED_FIELDS:
+                raise ValueError(
+                    f"The file must contain columns: {', '.join(REQUIRED_FIELDS)} "
+                    f"(or login, nom, mot de passe). Found: {list(df.columns)}"
+                )
+            frame[field] = None
+            continue
+        values = df[column].str.strip()
+        frame[field] = values.where(values.notna() & (values != ""), None)
+    return frame
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    Hache les mots de passe (bcrypt) en parallèle dans le pool de threads partagé de
+    l'authentification (l'extension bcrypt libère le GIL), avec le coût configuré pour l'API.
+    """
+    return list(await asyncio.gather(*(hash_password(password) for password in passwords)))
+
+
+class UserImportService:
+    """
+    Création / mise à jour en masse des utilisateurs : mots de passe hachés en
+    parallèle, puis un INSERT ... ON CONFLICT par lot au lieu d'un upsert par ligne.
+    """
+
+    def __init__(self, db: Prisma, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+
+    async def import_file(self, file: BinaryIO, filename: str) -> UserImportReport:
+        frame = await asyncio.to_thread(read_users_file, file, filename)
+        return await self.import_frame(frame)
+
+    async def import_frame(self, frame: pd.DataFrame) -> UserImportReport:
+        results: Dict[int, UserImportRowResult] = {}
+        valid: List[dict] = []
+
+        last_row_for_username = frame.dropna(subset=["username"]).groupby("username")["row"].max()
+        for record in frame.astype(object).where(frame.notna(), None).to_dict("records"):
+            row, username = int(record["row"]), record["username"]
+            missing = [field for field in REQUIRED_FIELDS if record[field] is None]
+            role = parse_role(record["role"]) if record["role"] is not None else None
+            message = None
+            if missing:
+                message = f"Missing required data: {', '.join(missing)}."
+            elif role is None:
+                message = f"Invalid role '{record['role']}'."
+            elif last_row_for_username[username] != row:
+                message = "Username listed several times in the file; the last line is used."
+            if message:
+                results[row] = UserImportRowResult(
+                    row=row, username=username, status=UserImportRowStatus.SKIPPED, message=message
+                )
+                continue
+            valid.append({**record, "row": row, "role": role.value})
+
+        hashes = await hash_passwords([user["password"] for user in valid])
+
+        for start in range(0, len(valid), self.batch_size):
+            batch = valid[start : start + self.batch_size]
+            payload = [
+                {
+                    "id": uuid.uuid4().hex,
+                    "username": user["username"],
+                    "email": user["email"],
+                    "name": user["name"],
+                    "password": password_hash,
+                    "role": user["role"],
+                    "department": user["department"],
+                }
+                for user, password_hash in zip(batch, hashes[start : start + self.batch_size])
+            ]
+            try:
+                upserted = await self.db.query_raw(_UPSERT_SQL, json.dumps(payload))
+            except Exception as exc:
+                for user in batch:
+                    results[user["row"]] = UserImportRowResult(
+                        row=user["row"], username=user["username"],
+                        status=UserImportRowStatus.SKIPPED, message=str(exc),
+                    )
+                continue
+            upserted_by_username = {row["username"]: row for row in upserted}
+            for user in batch:
+                upserted_row = upserted_by_username[user["username"]]
+                results[user["row"]] = UserImportRowResult(
+                    row=user["row"],
+                    username=user["username"],
+                    userId=upserted_row["id"],
+                    status=UserImportRowStatus.CREATED if upserted_row["created"] else UserImportRowStatus.UPDATED,
+                )
+
+        rows = [results[row] for row in sorted(results)]
+        return UserImportReport(
+            created=sum(row.status == UserImportRowStatus.CREATED for row in rows),
+            updated=sum(row.status == UserImportRowStatus.UPDATED for row in rows),
+            skipped=sum(row.status == UserImportRowStatus.SKIPPED for row in rows),
+            rows=rows,
+        )
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.pubsub import to_asyncpg_dsn
+
+logger = logging.getLogger(__name__)
+
+# Channel notified by the table_version_bump() trigger (migration
+# 20261016140000_add_table_versions) when a transaction writing a versioned table commits.
+CHANNEL = "table_versions"
+
+# Channel notified for each written row of a versioned table, before the version bump of
+# its transaction (migration 20261016150000_add_catalog_change_notifications).
+ROW_CHANNEL = "catalog_changes"
+
+# Tables whose writes are counted in "TableVersion".
+VERSIONED_TABLES = ("Product", "Category")
+
+# Callback run after a table version changes (name of the table, new version).
+Listener = Callable[[str, int], Awaitable[None]]
+
+# Callback run for each written row (name of the table, id of the row).
+RowListener = Callable[[str, str], None]
+
+
+class TableVersions:
+    """
+    Per-worker copy of the change counters of "TableVersion".
+
+    Each write transaction on a versioned table bumps its counter once, at commit, and
+    notifies CHANNEL; this worker keeps the counters in memory from those notifications,
+    so reading a version costs no query. The counters are reloaded from the table at
+    every (re)connection, and `get` returns None while the listener is down: callers
+    must then treat the version as unknown (no conditional response).
+    """
+
+    def __init__(self, reconnect_delay: float = 2.0):
+        self.reconnect_delay = reconnect_delay
+        self.dsn: Optional[str] = None
+        self._versions: Dict[str, int] = {}
+        self._changed_at: Dict[str, datetime] = {}
+        self._connection = None
+        self._listeners: List[Listener] = []
+        self._row_listeners: List[RowListener] = []
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.notifications = 0
+        self.reloads = 0
+        self.last_notification: Optional[float] = None
+
+    @property
+    def available(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    def get(self, table: str) -> Optional[int]:
+        """Committed version of the table, or None when it cannot be trusted."""
+        if not self.available:
+            return None
+        return self._versions.get(table)
+
+    def changed_at(self, table: str) -> Optional[datetime]:
+        """Time of the last committed write on the table (for Last-Modified)."""
+        if not self.available:
+            return None
+        return self._changed_at.get(table)
+
+    def on_change(self, listener: Listener) -> None:
+        """Registers a coroutine run after each version change (and after each reload)."""
+        self._listeners.append(listener)
+
+    def on_row_change(self, listener: RowListener) -> None:
+        """
+        Registers a callback run for each written row. The rows of a transaction are
+        received before its version change, so a listener of both sees the rows first.
+        """
+        self._row_listeners.append(listener)
+
+    async def start(self, database_url: str) -> None:
+        self.dsn = to_asyncpg_dsn(database_url)
+        self._stopping = False
+        await self._connect()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        connection.add_termination_listener(self._on_connection_lost)
+        # Listen before loading: a commit between the two is seen at least once.
+        await connection.add_listener(ROW_CHANNEL, self._on_row_notify)
+        await connection.add_listener(CHANNEL, self._on_notify)
+        rows = await connection.fetch('SELECT "table", "version", "updatedAt" FROM "TableVersion"')
+        for row in rows:
+            # A notification may have been handled while the rows were read: counters
+            # only grow, so the highest value is the current one.
+            if row["version"] >= self._versions.get(row["table"], -1):
+                self._versions[row["table"]] = row["version"]
+                self._changed_at[row["table"]] = row["updatedAt"]
+        self._connection = connection
+        self.reloads += 1
+        logger.info("Table versions loaded: %s", self._versions)
+        for table, version in self._versions.items():
+            await self._notify_listeners(table, version)
+
+    def _on_connection_lost(self, connection) -> None:
+        self._connection = None
+        if not self._stopping:
+            logger.warning("Table versions connection lost, reconnecting")
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._stopping:
+            try:
+                await self._connect()
+                return
+            except Exception:
+                logger.exception("Table versions reconnection failed")
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            table, version = message["table"], int(message["version"])
+        except (ValueError, KeyError, TypeError):
+            logger.error("Invalid table version payload: %r", payload)
+            return
+        self.notifications += 1
+        self.last_notification = time.time()
+        # Notifications arrive in commit order; never move a counter backwards.
+        if version <= self._versions.get(table, -1):
+            return
+        self._versions[table] = version
+        changed_at = message.get("at")
+        self._changed_at[table] = datetime.fromisoformat(changed_at) if changed_at else datetime.now()
+        asyncio.get_running_loop().create_task(self._notify_listeners(table, version))
+
+    def _on_row_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            table, row_id = message["table"], message["id"]
+        except (ValueError, KeyError, TypeError):
+            logger.error("Invalid row change payload: %r", payload)
+            return
+        for listener in self._row_listeners:
+            try:
+                listener(table, row_id)
+            except Exception:
+                logger.exception("Row change listener failed for %s", table)
+
+    async def _notify_listeners(self, table: str, version: int) -> None:
+        for listener in self._listeners:
+            try:
+                await listener(table, version)
+            except Exception:
+                logger.exception("Table version listener failed for %s", table)
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available,
+            "versions": dict(self._versions),
+            "notifications": self.notifications,
+            "reloads": self.reloads,
+            "lastNotification": self.last_notification,
+        }
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+
+
+table_versions = TableVersions()
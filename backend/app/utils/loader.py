@@ -0,0 +1,76 @@
+import asyncio
+from typing import Any, Dict, Generic, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class ModelLoader(Generic[T]):
+    """
+    Chargeur par identifiant pour un modèle Prisma (`db.product`, `transaction.requestitem`...).
+
+    Les identifiants demandés sont regroupés en un seul `find_many(where={"id": {"in": [...]}})`
+    et les résultats sont mémorisés : un chargeur est créé par requête HTTP (ou par
+    transaction), jamais partagé entre requêtes, pour ne pas servir de données périmées.
+
+    `load_many` charge un lot en une requête ; les appels concurrents à `load` faits dans
+    la même itération de la boucle d'événements sont eux aussi regroupés.
+    """
+
+    def __init__(self, delegate: Any, include: Optional[dict] = None):
+        self.delegate = delegate
+        self.include = include
+        self._cache: Dict[str, Optional[T]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_scheduled = False
+
+    async def load_many(self, ids: Iterable[str]) -> Dict[str, Optional[T]]:
+        """Retourne {id: enregistrement ou None}, en une requête au plus pour les ids non encore chargés."""
+        ids = list(dict.fromkeys(ids))
+        missing = [id_ for id_ in ids if id_ not in self._cache]
+        if missing:
+            await self._fetch(missing)
+        return {id_: self._cache[id_] for id_ in ids}
+
+    async def load(self, id_: str) -> Optional[T]:
+        if id_ in self._cache:
+            return self._cache[id_]
+        future = self._pending.get(id_)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[id_] = future
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                asyncio.get_running_loop().call_soon(
+                    lambda: asyncio.ensure_future(self._flush())
+                )
+        return await future
+
+    def prime(self, records: Iterable[T]) -> None:
+        """Ajoute au cache des enregistrements déjà lus (par exemple via un `include`)."""
+        for record in records:
+            self._cache[record.id] = record
+
+    async def _flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        self._flush_scheduled = False
+        try:
+            await self._fetch([id_ for id_ in pending if id_ not in self._cache])
+        except Exception as exc:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for id_, future in pending.items():
+            if not future.done():
+                future.set_result(self._cache.get(id_))
+
+    async def _fetch(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        kwargs = {"where": {"id": {"in": ids}}}
+        if self.include:
+            kwargs["include"] = self.include
+        records = await self.delegate.find_many(**kwargs)
+        for id_ in ids:
+            self._cache[id_] = None
+        self.prime(records)
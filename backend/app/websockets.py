@@ -1,44 +1,227 @@
+import asyncio
 import json  # Import json module
-from typing import Dict, List
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Union
 
 from fastapi import WebSocket
 
+from app.pubsub import PubSubBackend
+
+logger = logging.getLogger(__name__)
+
+# Messages waiting to be sent on one connection; a consumer that falls further
+# behind than this is disconnected instead of slowing down everyone else.
+SEND_QUEUE_SIZE = 100
+# Seconds allowed for a single send before the connection is considered stuck.
+SEND_TIMEOUT = 5.0
+
+
+class Connection:
+    """
+    One WebSocket connection (one browser tab) and its bounded send queue.
+    A dedicated task drains the queue, so a slow client only delays itself.
+    """
+
+    __slots__ = ("websocket", "user_id", "queue", "sender", "closing")
+
+    def __init__(self, websocket: WebSocket, user_id: str, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        # Set once the connection is being dropped, so that it is dropped only once.
+        self.closing = False
+
 
 class ConnectionManager:
-    def __init__(self):
-        # Maps userId to their active WebSocket connection
-        self.active_connections: Dict[str, WebSocket] = {}
+    def __init__(self, queue_size: int = SEND_QUEUE_SIZE, send_timeout: float = SEND_TIMEOUT):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        # Maps userId to their active WebSocket connections (one per open tab)
+        self.active_connections: Dict[str, Set[Connection]] = {}
+        # Metrics
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.slow_consumers_dropped = 0
+        self._send_latencies: Deque[float] = deque(maxlen=1000)
+        # Cross-worker transport; without one, messages are delivered in this process only.
+        self.backend: Optional[PubSubBackend] = None
+        # Handlers of control envelopes (e.g. token revocation), run by every worker.
+        self._control_handlers: Dict[str, Callable[[dict], None]] = {}
+        # Running drops of slow consumers (referenced until done, so they are not collected).
+        self._drop_tasks: Set[asyncio.Task] = set()
+
+    async def start_backend(self, backend: PubSubBackend):
+        """Routes every message through the pub/sub backend shared by the workers."""
+        await backend.start(self.deliver)
+        self.backend = backend
+
+    async def stop_backend(self):
+        if self.backend is not None:
+            await self.backend.stop()
+            self.backend = None
 
-    async def connect(self, websocket: WebSocket, user_id: str):
-        """Accepts a new WebSocket connection and stores it."""
+    async def connect(self, websocket: WebSocket, user_id: str) -> Connection:
+        """Accepts a new WebSocket connection and starts its sender task."""
         await websocket.accept()
-        self.active_connections[user_id] = websocket
-        print(f"New connection: User {user_id} connected.")
+        connection = Connection(websocket, user_id, self.queue_size)
+        connection.sender = asyncio.get_running_loop().create_task(self._sender(connection))
+        self.active_connections.setdefault(user_id, set()).add(connection)
+        logger.debug("WebSocket connected: user %s (%d tabs)", user_id, len(self.active_connections[user_id]))
+        return connection
+
+    def disconnect(self, user_id: str, websocket: Optional[WebSocket] = None):
+        """
+        Removes a WebSocket connection of the user, or all of them when no websocket is given.
+        """
+        connections = self.active_connections.get(user_id)
+        if not connections:
+            return
+        for connection in list(connections):
+            if websocket is None or connection.websocket is websocket:
+                self._remove(connection)
+
+    def _remove(self, connection: Connection):
+        connections = self.active_connections.get(connection.user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.active_connections[connection.user_id]
+        if connection.sender is not None and connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+        logger.debug("WebSocket disconnected: user %s", connection.user_id)
 
-    def disconnect(self, user_id: str):
-        """Removes a WebSocket connection."""
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
-            print(f"Connection closed: User {user_id} disconnected.")
+    async def _drop_slow_consumer(self, connection: Connection, reason: str):
+        if connection.closing:
+            return
+        connection.closing = True
+        await self._close_slow_consumer(connection, reason)
+
+    async def _close_slow_consumer(self, connection: Connection, reason: str):
+        # Called once per connection, after `closing` was set
+        self.slow_consumers_dropped += 1
+        logger.warning("Dropping WebSocket of user %s: %s", connection.user_id, reason)
+        self._remove(connection)
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _sender(self, connection: Connection):
+        while True:
+            text = await connection.queue.get()
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(connection.websocket.send_text(text), self.send_timeout)
+            except asyncio.TimeoutError:
+                await self._drop_slow_consumer(connection, "send timed out")
+                return
+            except Exception:
+                # The client went away; the endpoint's receive loop will also notice.
+                self._remove(connection)
+                return
+            self._send_latencies.append(time.perf_counter() - started)
+            self.messages_sent += 1
+
+    def _enqueue(self, text: str, connections: Iterable[Connection]) -> int:
+        queued = 0
+        for connection in list(connections):
+            if connection.closing:
+                continue
+            try:
+                connection.queue.put_nowait(text)
+                queued += 1
+            except asyncio.QueueFull:
+                self.messages_dropped += 1
+                connection.closing = True  # later messages skip it while it is dropped
+                task = asyncio.get_running_loop().create_task(
+                    self._close_slow_consumer(connection, "send queue full")
+                )
+                self._drop_tasks.add(task)
+                task.add_done_callback(self._drop_tasks.discard)
+        return queued
+
+    def _connections_of(self, user_ids: Iterable[str]) -> List[Connection]:
+        connections: List[Connection] = []
+        for user_id in set(user_ids):
+            connections.extend(self.active_connections.get(user_id, ()))
+        return connections
+
+    @staticmethod
+    def serialize(message: Union[Dict, str]) -> str:
+        return json.dumps(message)  # JSON string, built once per message
+
+    async def _publish(self, text: str, user_ids: Optional[List[str]]):
+        # "u": target users (None = everybody), "m": serialized message.
+        envelope = {"u": user_ids, "m": text}
+        if self.backend is None:
+            await self.deliver(envelope)
+        else:
+            await self.backend.publish(envelope)
+
+    def on_control(self, kind: str, handler: Callable[[dict], None]):
+        """Registers the handler run by this worker for the control envelopes of a kind."""
+        self._control_handlers[kind] = handler
+
+    async def publish_control(self, kind: str, data: dict):
+        """Publishes a control envelope to every worker (itself included)."""
+        # "c": control kind, "d": its data. Control envelopes are not sent to sockets.
+        envelope = {"c": kind, "d": data}
+        if self.backend is None:
+            await self.deliver(envelope)
+        else:
+            await self.backend.publish(envelope)
+
+    async def deliver(self, envelope: dict):
+        """Enqueues a published message on the matching connections held by this worker."""
+        control = envelope.get("c")
+        if control is not None:
+            handler = self._control_handlers.get(control)
+            if handler is not None:
+                handler(envelope.get("d") or {})
+            return
+        user_ids = envelope.get("u")
+        if user_ids is None:
+            connections = [c for cs in self.active_connections.values() for c in cs]
+        else:
+            connections = self._connections_of(user_ids)
+        if connections:
+            self._enqueue(envelope["m"], connections)
 
     async def send_personal_message(self, message: Dict, user_id: str):
-        """Sends a message to a specific user."""
-        if user_id in self.active_connections:
-            websocket = self.active_connections[user_id]
-            await websocket.send_text(json.dumps(message))  # Send JSON string
-            print(f"Sent message to {user_id}: '{message}'")
+        """Sends a message to every open connection of a specific user."""
+        await self._publish(self.serialize(message), [user_id])
 
     async def broadcast(self, message: Dict):
         """Sends a message to all connected users."""
-        for user_id, websocket in self.active_connections.items():
-            await websocket.send_text(json.dumps(message))  # Send JSON string
-        print(f"Broadcasted message to all users: '{message}'")
+        await self._publish(self.serialize(message), None)
 
     async def send_to_users(self, message: Dict, user_ids: List[str]):
         """Sends a message to a specific list of users."""
-        for user_id in user_ids:
-            if user_id in self.active_connections:
-                await self.send_personal_message(message, user_id)
+        user_ids = list(dict.fromkeys(user_ids))
+        if user_ids:
+            await self._publish(self.serialize(message), user_ids)
+
+    def get_metrics(self) -> dict:
+        """Connection, queue and send latency metrics of this worker."""
+        connections = [c for cs in self.active_connections.values() for c in cs]
+        depths = [c.queue.qsize() for c in connections]
+        latencies = sorted(self._send_latencies)
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "users": len(self.active_connections),
+            "connections": len(connections),
+            "queueDepthTotal": sum(depths),
+            "queueDepthMax": max(depths, default=0),
+            "messagesSent": self.messages_sent,
+            "messagesDropped": self.messages_dropped,
+            "slowConsumersDropped": self.slow_consumers_dropped,
+            "sendLatencyAvgMs": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "sendLatencyP95Ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else 0.0,
+            "sendLatencyMaxMs": round(1000 * latencies[-1], 3) if latencies else 0.0,
+        }
 
 
 # Create a single instance of the manager to be used across the application
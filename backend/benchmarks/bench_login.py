@@ -0,0 +1,78 @@
+# backend/benchmarks/bench_login.py
+"""
+Débit de connexion sous concurrence : compare la vérification bcrypt exécutée sur la
+boucle d'événements (ancien comportement de /auth/login) et dans le pool de l'API
+(app.api.auth.check_password).
+
+Pendant chaque rafale de connexions, une tâche "sonde" mesure la réactivité de la
+boucle (retard d'un asyncio.sleep de 5 ms) : c'est le délai subi par toutes les
+autres requêtes du worker.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_login --logins 64 --concurrency 32 --rounds 12 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.api import auth
+
+
+async def _probe(stop: asyncio.Event, delays: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        delays.append(time.perf_counter() - start - 0.005)
+
+
+async def _run(login, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await login()
+
+    stop, delays = asyncio.Event(), []
+    probe = asyncio.create_task(_probe(stop, delays))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    delays = delays or [0.0]
+    return {
+        "logins_per_s": logins / elapsed,
+        "loop_delay_p50_ms": statistics.median(delays) * 1000,
+        "loop_delay_max_ms": max(delays) * 1000,
+    }
+
+
+async def main(args):
+    auth.set_password_settings(bcrypt_rounds=args.rounds, crypto_workers=args.workers)
+    stored_hash = auth.get_password_hash("password")
+
+    async def on_loop():
+        auth.verify_password("password", stored_hash)
+
+    async def in_pool():
+        await auth.check_password("password", stored_hash)
+
+    for name, login in (("on event loop", on_loop), ("crypto pool", in_pool)):
+        result = await _run(login, args.logins, args.concurrency)
+        print(
+            f"{name:>14}: {result['logins_per_s']:7.1f} logins/s, "
+            f"loop delay p50 {result['loop_delay_p50_ms']:7.1f} ms, "
+            f"max {result['loop_delay_max_ms']:7.1f} ms"
+        )
+    auth.shutdown_crypto_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
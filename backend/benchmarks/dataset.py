@@ -0,0 +1,648 @@
+# backend/benchmarks/dataset.py
+"""
+Jeu de données synthétique à l'échelle de la production, pour mesurer localement les
+rapports, l'historique, les audits et les tests de charge (benchmarks.loadtest).
+
+Tout est tiré d'une graine : une même graine et une même échelle donnent les mêmes
+lignes. Les données sont cohérentes avec le fonctionnement de l'application :
+- les demandes suivent le circuit TRANSMISE -> APPROUVEE -> LIVREE_PAR_MAGASINIER ->
+  RECEPTION_CONFIRMEE (les plus récentes sont encore en cours, certaines sont rejetées
+  ou annulées), avec leurs articles et l'approbation du DAF ;
+- chaque livraison, réception de stock ou ajustement approuvé a son mouvement dans
+  "Transaction", complété par un historique de fond jusqu'au volume demandé ;
+- la quantité de chaque produit est la somme de ses mouvements, précédés d'un stock
+  d'ouverture qui ne laisse jamais le stock passer sous zéro ;
+- les dates suivent l'activité d'un service : jours ouvrés, heures de bureau, volume
+  croissant sur la période ;
+- les compteurs de numérotation (COM, BC, AUDIT) reprennent après les numéros générés.
+
+Le chargement utilise COPY (asyncpg) dans une seule transaction. La base visée doit
+avoir le schéma à jour (prisma migrate deploy) ; --truncate vide d'abord les tables.
+Les comptes de seed.py (chef.service, daf, magasinier, admin) sont créés, plus des
+comptes numérotés par rôle (chef.service.0001, ...), tous avec le mot de passe "password".
+
+Usage (depuis backend/) :
+    python -m benchmarks.dataset --scale medium --seed 42 --truncate
+    python -m benchmarks.dataset --scale large --transactions 10000000 --truncate
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+SCALES = {
+    "small": {
+        "categories": 10, "products": 500, "chefs": 20, "dafs": 2, "magasiniers": 3,
+        "admins": 1, "observers": 1, "requests": 2_000, "receipts": 500, "adjustments": 200,
+        "purchase_orders": 100, "audits": 5, "audit_items": 100, "transactions": 50_000,
+    },
+    "medium": {
+        "categories": 30, "products": 5_000, "chefs": 100, "dafs": 3, "magasiniers": 10,
+        "admins": 2, "observers": 3, "requests": 50_000, "receipts": 10_000, "adjustments": 3_000,
+        "purchase_orders": 2_000, "audits": 20, "audit_items": 1_000, "transactions": 1_000_000,
+    },
+    "large": {
+        "categories": 80, "products": 20_000, "chefs": 400, "dafs": 5, "magasiniers": 25,
+        "admins": 3, "observers": 5, "requests": 300_000, "receipts": 50_000, "adjustments": 20_000,
+        "purchase_orders": 10_000, "audits": 50, "audit_items": 3_000, "transactions": 5_000_000,
+    },
+}
+
+# Tables dans l'ordre de chargement (clés étrangères d'abord)
+TABLES = [
+    "User", "Category", "Product", "Request", "RequestItem", "Approval", "StockReceipt",
+    "InventoryAudit", "InventoryAuditItem", "StockAdjustment", "PurchaseOrder",
+    "PurchaseOrderItem", "Transaction", "Counter",
+]
+
+COPY_CHUNK_SIZE = 200_000
+
+CATEGORY_NAMES = [
+    "Fournitures de Bureau", "Matériel Informatique", "Mobilier de Bureau", "Consommables",
+    "Entretien", "Papeterie", "Téléphonie", "Électricité", "Imprimés", "Sécurité",
+]
+PRODUCT_NAMES = [
+    "Stylo", "Cahier", "Ramette papier", "Classeur", "Agrafeuse", "Cartouche d'encre",
+    "Clavier", "Souris", "Écran", "Câble réseau", "Chaise", "Lampe", "Enveloppe",
+    "Chemise cartonnée", "Toner", "Clé USB", "Disque dur", "Savon", "Ampoule", "Badge",
+]
+UNITS = ["Unité", "Boîte", "Paquet", "Carton", "Rame"]
+DEPARTMENTS = ["Comptabilité", "RH", "Informatique", "Courrier", "Juridique", "Logistique", "Audit"]
+
+_DAY = np.timedelta64(1, "D")
+_SECOND = np.timedelta64(1, "s")
+
+
+class TimeDistribution:
+    """
+    Horodatages réalistes entre `start` et `end` : l'activité croît linéairement sur la
+    période (facteur `growth` entre le premier et le dernier jour), se concentre sur les
+    jours ouvrés et sur deux pics horaires (matin et après-midi).
+    """
+
+    WEEKDAY_WEIGHTS = np.array([1.0, 1.0, 1.0, 1.0, 0.9, 0.15, 0.03])  # lundi -> dimanche
+
+    def __init__(self, rng: np.random.Generator, start: np.datetime64, end: np.datetime64, growth: float = 2.0):
+        self.rng = rng
+        self.start = start.astype("datetime64[D]")
+        days = np.arange(int((end.astype("datetime64[D]") - self.start) / _DAY) + 1)
+        weekdays = (self.start + days * _DAY).astype("datetime64[D]").view("int64")
+        # 1970-01-01 était un jeudi : (jours + 3) % 7 donne 0 pour lundi
+        weights = (1 + (growth - 1) * days / max(len(days) - 1, 1)) * self.WEEKDAY_WEIGHTS[(weekdays + 3) % 7]
+        self.days = days
+        self.day_weights = weights / weights.sum()
+
+    def sample(self, size: int) -> np.ndarray:
+        days = self.rng.choice(self.days, size=size, p=self.day_weights)
+        peaks = np.where(self.rng.random(size) < 0.55, 10.0, 15.0)
+        hours = np.clip(self.rng.normal(peaks, 1.3), 7.0, 19.0)
+        seconds = (hours * 3600).astype("int64")
+        return self.start + days * _DAY + seconds * _SECOND
+
+    def after(self, timestamps: np.ndarray, mean_hours: float) -> np.ndarray:
+        """Délai exponentiel (moyenne `mean_hours`) ajouté à chaque horodatage."""
+        delays = (self.rng.exponential(mean_hours * 3600, size=len(timestamps)) + 60).astype("int64")
+        return timestamps + delays * _SECOND
+
+
+class SequentialIds:
+    """Identifiants "<préfixe><numéro>" produits à la demande (pas de tableau de millions de chaînes)."""
+
+    def __init__(self, prefix: str, count: int):
+        self.prefix = prefix
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [f"{self.prefix}{i:08d}" for i in range(*index.indices(self.count))]
+        return np.array([f"{self.prefix}{i:08d}" for i in np.asarray(index).ravel()], dtype=object)
+
+    def array(self) -> np.ndarray:
+        return np.array(self[:], dtype=object)
+
+
+def _ids(prefix: str, count: int) -> np.ndarray:
+    return SequentialIds(prefix, count).array()
+
+
+def _numbers(doc_type: str, timestamps: np.ndarray) -> Tuple[np.ndarray, Dict[int, int]]:
+    """
+    Numéros "<TYPE>-<ANNÉE>-<NNNNN>" attribués dans l'ordre chronologique, comme
+    generate_next_number, et dernier numéro utilisé par année (table Counter).
+    """
+    order = np.argsort(timestamps, kind="stable")
+    years = timestamps.astype("datetime64[Y]").astype(int) + 1970
+    numbers = np.empty(len(timestamps), dtype=object)
+    last: Dict[int, int] = {}
+    for index in order:
+        year = int(years[index])
+        last[year] = last.get(year, 0) + 1
+        numbers[index] = f"{doc_type}-{year}-{last[year]:05d}"
+    return numbers, last
+
+
+def _popularity(rng: np.random.Generator, count: int, exponent: float = 0.9) -> np.ndarray:
+    """Poids de type Zipf : quelques produits concentrent l'essentiel des mouvements."""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+class Dataset:
+    """Colonnes générées, par table : {table: (noms de colonnes, {colonne: tableau numpy})}."""
+
+    def __init__(self):
+        self.tables: Dict[str, Tuple[List[str], Dict[str, np.ndarray]]] = {}
+
+    def add(self, table: str, columns: Dict[str, np.ndarray]) -> None:
+        self.tables[table] = (list(columns), columns)
+
+    def rows(self, table: str) -> int:
+        _, columns = self.tables[table]
+        return max((len(v) for v in columns.values() if v is not None), default=0)
+
+    def records(self, table: str, start: int, stop: int) -> List[tuple]:
+        """Lignes [start, stop) converties en types Python pour COPY."""
+        names, columns = self.tables[table]
+        converted = []
+        for name in names:
+            values = columns[name][start:stop]
+            if isinstance(values, list):
+                pass
+            elif np.issubdtype(values.dtype, np.datetime64):
+                # NaT devient None
+                values = values.astype("datetime64[ms]").astype(object).tolist()
+            elif values.dtype == object:
+                values = [v.item() if isinstance(v, np.generic) else v for v in values]
+            else:
+                values = values.tolist()
+            converted.append(values)
+        return list(zip(*converted))
+
+
+def generate(scale: Dict[str, int], seed: int, months: int, end: datetime, password_hash: str) -> Dataset:
+    rng = np.random.default_rng(seed)
+    dataset = Dataset()
+    end64 = np.datetime64(end.replace(microsecond=0))
+    start64 = end64 - np.timedelta64(months * 30, "D")
+    clock = TimeDistribution(rng, start64, end64)
+    recent = end64 - np.timedelta64(10, "D")
+
+    # --- Utilisateurs : comptes de seed.py, puis comptes numérotés par rôle ---
+    roles = {
+        "CHEF_SERVICE": ("chef.service", scale["chefs"]),
+        "DAF": ("daf", scale["dafs"]),
+        "MAGASINIER": ("magasinier", scale["magasiniers"]),
+        "ADMIN": ("admin", scale["admins"]),
+        "SUPER_OBSERVATEUR": ("observateur", scale["observers"]),
+    }
+    usernames, user_roles = [], []
+    for role, (base, count) in roles.items():
+        usernames.append(base)
+        user_roles.append(role)
+        for index in range(1, count):
+            usernames.append(f"{base}.{index:04d}")
+            user_roles.append(role)
+    user_ids = _ids("usr", len(usernames))
+    user_roles = np.array(user_roles, dtype=object)
+    users_by_role = {role: user_ids[user_roles == role] for role in roles}
+    dataset.add("User", {
+        "id": user_ids,
+        "username": np.array(usernames, dtype=object),
+        "email": np.array([f"{name}@poste" for name in usernames], dtype=object),
+        "name": np.array([name.replace(".", " ").title() for name in usernames], dtype=object),
+        "password": np.full(len(usernames), password_hash, dtype=object),
+        "role": user_roles,
+        "department": np.where(
+            user_roles == "CHEF_SERVICE",
+            rng.choice(np.array(DEPARTMENTS, dtype=object), size=len(usernames)),
+            None,
+        ),
+        "createdAt": np.full(len(usernames), start64 - np.timedelta64(30, "D")),
+    })
+
+    # --- Catégories et produits ---
+    category_ids = _ids("cat", scale["categories"])
+    dataset.add("Category", {
+        "id": category_ids,
+        "name": np.array(
+            [f"{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} {i // len(CATEGORY_NAMES) + 1}" for i in range(len(category_ids))],
+            dtype=object,
+        ),
+    })
+    product_count = scale["products"]
+    product_ids = _ids("prd", product_count)
+    min_stock = rng.integers(5, 50, size=product_count)
+    product_columns = {
+        "id": product_ids,
+        "name": np.array(
+            [f"{PRODUCT_NAMES[i % len(PRODUCT_NAMES)]} modèle {i:05d}" for i in rng.permutation(product_count)],
+            dtype=object,
+        ),
+        "reference": np.array([f"REF-{i:06d}" for i in range(product_count)], dtype=object),
+        "categoryId": category_ids[rng.choice(len(category_ids), size=product_count, p=_popularity(rng, len(category_ids), 0.6))],
+        "quantity": None,  # calculée à partir des mouvements, plus bas
+        "minStock": min_stock,
+        "cost": np.round(rng.lognormal(7.5, 1.2, size=product_count), 0),
+        "unit": rng.choice(np.array(UNITS, dtype=object), size=product_count),
+        "location": np.array([f"Allée {aisle}" for aisle in rng.integers(1, 41, size=product_count)], dtype=object),
+    }
+    popularity = _popularity(rng, product_count)
+
+    # Mouvements de stock, accumulés puis chargés dans "Transaction"
+    movements: Dict[str, List[np.ndarray]] = {k: [] for k in ("productId", "userId", "type", "source", "quantity", "createdAt")}
+
+    def add_movements(products, users, types, sources, quantities, timestamps):
+        size = len(products)
+        for key, value in (
+            ("productId", products), ("userId", users), ("type", types),
+            ("source", sources), ("quantity", quantities), ("createdAt", timestamps),
+        ):
+            movements[key].append(np.broadcast_to(value, (size,)) if np.ndim(value) == 0 else np.asarray(value))
+
+    # --- Demandes, articles, approbations ---
+    request_count = scale["requests"]
+    created = np.sort(clock.sample(request_count))
+    is_recent = created >= recent
+    # Demandes anciennes : presque toutes terminées ; récentes : encore dans le circuit
+    old_status = rng.choice(
+        np.array(["RECEPTION_CONFIRMEE", "REJETEE", "ANNULEE", "LITIGE_RECEPTION"], dtype=object),
+        size=request_count, p=[0.9, 0.06, 0.035, 0.005],
+    )
+    recent_status = rng.choice(
+        np.array(["TRANSMISE", "APPROUVEE", "LIVREE_PAR_MAGASINIER", "RECEPTION_CONFIRMEE", "REJETEE"], dtype=object),
+        size=request_count, p=[0.3, 0.2, 0.15, 0.3, 0.05],
+    )
+    status = np.where(is_recent, recent_status, old_status)
+    approved = np.isin(status, ["APPROUVEE", "LIVREE_PAR_MAGASINIER", "RECEPTION_CONFIRMEE", "LITIGE_RECEPTION"])
+    delivered = np.isin(status, ["LIVREE_PAR_MAGASINIER", "RECEPTION_CONFIRMEE", "LITIGE_RECEPTION"])
+    decided = approved | (status == "REJETEE")
+
+    approved_at = clock.after(created, 20)
+    delivered_at = clock.after(approved_at, 30)
+    confirmed_at = clock.after(delivered_at, 24)
+    chefs, dafs, magasiniers = users_by_role["CHEF_SERVICE"], users_by_role["DAF"], users_by_role["MAGASINIER"]
+    approver = dafs[rng.integers(0, len(dafs), size=request_count)]
+    deliverer = magasiniers[rng.integers(0, len(magasiniers), size=request_count)]
+    nat = np.datetime64("NaT", "ms")
+    request_ids = _ids("req", request_count)
+    request_numbers, request_counters = _numbers("COM", created)
+    received_at = np.where(status == "RECEPTION_CONFIRMEE", confirmed_at, nat)
+    updated = np.maximum.reduce([
+        created,
+        np.where(decided, approved_at, created),
+        np.where(delivered, delivered_at, created),
+        np.where(status == "RECEPTION_CONFIRMEE", confirmed_at, created),
+    ])
+    dataset.add("Request", {
+        "id": request_ids,
+        "requestNumber": request_numbers,
+        "status": status,
+        "requesterObservations": np.where(rng.random(request_count) < 0.3, "Besoin du service", None),
+        "requesterId": chefs[rng.choice(len(chefs), size=request_count, p=_popularity(rng, len(chefs), 0.5))],
+        "approvedAt": np.where(approved, approved_at, nat),
+        "approvedById": np.where(approved, approver, None),
+        "receivedAt": received_at,
+        "receivedById": np.where(delivered, deliverer, None),
+        "createdAt": created,
+        "updatedAt": updated,
+    })
+
+    items_per_request = np.minimum(1 + rng.poisson(1.5, size=request_count), 8)
+    item_request = np.repeat(np.arange(request_count), items_per_request)
+    item_count = len(item_request)
+    item_product = rng.choice(product_count, size=item_count, p=popularity)
+    requested_qty = rng.integers(1, 11, size=item_count)
+    # Le DAF réduit parfois la quantité demandée
+    approved_qty = np.where(rng.random(item_count) < 0.15, np.maximum(requested_qty // 2, 1), requested_qty)
+    item_approved = approved[item_request]
+    dataset.add("RequestItem", {
+        "id": _ids("rqi", item_count),
+        "requestId": request_ids[item_request],
+        "productId": product_ids[item_product],
+        "requestedQty": requested_qty,
+        "approvedQty": np.where(item_approved, approved_qty, None),
+        "itemDisputeStatus": np.where(status[item_request] == "LITIGE_RECEPTION", "REPORTED", "NO_DISPUTE"),
+        "createdAt": created[item_request],
+    })
+    item_delivered = delivered[item_request]
+    add_movements(
+        item_product[item_delivered], deliverer[item_request][item_delivered], "SORTIE", "REQUEST",
+        approved_qty[item_delivered], delivered_at[item_request][item_delivered],
+    )
+
+    decided_index = np.flatnonzero(decided)
+    dataset.add("Approval", {
+        "id": _ids("apr", len(decided_index)),
+        "requestId": request_ids[decided_index],
+        "userId": approver[decided_index],
+        "role": np.full(len(decided_index), "DAF", dtype=object),
+        "decision": np.where(approved[decided_index], "APPROUVE", "REJETE"),
+        "comment": None,
+        "createdAt": approved_at[decided_index],
+    })
+
+    # --- Réceptions de stock (ENTREE, source RECEIPT une fois approuvées) ---
+    receipt_count = scale["receipts"]
+    receipt_created = clock.sample(receipt_count)
+    receipt_product = rng.choice(product_count, size=receipt_count, p=popularity)
+    receipt_quantity = rng.integers(10, 60, size=receipt_count)
+    receipt_status = np.where(
+        receipt_created >= recent,
+        rng.choice(np.array(["PENDING", "APPROVED"], dtype=object), size=receipt_count, p=[0.6, 0.4]),
+        rng.choice(np.array(["APPROVED", "REJECTED"], dtype=object), size=receipt_count, p=[0.95, 0.05]),
+    )
+    receipt_decided_at = clock.after(receipt_created, 24)
+    receipt_user = magasiniers[rng.integers(0, len(magasiniers), size=receipt_count)]
+    receipt_approver = dafs[rng.integers(0, len(dafs), size=receipt_count)]
+    receipt_done = receipt_status != "PENDING"
+    dataset.add("StockReceipt", {
+        "id": _ids("rcp", receipt_count),
+        "productId": product_ids[receipt_product],
+        "quantity": receipt_quantity,
+        "supplierName": np.array([f"Fournisseur {i % 60 + 1}" for i in rng.integers(0, 60, size=receipt_count)], dtype=object),
+        "batchNumber": None,
+        "requestedById": receipt_user,
+        "status": receipt_status,
+        "approvedById": np.where(receipt_done, receipt_approver, None),
+        "approvedAt": np.where(receipt_done, receipt_decided_at, nat),
+        "createdAt": receipt_created,
+        "updatedAt": np.where(receipt_done, receipt_decided_at, receipt_created),
+    })
+    receipt_approved = receipt_status == "APPROVED"
+    add_movements(
+        receipt_product[receipt_approved], receipt_user[receipt_approved], "ENTREE", "RECEIPT",
+        receipt_quantity[receipt_approved], receipt_decided_at[receipt_approved],
+    )
+
+    # --- Inventaires (le dernier est en cours) ---
+    audit_count = scale["audits"]
+    audit_created = np.sort(clock.sample(audit_count))
+    audit_status = np.full(audit_count, "CLOSED", dtype=object)
+    if audit_count:
+        audit_status[-1] = "IN_PROGRESS"
+    audit_ids = _ids("aud", audit_count)
+    audit_numbers, audit_counters = _numbers("AUDIT", audit_created)
+    audit_completed = clock.after(audit_created, 48)
+    admins = users_by_role["ADMIN"]
+    dataset.add("InventoryAudit", {
+        "id": audit_ids,
+        "auditNumber": audit_numbers,
+        "status": audit_status,
+        "createdById": admins[rng.integers(0, len(admins), size=audit_count)],
+        "createdAt": audit_created,
+        "updatedAt": np.where(audit_status == "CLOSED", audit_completed, audit_created),
+        "completedAt": np.where(audit_status == "CLOSED", audit_completed, nat),
+    })
+    per_audit = min(scale["audit_items"], product_count)
+    audit_item_audit = np.repeat(np.arange(audit_count), per_audit)
+    audit_item_product = np.concatenate(
+        [rng.choice(product_count, size=per_audit, replace=False) for _ in range(audit_count)]
+    ) if audit_count else np.array([], dtype=int)
+    system_quantity = rng.integers(0, 300, size=len(audit_item_audit))
+    counted = np.maximum(system_quantity + np.where(rng.random(len(system_quantity)) < 0.1, rng.integers(-5, 6, size=len(system_quantity)), 0), 0)
+    audit_in_progress = audit_status[audit_item_audit] == "IN_PROGRESS"
+    dataset.add("InventoryAuditItem", {
+        "id": _ids("aui", len(audit_item_audit)),
+        "auditId": audit_ids[audit_item_audit],
+        "productId": product_ids[audit_item_product],
+        "systemQuantity": system_quantity,
+        "countedQuantity": np.where(audit_in_progress, None, counted),
+        "discrepancy": np.where(audit_in_progress, None, counted - system_quantity),
+        "createdAt": audit_created[audit_item_audit],
+        "updatedAt": audit_completed[audit_item_audit],
+    })
+
+    # --- Ajustements de stock (une partie issue des inventaires) ---
+    adjustment_count = scale["adjustments"]
+    adjustment_created = clock.sample(adjustment_count)
+    adjustment_product = rng.choice(product_count, size=adjustment_count, p=popularity)
+    adjustment_quantity = rng.integers(1, 20, size=adjustment_count)
+    adjustment_type = rng.choice(np.array(["ENTREE", "SORTIE"], dtype=object), size=adjustment_count, p=[0.4, 0.6])
+    adjustment_status = np.where(
+        adjustment_created >= recent,
+        rng.choice(np.array(["PENDING", "APPROVED"], dtype=object), size=adjustment_count, p=[0.5, 0.5]),
+        rng.choice(np.array(["APPROVED", "REJECTED"], dtype=object), size=adjustment_count, p=[0.9, 0.1]),
+    )
+    adjustment_decided_at = clock.after(adjustment_created, 24)
+    adjustment_user = magasiniers[rng.integers(0, len(magasiniers), size=adjustment_count)]
+    adjustment_done = adjustment_status != "PENDING"
+    closed_audits = np.flatnonzero(audit_status == "CLOSED")
+    from_audit = (rng.random(adjustment_count) < 0.2) & (len(closed_audits) > 0)
+    dataset.add("StockAdjustment", {
+        "id": _ids("adj", adjustment_count),
+        "productId": product_ids[adjustment_product],
+        "quantity": adjustment_quantity,
+        "type": adjustment_type,
+        "reason": np.where(from_audit, "Écart d'inventaire", "Correction de stock"),
+        "requestedById": adjustment_user,
+        "status": adjustment_status,
+        "approvedById": np.where(adjustment_done, dafs[rng.integers(0, len(dafs), size=adjustment_count)], None),
+        "approvedAt": np.where(adjustment_done, adjustment_decided_at, nat),
+        "inventoryAuditId": np.where(
+            from_audit,
+            audit_ids[closed_audits[rng.integers(0, max(len(closed_audits), 1), size=adjustment_count)]] if len(closed_audits) else None,
+            None,
+        ),
+        "createdAt": adjustment_created,
+        "updatedAt": np.where(adjustment_done, adjustment_decided_at, adjustment_created),
+    })
+    adjustment_approved = adjustment_status == "APPROVED"
+    add_movements(
+        adjustment_product[adjustment_approved], adjustment_user[adjustment_approved],
+        adjustment_type[adjustment_approved], "ADJUSTMENT",
+        adjustment_quantity[adjustment_approved], adjustment_decided_at[adjustment_approved],
+    )
+
+    # --- Bons de commande ---
+    order_count = scale["purchase_orders"]
+    order_created = clock.sample(order_count)
+    order_status = np.where(
+        order_created >= recent,
+        rng.choice(np.array(["DRAFT", "PENDING_APPROVAL", "APPROVED", "ORDERED"], dtype=object), size=order_count),
+        rng.choice(np.array(["CLOTUREE", "ANNULEE", "ORDERED"], dtype=object), size=order_count, p=[0.85, 0.1, 0.05]),
+    )
+    order_ids = _ids("bcm", order_count)
+    order_numbers, order_counters = _numbers("BC", order_created)
+    lines_per_order = np.minimum(1 + rng.poisson(2, size=order_count), 10)
+    line_order = np.repeat(np.arange(order_count), lines_per_order)
+    line_quantity = rng.integers(10, 500, size=len(line_order))
+    line_product = rng.choice(product_count, size=len(line_order), p=popularity)
+    line_price = product_columns["cost"][line_product]
+    line_total = line_quantity * line_price
+    order_approved = ~np.isin(order_status, ["DRAFT", "PENDING_APPROVAL", "ANNULEE"])
+    dataset.add("PurchaseOrder", {
+        "id": order_ids,
+        "orderNumber": order_numbers,
+        "status": order_status,
+        "requestedById": magasiniers[rng.integers(0, len(magasiniers), size=order_count)],
+        "approvedById": np.where(order_approved, dafs[rng.integers(0, len(dafs), size=order_count)], None),
+        "supplierName": np.array([f"Fournisseur {i + 1}" for i in rng.integers(0, 60, size=order_count)], dtype=object),
+        "totalAmount": np.bincount(line_order, weights=line_total, minlength=order_count),
+        "createdAt": order_created,
+        "updatedAt": clock.after(order_created, 72),
+    })
+    dataset.add("PurchaseOrderItem", {
+        "id": _ids("bci", len(line_order)),
+        "purchaseOrderId": order_ids[line_order],
+        "productId": product_ids[line_product],
+        "quantity": line_quantity,
+        "unitPrice": line_price,
+        "totalPrice": line_total,
+    })
+
+    # --- Historique de fond jusqu'au volume de mouvements demandé ---
+    generated = sum(len(chunk) for chunk in movements["productId"])
+    background = max(scale["transactions"] - generated, 0)
+    if background:
+        background_type = rng.choice(np.array(["SORTIE", "ENTREE"], dtype=object), size=background, p=[0.7, 0.3])
+        add_movements(
+            rng.choice(product_count, size=background, p=popularity),
+            magasiniers[rng.integers(0, len(magasiniers), size=background)],
+            background_type,
+            np.where(background_type == "SORTIE", "REQUEST", "RECEIPT"),
+            # Entrées et sorties à peu près équilibrées, pour que le stock fluctue
+            np.where(background_type == "SORTIE", rng.integers(1, 11, size=background), rng.integers(5, 20, size=background)),
+            clock.sample(background),
+        )
+
+    columns = {key: np.concatenate(chunks) for key, chunks in movements.items()}
+    product_index = columns["productId"].astype(np.int64)
+    delta = np.where(columns["type"] == "ENTREE", columns["quantity"], -columns["quantity"]).astype(np.int64)
+
+    # Stock d'ouverture : vise un stock final tiré au hasard (une partie du catalogue en
+    # rupture ou sous son minimum), sans jamais laisser le stock passer sous zéro.
+    order = np.lexsort((columns["createdAt"], product_index))
+    running = np.cumsum(delta[order])
+    product_sorted = product_index[order]
+    starts = np.searchsorted(product_sorted, np.arange(product_count))
+    offset = np.where(starts > 0, running[np.maximum(starts - 1, 0)], 0)
+    lowest = np.full(product_count, 0, dtype=np.int64)
+    np.minimum.at(lowest, product_sorted, running - offset[product_sorted])
+    net = np.bincount(product_index, weights=delta, minlength=product_count).astype(np.int64)
+    target = np.select(
+        [rng.random(product_count) < 0.05, rng.random(product_count) < 0.2],
+        [0, rng.integers(0, np.maximum(min_stock, 1))],
+        default=rng.integers(min_stock, 4 * min_stock + 1),
+    )
+    opening = np.maximum(target - net, -lowest)
+    product_columns["quantity"] = opening + net
+    dataset.add("Product", product_columns)
+
+    has_opening = opening > 0
+    opening_products = np.flatnonzero(has_opening)
+    add_movements(
+        opening_products, admins[0], "ENTREE", "ADJUSTMENT",
+        opening[has_opening], np.full(len(opening_products), start64 - np.timedelta64(1, "D")),
+    )
+    columns = {key: np.concatenate(chunks) for key, chunks in movements.items()}
+    # Chargées dans l'ordre chronologique, comme elles auraient été insérées
+    chronological = np.argsort(columns["createdAt"], kind="stable")
+    dataset.add("Transaction", {
+        "id": SequentialIds("trx", len(chronological)),
+        "productId": product_ids[columns["productId"][chronological].astype(np.int64)],
+        "userId": columns["userId"][chronological],
+        "type": columns["type"][chronological],
+        "source": columns["source"][chronological],
+        "quantity": columns["quantity"][chronological].astype(np.int64),
+        "createdAt": columns["createdAt"][chronological],
+    })
+
+    counters = [
+        (doc_type, year, last)
+        for doc_type, per_year in (("COM", request_counters), ("BC", order_counters), ("AUDIT", audit_counters))
+        for year, last in sorted(per_year.items())
+    ]
+    dataset.add("Counter", {
+        "id": _ids("cnt", len(counters)),
+        "type": np.array([c[0] for c in counters], dtype=object),
+        "year": np.array([c[1] for c in counters]),
+        "lastNumber": np.array([c[2] for c in counters]),
+    })
+    return dataset
+
+
+def _normalize(dataset: Dataset) -> None:
+    """Colonnes entièrement vides (None) étendues à la taille de leur table."""
+    for table, (names, columns) in dataset.tables.items():
+        size = dataset.rows(table)
+        for name in names:
+            if columns[name] is None:
+                columns[name] = np.full(size, None, dtype=object)
+
+
+async def load(database_url: str, dataset: Dataset, truncate: bool) -> None:
+    import asyncpg
+
+    from app.pubsub import to_asyncpg_dsn
+
+    connection = await asyncpg.connect(to_asyncpg_dsn(database_url))
+    try:
+        async with connection.transaction():
+            if truncate:
+                await connection.execute(
+                    "TRUNCATE " + ", ".join(f'"{table}"' for table in TABLES + ["NotificationOutbox"]) + " CASCADE"
+                )
+            elif await connection.fetchval('SELECT EXISTS (SELECT 1 FROM "Product")'):
+                raise SystemExit("The database already contains products: use --truncate to replace them.")
+            for table in TABLES:
+                names, _ = dataset.tables[table]
+                total = dataset.rows(table)
+                started = time.perf_counter()
+                for start in range(0, total, COPY_CHUNK_SIZE):
+                    await connection.copy_records_to_table(
+                        table, records=dataset.records(table, start, start + COPY_CHUNK_SIZE), columns=names
+                    )
+                print(f"{table:<20} {total:>10} rows in {time.perf_counter() - started:6.1f} s")
+        # Statistiques du planificateur à jour avant les mesures
+        await connection.execute("ANALYZE")
+    finally:
+        await connection.close()
+
+
+def main(args) -> None:
+    from app.api.auth import get_password_hash
+
+    database_url = args.database_url or os.environ.get("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("Set DATABASE_URL (a local database) or pass --database-url.")
+
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        value = getattr(args, key, None)
+        if value is not None:
+            scale[key] = value
+
+    started = time.perf_counter()
+    end = datetime.now().replace(microsecond=0) if args.end is None else datetime.fromisoformat(args.end)
+    dataset = generate(scale, args.seed, args.months, end, get_password_hash(args.password))
+    _normalize(dataset)
+    print(f"generated in {time.perf_counter() - started:.1f} s: " + ", ".join(
+        f"{table} {dataset.rows(table)}" for table in TABLES
+    ))
+    if args.dry_run:
+        return
+    asyncio.run(load(database_url, dataset, args.truncate))
+    print(f"done in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--months", type=int, default=36, help="History length")
+    parser.add_argument("--end", help="Last day of the history (ISO date, default: now); fixes the dates of a run")
+    parser.add_argument("--database-url", help="Defaults to DATABASE_URL")
+    parser.add_argument("--truncate", action="store_true", help="Empty the tables before loading")
+    parser.add_argument("--dry-run", action="store_true", help="Generate only, without loading")
+    parser.add_argument("--password", default="password")
+    for option in SCALES["medium"]:
+        parser.add_argument(f"--{option.replace('_', '-')}", dest=option, type=int, help=f"Override the scale's {option}")
+    main(parser.parse_args())
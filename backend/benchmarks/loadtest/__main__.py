@@ -0,0 +1,158 @@
+# backend/benchmarks/loadtest/__main__.py
+"""
+Test de charge du backend : des utilisateurs virtuels jouent les scénarios de chaque
+rôle (voir scenarios.py) pendant une durée fixe, puis le rapport donne, par point
+d'accès, le débit et les latences p50/p95/p99 (et le temps base de données médian,
+lu dans l'en-tête Server-Timing).
+
+Le serveur est démarré par le test (`main:app` sur DATABASE_URL, à faire pointer vers
+une base PostgreSQL locale remplie par seed.py) ou visé avec --base-url.
+
+Usage (depuis backend/) :
+    python -m benchmarks.loadtest --duration 60 --save-baseline main
+    python -m benchmarks.loadtest --duration 60 --compare main --max-regression 0.2
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8000 --user CHEF_SERVICE=chef1,chef2
+
+Les comptes utilisés par défaut sont ceux de seed.py (mot de passe "password").
+Avec --compare, le code de sortie vaut 1 si un p95 régresse au-delà du seuil.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from itertools import cycle
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.loadtest.scenarios import SCENARIOS, ApiClient, websocket_listener
+from benchmarks.loadtest.server import running_server
+from benchmarks.loadtest.stats import (
+    Recorder,
+    compare,
+    format_report,
+    load_baseline,
+    save_baseline,
+)
+
+DEFAULT_ACCOUNTS = {
+    "CHEF_SERVICE": ["chef.service"],
+    "DAF": ["daf"],
+    "MAGASINIER": ["magasinier"],
+    "OBSERVER": ["admin"],
+}
+
+
+async def run(args, base_url: str, accounts: Dict[str, List[str]]) -> dict:
+    recorder = Recorder()
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.max_connections)
+    virtual_users = {
+        "CHEF_SERVICE": args.chefs,
+        "DAF": args.dafs,
+        "MAGASINIER": args.magasiniers,
+        "OBSERVER": args.observers,
+    }
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as http:
+        # Un jeton par compte, partagé par les utilisateurs virtuels du compte
+        tokens: Dict[str, str] = {}
+        for username in {name for names in accounts.values() for name in names}:
+            client = ApiClient(http, recorder)
+            await client.login(username, args.password)
+            tokens[username] = client.token
+
+        tasks = []
+        for role, count in virtual_users.items():
+            usernames = cycle(accounts[role])
+            for index in range(count):
+                client = ApiClient(http, recorder, tokens[next(usernames)])
+                rng = random.Random(f"{args.seed}:{role}:{index}")
+                tasks.append(asyncio.create_task(SCENARIOS[role](client, rng, args.think_ms / 1000, stop)))
+
+        ws_url = base_url.replace("http", "ws", 1)
+        listener_tokens = cycle(tokens.values())
+        for _ in range(args.ws_listeners):
+            tasks.append(asyncio.create_task(websocket_listener(ws_url, next(listener_tokens), recorder, stop)))
+
+        if args.warmup:
+            await asyncio.sleep(args.warmup)
+            recorder.reset()
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        stop.set()
+        recorder.duration = time.perf_counter() - started
+        # Les requêtes en cours se terminent ; au-delà du délai, elles sont abandonnées
+        _, pending = await asyncio.wait(tasks, timeout=args.timeout)
+        for task in pending:
+            task.cancel()
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception():
+                print(f"virtual user failed: {task.exception()!r}", file=sys.stderr)
+
+    config = {
+        key: getattr(args, key)
+        for key in ("duration", "warmup", "chefs", "dafs", "magasiniers", "observers",
+                    "ws_listeners", "think_ms", "seed", "workers")
+    }
+    return recorder.report(config)
+
+
+def _parse_accounts(values: List[str]) -> Dict[str, List[str]]:
+    accounts = {role: list(names) for role, names in DEFAULT_ACCOUNTS.items()}
+    for value in values:
+        role, _, names = value.partition("=")
+        role = role.strip().upper()
+        if role not in accounts or not names:
+            raise SystemExit(f"Invalid --user '{value}': expected ROLE=user1,user2 with ROLE in {list(accounts)}")
+        accounts[role] = [name.strip() for name in names.split(",") if name.strip()]
+    return accounts
+
+
+async def main(args) -> int:
+    accounts = _parse_accounts(args.user)
+    if args.base_url:
+        report = await run(args, args.base_url.rstrip("/"), accounts)
+    else:
+        async with running_server(args.port, args.workers) as base_url:
+            report = await run(args, base_url, accounts)
+
+    print(format_report(report))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    if args.save_baseline:
+        print(f"baseline saved to {save_baseline(report, args.save_baseline)}")
+    if args.compare:
+        lines = compare(report, load_baseline(args.compare), args.max_regression)
+        print("\n".join(lines))
+        if any(line.startswith("REGRESSION") for line in lines):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Target an already running server instead of booting main:app")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the booted server")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds run before measuring")
+    parser.add_argument("--chefs", type=int, default=8)
+    parser.add_argument("--dafs", type=int, default=2)
+    parser.add_argument("--magasiniers", type=int, default=2)
+    parser.add_argument("--observers", type=int, default=4)
+    parser.add_argument("--ws-listeners", type=int, default=20)
+    parser.add_argument("--think-ms", type=float, default=500, help="Mean pause between two actions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--user", action="append", default=[], help="ROLE=user1,user2 (CHEF_SERVICE, DAF, MAGASINIER, OBSERVER)")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Save the report as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="Compare with a saved baseline (name or path)")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95 increase (0.2 = +20%%)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
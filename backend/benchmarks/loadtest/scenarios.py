@@ -0,0 +1,188 @@
+# backend/benchmarks/loadtest/scenarios.py
+"""
+Scénarios par rôle, joués en boucle par des utilisateurs virtuels jusqu'à la fin du test :
+- CHEF_SERVICE : consulte le catalogue, crée des demandes, suit les siennes et confirme
+  la réception de celles qui ont été livrées ;
+- DAF : consulte les demandes à approuver et en approuve ;
+- MAGASINIER : consulte les demandes approuvées et les livre ;
+- observateur (ADMIN / SUPER_OBSERVATEUR) : interroge le tableau de bord et les rapports ;
+- écouteurs WebSocket : restent connectés et comptent les notifications reçues.
+
+Chaque utilisateur virtuel tire ses choix d'un random.Random initialisé par la graine
+du test : deux exécutions sur les mêmes données enchaînent les mêmes actions.
+"""
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional, Sequence
+
+import httpx
+import websockets
+
+from benchmarks.loadtest.stats import Recorder
+
+# Transitions d'état en concurrence : un autre utilisateur virtuel peut avoir traité la
+# demande entre la lecture de la liste et l'action. Ce 400 est attendu, pas une erreur.
+TRANSITION_STATUSES = (200, 400)
+
+
+class ApiClient:
+    """Client HTTP d'un utilisateur virtuel : chaque appel est chronométré par point d'accès."""
+
+    def __init__(self, http: httpx.AsyncClient, recorder: Recorder, token: Optional[str] = None):
+        self.http = http
+        self.recorder = recorder
+        self.token = token
+
+    async def call(
+        self,
+        method: str,
+        path: str,
+        endpoint: Optional[str] = None,
+        expected: Sequence[int] = (200, 201),
+        **kwargs: Any,
+    ) -> Optional[httpx.Response]:
+        """`endpoint` est le libellé des mesures (chemin avec ses paramètres génériques)."""
+        endpoint = f"{method} {endpoint or path}"
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(endpoint, time.perf_counter() - started, None)
+            return None
+        self.recorder.record(
+            endpoint,
+            time.perf_counter() - started,
+            response.status_code,
+            response.headers.get("server-timing"),
+            ok=response.status_code in expected,
+        )
+        return response
+
+    async def login(self, username: str, password: str) -> None:
+        response = await self.call(
+            "POST", "/api/auth/login", json={"username": username, "password": password}
+        )
+        if response is None or response.status_code != 200:
+            raise RuntimeError(f"Login failed for '{username}'")
+        self.token = response.json()["access_token"]
+
+
+def _json(response: Optional[httpx.Response]) -> Any:
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()
+
+
+async def _pause(rng: random.Random, think_time: float, stop: asyncio.Event) -> None:
+    """Temps de réflexion (±50 %) entre deux actions, interrompu par la fin du test."""
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=think_time * rng.uniform(0.5, 1.5))
+    except asyncio.TimeoutError:
+        pass
+
+
+async def chef_service(client: ApiClient, rng: random.Random, think_time: float, stop: asyncio.Event):
+    while not stop.is_set():
+        products = _json(await client.call("GET", "/api/products/")) or []
+        available = [p for p in products if p["quantity"] >= 10]
+        if available:
+            items = rng.sample(available, k=min(len(available), rng.randint(1, 3)))
+            await client.call(
+                "POST",
+                "/api/requests/",
+                json={
+                    "items": [{"productId": p["id"], "requestedQty": rng.randint(1, 3)} for p in items],
+                    "requesterObservations": "Test de charge",
+                },
+                # 400 : stock consommé par une autre demande depuis la lecture du catalogue
+                expected=(201, 400),
+            )
+        await _pause(rng, think_time, stop)
+
+        my_requests = _json(await client.call("GET", "/api/requests/my-requests")) or []
+        delivered = [r for r in my_requests if r["status"] == "LIVREE_PAR_MAGASINIER"]
+        for request in delivered[:2]:
+            await client.call(
+                "PUT", f"/api/requests/{request['id']}/receive",
+                endpoint="/api/requests/{id}/receive", expected=TRANSITION_STATUSES,
+            )
+        await _pause(rng, think_time, stop)
+
+
+async def daf(client: ApiClient, rng: random.Random, think_time: float, stop: asyncio.Event):
+    while not stop.is_set():
+        pending = _json(await client.call("GET", "/api/requests/daf")) or []
+        to_approve = [r for r in pending if r["status"] == "TRANSMISE"]
+        for request in rng.sample(to_approve, k=min(len(to_approve), 2)):
+            await client.call(
+                "PUT", f"/api/requests/{request['id']}/approve",
+                endpoint="/api/requests/{id}/approve", expected=TRANSITION_STATUSES,
+                json={"decision": "APPROUVE", "comment": "Test de charge"},
+            )
+        await client.call("GET", "/api/dashboard/")
+        await _pause(rng, think_time, stop)
+
+
+async def magasinier(client: ApiClient, rng: random.Random, think_time: float, stop: asyncio.Event):
+    while not stop.is_set():
+        requests = _json(await client.call("GET", "/api/requests/magasinier/requests")) or []
+        approved = [r for r in requests if r["status"] == "APPROUVEE"]
+        for request in rng.sample(approved, k=min(len(approved), 2)):
+            await client.call(
+                "PUT", f"/api/requests/{request['id']}/deliver",
+                endpoint="/api/requests/{id}/deliver", expected=TRANSITION_STATUSES,
+            )
+        await client.call("GET", "/api/reports/stock-status", params={"page": rng.randint(1, 3)})
+        await _pause(rng, think_time, stop)
+
+
+async def observer(client: ApiClient, rng: random.Random, think_time: float, stop: asyncio.Event):
+    """Tableaux de bord et rapports, interrogés périodiquement."""
+    end = datetime.now()
+    start = end - timedelta(days=90)
+    polls = [
+        ("/api/dashboard/", {}),
+        ("/api/reports/stock-value", {}),
+        ("/api/reports/stock-valuation-by-category", {}),
+        ("/api/reports/stock-turnover", {"start_date": start.isoformat(), "end_date": end.isoformat(), "page_size": 50}),
+        ("/api/reports/stock-history", {"page_size": 50, "count": "approximate"}),
+        ("/api/requests/all", {}),
+    ]
+    while not stop.is_set():
+        path, params = polls[rng.randrange(len(polls))]
+        await client.call("GET", path, params=params)
+        await _pause(rng, think_time, stop)
+
+
+async def websocket_listener(ws_url: str, token: str, recorder: Recorder, stop: asyncio.Event):
+    """Reste connecté jusqu'à la fin du test ; mesure la connexion et compte les messages."""
+    started = time.perf_counter()
+    try:
+        connection = await websockets.connect(f"{ws_url}/api/notifications/ws/{token}")
+    except Exception:
+        recorder.record("WS /api/notifications/ws/{token}", time.perf_counter() - started, None)
+        return
+    recorder.record("WS /api/notifications/ws/{token}", time.perf_counter() - started, 101)
+    recorder.count("websocket_connections")
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(connection.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            recorder.count("websocket_messages")
+    except websockets.ConnectionClosed:
+        recorder.count("websocket_disconnections")
+    finally:
+        await connection.close()
+
+
+SCENARIOS = {
+    "CHEF_SERVICE": chef_service,
+    "DAF": daf,
+    "MAGASINIER": magasinier,
+    "OBSERVER": observer,
+}
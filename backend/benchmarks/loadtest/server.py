@@ -0,0 +1,58 @@
+# backend/benchmarks/loadtest/server.py
+"""
+Démarre `main:app` (uvicorn) dans un processus séparé pour la durée du test de charge.
+La base visée est celle de DATABASE_URL : une base PostgreSQL locale, jamais la production.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+@asynccontextmanager
+async def running_server(port: int, workers: int = 1, startup_timeout: float = 60.0) -> AsyncIterator[str]:
+    """Lance le serveur, attend qu'il soit prêt (/api/health/ready) et retourne son URL."""
+    for variable in ("DATABASE_URL", "SECRET_KEY"):
+        if not os.environ.get(variable):
+            raise RuntimeError(f"{variable} must be set to boot the server (use a local database).")
+
+    base_url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--no-access-log", "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        await _wait_until_ready(base_url, process, startup_timeout)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as http:
+        while asyncio.get_running_loop().time() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"The server exited during startup (code {process.returncode}).")
+            try:
+                if (await http.get("/api/health/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"The server was not ready after {timeout} s.")
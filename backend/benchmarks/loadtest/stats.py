@@ -0,0 +1,170 @@
+# backend/benchmarks/loadtest/stats.py
+"""
+Mesures du test de charge : latences par point d'accès, percentiles, débit, et
+comparaison avec une référence enregistrée (fichier JSON dans benchmarks/baselines/).
+"""
+import json
+import math
+import platform
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BASELINES_DIR = Path(__file__).resolve().parent.parent / "baselines"
+
+_SERVER_DB_TIME = re.compile(r"db;dur=([0-9.]+)")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentile par rang le plus proche (valeurs déjà triées)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class EndpointStats:
+    __slots__ = ("latencies", "db_times", "errors", "statuses")
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.db_times: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[int, int] = {}
+
+
+class Recorder:
+    """Collecte les mesures de tous les utilisateurs virtuels, par point d'accès."""
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+        # Compteurs libres (connexions WebSocket, notifications reçues...)
+        self.counters: Dict[str, int] = {}
+        self.duration = 0.0
+
+    def reset(self) -> None:
+        """Oublie les mesures (fin de la période de chauffe)."""
+        self.endpoints.clear()
+        self.counters.clear()
+
+    def count(self, name: str, increment: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + increment
+
+    def record(
+        self,
+        endpoint: str,
+        latency: float,
+        status: Optional[int],
+        server_timing: Optional[str] = None,
+        ok: Optional[bool] = None,
+    ) -> None:
+        """
+        `status` vaut None quand la requête n'a pas abouti (connexion, délai).
+        `ok` indique si le statut était attendu ; par défaut, tout statut < 400.
+        """
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        stats.latencies.append(latency)
+        if status is not None:
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        if ok is None:
+            ok = status is not None and status < 400
+        if not ok:
+            stats.errors += 1
+        if server_timing:
+            match = _SERVER_DB_TIME.search(server_timing)
+            if match:
+                stats.db_times.append(float(match.group(1)) / 1000)
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for endpoint, stats in sorted(self.endpoints.items()):
+            latencies = sorted(stats.latencies)
+            result[endpoint] = {
+                "requests": len(latencies),
+                "errors": stats.errors,
+                "rps": round(len(latencies) / self.duration, 2) if self.duration else 0.0,
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+                "db_p50_ms": round(percentile(sorted(stats.db_times), 50) * 1000, 2),
+                "statuses": {str(code): count for code, count in sorted(stats.statuses.items())},
+            }
+        return result
+
+    def report(self, config: dict) -> dict:
+        endpoints = self.summary()
+        total = sum(e["requests"] for e in endpoints.values())
+        return {
+            "createdAt": datetime.now().isoformat(timespec="seconds"),
+            "machine": {"python": platform.python_version(), "platform": platform.platform()},
+            "config": config,
+            "durationSeconds": round(self.duration, 2),
+            "totalRequests": total,
+            "totalRps": round(total / self.duration, 2) if self.duration else 0.0,
+            "endpoints": endpoints,
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{'endpoint':<58} {'reqs':>6} {'err':>4} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'db p50':>8}",
+    ]
+    for endpoint, e in report["endpoints"].items():
+        lines.append(
+            f"{endpoint:<58} {e['requests']:>6} {e['errors']:>4} {e['rps']:>8.1f} "
+            f"{e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f} {e['db_p50_ms']:>8.1f}"
+        )
+    for name, value in report.get("counters", {}).items():
+        lines.append(f"{name}: {value}")
+    lines.append(
+        f"total: {report['totalRequests']} requests in {report['durationSeconds']} s "
+        f"({report['totalRps']} req/s), latencies in ms"
+    )
+    return "\n".join(lines)
+
+
+def baseline_path(name: str) -> Path:
+    path = Path(name)
+    if path.suffix == ".json" or path.parent != Path("."):
+        return path
+    return BASELINES_DIR / f"{name}.json"
+
+
+def save_baseline(report: dict, name: str) -> Path:
+    path = baseline_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return path
+
+
+def load_baseline(name: str) -> dict:
+    return json.loads(baseline_path(name).read_text(encoding="utf-8"))
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> List[str]:
+    """
+    Compare p95 et débit point d'accès par point d'accès. Retourne les lignes du
+    comparatif ; celles qui dépassent `max_regression` (0.2 = +20 % de p95) commencent
+    par "REGRESSION".
+    """
+    lines = []
+    for endpoint, current in report["endpoints"].items():
+        previous = baseline["endpoints"].get(endpoint)
+        if previous is None or not previous["p95_ms"]:
+            lines.append(f"new        {endpoint}: p95 {current['p95_ms']} ms")
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1
+        prefix = "REGRESSION" if change > max_regression else "ok        "
+        lines.append(
+            f"{prefix} {endpoint}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms ({change:+.0%}), "
+            f"req/s {previous['rps']} -> {current['rps']}"
+        )
+    for endpoint in baseline["endpoints"]:
+        if endpoint not in report["endpoints"]:
+            lines.append(f"missing    {endpoint}")
+    return lines
@@ -0,0 +1,2 @@
+-- CreateIndex
+CREATE INDEX "Transaction_productId_source_createdAt_idx" ON "Transaction"("productId", "source", "createdAt");
@@ -0,0 +1,7 @@
+-- Partial index for the low-stock predicate (quantity <= "minStock").
+-- Prisma cannot declare partial indexes in schema.prisma; it is maintained here.
+-- The low-stock alerts are listed by name, so the index is ordered by name.
+CREATE INDEX "Product_low_stock_idx" ON "Product"("name", "id") WHERE "quantity" <= "minStock";
+
+-- Ordered listing of the stock status report.
+CREATE INDEX "Product_name_id_idx" ON "Product"("name", "id");
@@ -0,0 +1,5 @@
+-- DropIndex (covered by the composite index below)
+DROP INDEX IF EXISTS "Transaction_productId_idx";
+
+-- CreateIndex
+CREATE INDEX "Transaction_productId_createdAt_idx" ON "Transaction"("productId", "createdAt");
@@ -0,0 +1,18 @@
+-- CreateTable
+CREATE TABLE "NotificationOutbox" (
+    "id" TEXT NOT NULL,
+    "message" JSONB NOT NULL,
+    "userIds" JSONB NOT NULL DEFAULT '[]',
+    "roles" JSONB NOT NULL DEFAULT '[]',
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "lastError" TEXT,
+    "availableAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "sentAt" TIMESTAMP(3),
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "NotificationOutbox_pkey" PRIMARY KEY ("id")
+);
+
+-- Pending notifications only: the dispatcher polls this index, sent rows stay out of it.
+-- Prisma cannot declare partial indexes in schema.prisma; it is maintained here.
+CREATE INDEX "NotificationOutbox_pending_idx" ON "NotificationOutbox"("availableAt") WHERE "sentAt" IS NULL;
@@ -0,0 +1,15 @@
+-- The paginated request, stock receipt and stock adjustment lists filter on one column
+-- and are ordered by "createdAt": the composite indexes serve both, so a page is read in
+-- order without sorting the whole history. They replace the single-column indexes.
+
+-- DropIndex
+DROP INDEX IF EXISTS "Request_status_idx";
+DROP INDEX IF EXISTS "Request_requesterId_idx";
+DROP INDEX IF EXISTS "StockAdjustment_status_idx";
+DROP INDEX IF EXISTS "StockReceipt_status_idx";
+
+-- CreateIndex
+CREATE INDEX "Request_status_createdAt_idx" ON "Request"("status", "createdAt");
+CREATE INDEX "Request_requesterId_createdAt_idx" ON "Request"("requesterId", "createdAt");
+CREATE INDEX "StockAdjustment_status_createdAt_idx" ON "StockAdjustment"("status", "createdAt");
+CREATE INDEX "StockReceipt_status_createdAt_idx" ON "StockReceipt"("status", "createdAt");
@@ -0,0 +1,127 @@
+-- Trigram search (pg_trgm) over products and requests.
+-- ILIKE '%term%' and the fuzzy operator <% can use GIN gin_trgm_ops indexes; Prisma cannot
+-- declare them in schema.prisma, they are maintained here.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX "Product_name_trgm_idx" ON "Product" USING GIN ("name" gin_trgm_ops);
+CREATE INDEX "Product_reference_trgm_idx" ON "Product" USING GIN ("reference" gin_trgm_ops);
+
+-- Search document of a request: number, requester name, names and references of the
+-- requested products. Searching one column replaces a semi-join over items and products.
+ALTER TABLE "Request" ADD COLUMN "searchText" TEXT NOT NULL DEFAULT '';
+
+CREATE OR REPLACE FUNCTION request_search_refresh(request_ids TEXT[]) RETURNS VOID
+LANGUAGE sql AS $$
+    UPDATE "Request" r
+    SET "searchText" = concat_ws(
+        ' ',
+        r."requestNumber",
+        (SELECT u."name" FROM "User" u WHERE u."id" = r."requesterId"),
+        (
+            SELECT string_agg(DISTINCT p."name" || ' ' || p."reference", ' ')
+            FROM "RequestItem" ri
+            JOIN "Product" p ON p."id" = ri."productId"
+            WHERE ri."requestId" = r."id"
+        )
+    )
+    WHERE r."id" = ANY(request_ids);
+$$;
+
+-- The document is kept up to date by triggers, whatever writes the rows (API, scripts,
+-- COPY). Statement-level triggers refresh all the rows of a statement in one UPDATE.
+CREATE OR REPLACE FUNCTION request_search_on_request_insert() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM request_search_refresh(ARRAY(SELECT "id" FROM new_rows));
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION request_search_on_request_update() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM request_search_refresh(ARRAY[NEW."id"]);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION request_search_on_item_change() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM request_search_refresh(ARRAY(SELECT DISTINCT "requestId" FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM request_search_refresh(ARRAY(SELECT DISTINCT "requestId" FROM old_rows));
+    ELSE
+        -- Quantity and dispute updates do not change the document
+        PERFORM request_search_refresh(ARRAY(
+            SELECT n."requestId" FROM new_rows n JOIN old_rows o ON o."id" = n."id"
+            WHERE n."productId" <> o."productId" OR n."requestId" <> o."requestId"
+            UNION
+            SELECT o."requestId" FROM new_rows n JOIN old_rows o ON o."id" = n."id"
+            WHERE n."requestId" <> o."requestId"
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION request_search_on_product_update() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM request_search_refresh(ARRAY(
+        SELECT DISTINCT "requestId" FROM "RequestItem" WHERE "productId" = NEW."id"
+    ));
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION request_search_on_user_update() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM request_search_refresh(ARRAY(
+        SELECT "id" FROM "Request" WHERE "requesterId" = NEW."id"
+    ));
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER "Request_search_insert"
+    AFTER INSERT ON "Request" REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION request_search_on_request_insert();
+
+CREATE TRIGGER "Request_search_update"
+    AFTER UPDATE OF "requestNumber", "requesterId" ON "Request"
+    FOR EACH ROW
+    WHEN (OLD."requestNumber" IS DISTINCT FROM NEW."requestNumber"
+          OR OLD."requesterId" IS DISTINCT FROM NEW."requesterId")
+    EXECUTE FUNCTION request_search_on_request_update();
+
+CREATE TRIGGER "RequestItem_search_insert"
+    AFTER INSERT ON "RequestItem" REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION request_search_on_item_change();
+
+CREATE TRIGGER "RequestItem_search_update"
+    AFTER UPDATE ON "RequestItem" REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION request_search_on_item_change();
+
+CREATE TRIGGER "RequestItem_search_delete"
+    AFTER DELETE ON "RequestItem" REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION request_search_on_item_change();
+
+CREATE TRIGGER "Product_search_update"
+    AFTER UPDATE OF "name", "reference" ON "Product"
+    FOR EACH ROW
+    WHEN (OLD."name" IS DISTINCT FROM NEW."name" OR OLD."reference" IS DISTINCT FROM NEW."reference")
+    EXECUTE FUNCTION request_search_on_product_update();
+
+CREATE TRIGGER "User_search_update"
+    AFTER UPDATE OF "name" ON "User"
+    FOR EACH ROW
+    WHEN (OLD."name" IS DISTINCT FROM NEW."name")
+    EXECUTE FUNCTION request_search_on_user_update();
+
+-- Backfill, then index
+SELECT request_search_refresh(ARRAY(SELECT "id" FROM "Request"));
+
+CREATE INDEX "Request_searchText_trgm_idx" ON "Request" USING GIN ("searchText" gin_trgm_ops);
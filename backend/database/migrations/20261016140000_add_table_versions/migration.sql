@@ -0,0 +1,67 @@
+-- Change counters of the catalog tables, used as HTTP validators (ETag, Last-Modified)
+-- by GET /products and GET /categories (app/table_versions.py, app/api/conditional.py).
+
+-- AlterTable
+ALTER TABLE "Product" ADD COLUMN "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+-- CreateTable
+CREATE TABLE "TableVersion" (
+    "table" TEXT NOT NULL,
+    "version" BIGINT NOT NULL DEFAULT 0,
+    "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "TableVersion_pkey" PRIMARY KEY ("table")
+);
+
+INSERT INTO "TableVersion" ("table") VALUES ('Product'), ('Category');
+
+-- Prisma sets "updatedAt" on its own updates; the trigger also covers raw SQL writes
+-- (stock ledger, imports).
+CREATE OR REPLACE FUNCTION product_set_updated_at() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW."updatedAt" := now() AT TIME ZONE 'UTC';
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER "Product_set_updated_at"
+    BEFORE UPDATE ON "Product"
+    FOR EACH ROW EXECUTE FUNCTION product_set_updated_at();
+
+-- The counter of a table is bumped once per writing transaction, at commit (deferred
+-- constraint trigger), then the new version is notified on channel "table_versions".
+-- A transaction-local setting marks the tables already bumped, so the other rows of the
+-- transaction skip the update. The row lock on "TableVersion" orders the commits of the
+-- writers of a table: versions are notified in increasing order.
+CREATE OR REPLACE FUNCTION table_version_bump() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    flag TEXT := 'table_version.' || lower(TG_TABLE_NAME);
+    new_version BIGINT;
+    changed_at TIMESTAMP(3);
+BEGIN
+    IF current_setting(flag, true) IS DISTINCT FROM 'bumped' THEN
+        PERFORM set_config(flag, 'bumped', true);
+        UPDATE "TableVersion"
+        SET "version" = "version" + 1, "updatedAt" = clock_timestamp() AT TIME ZONE 'UTC'
+        WHERE "table" = TG_TABLE_NAME
+        RETURNING "version", "updatedAt" INTO new_version, changed_at;
+        PERFORM pg_notify(
+            'table_versions',
+            json_build_object('table', TG_TABLE_NAME, 'version', new_version, 'at', changed_at)::text
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE CONSTRAINT TRIGGER "Product_table_version"
+    AFTER INSERT OR UPDATE OR DELETE ON "Product"
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION table_version_bump();
+
+CREATE CONSTRAINT TRIGGER "Category_table_version"
+    AFTER INSERT OR UPDATE OR DELETE ON "Category"
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION table_version_bump();
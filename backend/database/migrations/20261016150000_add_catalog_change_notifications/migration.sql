@@ -0,0 +1,22 @@
+-- Row change notifications of the catalog tables, for the per-worker catalog cache
+-- (app/catalog_cache.py). Each written row is notified on channel "catalog_changes"
+-- ({"table", "id"}); notifications are delivered at commit, before the table version
+-- bump of the same transaction (table_version_bump runs deferred), and identical ones
+-- are merged by PostgreSQL within a transaction.
+CREATE OR REPLACE FUNCTION catalog_row_notify() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    row_id TEXT := CASE WHEN TG_OP = 'DELETE' THEN OLD."id" ELSE NEW."id" END;
+BEGIN
+    PERFORM pg_notify('catalog_changes', json_build_object('table', TG_TABLE_NAME, 'id', row_id)::text);
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER "Product_catalog_row_notify"
+    AFTER INSERT OR UPDATE OR DELETE ON "Product"
+    FOR EACH ROW EXECUTE FUNCTION catalog_row_notify();
+
+CREATE TRIGGER "Category_catalog_row_notify"
+    AFTER INSERT OR UPDATE OR DELETE ON "Category"
+    FOR EACH ROW EXECUTE FUNCTION catalog_row_notify();
@@ -0,0 +1,15 @@
+-- WebSocket envelopes too large for a NOTIFY payload (8000 bytes): PostgresPubSub stores
+-- them here and notifies their id, each worker reads them back (app/pubsub.py). Rows are
+-- deleted by the next publishes once their retention is over.
+
+-- CreateTable
+CREATE TABLE "PubSubPayload" (
+    "id" BIGSERIAL NOT NULL,
+    "payload" TEXT NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "PubSubPayload_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "PubSubPayload_createdAt_idx" ON "PubSubPayload"("createdAt");
@@ -0,0 +1,6 @@
+-- Token revocation cutoff of each user (password or role change): the access tokens issued
+-- before it are rejected when a worker first verifies them (app/api/auth.py), including
+-- after a restart. Millisecond precision, like the "iat" of the tokens.
+
+-- AlterTable
+ALTER TABLE "User" ADD COLUMN "tokensValidAfter" TIMESTAMP(3);
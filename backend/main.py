@@ -1,8 +1,10 @@
 import logging
 logger = logging.getLogger(__name__) # Moved logger initialization here
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse
 from starlette.requests import Request
 from starlette.middleware.cors import CORSMiddleware
 import sentry_sdk
@@ -11,11 +13,23 @@ from sentry_sdk.integrations.fastapi import FastApiIntegration
 # Import centralized settings
 from app.config import settings
 
+from app.catalog_cache import catalog_cache
+from app.database import connect_db, disconnect_db
+from app.metrics import QueryBudget, TimingMiddleware
+from app.pubsub import InMemoryPubSub, create_pubsub_backend
+from app.services.notification_dispatcher import dispatcher
+from app.services.notification_outbox import outbox
+from app.services.pdf_service import shutdown_render_pool
+from app.table_versions import table_versions
+from app.websockets import manager
+
 # Import API routers
-from app.api.auth import set_jwt_settings
+from app.api.auth import set_jwt_settings, set_password_settings, shutdown_crypto_executor, token_cache
+from app.api.conditional import set_http_cache_enabled
 from app.api.routes.auth import router as auth_router
 from app.api.routes.category import router as category_router
 from app.api.routes.dashboard import router as dashboard_router
+from app.api.routes.health import router as health_router
 from app.api.routes.inventory_audit import router as inventory_audit_router
 from app.api.routes.notifications import router as notifications_router
 from app.api.routes.product import router as product_router
@@ -39,6 +53,71 @@ if settings.SENTRY_DSN: # Sentry DSN will be loaded from .env via app.config
 # --- JWT Settings ---
 # The app will fail to start if SECRET_KEY is not set, thanks to Pydantic
 set_jwt_settings(settings.SECRET_KEY)
+set_password_settings(
+    bcrypt_rounds=settings.AUTH_BCRYPT_ROUNDS, crypto_workers=settings.AUTH_CRYPTO_WORKERS
+)
+token_cache.max_size = settings.AUTH_TOKEN_CACHE_SIZE
+set_http_cache_enabled(settings.HTTP_CACHE_ENABLED)
+
+
+# Token revocations are published to every worker, each one updating its own cache.
+def _revoke_tokens(data: dict):
+    for user_id in data["userIds"]:
+        token_cache.revoke_user(user_id, data.get("at"))
+
+
+manager.on_control("revoke_tokens", _revoke_tokens)
+
+
+# User changes are published to every worker, each one dropping its role -> users index.
+def _invalidate_roles(data: dict):
+    dispatcher.invalidate_roles()
+
+
+manager.on_control("invalidate_roles", _invalidate_roles)
+
+
+# --- Application Lifespan ---
+# Each gunicorn worker opens one Prisma client (and its connection pool) at startup
+# and reuses it for every request, instead of connecting per request.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_db(
+        settings.DATABASE_URL,
+        connection_limit=settings.DB_CONNECTION_LIMIT,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        connect_timeout=settings.DB_CONNECT_TIMEOUT,
+    )
+    # WebSocket messages go through a pub/sub backend so that a notification raised
+    # by one worker reaches the sockets held by the others.
+    try:
+        await manager.start_backend(
+            create_pubsub_backend(settings.WS_PUBSUB_BACKEND, settings.DATABASE_URL)
+        )
+    except Exception:
+        logger.exception("WebSocket pub/sub backend unavailable, notifications stay within this worker")
+        await manager.start_backend(InMemoryPubSub())
+    # Notifications written by the transactions (outbox) are sent by a background task.
+    outbox.start()
+    # Change counters of the catalog tables, validators of the catalog reads (ETag);
+    # the catalog cache is loaded and kept up to date from the same notifications.
+    if settings.CATALOG_CACHE_ENABLED:
+        catalog_cache.attach(table_versions)
+    if settings.HTTP_CACHE_ENABLED or settings.CATALOG_CACHE_ENABLED:
+        try:
+            await table_versions.start(settings.DATABASE_URL)
+        except Exception:
+            logger.exception("Table versions unavailable, catalog reads are served from the database without ETag")
+    try:
+        yield
+    finally:
+        await table_versions.stop()
+        await outbox.stop()
+        await dispatcher.drain()
+        await manager.stop_backend()
+        shutdown_render_pool()
+        shutdown_crypto_executor()
+        await disconnect_db()
 
 
 # --- FastAPI App Initialization ---
@@ -46,23 +125,13 @@ app = FastAPI(
     title="Postefinances Stock Management API",
     openapi_url="/api/openapi.json",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan,
 )
 
 
 # --- Middleware Configuration ---
 
-# Logging middleware for debugging requests
-logger = logging.getLogger(__name__)
-class DebugMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        logger.info(f"Incoming Request: Method={request.method}, URL={request.url.path}")
-        response = await call_next(request)
-        logger.info(f"Outgoing Response: Status={response.status_code}")
-        return response
-
-app.add_middleware(DebugMiddleware)
-
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -72,6 +141,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timing: latency and database time per route, Server-Timing header,
+# sampled request logs. Added last so that it is the outermost middleware.
+app.add_middleware(
+    TimingMiddleware,
+    log_sample_rate=settings.REQUEST_LOG_SAMPLE_RATE,
+    slow_request_seconds=settings.SLOW_REQUEST_MS / 1000,
+    query_budget=QueryBudget(
+        max_queries=settings.DB_QUERY_BUDGET or None,
+        max_repeats=settings.DB_QUERY_REPEAT_LIMIT or None,
+        raise_on_violation=settings.DB_QUERY_BUDGET_RAISE,
+    ),
+)
+
 # --- Global Exception Handlers ---
 @app.exception_handler(ValueError)
 async def value_error_exception_handler(request: Request, exc: ValueError):
@@ -105,6 +187,7 @@ app.include_router(notifications_router, prefix="/api")
 app.include_router(purchase_order_router, prefix="/api")
 app.include_router(reports_router, prefix="/api/reports", tags=["Reports"])
 app.include_router(stock_adjustment_router, prefix="/api")
+app.include_router(health_router, prefix="/api")
 
 @app.get("/", tags=["Root"])
 async def read_root():
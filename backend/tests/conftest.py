@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+from typing import Iterable, Optional
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.metrics import QueryBudget, instrument_client, track_queries
+
+
+class _Row(dict):
+    """Raw result row: the columns not given read as 0."""
+
+    def __missing__(self, key):
+        return 0
+
+
+class _Delegate:
+    def __init__(self, client: "RecordingClient", name: str):
+        self._client = client
+        self._model = type(name, (), {})
+
+    def __getattr__(self, method: str):
+        async def action(**arguments):
+            return await self._client._execute(method=method, arguments=arguments, model=self._model)
+
+        return action
+
+
+class RecordingClient:
+    """
+    Stands for the Prisma client in query budget tests: raw queries and model actions
+    (db.purchaseorder.create...) go through `_execute`, instrumented like Prisma's, so
+    that query_budget counts them. Raw queries return `rows`, model actions a MagicMock.
+    """
+
+    def __init__(self, rows: Iterable[dict] = ()):
+        self.rows = [_Row(row) for row in rows]
+
+    async def _execute(self, *, method, arguments, model=None, root_selection=None):
+        if method == "query_raw":
+            return list(self.rows)
+        return MagicMock()
+
+    async def query_raw(self, query, *args):
+        return await self._execute(method="query_raw", arguments={"query": query, "parameters": args})
+
+    def __getattr__(self, name: str) -> _Delegate:
+        return _Delegate(self, name)
+
+
+instrument_client(RecordingClient)
+
+
+@pytest.fixture
+def recording_db():
+    """Factory of RecordingClient: `recording_db(rows)`."""
+    return RecordingClient
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Asserts the number of Prisma queries run by a block (an endpoint call through a
+    TestClient, a service...):
+
+        with query_budget(max_queries=3, max_repeats=1) as stats:
+            client.get("/api/products")
+
+    Fails with the executed query shapes when a limit is exceeded, so that an N+1
+    (the same query once per row) shows up in the test output.
+    """
+    from database.generated.prisma import Prisma
+
+    instrument_client(Prisma)
+
+    @contextmanager
+    def check(max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+        with track_queries(QueryBudget(max_queries, max_repeats)) as stats:
+            yield stats
+        assert not stats.violations, (
+            f"Query budget exceeded: {'; '.join(stats.violations)}. "
+            f"Queries: {stats.top_shapes(limit=10)}"
+        )
+
+    return check
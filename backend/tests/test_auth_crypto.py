@@ -0,0 +1,33 @@
+import pytest
+
+from app.api import auth
+
+
+@pytest.fixture(autouse=True)
+def fast_bcrypt():
+    auth.set_password_settings(bcrypt_rounds=4, crypto_workers=2)
+    yield
+    auth.shutdown_crypto_executor()
+    auth.set_password_settings(bcrypt_rounds=12)
+
+
+@pytest.mark.asyncio
+async def test_hash_and_check_run_in_the_crypto_pool():
+    hashed = await auth.hash_password("secret")
+
+    assert await auth.check_password("secret", hashed) == (True, None)
+    assert (await auth.check_password("wrong", hashed))[0] is False
+    assert auth._crypto_executor is not None
+
+
+@pytest.mark.asyncio
+async def test_check_password_returns_a_new_hash_when_the_cost_changes():
+    old_hash = await auth.hash_password("secret")
+    auth.set_password_settings(bcrypt_rounds=5)
+
+    valid, new_hash = await auth.check_password("secret", old_hash)
+
+    assert valid is True
+    assert new_hash is not None and new_hash != old_hash
+    assert auth.verify_password("secret", new_hash)
+    assert await auth.check_password("secret", new_hash) == (True, None)
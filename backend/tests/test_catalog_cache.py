@@ -0,0 +1,165 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.catalog_cache as catalog_module
+from app.catalog_cache import MAX_ROW_REFRESH, CatalogCache
+from app.table_versions import TableVersions
+
+
+def _row(product_id, name, reference, quantity=10, category_id="cat1"):
+    return {
+        "id": product_id,
+        "reference": reference,
+        "name": name,
+        "categoryId": category_id,
+        "quantity": quantity,
+        "minStock": 5,
+        "cost": 2.5,
+        "unit": "pièce",
+        "location": None,
+        "updatedAt": 1_790_000_000.0,
+    }
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = MagicMock()
+    db.query_raw = AsyncMock()
+    monkeypatch.setattr(catalog_module, "get_client", lambda: db)
+    return db
+
+
+@pytest.fixture
+def source():
+    source = TableVersions()
+    source._connection = MagicMock(is_closed=MagicMock(return_value=False))
+    return source
+
+
+async def _load(cache, source, db, rows, product_version=1):
+    cache.attach(source)
+    source._versions.update(Product=product_version, Category=1)
+    db.query_raw.return_value = [{"id": "cat1", "name": "Visserie"}]
+    await cache._on_version_change("Category", 1)
+    db.query_raw.return_value = rows
+    await cache._on_version_change("Product", product_version)
+
+
+@pytest.mark.asyncio
+async def test_lookups_and_search_after_full_load(db, source):
+    cache = CatalogCache()
+    # Rows come in the order of the database collation ("Écrou" before "Vis")
+    await _load(cache, source, db, [_row("p1", "Écrou M4", "ECR-M4"), _row("p2", "Vis M4", "VIS-M4")])
+
+    assert cache.fresh()
+    assert 'ORDER BY "name", "id"' in db.query_raw.await_args.args[0]
+    assert cache.get("p1").name == "Écrou M4"
+    assert cache.get("p1").category == {"id": "cat1", "name": "Visserie"}
+    assert cache.get("missing") is None
+    assert cache.get_by_reference("VIS-M4").id == "p2"
+    assert cache.get_by_reference("vis-m4") is None
+    assert [p.id for p in cache.search("m4")] == ["p1", "p2"]  # database order, not code points
+    assert [p.id for p in cache.search("écrou")] == ["p1"]
+    body = json.loads(cache.products_json())
+    assert body[0]["id"] == "p1" and body[0]["category"]["name"] == "Visserie"
+    assert cache.quantities.typecode == "q" and cache.costs.typecode == "d"
+
+
+@pytest.mark.asyncio
+async def test_notified_rows_are_refreshed_at_their_version(db, source):
+    cache = CatalogCache()
+    await _load(cache, source, db, [_row("p1", "Vis", "V1"), _row("p2", "Écrou", "E1"), _row("p3", "Clou", "C1")])
+    first_body = cache.products_json()
+
+    # p1 updated, p2 deleted in the transaction of version 2
+    source._on_row_notify(None, 1, "catalog_changes", json.dumps({"table": "Product", "id": "p1"}))
+    source._on_row_notify(None, 1, "catalog_changes", json.dumps({"table": "Product", "id": "p2"}))
+    db.query_raw.return_value = [_row("p1", "Vis", "V1-NEW", quantity=1)]
+    source._versions["Product"] = 2
+    await cache._on_version_change("Product", 2)
+
+    assert cache.fresh()
+    assert cache.get("p1").quantity == 1 and cache.get("p1").reference == "V1-NEW"
+    assert cache.get("p2") is None and cache.get("p3").name == "Clou"
+    assert cache.get_by_reference("V1-NEW").id == "p1" and cache.get_by_reference("V1") is None
+    assert cache.get_by_reference("E1") is None and cache.get_by_reference("C1").id == "p3"  # moved row
+    assert len(cache.ids) == len(cache.quantities) == 2
+    assert [p.id for p in cache.search()] == ["p1", "p3"]  # same name: order kept, no sort query
+    assert cache.products_json() != first_body
+    assert json.loads(db.query_raw.await_args.args[1]) and cache.row_refreshes == 1
+
+
+@pytest.mark.asyncio
+async def test_added_or_renamed_products_are_placed_by_the_database(db, source):
+    cache = CatalogCache()
+    await _load(cache, source, db, [_row("p1", "Clou", "C1"), _row("p2", "Vis", "V1")])
+
+    cache._on_row_change("Product", "p1")
+    cache._on_row_change("Product", "p3")
+    db.query_raw.side_effect = [
+        [_row("p1", "Écrou", "C1"), _row("p3", "Agrafe", "A1")],  # refreshed rows
+        [{"id": "p3"}, {"id": "p4"}, {"id": "p1"}, {"id": "p2"}],  # ids in database order
+    ]
+    source._versions["Product"] = 2
+    await cache._on_version_change("Product", 2)
+
+    assert db.query_raw.await_args.args == ('SELECT "id" FROM "Product" ORDER BY "name", "id"',)
+    # p4 was added after version 2: placed by its own refresh
+    assert [p.id for p in cache.search()] == ["p3", "p1", "p2"]
+    assert json.loads(cache.products_json())[0]["name"] == "Agrafe"
+
+
+@pytest.mark.asyncio
+async def test_products_deleted_after_the_version_stay_listed_until_refreshed(db, source):
+    cache = CatalogCache()
+    await _load(cache, source, db, [_row("p1", "Clou", "C1"), _row("p2", "Vis", "V1")])
+
+    cache._on_row_change("Product", "p3")
+    db.query_raw.side_effect = [
+        [_row("p3", "Agrafe", "A1")],
+        [{"id": "p3"}, {"id": "p2"}],  # p1 deleted by a later transaction
+    ]
+    source._versions["Product"] = 2
+    await cache._on_version_change("Product", 2)
+    assert [p.id for p in cache.search()] == ["p3", "p2", "p1"]
+
+    cache._on_row_change("Product", "p1")
+    db.query_raw.side_effect = [[]]
+    source._versions["Product"] = 3
+    await cache._on_version_change("Product", 3)
+    assert [p.id for p in cache.search()] == ["p3", "p2"] and cache.get_by_reference("C1") is None
+
+
+@pytest.mark.asyncio
+async def test_missed_version_or_large_write_reloads_everything(db, source):
+    cache = CatalogCache()
+    await _load(cache, source, db, [_row("p1", "Vis", "V1")])
+
+    db.query_raw.return_value = [_row("p9", "Clou", "C9")]
+    source._versions["Product"] = 3
+    await cache._on_version_change("Product", 3)  # version 2 never received
+    assert cache.full_reloads == 2 and cache.get("p1") is None and cache.get("p9")
+
+    for index in range(MAX_ROW_REFRESH + 1):
+        cache._on_row_change("Product", f"p{index}")
+    source._versions["Product"] = 4
+    await cache._on_version_change("Product", 4)
+    assert cache.full_reloads == 3 and cache.stats()["pendingRows"] == 0
+
+
+@pytest.mark.asyncio
+async def test_not_fresh_behind_the_database_or_without_listener(db, source):
+    cache = CatalogCache()
+    await _load(cache, source, db, [_row("p1", "Vis", "V1")])
+
+    source._versions["Product"] = 2  # version known, not yet applied
+    assert not cache.fresh()
+    assert cache.stats()["versionLag"] == {"Product": 1, "Category": 0}
+
+    source._versions["Product"] = 1
+    source._connection = None
+    assert not cache.fresh()
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 2
+    assert cache.memory_bytes() > 0
@@ -0,0 +1,130 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import HTTPException, Response
+from starlette.requests import Request
+
+from app.api import conditional
+from app.api.routes import product as product_routes
+from app.api.routes.category import get_all_categories
+from app.table_versions import TableVersions
+
+
+def _versions(**counters) -> TableVersions:
+    versions = TableVersions()
+    versions._connection = MagicMock(is_closed=MagicMock(return_value=False))
+    versions._versions.update(counters)
+    return versions
+
+
+def _request(**headers) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_notifications_only_move_versions_forward():
+    versions = _versions(Product=3)
+    changes = []
+
+    async def listener(table, version):
+        changes.append((table, version))
+
+    versions.on_change(listener)
+    versions._on_notify(None, 1, "table_versions", json.dumps({"table": "Product", "version": 5}))
+    versions._on_notify(None, 1, "table_versions", json.dumps({"table": "Product", "version": 4}))
+    versions._on_notify(None, 1, "table_versions", "not json")
+    await asyncio.sleep(0)
+
+    assert versions.get("Product") == 5
+    assert changes == [("Product", 5)]
+    assert versions.notifications == 2
+
+
+def test_versions_unknown_while_listener_is_down(monkeypatch):
+    versions = _versions(Product=3, Category=1)
+    versions._connection = None
+    monkeypatch.setattr(conditional, "table_versions", versions)
+
+    assert versions.get("Product") is None
+    assert conditional.catalog_validators("products", ("Product", "Category")) is None
+
+
+def test_etag_changes_with_versions_and_parameters(monkeypatch):
+    monkeypatch.setattr(conditional, "table_versions", _versions(Product=3, Category=1))
+    first = conditional.catalog_validators("products", ("Product", "Category"), "vis")
+    other_search = conditional.catalog_validators("products", ("Product", "Category"), "écrou")
+
+    monkeypatch.setattr(conditional, "table_versions", _versions(Product=4, Category=1))
+    after_write = conditional.catalog_validators("products", ("Product", "Category"), "vis")
+
+    assert first.etag.startswith('"products-product3-category1-')
+    assert len({first.etag, other_search.etag, after_write.etag}) == 3
+
+
+def test_if_none_match_and_if_modified_since():
+    changed = datetime.now(timezone.utc) - timedelta(minutes=5)
+    validators = conditional.Validators('"products-product3"').with_last_modified(changed)
+    last_modified = validators.headers()["Last-Modified"]
+
+    assert validators.matches(_request(if_none_match='"other", W/"products-product3"'))
+    assert validators.matches(_request(if_none_match="*"))
+    assert not validators.matches(_request(if_none_match='"products-product2"'))
+    assert validators.matches(_request(if_modified_since=last_modified))
+    # If-None-Match takes precedence over If-Modified-Since
+    assert not validators.matches(_request(if_none_match='"x"', if_modified_since=last_modified))
+    assert not validators.matches(_request())
+
+
+def test_last_modified_withheld_within_its_second():
+    validators = conditional.Validators('"x"').with_last_modified(datetime.now(timezone.utc))
+    assert "Last-Modified" not in validators.headers()
+    assert validators.headers()["Cache-Control"] == conditional.CACHE_CONTROL
+
+
+@pytest.mark.asyncio
+async def test_current_etag_answers_304_without_querying(monkeypatch):
+    monkeypatch.setattr(conditional, "table_versions", _versions(Category=7))
+    db = MagicMock()
+    db.category.find_many = AsyncMock(return_value=[])
+    response = Response()
+
+    first = await get_all_categories(_request(), response, db=db, current_user=MagicMock())
+    etag = response.headers["ETag"]
+    second = await get_all_categories(_request(if_none_match=etag), Response(), db=db, current_user=MagicMock())
+
+    assert first == []
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    db.category.find_many.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unknown_product_is_404_even_with_if_none_match_star(monkeypatch):
+    versions = _versions(Product=3, Category=1)
+    monkeypatch.setattr(conditional, "table_versions", versions)
+    monkeypatch.setattr(product_routes, "table_versions", versions)
+    monkeypatch.setattr(product_routes, "catalog_cache", MagicMock(fresh=MagicMock(return_value=False)))
+    db = MagicMock()
+    db.product.find_unique = AsyncMock(return_value=None)
+
+    with pytest.raises(HTTPException) as error:
+        await product_routes.get_product_by_id(
+            "missing", _request(if_none_match="*"), Response(), db=db, current_user=MagicMock()
+        )
+    assert error.value.status_code == 404
+
+    db.product.find_unique.return_value = MagicMock(updatedAt=datetime.now(timezone.utc) - timedelta(minutes=5))
+    answer = await product_routes.get_product_by_id(
+        "p1", _request(if_none_match="*"), Response(), db=db, current_user=MagicMock()
+    )
+    assert answer.status_code == 304
@@ -7,10 +7,9 @@ from app.crud.purchase_order import (
     create_purchase_order,
     get_purchase_order,
     get_purchase_orders,
-    update_purchase_order,
     delete_purchase_order,
 )
-from app.api.schemas import PurchaseOrderCreate, PurchaseOrderUpdate, PurchaseOrderItemCreate
+from app.api.schemas import PurchaseOrderCreate, PurchaseOrderItemCreate
 from database.generated.prisma import Prisma
 from database.generated.prisma.models import User, Product, PurchaseOrder
 from database.generated.prisma.enums import PurchaseOrderStatus, UserRole, TransactionType, TransactionSource
@@ -20,6 +19,7 @@ def create_test_user(id, email, name, role, department):
     return User(
         id=id,
         email=email,
+        username=email.split("@")[0],
         name=name,
         role=role,
         password="hashed_password",
@@ -48,9 +48,11 @@ def mock_db_fixture():
     
     # Configure all awaited methods with AsyncMock
     mock_db.product.find_unique = AsyncMock()
+    mock_db.product.find_many = AsyncMock(return_value=[])
     mock_db.purchaseorder.create = AsyncMock()
     mock_db.purchaseorder.find_unique = AsyncMock()
     mock_db.purchaseorder.find_many = AsyncMock()
+    mock_db.purchaseorder.count = AsyncMock(return_value=0)
     mock_db.purchaseorder.update = AsyncMock()
     mock_db.purchaseorder.delete = AsyncMock()
     mock_db.purchaseorderitem.delete_many = AsyncMock()
@@ -79,18 +81,12 @@ def mock_generate_next_number_fixture():
     with patch("app.crud.purchase_order.generate_next_number", new_callable=AsyncMock) as mock:
         yield mock
 
-@pytest.fixture(name="mock_websocket_manager")
-def mock_websocket_manager_fixture():
-    # Patch where it's USED
-    with patch("app.crud.purchase_order.manager", new_callable=AsyncMock) as mock:
-        yield mock
-
 # Tests for create_purchase_order
 @pytest.mark.asyncio
 async def test_create_purchase_order_success(mock_db, mock_user, mock_generate_next_number):
     # Arrange
     mock_generate_next_number.return_value = "BC-TEST-001"
-    mock_db.product.find_unique.return_value = MagicMock(id="prod1", cost=10.0)
+    mock_db.product.find_many.return_value = [MagicMock(id="prod1", cost=10.0)]
     mock_db.purchaseorder.create.return_value = MagicMock(id="po1", orderNumber="BC-TEST-001", status=PurchaseOrderStatus.DRAFT)
 
     purchase_order_data = PurchaseOrderCreate(
@@ -104,16 +100,35 @@ async def test_create_purchase_order_success(mock_db, mock_user, mock_generate_n
 
     # Assert
     mock_generate_next_number.assert_called_once_with(mock_db, "BC")
-    mock_db.product.find_unique.assert_called_once_with(where={"id": "prod1"})
+    mock_db.product.find_many.assert_called_once_with(where={"id": {"in": ["prod1"]}})
     mock_db.purchaseorder.create.assert_called_once()
     assert po.orderNumber == "BC-TEST-001"
     assert po.status == PurchaseOrderStatus.DRAFT
 
+@pytest.mark.asyncio
+async def test_create_purchase_order_loads_products_in_one_query(mock_db, mock_user, mock_generate_next_number):
+    # Arrange
+    mock_generate_next_number.return_value = "BC-TEST-003"
+    product_ids = [f"prod{i}" for i in range(40)]
+    mock_db.product.find_many.return_value = [MagicMock(id=product_id) for product_id in product_ids]
+
+    purchase_order_data = PurchaseOrderCreate(
+        supplierName="Test Supplier",
+        items=[PurchaseOrderItemCreate(productId=product_id, quantity=1, unitPrice=1.0) for product_id in product_ids]
+    )
+
+    # Act
+    await create_purchase_order(mock_db, purchase_order_data, mock_user)
+
+    # Assert
+    assert mock_db.product.find_many.await_count == 1
+    mock_db.product.find_unique.assert_not_called()
+
 @pytest.mark.asyncio
 async def test_create_purchase_order_product_not_found(mock_db, mock_user, mock_generate_next_number):
     # Arrange
     mock_generate_next_number.return_value = "BC-TEST-002"
-    mock_db.product.find_unique.return_value = None
+    mock_db.product.find_many.return_value = []
 
     purchase_order_data = PurchaseOrderCreate(
         supplierName="Test Supplier",
@@ -125,7 +140,7 @@ async def test_create_purchase_order_product_not_found(mock_db, mock_user, mock_
         await create_purchase_order(mock_db, purchase_order_data, mock_user)
     
     mock_generate_next_number.assert_called_once_with(mock_db, "BC")
-    mock_db.product.find_unique.assert_called_once_with(where={"id": "non_existent_prod"})
+    mock_db.product.find_many.assert_called_once_with(where={"id": {"in": ["non_existent_prod"]}})
     mock_db.purchaseorder.create.assert_not_called()
 
 # Tests for get_purchase_order
@@ -166,42 +181,13 @@ async def test_get_purchase_orders_no_filter(mock_db):
     # Arrange
     expected_pos = [MagicMock(id="po1"), MagicMock(id="po2")]
     mock_db.purchaseorder.find_many.return_value = expected_pos
+    mock_db.purchaseorder.count.return_value = 2
 
     # Act
     pos = await get_purchase_orders(mock_db)
 
     # Assert
-    assert pos == expected_pos
-
-# Tests for update_purchase_order
-@pytest.mark.asyncio
-async def test_update_purchase_order_not_found(mock_db, mock_user):
-    # Arrange
-    mock_db.purchaseorder.find_unique.return_value = None
-    update_data = PurchaseOrderUpdate(supplierName="New Supplier")
-
-    # Act & Assert
-    with pytest.raises(ValueError, match="Purchase Order not found"):
-        await update_purchase_order(mock_db, "non_existent_po", update_data, mock_user)
-
-@pytest.mark.asyncio
-async def test_update_purchase_order_daf_approves_success(mock_db, mock_websocket_manager):
-    # Arrange
-    daf_user = create_test_user("daf_user_id", "daf@example.com", "DAF User", UserRole.DAF, "Finance")
-    
-    existing_po = MagicMock(id="po1", orderNumber="BC-TEST-001", requestedById="requester_id")
-    mock_db.purchaseorder.find_unique.return_value = existing_po
-    
-    update_data = PurchaseOrderUpdate(status=PurchaseOrderStatus.APPROVED)
-
-    # Act
-    await update_purchase_order(mock_db, "po1", update_data, daf_user)
-
-    # Assert
-    mock_db.purchaseorder.update.assert_called_once()
-    update_call_data = mock_db.purchaseorder.update.call_args[1]['data']
-    assert update_call_data['status'] == PurchaseOrderStatus.APPROVED
-    mock_websocket_manager.send_personal_message.assert_called_once()
+    assert pos == (expected_pos, 2)
 
 # Tests for delete_purchase_order
 @pytest.mark.asyncio
@@ -214,14 +200,7 @@ async def test_delete_purchase_order_success(mock_db):
 
     # Assert
     mock_db.purchaseorderitem.delete_many.assert_called_once_with(where={"purchaseOrderId": "po1"})
-    mock_db.purchaseorder.delete.assert_called_once_with(
-        where={"id": "po1"},
-        include={
-            "requestedBy": True,
-            "approvedBy": True,
-            "items": {"include": {"product": True}},
-        },
-    )
+    mock_db.purchaseorder.delete.assert_called_once_with(where={"id": "po1"})
 
 @pytest.mark.asyncio
 async def test_delete_purchase_order_not_found(mock_db):
@@ -0,0 +1,133 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.crud.reports import (
+    build_stock_report_query,
+    get_stock_report,
+    get_stock_turnover,
+)
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.query_raw = AsyncMock()
+    return mock_db
+
+
+def _report_row(**overrides):
+    row = {
+        "id": "prod1",
+        "name": "Stylo",
+        "reference": "REF-001",
+        "unit": "pcs",
+        "quantity": 3,
+        "minStock": 10,
+        "location": None,
+        "categoryId": "cat1",
+        "categoryName": "Papeterie",
+        "lastAdjustmentDate": None,
+        "lastReceiptDate": "2025-11-20T10:00:00+00:00",
+        "totalItems": 42,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_build_stock_report_query_whitelists_sort_column():
+    query = build_stock_report_query("quantity; DROP TABLE \"Product\"", "desc")
+    assert "DROP TABLE" not in query
+    assert "lower(name) DESC" in query
+
+
+def test_build_stock_report_query_sorts_movements_before_pagination():
+    query = build_stock_report_query("last_adjustment", "asc")
+    # The LIMIT must come after the lateral lookup so the ordering is global.
+    assert query.index("LEFT JOIN LATERAL") < query.index("LIMIT $5")
+
+
+@pytest.mark.asyncio
+async def test_get_stock_report_runs_a_single_query(mock_db):
+    mock_db.query_raw.return_value = [_report_row(), _report_row(id="prod2", name="Gomme")]
+
+    report = await get_stock_report(
+        mock_db, product_name="st%", low_stock=True, sort_by="last_receipt", skip=0, limit=2
+    )
+
+    mock_db.query_raw.assert_awaited_once()
+    args = mock_db.query_raw.await_args.args
+    assert args[1:] == ("st\\%", None, None, True, 2, 0)
+    assert report["totalItems"] == 42
+    assert report["items"][0]["product"]["category"] == {"id": "cat1", "name": "Papeterie"}
+    assert report["items"][1]["product"]["name"] == "Gomme"
+
+
+@pytest.mark.asyncio
+async def test_get_stock_report_counts_when_page_is_past_the_end(mock_db):
+    mock_db.query_raw.side_effect = [[], [{"totalItems": 7}]]
+
+    report = await get_stock_report(mock_db, skip=50, limit=10)
+
+    assert report["items"] == []
+    assert report["totalItems"] == 7
+    assert mock_db.query_raw.await_count == 2
+
+
+def _turnover_row(index):
+    return {
+        "productId": f"prod{index}",
+        "productName": f"Produit {index}",
+        "productReference": f"REF-{index:05d}",
+        "currentStock": 10,
+        "totalQuantityOut": 20,
+        "openingStock": 30,
+        "closingStock": 10,
+        "averageStock": 20.0,
+        "turnoverRate": 1.0,
+        "totalItems": 5000,
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("catalog_size", [1, 100, 5000])
+async def test_get_stock_turnover_query_count_is_constant(mock_db, catalog_size):
+    mock_db.query_raw.return_value = [_turnover_row(i) for i in range(catalog_size)]
+    mock_db.product.find_many = AsyncMock()
+    mock_db.transaction.find_many = AsyncMock()
+
+    report = await get_stock_turnover(mock_db, datetime(2025, 1, 1), datetime(2025, 1, 31))
+
+    assert mock_db.query_raw.await_count == 1
+    mock_db.product.find_many.assert_not_awaited()
+    mock_db.transaction.find_many.assert_not_awaited()
+    assert len(report["items"]) == catalog_size
+    assert report["totalItems"] == 5000
+
+
+@pytest.mark.asyncio
+async def test_get_stock_turnover_paginates_in_sql(mock_db):
+    mock_db.query_raw.return_value = [_turnover_row(1)]
+
+    report = await get_stock_turnover(
+        mock_db, datetime(2025, 1, 1), datetime(2025, 1, 31), page=3, page_size=25, sort_by="name", sort_order="asc"
+    )
+
+    query, *params = mock_db.query_raw.await_args.args
+    assert 'ORDER BY lower("productName") ASC' in query
+    assert "LIMIT $3 OFFSET $4" in query
+    assert params[2:] == [25, 50]
+    assert report["page"] == 3 and report["pageSize"] == 25
+
+
+@pytest.mark.asyncio
+async def test_get_stock_turnover_casts_period_bounds(mock_db):
+    mock_db.query_raw.return_value = []
+
+    await get_stock_turnover(mock_db, datetime(2025, 1, 1), datetime(2025, 1, 31))
+
+    query = mock_db.query_raw.await_args.args[0]
+    assert '"createdAt" >= $1::timestamp(3)' in query
+    assert '"createdAt" <= $2::timestamp(3)' in query
+    assert '"createdAt" > $2::timestamp(3)' in query
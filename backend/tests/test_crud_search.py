@@ -0,0 +1,55 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.crud.search import MAX_SEARCH_LIMIT, search_products, search_requests
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.query_raw = AsyncMock()
+    return mock_db
+
+
+@pytest.mark.asyncio
+async def test_search_products_ranks_and_bounds_in_the_database(mock_db):
+    mock_db.query_raw.return_value = [
+        {
+            "id": "prod1", "name": "Stylo bleu", "reference": "STY-001", "categoryId": "cat1",
+            "quantity": 4, "minStock": 10, "cost": 0.5, "unit": "pcs", "location": None,
+            "categoryName": "Papeterie",
+        }
+    ]
+
+    products = await search_products(mock_db, " sty_ ", limit=1000, category_id="cat1")
+
+    query, *args = mock_db.query_raw.await_args.args
+    assert "$1 <% p.name" in query and "word_similarity($1, p.name)" in query
+    assert args == ["sty_", "sty\\_", "cat1", MAX_SEARCH_LIMIT]
+    assert query.rstrip().endswith("LIMIT $4")
+    assert products[0]["category"] == {"id": "cat1", "name": "Papeterie"}
+
+
+@pytest.mark.asyncio
+async def test_search_requests_uses_the_search_document_and_summarises(mock_db):
+    mock_db.query_raw.side_effect = [
+        [
+            {
+                "id": "req1", "requestNumber": "COM-2026-00001", "status": "TRANSMISE",
+                "requesterId": "chef1", "requesterName": "Chef", "requesterDepartment": None,
+                "approvedAt": None, "receivedAt": None,
+                "createdAt": "2026-10-01T09:00:00+00:00", "updatedAt": "2026-10-01T09:00:00+00:00",
+            }
+        ],
+        [{"requestId": "req1", "itemCount": 2, "totalRequestedQty": 5, "totalApprovedQty": None, "disputedItemCount": 0}],
+    ]
+
+    results = await search_requests(mock_db, "stylo", statuses=["TRANSMISE"], requester_id="chef1")
+
+    query, *args = mock_db.query_raw.await_args_list[0].args
+    assert 'r."searchText" ILIKE' in query and '$1 <% r."searchText"' in query
+    assert "RequestItem" not in query
+    assert args == ["stylo", "stylo", json.dumps(["TRANSMISE"]), "chef1", 20]
+    assert [(r["requestNumber"], r["itemCount"]) for r in results] == [("COM-2026-00001", 2)]
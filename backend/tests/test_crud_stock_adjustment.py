@@ -0,0 +1,30 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.api.auth import CurrentUser, UserRole
+from app.crud.stock_adjustment import create_stock_adjustment
+
+
+@pytest.mark.asyncio
+async def test_absolute_adjustment_locks_the_row_before_computing_the_delta():
+    admin = CurrentUser(id="admin1", email="admin@example.com", username="admin", name="Admin", role=UserRole.ADMIN)
+    transaction = MagicMock()
+    transaction.query_raw = AsyncMock(
+        side_effect=[
+            [{"quantity": 4}],  # lock
+            [{"id": "p1", "name": "A", "reference": "R1", "minStock": 1, "delta": 6,
+              "previousQuantity": 4, "quantity": 10, "found": True, "applied": True}],  # ledger
+        ]
+    )
+    transaction.stockadjustment.create = AsyncMock(return_value="adjustment")
+    db = MagicMock()
+    db.tx.return_value.__aenter__ = AsyncMock(return_value=transaction)
+    db.tx.return_value.__aexit__ = AsyncMock(return_value=None)
+
+    assert await create_stock_adjustment(db, admin, "p1", 10, "inventaire") == "adjustment"
+
+    lock_sql, product_id = transaction.query_raw.await_args_list[0].args
+    assert "FOR UPDATE" in lock_sql and product_id == "p1"
+    data = transaction.stockadjustment.create.await_args.kwargs["data"]
+    assert data["quantity"] == 6 and data["type"] == "ENTREE"
@@ -0,0 +1,85 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.crud.stock_status import (
+    LOW_STOCK_CONDITION,
+    build_stock_status_filters,
+    count_below_min_stock,
+    get_stock_status_page,
+)
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.query_raw = AsyncMock()
+    mock_db.product.find_many = AsyncMock()
+    return mock_db
+
+
+def _status_row(**overrides):
+    row = {
+        "id": "prod1",
+        "name": "Stylo",
+        "reference": "REF-001",
+        "quantity": 0,
+        "minStock": 10,
+        "unit": "pcs",
+        "location": None,
+        "categoryId": "cat1",
+        "categoryName": "Papeterie",
+        "status": "OUT_OF_STOCK",
+        "totalItems": 57,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_build_stock_status_filters_numbers_parameters():
+    where, params = build_stock_status_filters(
+        search="50%", category_id="cat1", status_filter="CRITICAL", low_stock_only=True
+    )
+    assert params == ["50\\%", "cat1"]
+    assert '"categoryId" = $2' in where
+    assert LOW_STOCK_CONDITION in where
+
+
+def test_build_stock_status_filters_unknown_status_matches_nothing():
+    where, params = build_stock_status_filters(status_filter="BOGUS")
+    assert where == "WHERE FALSE"
+    assert params == []
+
+
+@pytest.mark.asyncio
+async def test_get_stock_status_page_filters_in_the_database(mock_db):
+    mock_db.query_raw.return_value = [_status_row(), _status_row(id="prod2", status="CRITICAL", quantity=3)]
+
+    page = await get_stock_status_page(mock_db, page=3, page_size=2, low_stock_only=True)
+
+    mock_db.query_raw.assert_awaited_once()
+    mock_db.product.find_many.assert_not_awaited()
+    query, *args = mock_db.query_raw.await_args.args
+    assert LOW_STOCK_CONDITION in query
+    assert args == [2, 4]
+    assert page["totalItems"] == 57
+    assert page["items"][0]["category"] == {"id": "cat1", "name": "Papeterie"}
+    assert page["items"][1]["status"] == "CRITICAL"
+
+
+@pytest.mark.asyncio
+async def test_get_stock_status_page_past_the_end_counts_separately(mock_db):
+    mock_db.query_raw.side_effect = [[], [{"count": 5}]]
+
+    page = await get_stock_status_page(mock_db, page=10, page_size=20, category_id="cat1")
+
+    assert page["items"] == []
+    assert page["totalItems"] == 5
+    assert mock_db.query_raw.await_args.args[1:] == ("cat1",)
+
+
+@pytest.mark.asyncio
+async def test_count_below_min_stock(mock_db):
+    mock_db.query_raw.return_value = [{"count": 12}]
+    assert await count_below_min_stock(mock_db) == 12
+    assert 'quantity < p."minStock"' in mock_db.query_raw.await_args.args[0]
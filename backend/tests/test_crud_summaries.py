@@ -0,0 +1,108 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.crud.summaries import (
+    get_pending_stock_receipt_page,
+    get_request_summary_page,
+    get_user_summary_page,
+)
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.query_raw = AsyncMock()
+    return mock_db
+
+
+def _request_row(request_id="req1", **overrides):
+    row = {
+        "id": request_id,
+        "requestNumber": "COM-2026-00001",
+        "status": "TRANSMISE",
+        "requesterId": "chef1",
+        "requesterName": "Chef Service",
+        "requesterDepartment": "RH",
+        "approvedAt": None,
+        "receivedAt": None,
+        "createdAt": "2026-10-01T09:00:00+00:00",
+        "updatedAt": "2026-10-01T09:00:00+00:00",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.mark.asyncio
+async def test_request_summary_page_orders_and_paginates_in_the_database(mock_db):
+    mock_db.query_raw.side_effect = [
+        [_request_row("req1"), _request_row("req2")],
+        [{"count": 41}],
+        [{"requestId": "req1", "itemCount": 3, "totalRequestedQty": 12, "totalApprovedQty": None, "disputedItemCount": 0}],
+    ]
+
+    page = await get_request_summary_page(
+        mock_db, page=2, page_size=2, statuses=["TRANSMISE", "LITIGE_RECEPTION"], search="stylo"
+    )
+
+    query, *args = mock_db.query_raw.await_args_list[0].args
+    assert 'ORDER BY r."createdAt" DESC, r.id DESC LIMIT $3 OFFSET $4' in query
+    assert args == [json.dumps(["TRANSMISE", "LITIGE_RECEPTION"]), "stylo", 2, 2]
+    assert 'r."searchText" ILIKE' in query
+    # Totals of the items are only computed for the rows of the page
+    assert mock_db.query_raw.await_args_list[2].args[1] == json.dumps(["req1", "req2"])
+
+    assert page["totalItems"] == 41
+    first, second = page["items"]
+    assert first["requester"] == {"name": "Chef Service", "department": "RH"}
+    assert (first["itemCount"], first["totalRequestedQty"], first["totalApprovedQty"]) == (3, 12, None)
+    assert (second["itemCount"], second["totalRequestedQty"]) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_request_summary_page_of_a_requester_ordered_by_approval(mock_db):
+    mock_db.query_raw.side_effect = [[], []]
+
+    page = await get_request_summary_page(
+        mock_db, requester_id="chef1", search="COM", order_by="approvedAt", count_mode="exact"
+    )
+
+    query, *args = mock_db.query_raw.await_args_list[0].args
+    assert 'r."approvedAt" DESC' in query
+    assert args[:2] == ["chef1", "COM"]
+    # Short first page: the total is known without a COUNT
+    assert mock_db.query_raw.await_count == 1
+    assert page == {"items": [], "totalItems": 0, "page": 1, "pageSize": 20}
+
+
+@pytest.mark.asyncio
+async def test_pending_stock_receipt_page_without_count(mock_db):
+    mock_db.query_raw.return_value = [
+        {
+            "id": "sr1", "productId": "prod1", "productName": "Stylo", "productReference": "REF-001",
+            "productUnit": "pcs", "quantity": 20, "supplierName": "Fournisseur", "batchNumber": None,
+            "requestedByName": "Magasinier", "requestedByDepartment": None, "status": "PENDING",
+            "createdAt": "2026-10-01T09:00:00+00:00",
+        }
+    ] * 5
+
+    page = await get_pending_stock_receipt_page(mock_db, page_size=5, count_mode="none")
+
+    mock_db.query_raw.assert_awaited_once()
+    assert "s.status = 'PENDING'" in mock_db.query_raw.await_args.args[0]
+    assert page["totalItems"] is None
+    assert page["items"][0]["product"] == {"id": "prod1", "name": "Stylo", "reference": "REF-001", "unit": "pcs"}
+    assert page["items"][0]["supplierName"] == "Fournisseur"
+
+
+@pytest.mark.asyncio
+async def test_user_summary_page_never_reads_passwords(mock_db):
+    mock_db.query_raw.side_effect = [[{"id": "u1"}] * 2, [{"count": 7}]]
+
+    page = await get_user_summary_page(mock_db, page=1, page_size=2, roles=["DAF"])
+
+    query, *args = mock_db.query_raw.await_args_list[0].args
+    assert "password" not in query and "refreshToken" not in query
+    assert args == [json.dumps(["DAF"]), 2, 0]
+    assert page["totalItems"] == 7
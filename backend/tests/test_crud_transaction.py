@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.crud import transaction as crud_transaction
+from app.crud.transaction import decode_cursor, encode_cursor, get_transaction_page
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.transaction.find_many = AsyncMock()
+    mock_db.transaction.count = AsyncMock(return_value=1234)
+    mock_db.query_raw = AsyncMock()
+    crud_transaction._count_cache.clear()
+    return mock_db
+
+
+def _transaction(index):
+    return SimpleNamespace(
+        id=f"tx{index:03d}",
+        createdAt=datetime(2025, 11, 20, 10, 0, index, tzinfo=timezone.utc),
+    )
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 11, 20, 10, 0, 0, 123000, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(created_at, "tx1")) == (created_at, "tx1")
+
+
+def test_invalid_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_first_page_returns_next_cursor(mock_db):
+    mock_db.transaction.find_many.return_value = [_transaction(i) for i in range(3)]
+
+    page = await get_transaction_page(mock_db, {"productId": "prod1"}, page_size=2)
+
+    kwargs = mock_db.transaction.find_many.await_args.kwargs
+    assert kwargs["take"] == 3
+    assert kwargs["order"] == [{"createdAt": "desc"}, {"id": "desc"}]
+    assert len(page["items"]) == 2
+    assert decode_cursor(page["nextCursor"]) == (_transaction(1).createdAt, "tx001")
+    assert page["totalItems"] == 1234
+
+
+@pytest.mark.asyncio
+async def test_after_cursor_uses_keyset_instead_of_offset(mock_db):
+    mock_db.transaction.find_many.return_value = [_transaction(0)]
+    cursor = encode_cursor(_transaction(5).createdAt, "tx005")
+
+    page = await get_transaction_page(
+        mock_db, {"productId": "prod1"}, page=50, page_size=2, after=cursor
+    )
+
+    kwargs = mock_db.transaction.find_many.await_args.kwargs
+    assert kwargs["skip"] == 0
+    keyset = kwargs["where"]["AND"][1]["OR"]
+    assert keyset[0] == {"createdAt": {"lt": _transaction(5).createdAt}}
+    assert keyset[1] == {"createdAt": _transaction(5).createdAt, "id": {"lt": "tx005"}}
+    # The total ignores the cursor.
+    mock_db.transaction.count.assert_awaited_once_with(where={"productId": "prod1"})
+    assert page["nextCursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_count_modes(mock_db):
+    mock_db.transaction.find_many.return_value = []
+
+    page = await get_transaction_page(mock_db, {}, count_mode="none")
+    assert page["totalItems"] is None
+    mock_db.transaction.count.assert_not_awaited()
+
+    mock_db.query_raw.return_value = [{"estimate": 5600}]
+    page = await get_transaction_page(mock_db, {}, count_mode="approximate")
+    assert page["totalItems"] == 5600
+    mock_db.transaction.count.assert_not_awaited()
+
+    for _ in range(2):
+        page = await get_transaction_page(mock_db, {"userId": "u1"}, count_mode="approximate")
+    assert page["totalItems"] == 1234
+    mock_db.transaction.count.assert_awaited_once()
@@ -0,0 +1,25 @@
+import pytest
+
+from app import database
+from app.database import build_datasource_url, get_client, get_pool_status
+
+
+def test_build_datasource_url_adds_pool_parameters():
+    url = build_datasource_url("postgresql://user:pw@localhost:5432/stockdb", 5, 20)
+    assert url == "postgresql://user:pw@localhost:5432/stockdb?connection_limit=5&pool_timeout=20"
+
+
+def test_build_datasource_url_keeps_existing_parameters():
+    url = build_datasource_url(
+        "postgresql://user:pw@localhost/stockdb?schema=public&connection_limit=3", 10, None
+    )
+    assert "connection_limit=3" in url
+    assert "schema=public" in url
+    assert "pool_timeout" not in url
+
+
+def test_get_client_requires_connection(monkeypatch):
+    monkeypatch.setattr(database, "_client", None)
+    with pytest.raises(RuntimeError):
+        get_client()
+    assert get_pool_status()["connected"] is False
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+# The generator needs numpy: imported after the skip check
+benchmark_dataset = pytest.importorskip("benchmarks.dataset")
+
+SCALE = {**benchmark_dataset.SCALES["small"], "products": 200, "requests": 500, "transactions": 10_000}
+
+
+def _generate(seed=1):
+    dataset = benchmark_dataset.generate(SCALE, seed, months=12, end=datetime(2026, 6, 30), password_hash="hash")
+    benchmark_dataset._normalize(dataset)
+    return dataset
+
+
+def test_every_table_is_generated_with_aligned_columns():
+    dataset = _generate()
+    for table in benchmark_dataset.TABLES:
+        names, columns = dataset.tables[table]
+        assert {len(columns[name]) for name in names} == {dataset.rows(table)}
+    assert dataset.rows("Transaction") >= SCALE["transactions"]
+    # Accounts of seed.py, used by the load test
+    usernames = set(dataset.tables["User"][1]["username"])
+    assert {"chef.service", "daf", "magasinier", "admin"} <= usernames
+
+
+def test_product_quantity_is_the_sum_of_its_movements_and_never_negative():
+    dataset = _generate()
+    products = dataset.tables["Product"][1]
+    transactions = dataset.tables["Transaction"][1]
+    balance = {product_id: 0 for product_id in products["id"]}
+    lowest = 0
+    for product_id, kind, quantity in zip(transactions["productId"], transactions["type"], transactions["quantity"]):
+        balance[product_id] += quantity if kind == "ENTREE" else -quantity
+        lowest = min(lowest, balance[product_id])
+
+    assert lowest == 0
+    assert [balance[product_id] for product_id in products["id"]] == products["quantity"].tolist()
+    assert (products["quantity"] < products["minStock"]).any()
+
+
+def test_transactions_are_chronological_and_request_numbers_follow_counters():
+    dataset = _generate()
+    created = dataset.tables["Transaction"][1]["createdAt"]
+    assert (np.diff(created.astype("datetime64[s]").astype("int64")) >= 0).all()
+
+    numbers = dataset.tables["Request"][1]["requestNumber"]
+    counters = dataset.tables["Counter"][1]
+    com = {year: last for kind, year, last in zip(counters["type"], counters["year"], counters["lastNumber"]) if kind == "COM"}
+    assert sum(com.values()) == len(numbers) == len(set(numbers))
+
+
+def test_generation_is_deterministic():
+    first, second = _generate(seed=5), _generate(seed=5)
+    for table in ("Product", "Request", "Transaction"):
+        assert first.records(table, 0, 50) == second.records(table, 0, 50)
+    assert first.records("Transaction", 0, 50) != _generate(seed=6).records("Transaction", 0, 50)
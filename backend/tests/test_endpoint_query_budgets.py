@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.api.auth import CurrentUser, UserRole
+from app.api.routes.purchase_order import auto_generate_purchase_orders
+from app.crud import summaries
+from app.crud.reports import get_stock_report, get_stock_turnover
+
+
+def _rows(number, **columns):
+    return [{"id": f"row{i}", **columns} for i in range(number)]
+
+
+@pytest.mark.asyncio
+async def test_stock_report_is_one_query_per_page(query_budget, recording_db):
+    db = recording_db(_rows(10, totalItems=500))
+    with query_budget(max_queries=1):
+        report = await get_stock_report(db, limit=10)
+    assert len(report["items"]) == 10
+
+
+@pytest.mark.asyncio
+async def test_stock_turnover_is_one_query_for_the_whole_catalog(query_budget, recording_db):
+    db = recording_db(_rows(200, averageStock=1, turnoverRate=0.5))
+    end = datetime.now()
+    with query_budget(max_queries=1):
+        report = await get_stock_turnover(db, end - timedelta(days=30), end)
+    assert len(report["items"]) == 200
+
+
+@pytest.mark.asyncio
+async def test_auto_generated_purchase_orders_cost_one_lookup_plus_one_write_each(query_budget, recording_db):
+    db = recording_db(_rows(5, name="Vis", quantity=1, minStock=10))
+    user = CurrentUser(id="mag1", username="mag1", name="Magasinier", role=UserRole.MAGASINIER)
+    with patch("app.api.routes.purchase_order.manager", new_callable=MagicMock) as manager:
+        manager.send_personal_message = AsyncMock()
+        with query_budget(max_queries=1 + 5, max_repeats=5):
+            generated = await auto_generate_purchase_orders(current_user=user, db=db)
+    assert len(generated) == 5
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "page_function, max_queries",
+    [
+        (summaries.get_request_summary_page, 3),  # page, count, item totals
+        (summaries.get_pending_stock_receipt_page, 2),  # page, count
+        (summaries.get_pending_stock_adjustment_page, 2),
+        (summaries.get_user_summary_page, 2),
+    ],
+)
+async def test_summary_pages_do_not_depend_on_the_page_size(query_budget, recording_db, page_function, max_queries):
+    db = recording_db(_rows(100, count=1000))
+    with query_budget(max_queries=max_queries, max_repeats=1):
+        page = await page_function(db, page=1, page_size=100)
+    assert len(page["items"]) == 100
+
+
+@pytest.mark.asyncio
+async def test_budget_fails_on_one_query_per_row(query_budget, recording_db):
+    db = recording_db(_rows(3))
+    with pytest.raises(AssertionError, match="Query budget exceeded"):
+        with query_budget(max_queries=1):
+            for row in await db.query_raw('SELECT "id" FROM "Product"'):
+                await db.product.find_unique(where={"id": row["id"]})
@@ -0,0 +1,58 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.auth import CurrentUser, UserRole, get_current_user
+from app.api.routes import health
+from main import app
+
+client = TestClient(app)
+
+ADMIN_ONLY = [
+    "/api/metrics",
+    "/api/health/auth",
+    "/api/health/websockets",
+    "/api/health/table-versions",
+    "/api/health/catalog",
+]
+
+
+@pytest.fixture
+def as_user():
+    def login(role):
+        app.dependency_overrides[get_current_user] = lambda: CurrentUser(
+            id="u1", email="u1@example.com", username="u1", name="U1", role=role
+        )
+
+    yield login
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_liveness_is_public():
+    assert client.get("/api/health").status_code == 200
+
+
+@pytest.mark.parametrize("path", ADMIN_ONLY)
+def test_metrics_require_a_token(path):
+    assert client.get(path).status_code == 401
+
+
+@pytest.mark.parametrize("path", ADMIN_ONLY)
+def test_metrics_are_reserved_to_admins(path, as_user):
+    as_user(UserRole.MAGASINIER)
+    assert client.get(path).status_code == 403
+    as_user(UserRole.ADMIN)
+    assert client.get(path).status_code == 200
+
+
+def test_readiness_hides_the_database_error(monkeypatch, caplog):
+    failing = MagicMock()
+    failing.query_raw = AsyncMock(side_effect=RuntimeError("password authentication failed for user stock"))
+    monkeypatch.setattr(health, "get_client", lambda: failing)
+
+    response = client.get("/api/health/ready")
+
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Database unreachable"
+    assert "password authentication failed" in caplog.text
@@ -0,0 +1,55 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.utils.loader import ModelLoader
+
+
+def _delegate(existing_ids):
+    delegate = MagicMock()
+
+    async def find_many(where, include=None):
+        return [MagicMock(id=id_) for id_ in where["id"]["in"] if id_ in existing_ids]
+
+    delegate.find_many = AsyncMock(side_effect=find_many)
+    return delegate
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("line_count", [1, 5, 40])
+async def test_load_many_issues_one_query_whatever_the_line_count(line_count):
+    ids = [f"p{i}" for i in range(line_count)]
+    delegate = _delegate(set(ids))
+
+    records = await ModelLoader(delegate).load_many(ids + ids)
+
+    assert delegate.find_many.await_count == 1
+    assert delegate.find_many.await_args.kwargs["where"] == {"id": {"in": ids}}
+    assert [records[id_].id for id_ in ids] == ids
+
+
+@pytest.mark.asyncio
+async def test_loaded_records_are_memoized_and_missing_ids_are_none():
+    delegate = _delegate({"p1"})
+    loader = ModelLoader(delegate)
+
+    first = await loader.load_many(["p1", "missing"])
+    second = await loader.load_many(["p1", "missing"])
+
+    assert first["missing"] is None
+    assert second["p1"] is first["p1"]
+    assert delegate.find_many.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_are_batched():
+    delegate = _delegate({"p1", "p2", "p3"})
+    loader = ModelLoader(delegate, include={"category": True})
+
+    records = await asyncio.gather(loader.load("p1"), loader.load("p2"), loader.load("p1"), loader.load("p3"))
+
+    assert [record.id for record in records] == ["p1", "p2", "p1", "p3"]
+    delegate.find_many.assert_awaited_once_with(
+        where={"id": {"in": ["p1", "p2", "p3"]}}, include={"category": True}
+    )
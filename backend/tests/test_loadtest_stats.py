@@ -0,0 +1,41 @@
+from benchmarks.loadtest.stats import Recorder, compare, percentile
+
+
+def test_percentile_uses_the_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]  # 1..100 ms
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 99) == 0.099
+    assert percentile([], 95) == 0.0
+
+
+def test_recorder_summarizes_per_endpoint():
+    recorder = Recorder()
+    for latency in (0.010, 0.020, 0.030):
+        recorder.record("GET /api/products/", latency, 200, 'app;dur=9.0, db;dur=4.0;desc="2 queries"')
+    recorder.record("PUT /api/requests/{id}/approve", 0.05, 400, ok=True)
+    recorder.record("PUT /api/requests/{id}/approve", 0.05, None)
+    recorder.count("websocket_messages", 3)
+    recorder.duration = 2.0
+
+    report = recorder.report({"seed": 1})
+
+    products = report["endpoints"]["GET /api/products/"]
+    assert products["requests"] == 3
+    assert products["rps"] == 1.5
+    assert products["p50_ms"] == 20.0
+    assert products["db_p50_ms"] == 4.0
+    approve = report["endpoints"]["PUT /api/requests/{id}/approve"]
+    assert approve["errors"] == 1  # the 400 was expected, the failed connection was not
+    assert report["totalRequests"] == 5
+    assert report["counters"] == {"websocket_messages": 3}
+
+
+def test_compare_flags_p95_regressions():
+    baseline = {"endpoints": {"GET /a": {"p95_ms": 100.0, "rps": 10}, "GET /b": {"p95_ms": 50.0, "rps": 5}}}
+    report = {"endpoints": {"GET /a": {"p95_ms": 130.0, "rps": 9}, "GET /c": {"p95_ms": 1.0, "rps": 1}}}
+
+    lines = compare(report, baseline, max_regression=0.2)
+
+    assert lines[0].startswith("REGRESSION GET /a")
+    assert lines[1].startswith("new        GET /c")
+    assert lines[2] == "missing    GET /b"
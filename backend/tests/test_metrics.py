@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app import metrics as metrics_module
+from app.metrics import (
+    UNMATCHED_ROUTE,
+    Histogram,
+    QueryBudget,
+    RouteMetrics,
+    TimingMiddleware,
+    current_request_stats,
+    instrument_client,
+    metrics,
+)
+
+
+class FakeClient:
+    """Stands for the Prisma client: actions go through `_execute`."""
+
+    calls = 0
+
+    async def _execute(self, *, method, arguments, model=None, root_selection=None):
+        FakeClient.calls += 1
+        await asyncio.sleep(0)
+        return {"data": {"result": []}}
+
+
+instrument_client(FakeClient)
+
+
+def _app(client=None, status=200, route_path="/api/products/{product_id}", queries=0):
+    async def app(scope, receive, send):
+        scope["route"] = SimpleNamespace(path_format=route_path) if route_path else None
+        for _ in range(queries):
+            await client._execute(method="query_raw", arguments={"query": "SELECT 1"})
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app
+
+
+async def _call(app, path="/api/products/p1", method="GET"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": path, "headers": []}, receive, send)
+    return sent
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [("0.1", 1), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(4.25)
+
+
+@pytest.mark.asyncio
+async def test_client_queries_are_counted_for_the_current_request_only():
+    client = FakeClient()
+    FakeClient.calls = 0
+    instrument_client(FakeClient)  # idempotent
+
+    await client._execute(method="query_raw", arguments={"query": "SELECT 1"})  # outside of a request
+    await _call(TimingMiddleware(_app(client, queries=3)))
+
+    assert FakeClient.calls == 4
+    key = ("GET", "/api/products/{product_id}", "2xx")
+    assert metrics.db_queries[key] == 3
+    assert current_request_stats() is None
+
+
+@pytest.mark.asyncio
+async def test_latency_is_recorded_per_route_template():
+    middleware = TimingMiddleware(_app())
+    await _call(middleware, path="/api/products/p1")
+    await _call(middleware, path="/api/products/p2")
+
+    assert list(metrics.latency) == [("GET", "/api/products/{product_id}", "2xx")]
+    assert metrics.latency[("GET", "/api/products/{product_id}", "2xx")].count == 2
+    assert metrics.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_unmatched_paths_share_one_series():
+    middleware = TimingMiddleware(_app(status=404, route_path=None))
+    await _call(middleware, path="/wp-admin")
+    await _call(middleware, path="/.env")
+
+    assert list(metrics.latency) == [("GET", UNMATCHED_ROUTE, "4xx")]
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_is_added():
+    sent = await _call(TimingMiddleware(_app(FakeClient(), queries=2)))
+
+    headers = dict(sent[0]["headers"])
+    assert b"app;dur=" in headers[b"server-timing"]
+    assert b'desc="2 queries"' in headers[b"server-timing"]
+
+
+@pytest.mark.asyncio
+async def test_query_budget_violation_is_logged_and_counted(caplog):
+    middleware = TimingMiddleware(
+        _app(FakeClient(), queries=5), log_sample_rate=0, query_budget=QueryBudget(max_repeats=3)
+    )
+    await _call(middleware)
+
+    assert metrics.budget_violations[("GET", "/api/products/{product_id}", "2xx")] == 1
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("query budget exceeded" in m and "5x query_raw: SELECT 1" in m for m in messages)
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_recorded_as_5xx_and_logged(caplog):
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await _call(TimingMiddleware(failing_app, log_sample_rate=0))
+
+    assert ("GET", UNMATCHED_ROUTE, "5xx") in metrics.latency
+    assert any("status=500" in record.getMessage() for record in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_requests_are_not_logged_outside_of_the_sample(caplog, monkeypatch):
+    caplog.set_level(logging.INFO, logger="app.requests")
+    monkeypatch.setattr(metrics_module.random, "random", lambda: 0.5)
+    await _call(TimingMiddleware(_app(), log_sample_rate=0.1))
+    assert not caplog.records
+
+    await _call(TimingMiddleware(_app(), log_sample_rate=0.9))
+    assert len(caplog.records) == 1
+
+
+@pytest.mark.asyncio
+async def test_websocket_scopes_are_passed_through():
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(scope["type"])
+
+    await TimingMiddleware(app)({"type": "websocket", "path": "/api/ws/t"}, None, None)
+
+    assert seen == ["websocket"]
+    assert not metrics.latency
+
+
+def test_prometheus_rendering():
+    registry = RouteMetrics()
+    stats = metrics_module.RequestStats()
+    stats.db_queries, stats.db_time = 4, 0.02
+    registry.record("GET", '/api/a"b', 200, 0.03, stats)
+
+    text = registry.render_prometheus()
+
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/a\\"b",status="2xx",le="0.05"} 1' in text
+    assert 'http_request_db_queries_total{method="GET",route="/api/a\\"b",status="2xx"} 4' in text
+    assert text.endswith("\n")
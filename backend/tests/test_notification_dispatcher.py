@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.notification_dispatcher import NotificationDispatcher
+from database.generated.prisma.enums import UserRole
+
+
+def _user(user_id, role):
+    return {"id": user_id, "role": role.value}
+
+
+def _product(quantity, min_stock=10):
+    return SimpleNamespace(id="prod1", name="Stylo", reference="REF-001", quantity=quantity, minStock=min_stock)
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.query_raw = AsyncMock(
+        return_value=[
+            _user("admin1", UserRole.ADMIN),
+            _user("daf1", UserRole.DAF),
+            _user("daf2", UserRole.DAF),
+            _user("mag1", UserRole.MAGASINIER),
+        ]
+    )
+    with patch("app.services.notification_dispatcher.get_client", return_value=mock_db):
+        yield mock_db
+
+
+@pytest.fixture(name="mock_manager")
+def mock_manager_fixture():
+    with patch("app.services.notification_dispatcher.manager") as mock:
+        mock.send_to_users = AsyncMock()
+        mock.send_personal_message = AsyncMock()
+        yield mock
+
+
+@pytest.mark.asyncio
+async def test_role_index_is_cached_until_invalidated(mock_db, mock_manager):
+    dispatcher = NotificationDispatcher()
+
+    assert sorted(await dispatcher.user_ids_for_roles(["DAF"])) == ["daf1", "daf2"]
+    assert await dispatcher.user_ids_for_roles([UserRole.MAGASINIER]) == ["mag1"]
+    mock_db.query_raw.assert_awaited_once()
+    assert mock_db.query_raw.await_args.args[0] == 'SELECT "id", "role"::text AS "role" FROM "User"'
+
+    dispatcher.invalidate_roles()
+    await dispatcher.user_ids_for_roles([UserRole.DAF])
+    assert mock_db.query_raw.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_notify_roles_runs_in_background(mock_db, mock_manager):
+    dispatcher = NotificationDispatcher()
+
+    dispatcher.notify_roles({"type": "daf_approval_request", "message": "m"}, [UserRole.DAF])
+    mock_manager.send_to_users.assert_not_awaited()
+    await dispatcher.drain()
+
+    message, user_ids = mock_manager.send_to_users.await_args.args
+    assert message["type"] == "daf_approval_request"
+    assert sorted(user_ids) == ["daf1", "daf2"]
+
+
+@pytest.mark.asyncio
+async def test_low_stock_alerts_are_deduplicated(mock_db, mock_manager):
+    dispatcher = NotificationDispatcher(low_stock_window=300)
+
+    dispatcher.notify_low_stock(_product(quantity=4))
+    dispatcher.notify_low_stock(_product(quantity=3))
+    await dispatcher.drain()
+    assert mock_manager.send_to_users.await_count == 1
+    assert "(4/10)" in mock_manager.send_to_users.await_args.args[0]["message"]
+
+    # Back above the threshold: the next drop alerts again.
+    dispatcher.notify_low_stock(_product(quantity=20))
+    dispatcher.notify_low_stock(_product(quantity=2))
+    await dispatcher.drain()
+    assert mock_manager.send_to_users.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_no_alert_above_threshold(mock_db, mock_manager):
+    dispatcher = NotificationDispatcher()
+    dispatcher.notify_low_stock(_product(quantity=11))
+    await dispatcher.drain()
+    mock_manager.send_to_users.assert_not_awaited()
+    mock_db.query_raw.assert_not_awaited()
@@ -0,0 +1,101 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.notification_outbox import NotificationOutbox
+from database.generated.prisma.enums import UserRole
+
+
+def _row(row_id, message, user_ids=(), roles=(), attempts=1):
+    return {
+        "id": row_id,
+        "message": json.dumps(message),
+        "userIds": json.dumps(list(user_ids)),
+        "roles": json.dumps(list(roles)),
+        "attempts": attempts,
+    }
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.execute_raw = AsyncMock(return_value=1)
+    mock_db.query_raw = AsyncMock(return_value=[])
+    return mock_db
+
+
+@pytest.fixture(name="mock_manager")
+def mock_manager_fixture():
+    with patch("app.services.notification_outbox.manager") as mock:
+        mock.send_to_users = AsyncMock()
+        yield mock
+
+
+@pytest.fixture(name="mock_dispatcher")
+def mock_dispatcher_fixture():
+    with patch("app.services.notification_outbox.dispatcher") as mock:
+        mock.user_ids_for_roles = AsyncMock(return_value=["daf1", "daf2"])
+        yield mock
+
+
+@pytest.mark.asyncio
+async def test_enqueue_writes_in_the_given_transaction(mock_db):
+    outbox = NotificationOutbox()
+
+    await outbox.enqueue(
+        mock_db, {"type": "t", "message": "m"}, user_ids=["u1", "u1", None], roles=[UserRole.DAF]
+    )
+
+    args = mock_db.execute_raw.await_args.args
+    assert 'INSERT INTO "NotificationOutbox"' in args[0]
+    assert json.loads(args[2]) == {"type": "t", "message": "m"}
+    assert json.loads(args[3]) == ["u1"]
+    assert json.loads(args[4]) == ["DAF"]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_without_recipient_writes_nothing(mock_db):
+    await NotificationOutbox().enqueue(mock_db, {"type": "t"}, user_ids=[None])
+    mock_db.execute_raw.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_sends_claimed_batch_and_marks_it_sent(mock_db, mock_manager, mock_dispatcher):
+    mock_db.query_raw.return_value = [
+        _row("n1", {"type": "a"}, user_ids=["u1"]),
+        _row("n2", {"type": "b"}, user_ids=["u2"], roles=["DAF"]),
+    ]
+    outbox = NotificationOutbox(batch_size=50)
+
+    assert await outbox.dispatch_pending(mock_db) == 2
+
+    claim_args = mock_db.query_raw.await_args.args
+    assert "FOR UPDATE SKIP LOCKED" in claim_args[0]
+    assert claim_args[1] == 50
+    mock_manager.send_to_users.assert_any_await({"type": "a"}, ["u1"])
+    mock_manager.send_to_users.assert_any_await({"type": "b"}, ["u2", "daf1", "daf2"])
+    mock_dispatcher.user_ids_for_roles.assert_awaited_once_with(["DAF"])
+    # One UPDATE marks the whole batch as sent.
+    mock_db.execute_raw.assert_awaited_once()
+    sql, ids = mock_db.execute_raw.await_args.args
+    assert '"sentAt" = CURRENT_TIMESTAMP' in sql
+    assert json.loads(ids) == ["n1", "n2"]
+    assert outbox.notifications_sent == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_notification_is_rescheduled_with_backoff(mock_db, mock_manager, mock_dispatcher):
+    mock_db.query_raw.return_value = [
+        _row("n1", {"type": "a"}, user_ids=["u1"], attempts=3),
+        _row("n2", {"type": "b"}, user_ids=["u2"]),
+    ]
+    mock_manager.send_to_users.side_effect = [RuntimeError("boom"), None]
+    outbox = NotificationOutbox()
+
+    await outbox.dispatch_pending(mock_db)
+
+    failed_call, sent_call = mock_db.execute_raw.await_args_list
+    assert failed_call.args[1:] == ("n1", "boom", 8)
+    assert json.loads(sent_call.args[1]) == ["n2"]
+    assert outbox.notifications_failed == 1
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.pdf_service import PDFCache, PDFRenderPool
+
+
+@pytest.fixture(name="render_pool")
+def render_pool_fixture():
+    # Threads instead of processes: the tests only exercise the pool's bookkeeping.
+    pool = PDFRenderPool(pool_size=1, queue_depth=0, timeout=1, cache_max_bytes=1024)
+    executor = ThreadPoolExecutor(max_workers=1)
+    pool._get_executor = lambda: executor
+    yield pool
+    executor.shutdown(wait=False)
+
+
+def test_pdf_cache_evicts_least_recently_used():
+    cache = PDFCache(max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"
+    cache.put("c", b"12345")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.size == 10
+
+
+def test_pdf_cache_key_depends_on_content():
+    assert PDFCache.key_for("delivery_note", "<p>1</p>") == PDFCache.key_for("delivery_note", "<p>1</p>")
+    assert PDFCache.key_for("delivery_note", "<p>1</p>") != PDFCache.key_for("delivery_note", "<p>2</p>")
+
+
+@pytest.mark.asyncio
+async def test_render_serves_unchanged_documents_from_cache(render_pool):
+    renderer = MagicMock(side_effect=lambda html: html.encode())
+    with patch("app.services.pdf_service.render_html_to_pdf", renderer):
+        first = await render_pool.render("delivery_note", "<p>BL-1</p>")
+        second = await render_pool.render("delivery_note", "<p>BL-1</p>")
+        await render_pool.render("delivery_note", "<p>BL-1 modifié</p>")
+
+    assert first == second == b"<p>BL-1</p>"
+    assert renderer.call_count == 2
+    assert render_pool.cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_render_rejects_when_queue_is_full(render_pool):
+    release = threading.Event()
+
+    def slow_render(html):
+        release.wait(1)
+        return b"%PDF"
+
+    with patch("app.services.pdf_service.render_html_to_pdf", slow_render):
+        first = asyncio.ensure_future(render_pool.render("purchase_order", "<p>BC-1</p>"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as exc_info:
+            await render_pool.render("purchase_order", "<p>BC-2</p>")
+        release.set()
+        assert await first == b"%PDF"
+
+    assert exc_info.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_render_times_out(render_pool):
+    render_pool.timeout = 0.05
+    release = threading.Event()
+
+    with patch("app.services.pdf_service.render_html_to_pdf", lambda html: release.wait(1) and b""):
+        with pytest.raises(HTTPException) as exc_info:
+            await render_pool.render("purchase_order", "<p>BC-3</p>")
+        release.set()
+
+    assert exc_info.value.status_code == 504
+
+
+@pytest.mark.asyncio
+async def test_timed_out_render_keeps_its_slot_until_the_process_finishes(render_pool):
+    render_pool.timeout = 0.05
+    release = threading.Event()
+
+    def slow_render(html):
+        release.wait(1)
+        return b"%PDF"
+
+    with patch("app.services.pdf_service.render_html_to_pdf", slow_render):
+        with pytest.raises(HTTPException):
+            await render_pool.render("purchase_order", "<p>BC-4</p>")
+        # The render is still running: the pool is still full
+        with pytest.raises(HTTPException) as exc_info:
+            await render_pool.render("purchase_order", "<p>BC-5</p>")
+        assert exc_info.value.status_code == 503
+
+        release.set()
+        await asyncio.sleep(0.05)
+        render_pool.timeout = 1
+        assert await render_pool.render("purchase_order", "<p>BC-5</p>") == b"%PDF"
+
+
+@pytest.mark.asyncio
+async def test_uncached_render_is_not_stored(render_pool):
+    renderer = MagicMock(side_effect=lambda html: html.encode())
+    with patch("app.services.pdf_service.render_html_to_pdf", renderer):
+        await render_pool.render("stock_status", "<p>état</p>", cache=False)
+        await render_pool.render("stock_status", "<p>état</p>", cache=False)
+
+    assert renderer.call_count == 2
+    assert render_pool.cache.stats()["entries"] == 0
@@ -0,0 +1,56 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.api.auth import CurrentUser, UserRole
+from app.api.routes import product as product_routes
+from app.api.schemas import ProductUpdate
+
+
+@pytest.fixture(name="transaction")
+def transaction_fixture():
+    transaction = MagicMock()
+    transaction.query_raw = AsyncMock(
+        side_effect=[
+            [{"quantity": 12}],  # lock
+            [{"id": "p1", "name": "A", "reference": "R1", "minStock": 1, "delta": -5,
+              "previousQuantity": 12, "quantity": 7, "found": True, "applied": True}],  # ledger
+        ]
+    )
+    transaction.product.update = AsyncMock(return_value=MagicMock(quantity=7, minStock=1))
+    transaction.product.find_unique = AsyncMock(return_value=MagicMock(quantity=7, minStock=1))
+    return transaction
+
+
+@pytest.fixture(name="db")
+def db_fixture(transaction):
+    db = MagicMock()
+    db.tx.return_value.__aenter__ = AsyncMock(return_value=transaction)
+    db.tx.return_value.__aexit__ = AsyncMock(return_value=None)
+    with patch.object(product_routes, "dispatcher"), patch.object(product_routes, "ProductFullResponse"):
+        yield db
+
+
+MAGASINIER = CurrentUser(id="mag1", email="mag@example.com", username="mag", name="Mag", role=UserRole.MAGASINIER)
+
+
+@pytest.mark.asyncio
+async def test_quantity_change_is_recorded_as_a_ledger_movement(db, transaction):
+    await product_routes.update_product("p1", ProductUpdate(quantity=7, location="B2"), db=db, current_user=MAGASINIER)
+
+    lock_sql, product_id = transaction.query_raw.await_args_list[0].args
+    assert "FOR UPDATE" in lock_sql and product_id == "p1"
+    ledger_payload = transaction.query_raw.await_args_list[1].args[1]
+    assert '"delta": -5' in ledger_payload and '"source": "ADJUSTMENT"' in ledger_payload
+    # The quantity itself is never written directly
+    assert transaction.product.update.await_args.kwargs["data"] == {"location": "B2"}
+
+
+@pytest.mark.asyncio
+async def test_unchanged_quantity_writes_no_movement(db, transaction):
+    transaction.query_raw.side_effect = [[{"quantity": 7}]]
+
+    await product_routes.update_product("p1", ProductUpdate(quantity=7), db=db, current_user=MAGASINIER)
+
+    assert transaction.query_raw.await_count == 1
+    transaction.product.update.assert_not_awaited()
@@ -0,0 +1,92 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.pubsub import (
+    MAX_NOTIFY_PAYLOAD,
+    InMemoryHub,
+    InMemoryPubSub,
+    PostgresPubSub,
+    to_asyncpg_dsn,
+)
+from app.websockets import ConnectionManager
+from tests.test_websockets import FakeWebSocket
+
+
+@pytest.mark.asyncio
+async def test_message_reaches_the_worker_holding_the_socket():
+    hub = InMemoryHub()
+    worker_a, worker_b = ConnectionManager(), ConnectionManager()
+    await worker_a.start_backend(InMemoryPubSub(hub))
+    await worker_b.start_backend(InMemoryPubSub(hub))
+    socket_a, socket_b = FakeWebSocket(), FakeWebSocket()
+    await worker_a.connect(socket_a, "user_a")
+    await worker_b.connect(socket_b, "user_b")
+
+    await worker_a.send_to_users({"type": "t"}, ["user_b"])
+    await worker_b.broadcast({"type": "all"})
+    await asyncio.sleep(0.05)
+
+    assert socket_b.sent == ['{"type": "t"}', '{"type": "all"}']
+    assert socket_a.sent == ['{"type": "all"}']
+
+    await worker_a.stop_backend()
+    await worker_b.stop_backend()
+    assert hub.handlers == []
+
+
+def test_build_payloads_respects_notify_limit():
+    envelopes = [json.dumps({"u": ["user"], "m": "x" * 1000}) for _ in range(20)]
+
+    payloads = PostgresPubSub.build_payloads(envelopes)
+
+    assert len(payloads) > 1
+    assert all(len(p.encode("utf-8")) <= MAX_NOTIFY_PAYLOAD for p in payloads)
+    assert sum(len(json.loads(p)) for p in payloads) == 20
+
+
+@pytest.mark.asyncio
+async def test_oversized_envelope_is_published_by_reference():
+    pubsub = PostgresPubSub("postgresql://u:p@db/stock")
+    pubsub._connection = MagicMock()
+    pubsub._connection.fetchval = AsyncMock(return_value=42)
+    pubsub._connection.executemany = AsyncMock()
+    large = {"u": None, "m": "x" * MAX_NOTIFY_PAYLOAD}
+
+    await pubsub.publish(large)
+    await pubsub.publish({"u": None, "m": "small"})
+    await pubsub._send_pending()
+
+    (_, payload), = pubsub._connection.executemany.await_args.args[1]
+    assert json.loads(payload) == [{"p": 42}, {"u": None, "m": "small"}]
+    assert pubsub.envelopes_by_reference == 1
+
+    # Receiving worker: the reference is read back before delivery
+    received = []
+    pubsub._handler = AsyncMock(side_effect=received.append)
+    pubsub._connection.fetchval = AsyncMock(return_value=json.dumps(large))
+    pubsub._on_notify(None, 1, pubsub.channel, payload)
+    await asyncio.sleep(0)
+
+    assert large in received and {"u": None, "m": "small"} in received
+    assert pubsub._connection.fetchval.await_args.args[1] == 42
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_logged_and_released(caplog):
+    pubsub = PostgresPubSub("postgresql://u:p@db/stock")
+    pubsub._handler = AsyncMock(side_effect=RuntimeError("socket gone"))
+
+    pubsub._on_notify(None, 1, pubsub.channel, json.dumps([{"u": None, "m": "x"}]))
+    assert len(pubsub._deliveries) == 1
+    await asyncio.sleep(0.01)
+
+    assert pubsub._deliveries == set()
+    assert "Pub/sub delivery failed" in caplog.text
+
+
+def test_to_asyncpg_dsn_drops_prisma_parameters():
+    dsn = to_asyncpg_dsn("postgresql://u:p@db:5432/stock?schema=public&connection_limit=5&sslmode=require")
+    assert dsn == "postgresql://u:p@db:5432/stock?sslmode=require"
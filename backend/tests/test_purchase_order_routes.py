@@ -17,6 +17,7 @@ def mock_db_fixture():
     mock_db.counter = MagicMock()
     mock_db.purchaseorder.create = AsyncMock()
     mock_db.product.find_unique = AsyncMock()
+    mock_db.product.find_many = AsyncMock()
     mock_db.user.find_many = AsyncMock() # For websocket notifications
     mock_db.counter.upsert = AsyncMock()
     return mock_db
@@ -24,7 +25,7 @@ def mock_db_fixture():
 # Mock the CurrentUser dependency
 @pytest.fixture(name="mock_magasinier_user")
 def mock_magasinier_user_fixture():
-    return CurrentUser(id="user123", email="magasinier@example.com", name="Magasinier User", role=UserRole.MAGASINIER)
+    return CurrentUser(id="user123", email="magasinier@example.com", username="magasinier", name="Magasinier User", role=UserRole.MAGASINIER)
 
 # Mock the generate_next_number utility
 @pytest.fixture(name="mock_generate_next_number")
@@ -68,9 +69,9 @@ async def test_create_purchase_order_assigns_number(
     # Arrange
     mock_generate_next_number.return_value = "BC-2023-00001"
     
-    mock_db.product.find_unique.return_value = MagicMock(
-        id="prod1", name="Product 1", description="Desc 1", price=10.0, quantity=100, minStock=10
-    )
+    mock_db.product.find_many.return_value = [
+        MagicMock(id="prod1", name="Product 1", description="Desc 1", price=10.0, quantity=100, minStock=10)
+    ]
 
     mock_db.purchaseorder.create.return_value = PurchaseOrderResponse.model_validate({
         "id": "po1",
@@ -114,7 +115,9 @@ async def test_create_purchase_order_assigns_number(
 
     mock_generate_next_number.assert_called_once_with(mock_db, "BC")
     mock_db.purchaseorder.create.assert_called_once()
-    
+    mock_db.product.find_many.assert_awaited_once()
+    mock_db.product.find_unique.assert_not_called()
+
     create_call_args = mock_db.purchaseorder.create.call_args[1]["data"]
     assert create_call_args["orderNumber"] == "BC-2023-00001"
     
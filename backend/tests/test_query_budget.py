@@ -0,0 +1,90 @@
+import pytest
+
+from app.metrics import (
+    QueryBudget,
+    QueryBudgetExceeded,
+    instrument_client,
+    query_shape,
+    track_queries,
+)
+
+
+class Product:
+    pass
+
+
+class FakeClient:
+    """Stands for the Prisma client: actions go through `_execute`."""
+
+    async def _execute(self, *, method, arguments, model=None, root_selection=None):
+        if arguments.get("fail"):
+            raise RuntimeError("engine error")
+        return {"data": {"result": []}}
+
+
+instrument_client(FakeClient)
+
+
+async def _find_unique(client, product_id):
+    await client._execute(method="find_unique", arguments={"where": {"id": product_id}}, model=Product)
+
+
+def test_query_shape_ignores_values():
+    first = query_shape("find_many", Product, {"where": {"id": {"in": ["a", "b"]}}, "take": 10})
+    second = query_shape("find_many", Product, {"where": {"id": {"in": ["c"]}}, "take": 50})
+
+    assert first == second == "Product.find_many(take,where{id{in}})"
+
+
+def test_raw_query_shape_is_the_sql_text():
+    shape = query_shape("query_raw", None, {"query": 'SELECT *\n  FROM "Product"', "parameters": [1]})
+    assert shape == 'query_raw: SELECT * FROM "Product"'
+
+
+@pytest.mark.asyncio
+async def test_queries_are_counted_by_shape():
+    client = FakeClient()
+    with track_queries() as stats:
+        for product_id in ("p1", "p2", "p3"):
+            await _find_unique(client, product_id)
+        await client._execute(method="query_raw", arguments={"query": "SELECT 1"})
+
+    assert stats.db_queries == 4
+    assert stats.top_shapes(1) == [("Product.find_unique(where{id})", 3)]
+    assert not stats.violations
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_is_reported_as_n_plus_one():
+    client = FakeClient()
+    with track_queries(QueryBudget(max_repeats=2)) as stats:
+        for product_id in ("p1", "p2", "p3", "p4"):
+            await _find_unique(client, product_id)
+
+    assert len(stats.violations) == 1
+    assert "N+1" in stats.violations[0]
+    assert "Product.find_unique(where{id})" in stats.violations[0]
+
+
+@pytest.mark.asyncio
+async def test_budget_can_raise():
+    client = FakeClient()
+    with track_queries(QueryBudget(max_queries=1, raise_on_violation=True)):
+        await _find_unique(client, "p1")
+        with pytest.raises(QueryBudgetExceeded):
+            await _find_unique(client, "p2")
+
+
+@pytest.mark.asyncio
+async def test_failed_queries_are_counted_without_masking_the_error():
+    client = FakeClient()
+    with track_queries(QueryBudget(max_queries=0, raise_on_violation=True)) as stats:
+        with pytest.raises(RuntimeError, match="engine error"):
+            await client._execute(method="find_many", arguments={"fail": True}, model=Product)
+
+    assert stats.db_queries == 1
+
+
+@pytest.mark.asyncio
+async def test_queries_outside_of_a_request_are_not_tracked():
+    await _find_unique(FakeClient(), "p1")  # no error, nothing to record
@@ -20,7 +20,7 @@ def mock_db_fixture():
     mock_db.request.create = AsyncMock()
     mock_db.user.find_many = AsyncMock()
     mock_db.counter.upsert = AsyncMock()
-    mock_db.product.find_unique = AsyncMock() # Added for stock check in create_request
+    mock_db.product.find_many = AsyncMock() # Stock check in create_request (one query for all items)
 
     # Mocking tx() for transactional operations
     mock_db.tx = MagicMock()
@@ -32,7 +32,7 @@ def mock_db_fixture():
 # Mock the CurrentUser dependency
 @pytest.fixture(name="mock_chef_service_user")
 def mock_chef_service_user_fixture():
-    return CurrentUser(id="user123", email="chef@example.com", name="Chef Service", role=UserRole.CHEF_SERVICE)
+    return CurrentUser(id="user123", email="chef@example.com", username="chef", name="Chef Service", role=UserRole.CHEF_SERVICE)
 
 # Mock the generate_next_number utility
 @pytest.fixture(name="mock_generate_next_number")
@@ -40,11 +40,11 @@ def mock_generate_next_number_fixture():
     with patch("app.api.routes.request.generate_next_number", new_callable=AsyncMock) as mock:
         yield mock
 
-# Mock the websocket manager
-@pytest.fixture(name="mock_websocket_manager")
-def mock_websocket_manager_fixture():
-    with patch("app.api.routes.request.manager", new_callable=MagicMock) as mock:
-        mock.send_to_users = AsyncMock()
+# Mock the notification outbox (DAF notifications are written in the transaction)
+@pytest.fixture(name="mock_outbox")
+def mock_outbox_fixture():
+    with patch("app.api.routes.request.outbox", new_callable=MagicMock) as mock:
+        mock.enqueue = AsyncMock()
         yield mock
 
 # Fixture to override get_db
@@ -69,16 +69,16 @@ async def test_create_request_assigns_number(
     mock_db,
     mock_chef_service_user,
     mock_generate_next_number,
-    mock_websocket_manager,
+    mock_outbox,
     override_get_db_dependency, # Use the new fixture here
     override_auth_dependency # Use the new fixture here
 ):
     # Arrange
     mock_generate_next_number.return_value = "COM-2023-00001"
-    mock_db.product.find_unique.return_value = AsyncMock(
-        id="prod1", name="Product 1", quantity=100, # Sufficient quantity
-        _mock_await_return_value=MagicMock(id="prod1", name="Product 1", quantity=100) 
-    )
+    mock_db.product.find_many.return_value = [
+        MagicMock(id="prod1", name="Product 1", quantity=100), # Sufficient quantity
+        MagicMock(id="prod2", name="Product 2", quantity=100),
+    ]
     
     mock_db.request.create.return_value = RequestResponse.model_validate({
         "id": "req1",
@@ -99,10 +99,6 @@ async def test_create_request_assigns_number(
         "createdAt": datetime.now().isoformat(), # Add required fields
         "updatedAt": datetime.now().isoformat(), # Add required fields
     })    
-    mock_db.user.find_many.return_value = [
-        MagicMock(id="daf1", role=UserRole.DAF),
-        MagicMock(id="daf2", role=UserRole.DAF)
-    ]
 
     request_data = RequestCreate(
         items=[
@@ -126,18 +122,73 @@ async def test_create_request_assigns_number(
     assert response_data["requester"]["name"] == mock_chef_service_user.name
 
     mock_generate_next_number.assert_called_once_with(mock_db, "COM")
+    mock_db.product.find_many.assert_awaited_once_with(where={"id": {"in": ["prod1", "prod2"]}})
     mock_db.request.create.assert_called_once()
     
     # Check that the requestNumber passed to create was the generated one
     create_call_args = mock_db.request.create.call_args[1]["data"]
     assert create_call_args["requestNumber"] == "COM-2023-00001"
     
-    mock_websocket_manager.send_to_users.assert_called_once_with(
+    mock_outbox.enqueue.assert_awaited_once_with(
+        mock_db,
         {
             "type": "daf_approval_request",
             "message": "Nouvelle demande de stock (N°COM-2023-00001) en attente de votre approbation.",
         },
-        ["daf1", "daf2"],
+        roles=[UserRole.DAF],
     )
+    mock_outbox.wake.assert_called_once()
 
 # TODO: Add more tests for error cases, e.g., product not found, unauthorized user, etc.
+
+
+@pytest.mark.asyncio
+async def test_reject_request_notifies_requester_through_outbox(
+    mock_db,
+    mock_outbox,
+    override_get_db_dependency,
+):
+    daf_user = CurrentUser(id="daf1", email="daf@example.com", username="daf", name="DAF", role=UserRole.DAF)
+    app.dependency_overrides[get_current_user] = lambda: daf_user
+    mock_db.request.find_unique = AsyncMock()
+    mock_db.request.update = AsyncMock()
+    mock_db.approval = MagicMock()
+    mock_db.approval.create = AsyncMock()
+    mock_db.request.find_unique.side_effect = [
+        MagicMock(status="TRANSMISE", requesterId="user123"),
+        RequestResponse.model_validate({
+            "id": "req1",
+            "requestNumber": "COM-2023-00001",
+            "requesterId": "user123",
+            "status": "REJETEE",
+            "items": [],
+            "requester": {
+                "id": "user123",
+                "name": "Chef Service",
+                "email": "chef@example.com",
+                "role": "CHEF_SERVICE",
+                "department": "IT",
+            },
+            "approvedBy": None,
+            "receivedBy": None,
+            "approvals": [],
+            "createdAt": datetime.now().isoformat(),
+            "updatedAt": datetime.now().isoformat(),
+        }),
+    ]
+
+    try:
+        response = client.put("/api/requests/req1/reject", json={"decision": "REJETEE", "comment": "Budget épuisé"})
+    finally:
+        app.dependency_overrides.pop(get_current_user)
+
+    assert response.status_code == 200
+    mock_outbox.enqueue.assert_awaited_once_with(
+        mock_db,
+        {
+            "type": "request_decision",
+            "message": "Votre demande (N°COM-2023-00001) a été rejetée.",
+        },
+        user_ids=["user123"],
+    )
+    mock_outbox.wake.assert_called_once()
@@ -0,0 +1,125 @@
+import io
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.api.auth import CurrentUser, UserRole
+from app.services.stock_import import StockImportService, read_stock_file
+
+CSV = (
+    "Reference;Quantité\n"
+    "REF 1;10\n"
+    "REF2;5\n"
+    "REF3;abc\n"
+    "UNKNOWN;4\n"
+    ";3\n"
+    "REF4;7\n"
+    "REF4;8\n"
+).encode()
+
+
+@pytest.fixture(name="admin")
+def admin_fixture():
+    return CurrentUser(id="admin1", email="admin@example.com", username="admin", name="Admin", role=UserRole.ADMIN)
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.query_raw = AsyncMock(
+        return_value=[
+            {"key": "REF1", "id": "p1", "quantity": 4},
+            {"key": "REF2", "id": "p2", "quantity": 5},
+            {"key": "REF3", "id": "p3", "quantity": 1},
+            {"key": "REF4", "id": "p4", "quantity": 2},
+        ]
+    )
+    return mock_db
+
+
+def test_read_stock_file_normalizes_columns_and_references():
+    frame = read_stock_file(io.BytesIO(CSV), "stock.csv")
+
+    assert frame["reference"].tolist()[:2] == ["REF1", "REF2"]
+    assert frame["row"].tolist()[0] == 2
+
+
+def test_read_stock_file_rejects_missing_columns():
+    with pytest.raises(ValueError, match="Reference"):
+        read_stock_file(io.BytesIO(b"Article;Stock\nA;1\n"), "stock.csv")
+
+
+@pytest.mark.asyncio
+async def test_dry_run_resolves_all_references_in_one_query(mock_db, admin):
+    report = await StockImportService(mock_db).import_file(io.BytesIO(CSV), "stock.csv", admin)
+
+    mock_db.query_raw.assert_awaited_once()
+    assert sorted(json.loads(mock_db.query_raw.await_args.args[1])) == [
+        "REF1", "REF2", "REF3", "REF4", "UNKNOWN"
+    ]
+    mock_db.tx.assert_not_called()
+
+    statuses = {(row.row, row.status.value) for row in report.rows}
+    assert statuses == {
+        (2, "ADJUSTED"),
+        (3, "UNCHANGED"),
+        (4, "INVALID"),
+        (5, "NOT_FOUND"),
+        (6, "INVALID"),
+        (7, "INVALID"),
+        (8, "ADJUSTED"),
+    }
+    first = report.rows[0]
+    assert (first.productId, first.previousQuantity, first.newQuantity, first.difference) == ("p1", 4, 10, 6)
+    assert report.dryRun is True
+    assert (report.adjusted, report.unchanged, report.notFound, report.invalid) == (2, 1, 1, 3)
+
+
+@pytest.mark.asyncio
+async def test_apply_locks_rows_and_writes_adjustments_per_chunk(mock_db, admin):
+    transaction = MagicMock()
+    transaction.query_raw = AsyncMock(
+        side_effect=[
+            [{"id": "p1", "quantity": 4}],  # chunk 1: lock
+            [{"id": "p1", "name": "A", "reference": "REF1", "minStock": 1, "delta": 6,
+              "previousQuantity": 4, "quantity": 10, "found": True, "applied": True}],  # chunk 1: ledger
+            [{"id": "p4", "quantity": 8}],  # chunk 2: lock (already updated elsewhere)
+        ]
+    )
+    transaction.stockadjustment.create_many = AsyncMock()
+    mock_db.tx.return_value.__aenter__ = AsyncMock(return_value=transaction)
+    mock_db.tx.return_value.__aexit__ = AsyncMock(return_value=None)
+
+    report = await StockImportService(mock_db, chunk_size=1).import_file(
+        io.BytesIO(CSV), "stock.csv", admin, dry_run=False
+    )
+
+    assert mock_db.tx.call_count == 2
+    transaction.stockadjustment.create_many.assert_awaited_once()
+    adjustment = transaction.stockadjustment.create_many.await_args.kwargs["data"][0]
+    assert (adjustment["productId"], adjustment["quantity"]) == ("p1", 6)
+    assert (report.adjusted, report.unchanged) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_product_deleted_before_the_lock_is_reported_not_found(mock_db, admin):
+    transaction = MagicMock()
+    transaction.query_raw = AsyncMock(
+        side_effect=[
+            [{"id": "p4", "quantity": 2}],  # p1 deleted since the preview
+            [{"id": "p4", "name": "D", "reference": "REF4", "minStock": 1, "delta": 6,
+              "previousQuantity": 2, "quantity": 8, "found": True, "applied": True}],
+        ]
+    )
+    transaction.stockadjustment.create_many = AsyncMock()
+    mock_db.tx.return_value.__aenter__ = AsyncMock(return_value=transaction)
+    mock_db.tx.return_value.__aexit__ = AsyncMock(return_value=None)
+
+    report = await StockImportService(mock_db).import_file(io.BytesIO(CSV), "stock.csv", admin, dry_run=False)
+
+    adjustments = transaction.stockadjustment.create_many.await_args.kwargs["data"]
+    assert [adjustment["productId"] for adjustment in adjustments] == ["p4"]
+    deleted = next(row for row in report.rows if row.productId == "p1")
+    assert deleted.status.value == "NOT_FOUND" and deleted.previousQuantity is None
+    assert (report.adjusted, report.notFound, report.failed) == (1, 2, 0)
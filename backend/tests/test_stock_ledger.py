@@ -0,0 +1,93 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.stock_ledger import (
+    InsufficientStockError,
+    ProductNotFoundError,
+    StockLedger,
+    StockMovement,
+)
+from database.generated.prisma.enums import TransactionSource, TransactionType
+
+
+def _row(product_id, delta, previous, quantity, found=True, applied=True):
+    return {
+        "id": product_id,
+        "delta": delta,
+        "name": f"Produit {product_id}",
+        "reference": f"REF-{product_id}",
+        "minStock": 5,
+        "previousQuantity": previous,
+        "quantity": quantity,
+        "found": found,
+        "applied": applied,
+    }
+
+
+def _out(product_id, quantity):
+    return StockMovement(product_id, quantity, TransactionType.SORTIE, TransactionSource.REQUEST, "u1")
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.query_raw = AsyncMock(return_value=[])
+    return mock_db
+
+
+@pytest.mark.asyncio
+async def test_apply_sends_the_whole_batch_in_one_query(mock_db):
+    mock_db.query_raw.return_value = [_row("p1", -3, 10, 7), _row("p2", 4, 0, 4)]
+
+    levels = await StockLedger(mock_db).apply(
+        [
+            _out("p1", 1),
+            _out("p1", 2),
+            StockMovement("p2", 4, TransactionType.ENTREE, TransactionSource.RECEIPT, "u1"),
+        ]
+    )
+
+    mock_db.query_raw.assert_awaited_once()
+    payload = json.loads(mock_db.query_raw.await_args.args[1])
+    assert [(m["productId"], m["delta"], m["type"]) for m in payload] == [
+        ("p1", -1, "SORTIE"),
+        ("p1", -2, "SORTIE"),
+        ("p2", 4, "ENTREE"),
+    ]
+    assert len({m["id"] for m in payload}) == 3
+    assert levels["p1"].quantity == 7
+    assert levels["p2"].quantity == 4
+    assert levels["p2"].minStock == 5
+
+
+@pytest.mark.asyncio
+async def test_apply_without_movements_does_not_query(mock_db):
+    assert await StockLedger(mock_db).apply([]) == {}
+    mock_db.query_raw.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_apply_raises_when_stock_would_become_negative(mock_db):
+    mock_db.query_raw.return_value = [_row("p1", -5, 2, None, applied=False)]
+
+    with pytest.raises(InsufficientStockError) as exc_info:
+        await StockLedger(mock_db).apply([_out("p1", 5)])
+
+    assert "Available: 2, Requested: 5" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_apply_raises_for_unknown_product(mock_db):
+    mock_db.query_raw.return_value = [_row("missing", -1, None, None, found=False, applied=False)]
+
+    with pytest.raises(ProductNotFoundError) as exc_info:
+        await StockLedger(mock_db).apply([_out("missing", 1)])
+
+    assert "not found" in str(exc_info.value)
+
+
+def test_movement_quantity_must_be_positive():
+    with pytest.raises(ValueError):
+        _out("p1", 0)
@@ -0,0 +1,66 @@
+import csv
+import gzip
+import io
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.api.routes.product import _gzip_chunks, _stock_status_csv_chunks
+
+
+def _export_row(index):
+    return {
+        "id": f"prod{index}",
+        "name": f"Produit {index:03d}",
+        "reference": f"REF-{index:03d}",
+        "quantity": index,
+        "minStock": 5,
+        "unit": "pcs",
+        "location": None,
+        "categoryName": "Papeterie",
+        "status": "CRITICAL" if index <= 5 else "AVAILABLE",
+    }
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.query_raw = AsyncMock()
+    return mock_db
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_csv_export_pages_with_keyset(mock_db, monkeypatch):
+    monkeypatch.setattr("app.api.routes.product.EXPORT_BATCH_SIZE", 2)
+    mock_db.query_raw.side_effect = [
+        [_export_row(1), _export_row(2)],
+        [_export_row(3)],
+    ]
+
+    chunks = await _collect(_stock_status_csv_chunks(mock_db, "produit", None))
+
+    # Header, then one chunk per batch.
+    assert len(chunks) == 3
+    first_call, second_call = mock_db.query_raw.await_args_list
+    assert first_call.args[1:] == ("produit", None, None, 2)
+    assert second_call.args[1:] == ("produit", "Produit 002", "prod2", 2)
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0][:3] == ["ID", "Nom", "Référence"]
+    assert rows[1] == ["prod1", "Produit 001", "REF-001", "Papeterie", "1", "5", "pcs", "", "Critique"]
+    assert len(rows) == 4
+
+
+@pytest.mark.asyncio
+async def test_gzip_variant_decompresses_to_the_same_csv(mock_db):
+    mock_db.query_raw.side_effect = [[_export_row(i) for i in range(1, 10)]]
+    plain = b"".join(await _collect(_stock_status_csv_chunks(mock_db, None, None)))
+
+    mock_db.query_raw.side_effect = [[_export_row(i) for i in range(1, 10)]]
+    compressed = b"".join(await _collect(_gzip_chunks(_stock_status_csv_chunks(mock_db, None, None))))
+
+    assert gzip.decompress(compressed) == plain
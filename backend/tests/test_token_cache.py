@@ -0,0 +1,150 @@
+import time
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import jwt
+import pytest
+
+from app.api import auth
+from app.api.auth import (
+    VerifiedTokenCache,
+    create_access_token,
+    get_user_id_from_token,
+    set_jwt_settings,
+    token_cache,
+    verify_token,
+)
+
+
+def _token(user_id="u1", **kwargs):
+    claims = {"id": user_id, "username": f"user-{user_id}", "name": "Test", "role": "ADMIN"}
+    return create_access_token(claims, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    set_jwt_settings("test-secret")
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def db(monkeypatch):
+    db = MagicMock()
+    db.query_raw = AsyncMock(return_value=[{"validAfter": None}])
+    monkeypatch.setattr(auth, "get_client", lambda: db)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_second_verification_is_served_from_the_cache(db):
+    token = _token()
+    assert (await verify_token(token)).id == "u1"
+
+    with patch.object(auth.jwt, "decode", wraps=jwt.decode) as decode:
+        assert (await verify_token(token)).username == "user-u1"
+        decode.assert_not_called()
+    db.query_raw.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_user_id_from_token_shares_the_cache():
+    token = _token()
+    await verify_token(token)
+
+    with patch.object(auth.jwt, "decode", wraps=jwt.decode) as decode:
+        assert await get_user_id_from_token(token) == "u1"
+        decode.assert_not_called()
+    assert await get_user_id_from_token("not-a-token") is None
+
+
+def test_cached_entry_is_not_served_after_expiry():
+    cache = VerifiedTokenCache()
+    user = auth.CurrentUser(id="u1", username="a", name="A", role=auth.UserRole.ADMIN)
+    cache.put("t", user, expires_at=time.time() - 1)
+
+    assert cache.get("t") is None
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_rejected():
+    token = _token(expires_delta=timedelta(seconds=-10))
+    with pytest.raises(jwt.ExpiredSignatureError):
+        await verify_token(token)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = VerifiedTokenCache(max_size=2)
+    expires_at = time.time() + 60
+    for name in ("a", "b"):
+        cache.put(name, auth.CurrentUser(id=name, username=name, name=name, role=auth.UserRole.ADMIN), expires_at)
+    cache.get("a")
+    cache.put("c", auth.CurrentUser(id="c", username="c", name="c", role=auth.UserRole.ADMIN), expires_at)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+@pytest.mark.asyncio
+async def test_revocation_rejects_tokens_issued_before():
+    token = _token()
+    await verify_token(token)
+
+    token_cache.revoke_user("u1", at=time.time() + 1)
+
+    with pytest.raises(jwt.InvalidTokenError):
+        await verify_token(token)
+    assert token_cache.stats()["rejectedRevoked"] == 1
+    # Other users are not affected
+    assert (await verify_token(_token("u2"))).id == "u2"
+
+
+@pytest.mark.asyncio
+async def test_token_issued_after_revocation_is_accepted():
+    token_cache.revoke_user("u1", at=time.time() - 5)
+    assert (await verify_token(_token())).id == "u1"
+
+
+@pytest.mark.asyncio
+async def test_stats_report_the_hit_rate():
+    token = _token()
+    await verify_token(token)
+    await verify_token(token)
+    await verify_token(token)
+
+    stats = token_cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hitRate"] == pytest.approx(0.6667)
+
+
+@pytest.mark.asyncio
+async def test_token_issued_within_the_second_of_a_revocation_is_told_apart():
+    before = _token()
+    time.sleep(0.002)
+    token_cache.revoke_user("u1", at=auth.issued_at())
+    time.sleep(0.002)
+    after = _token()
+
+    with pytest.raises(jwt.InvalidTokenError):
+        await verify_token(before)
+    assert (await verify_token(after)).id == "u1"
+
+
+@pytest.mark.asyncio
+async def test_cutoff_stored_on_the_user_is_checked_on_cache_miss(db):
+    token = _token()
+    # Revoked by another worker or before a restart: this cache has no trace of it
+    db.query_raw.return_value = [{"validAfter": time.time() + 1}]
+
+    with pytest.raises(jwt.InvalidTokenError):
+        await verify_token(token)
+    assert db.query_raw.await_args.args[1] == "u1"
+
+    db.query_raw.return_value = []  # deleted user
+    with pytest.raises(jwt.InvalidTokenError):
+        await verify_token(_token("u2"))
+    assert token_cache.stats()["rejectedRevoked"] == 2
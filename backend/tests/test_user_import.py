@@ -0,0 +1,81 @@
+import io
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.api.auth import UserRole
+from app.api.routes import user as user_routes
+from app.services.user_import import UserImportService, parse_role, read_users_file
+
+CSV = (
+    "Nom;login;mot de passe;Role;Département\n"
+    "Chef Keur Massar ;keur.massar;passer;Chef de service;PF Keur Massar\n"
+    "Magasinier;mag1;secret;MAGASINIER;\n"
+    "Sans mot de passe;nopass;;DAF;\n"
+    "Rôle inconnu;bad.role;x;Stagiaire;\n"
+    "Doublon;mag1;secret2;magasinier;Stock\n"
+).encode()
+
+
+@pytest.fixture(name="mock_db")
+def mock_db_fixture():
+    mock_db = MagicMock()
+    mock_db.query_raw = AsyncMock(
+        return_value=[
+            {"id": "u1", "username": "keur.massar", "created": True},
+            {"id": "u2", "username": "mag1", "created": False},
+        ]
+    )
+    return mock_db
+
+
+def test_parse_role_accepts_enum_names_and_labels():
+    assert parse_role("Chef de service") == UserRole.CHEF_SERVICE
+    assert parse_role("chef_service") == UserRole.CHEF_SERVICE
+    assert parse_role("daf") == UserRole.DAF
+    assert parse_role("Stagiaire") is None
+
+
+def test_read_users_file_maps_users_xlsx_columns():
+    frame = read_users_file(io.BytesIO(CSV), "users.csv")
+
+    first = frame.iloc[0]
+    assert (first["username"], first["name"], first["role"]) == ("keur.massar", "Chef Keur Massar", "Chef de service")
+    assert frame["email"].isna().all()
+
+
+@pytest.mark.asyncio
+async def test_import_hashes_in_bulk_and_upserts_in_one_statement(mock_db):
+    with patch(
+        "app.services.user_import.hash_passwords", new_callable=AsyncMock, side_effect=lambda pw: [f"h:{p}" for p in pw]
+    ) as hash_mock:
+        report = await UserImportService(mock_db).import_file(io.BytesIO(CSV), "users.csv")
+
+    hash_mock.assert_awaited_once()
+    assert hash_mock.call_args.args[0] == ["passer", "secret2"]
+    mock_db.query_raw.assert_awaited_once()
+    payload = json.loads(mock_db.query_raw.await_args.args[1])
+    assert [(u["username"], u["role"], u["password"]) for u in payload] == [
+        ("keur.massar", "CHEF_SERVICE", "h:passer"),
+        ("mag1", "MAGASINIER", "h:secret2"),
+    ]
+    assert (report.created, report.updated, report.skipped) == (1, 1, 3)
+    assert [row.status.value for row in report.rows] == ["CREATED", "SKIPPED", "SKIPPED", "SKIPPED", "UPDATED"]
+
+
+@pytest.mark.asyncio
+async def test_import_route_revokes_the_tokens_of_updated_users(mock_db):
+    upload = MagicMock(file=io.BytesIO(CSV), filename="users.csv")
+    with patch(
+        "app.services.user_import.hash_passwords", new_callable=AsyncMock, side_effect=lambda pw: [f"h:{p}" for p in pw]
+    ), patch.object(user_routes, "revoke_user_tokens", new_callable=AsyncMock) as revoke_mock, patch.object(
+        user_routes, "manager"
+    ) as manager_mock:
+        manager_mock.publish_control = AsyncMock()
+        report = await user_routes.import_users(file=upload, db=mock_db, current_user=MagicMock())
+
+    assert [row.userId for row in report.rows if row.userId] == ["u1", "u2"]
+    revoke_mock.assert_awaited_once_with(mock_db, ["u2"])
+    # Every worker drops its role -> users index
+    manager_mock.publish_control.assert_awaited_once_with("invalidate_roles", {})
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from app.websockets import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def _settle(seconds: float = 0.05):
+    await asyncio.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_message_reaches_every_tab_of_the_user():
+    manager = ConnectionManager()
+    tab1, tab2, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await manager.connect(tab1, "user1")
+    await manager.connect(tab2, "user1")
+    await manager.connect(other, "user2")
+
+    await manager.send_to_users({"type": "t", "message": "m"}, ["user1"])
+    await _settle()
+
+    assert tab1.sent == tab2.sent == [json.dumps({"type": "t", "message": "m"})]
+    assert other.sent == []
+
+    manager.disconnect("user1", tab1)
+    assert manager.get_metrics()["connections"] == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_does_not_block_others_and_is_dropped():
+    manager = ConnectionManager(queue_size=2, send_timeout=0.05)
+    slow, fast = FakeWebSocket(delay=1), FakeWebSocket()
+    await manager.connect(slow, "slow")
+    await manager.connect(fast, "fast")
+
+    await manager.broadcast({"type": "t", "message": "1"})
+    await _settle(0.3)
+
+    assert len(fast.sent) == 1
+    assert slow.closed_with == 1013
+    assert "slow" not in manager.active_connections
+    assert manager.get_metrics()["slowConsumersDropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_the_consumer():
+    manager = ConnectionManager(queue_size=1, send_timeout=5)
+    stuck = FakeWebSocket(delay=5)
+    await manager.connect(stuck, "user1")
+
+    for i in range(3):
+        await manager.send_personal_message({"n": i}, "user1")
+    await _settle()
+
+    metrics = manager.get_metrics()
+    assert metrics["messagesDropped"] >= 1
+    assert metrics["connections"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_dropped_once():
+    manager = ConnectionManager(queue_size=1, send_timeout=5)
+    stuck = FakeWebSocket(delay=5)
+    connection = await manager.connect(stuck, "user1")
+
+    for i in range(4):
+        manager._enqueue(json.dumps({"n": i}), [connection])
+    assert connection.closing and len(manager._drop_tasks) == 1
+    await _settle()
+
+    assert manager.get_metrics()["slowConsumersDropped"] == 1
+    assert stuck.closed_with == 1013
+    assert not manager._drop_tasks